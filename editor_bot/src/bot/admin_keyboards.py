@@ -7,6 +7,8 @@ ADMIN_MAIN = "admin_main"
 ADMIN_SRC = "admin_src"
 ADMIN_SRC_ADD = "admin_src_add"
 ADMIN_SRC_DEL = "admin_src_del"  # + _id
+ADMIN_SRC_WEIGHT = "admin_src_w"  # + _id  (cycle outbox weight)
+ADMIN_SRC_PRIO = "admin_src_p"  # + _id  (toggle priority)
 ADMIN_TGT = "admin_tgt"
 ADMIN_TGT_EDIT = "admin_tgt_edit"
 ADMIN_ED = "admin_ed"
@@ -101,7 +103,7 @@ def admin_sources_keyboard(
     channels: list[dict],
     back: bool = True,
 ) -> InlineKeyboardMarkup:
-    """Sources submenu: list of channels with delete button + Add + Back."""
+    """Sources submenu: per channel delete, weight and priority buttons (when migrated) + Add + Back."""
     rows = []
     for ch in channels:
         ident = ch.get("channel_identifier", "")
@@ -109,12 +111,23 @@ def admin_sources_keyboard(
         cid = ch.get("id")
         if cid is not None:
             label = (display[:28] + "…") if len(display) > 28 else display
-            rows.append([
+            row = [
                 InlineKeyboardButton(
                     text=f"❌ {label}",
                     callback_data=f"{ADMIN_SRC_DEL}_{cid}",
                 ),
-            ])
+            ]
+            if ch.get("weight") is not None:
+                row.append(
+                    InlineKeyboardButton(text=f"⚖️ {ch['weight']}", callback_data=f"{ADMIN_SRC_WEIGHT}_{cid}")
+                )
+                row.append(
+                    InlineKeyboardButton(
+                        text="⚡" if ch.get("priority") else "☆",
+                        callback_data=f"{ADMIN_SRC_PRIO}_{cid}",
+                    )
+                )
+            rows.append(row)
     rows.append([InlineKeyboardButton(text="➕ Добавить канал", callback_data=ADMIN_SRC_ADD)])
     if back:
         rows.append([InlineKeyboardButton(text="Назад", callback_data=ADMIN_MAIN)])
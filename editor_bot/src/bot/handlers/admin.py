@@ -47,6 +47,8 @@ from src.database.admin_repository import (
     remove_source_channel,
     remove_target_channel,
     set_config_value,
+    cycle_source_channel_weight,
+    toggle_source_channel_priority,
 )
 from src.bot.admin_keyboards import (
     ADMIN_ADM,
@@ -76,6 +78,8 @@ from src.bot.admin_keyboards import (
     ADMIN_SRC,
     ADMIN_SRC_ADD,
     ADMIN_SRC_DEL,
+    ADMIN_SRC_PRIO,
+    ADMIN_SRC_WEIGHT,
     ADMIN_TGT,
     ADMIN_TGT_ADD,
     ADMIN_TGT_DEL,
@@ -206,6 +210,24 @@ async def cb_admin_close(callback: CallbackQuery) -> None:
 # --- Source channels ---
 
 
+def _sources_text(channels: list[dict]) -> str:
+    """Source channels list for the admin panel; weight and ⚡ priority shown when set."""
+    text = "Каналы-источники (мониторинг PDF):\n\n"
+    if not channels:
+        return text + "Нет каналов. Нажмите «Добавить канал»."
+    for ch in channels:
+        ident = ch.get("channel_identifier", "")
+        name = ch.get("display_name") or ident
+        active = "✅" if ch.get("is_active") else "⏸"
+        extra = ""
+        if ch.get("weight") is not None:
+            extra = f", вес {ch['weight']}" + (", ⚡ приоритет" if ch.get("priority") else "")
+        text += f"{active} {_esc(name)}\n  ({_esc(ident)}{extra})\n"
+    if any(ch.get("weight") is not None for ch in channels):
+        text += "\n⚖️ — вес в очереди (постов за круг), ⚡ — срочный источник (вне очереди)."
+    return text
+
+
 @router.callback_query(F.data == ADMIN_SRC)
 async def cb_admin_sources(callback: CallbackQuery, **kwargs: Any) -> None:
     """Show source channels list and keyboard."""
@@ -216,17 +238,8 @@ async def cb_admin_sources(callback: CallbackQuery, **kwargs: Any) -> None:
         return
     await callback.answer()
     channels = await get_all_source_channels(pool)
-    text = "Каналы-источники (мониторинг PDF):\n\n"
-    if not channels:
-        text += "Нет каналов. Нажмите «Добавить канал»."
-    else:
-        for ch in channels:
-            ident = ch.get("channel_identifier", "")
-            name = ch.get("display_name") or ident
-            active = "✅" if ch.get("is_active") else "⏸"
-            text += f"{active} {_esc(name)}\n  ({_esc(ident)})\n"
     await callback.message.edit_text(
-        text,
+        _sources_text(channels),
         reply_markup=admin_sources_keyboard(channels),
     )
 
@@ -271,23 +284,55 @@ async def cb_admin_src_del(callback: CallbackQuery, **kwargs: Any) -> None:
         )
         await callback.answer("Канал удалён.")
         channels = await get_all_source_channels(pool)
-        text = "Каналы-источники (мониторинг PDF):\n\n"
-        if not channels:
-            text += "Нет каналов. Нажмите «Добавить канал»."
-        else:
-            for ch in channels:
-                ident = ch.get("channel_identifier", "")
-                name = ch.get("display_name") or ident
-                active = "✅" if ch.get("is_active") else "⏸"
-                text += f"{active} {_esc(name)}\n  ({_esc(ident)})\n"
         await callback.message.edit_text(
-            text,
+            _sources_text(channels),
             reply_markup=admin_sources_keyboard(channels),
         )
     else:
         await callback.answer("Канал не найден или уже удалён.", show_alert=True)
 
 
+@router.callback_query(F.data.startswith(ADMIN_SRC_WEIGHT + "_") | F.data.startswith(ADMIN_SRC_PRIO + "_"))
+async def cb_admin_src_schedule(callback: CallbackQuery, **kwargs: Any) -> None:
+    """Cycle outbox weight or toggle priority of a source channel, then redraw the list."""
+    data = kwargs
+    pool = _pool(data)
+    if not pool:
+        await callback.answer("Ошибка сервера.", show_alert=True)
+        return
+    is_weight = callback.data.startswith(ADMIN_SRC_WEIGHT + "_")
+    prefix = ADMIN_SRC_WEIGHT if is_weight else ADMIN_SRC_PRIO
+    try:
+        cid = int(callback.data[len(prefix) + 1 :].strip())
+    except ValueError:
+        await callback.answer("Неверные данные.", show_alert=True)
+        return
+    if is_weight:
+        value = await cycle_source_channel_weight(pool, cid)
+        details = {"channel_id": cid, "weight": value}
+        notice = f"Вес: {value}"
+    else:
+        value = await toggle_source_channel_priority(pool, cid)
+        details = {"channel_id": cid, "priority": value}
+        notice = "Приоритет включён." if value else "Приоритет выключен."
+    if value is None:
+        await callback.answer("Канал не найден.", show_alert=True)
+        return
+    await add_audit_log(
+        pool,
+        None,
+        "admin_source_channel_schedule",
+        actor=str(callback.from_user.id) if callback.from_user else None,
+        details=details,
+    )
+    await callback.answer(notice)
+    channels = await get_all_source_channels(pool)
+    await callback.message.edit_text(
+        _sources_text(channels),
+        reply_markup=admin_sources_keyboard(channels),
+    )
+
+
 @router.message(AdminStates.adding_source_channel, F.text)
 async def process_add_source_channel(message: Message, state: FSMContext, **kwargs: Any) -> None:
     """Process entered channel identifier and add to DB."""
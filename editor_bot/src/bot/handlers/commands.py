@@ -6,7 +6,7 @@ from aiogram.filters import Command
 import structlog
 
 from src.database.admin_repository import is_admin
-from src.database.repository import get_post_counts_by_status
+from src.database.repository import get_post_counts_by_status, get_summary_cache_stats
 from src.bot.admin_keyboards import admin_main_keyboard, editor_admin_keyboard
 
 log = structlog.get_logger()
@@ -14,6 +14,14 @@ log = structlog.get_logger()
 router = Router(name="commands")
 
 ADMIN_BUTTON_TEXT = "Админка"
+SUMMARY_CACHE_STATS_DAYS = 7
+
+
+def format_summary_cache_line(hits: int, misses: int) -> str:
+    """Hit rate line for /status, e.g. 'Кэш саммари (7 дн.): 12 из 40 (30%)'."""
+    total = hits + misses
+    rate = f"{hits * 100 // total}%" if total else "—"
+    return f"Кэш саммари ({SUMMARY_CACHE_STATS_DAYS} дн.): {hits} из {total} ({rate})"
 
 
 def admin_reply_keyboard() -> ReplyKeyboardMarkup:
@@ -66,14 +74,20 @@ async def cmd_help(message: Message) -> None:
 
 @router.message(Command("status"))
 async def cmd_status(message: Message, pool=None) -> None:
-    """Respond to /status with post counts by status from DB."""
+    """Respond to /status with post counts by status and summary cache hit rate from DB."""
     if not pool:
         await message.answer("Бот работает. Очередь постов смотрите в n8n или в БД.")
         return
     try:
         counts = await get_post_counts_by_status(pool)
-        lines = ["По статусам:"] + [f"  {s}: {c}" for s, c in sorted(counts.items())]
-        await message.answer("\n".join(lines) if counts else "Постов пока нет.")
+        if counts:
+            lines = ["По статусам:"] + [f"  {s}: {c}" for s, c in sorted(counts.items())]
+        else:
+            lines = ["Постов пока нет."]
+        cache_stats = await get_summary_cache_stats(pool, SUMMARY_CACHE_STATS_DAYS)
+        if cache_stats is not None:
+            lines.append(format_summary_cache_line(*cache_stats))
+        await message.answer("\n".join(lines))
     except Exception as e:
         log.error("status_failed", exc_info=True, error=str(e))
         await message.answer("Ошибка запроса к БД.")
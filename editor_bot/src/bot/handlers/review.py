@@ -7,7 +7,7 @@ from typing import Any
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot, F, Router
-from aiogram.types import CallbackQuery, FSInputFile, Message
+from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 import structlog
 
@@ -21,6 +21,8 @@ from src.database.repository import (
 from src.database.admin_repository import get_channel_ids_for_publish, get_config_value
 from src.bot.keyboards import review_keyboard, schedule_actions_keyboard
 from src.bot.states import EditSummaryStates, ScheduleStates
+from src.services.pdf_optimizer import pdf_input_file
+from src.services.pdf_storage import is_indexed_pdf
 from src.services.publisher import publish_to_all_channels
 from src.utils.text import split_html_safe, summary_to_safe_html, SUMMARY_MAX_LENGTH
 
@@ -66,10 +68,10 @@ async def _send_post_to_editor(
         msg = await bot.send_message(editor_chat_id, chunks[0], reply_markup=kb)
         for part in chunks[1:]:
             await bot.send_message(editor_chat_id, part)
-        if pdf_path and os.path.isfile(pdf_path):
+        if pdf_path and (await is_indexed_pdf(pdf_path) or os.path.isfile(pdf_path)):
             await bot.send_document(
                 editor_chat_id,
-                FSInputFile(pdf_path),
+                await pdf_input_file(pdf_path),
                 caption=f"PDF к посту #{post_id}",
                 reply_to_message_id=msg.message_id,
             )
@@ -35,6 +35,27 @@ class Settings(BaseSettings):
     # Прокси для запросов к Telegram (Bot API). Если пусто — используется HTTP_PROXY из env.
     TELEGRAM_PROXY: Optional[str] = None
 
+    # Оптимизация PDF перед загрузкой в Telegram (pikepdf, пул процессов): вариант *.opt.pdf сохраняется
+    # рядом с оригиналом (нужна запись в PDF_STORAGE_PATH) и отправляется редакторам и в каналы, если он
+    # заметно меньше. Оригинал не меняется. 0 — отключено.
+    PDF_OPTIMIZE_WORKERS: int = 0
+    # Файлы меньше N КБ отправляются как есть; вариант используется, если экономит не меньше N процентов.
+    PDF_OPTIMIZE_MIN_KB: int = 1024
+    PDF_OPTIMIZE_MIN_SAVINGS_PCT: int = 10
+
+    # Сборщик мусора PDF: удаляет файлы, на которые не ссылается ни ожидающая строка userbot_outbox, ни пост
+    # в активном статусе. Раз в N минут, 0 — отключено (тогда можно пользоваться scripts/cleanup_pdfs.sh).
+    PDF_GC_INTERVAL_MIN: int = 0
+    # Сколько дней хранить PDF после перехода всех его постов в статус: "статус=дни" через запятую.
+    # Статусы без правила (processing, pending_review, scheduled, ...) файл не отдают.
+    PDF_GC_RETENTION_DAYS: str = "rejected=2,published=30,publish_failed=14"
+    # Файлы без единого поста и без ожидающей отправки удаляются через столько дней.
+    PDF_GC_ORPHAN_DAYS: int = 3
+    # Не больше N удалений в секунду, чтобы не нагружать диск; 0 — без ограничения.
+    PDF_GC_DELETES_PER_SEC: float = 20
+    # Только отчёт (что и сколько байт было бы удалено), без удаления.
+    PDF_GC_DRY_RUN: bool = False
+
     @field_validator("EDITOR_CHAT_ID")
     @classmethod
     def editor_chat_id_positive(cls, v: Optional[int]) -> Optional[int]:
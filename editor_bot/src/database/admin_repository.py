@@ -24,16 +24,47 @@ async def get_active_source_channels(pool: asyncpg.Pool) -> list[dict]:
 
 
 async def get_all_source_channels(pool: asyncpg.Pool) -> list[dict]:
-    """Return all source channels for admin list."""
-    rows = await pool.fetch(
-        """
-        SELECT id, channel_identifier, display_name, is_active, created_at
-        FROM source_channels ORDER BY created_at
-        """
-    )
+    """Return all source channels for admin list (with outbox weight/priority when migrated)."""
+    try:
+        rows = await pool.fetch(
+            """
+            SELECT id, channel_identifier, display_name, is_active, created_at, weight, priority
+            FROM source_channels ORDER BY created_at
+            """
+        )
+    except asyncpg.UndefinedColumnError:
+        rows = await pool.fetch(
+            """
+            SELECT id, channel_identifier, display_name, is_active, created_at
+            FROM source_channels ORDER BY created_at
+            """
+        )
     return [dict(r) for r in rows]
 
 
+# Weights the admin panel cycles through (posts per round in the userbot outbox)
+SOURCE_WEIGHT_STEPS = (1, 2, 3, 5)
+
+
+async def cycle_source_channel_weight(pool: asyncpg.Pool, channel_id: int) -> Optional[int]:
+    """Set weight to the next value of SOURCE_WEIGHT_STEPS (wraps to 1). Returns new weight or None."""
+    current = await pool.fetchval("SELECT weight FROM source_channels WHERE id = $1", channel_id)
+    if current is None:
+        return None
+    higher = [w for w in SOURCE_WEIGHT_STEPS if w > current]
+    new_weight = higher[0] if higher else SOURCE_WEIGHT_STEPS[0]
+    await pool.execute("UPDATE source_channels SET weight = $1 WHERE id = $2", new_weight, channel_id)
+    return new_weight
+
+
+async def toggle_source_channel_priority(pool: asyncpg.Pool, channel_id: int) -> Optional[bool]:
+    """Flip priority flag (urgent source, delivered first). Returns new value or None if not found."""
+    return await pool.fetchval(
+        "UPDATE source_channels SET priority = NOT priority WHERE id = $1 RETURNING priority",
+        channel_id,
+    )
+
+
 async def add_source_channel(
     pool: asyncpg.Pool,
     channel_identifier: str,
@@ -0,0 +1,56 @@
+"""pdf_files table (migration 020) and the posts/outbox rows that reference stored PDFs."""
+
+from typing import Any, Optional
+
+import asyncpg
+
+
+async def touch_pdf_file(pool: asyncpg.Pool, path: str, reference: Optional[str] = None) -> bool:
+    """
+    Bump last_access_at of path and add reference (e.g. "post:42") to referenced_by.
+    Returns False if path is not in the index.
+    """
+    row = await pool.fetchrow(
+        """
+        UPDATE pdf_files SET
+            last_access_at = NOW(),
+            referenced_by = CASE
+                WHEN $2::text IS NULL OR $2::text = ANY(referenced_by) THEN referenced_by
+                ELSE array_append(referenced_by, $2::text)
+            END
+        WHERE path = $1
+        RETURNING path
+        """,
+        path,
+        reference,
+    )
+    return row is not None
+
+
+async def get_pdf_references(pool: asyncpg.Pool, paths: list[str]) -> dict[str, tuple[bool, list[tuple[str, Any]]]]:
+    """
+    For each path: whether a userbot_outbox row still needs it (pending, or accepted by n8n and
+    not yet completed), and (status, updated_at)
+    of every post that references it. Paths nobody references map to (False, []).
+    """
+    rows = await pool.fetch(
+        """
+        WITH f AS (SELECT unnest($1::text[]) AS path)
+        SELECT f.path,
+               EXISTS (
+                   SELECT 1 FROM userbot_outbox o
+                   WHERE o.pdf_path = f.path AND o.status IN ('pending', 'accepted') AND o.pdf_path <> ''
+               ) AS queued,
+               COALESCE(array_agg(p.status) FILTER (WHERE p.id IS NOT NULL), '{}') AS statuses,
+               COALESCE(array_agg(p.updated_at) FILTER (WHERE p.id IS NOT NULL), '{}') AS updated
+        FROM f LEFT JOIN posts p ON p.pdf_path = f.path AND p.pdf_path <> ''
+        GROUP BY f.path
+        """,
+        paths,
+    )
+    return {row["path"]: (row["queued"], list(zip(row["statuses"], row["updated"]))) for row in rows}
+
+
+async def forget_pdf_files(pool: asyncpg.Pool, paths: list[str]) -> None:
+    """Drop index rows of deleted files."""
+    await pool.execute("DELETE FROM pdf_files WHERE path = ANY($1::text[])", paths)
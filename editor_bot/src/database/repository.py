@@ -8,6 +8,7 @@ import asyncpg
 import structlog
 
 from src.database.models import Post
+from src.utils.resilience import full_jitter_backoff
 
 log = structlog.get_logger()
 
@@ -176,6 +177,7 @@ async def update_post_status(
 
 DELIVERY_RETRY_MAX_ATTEMPTS = 5
 DELIVERY_RETRY_BACKOFF_BASE_SEC = 60
+DELIVERY_RETRY_BACKOFF_CAP_SEC = 3600
 
 
 async def get_posts_for_delivery_retry(pool: asyncpg.Pool, limit: int = 5) -> list[Post]:
@@ -225,7 +227,7 @@ async def update_post_delivery_failed(
     error: str,
     attempts: int,
 ) -> None:
-    """Set delivery_attempts, last_delivery_error, next_retry_at; if attempts >= max set status=send_failed."""
+    """Set delivery_attempts, last_delivery_error, next_retry_at (full-jitter backoff); if attempts >= max set status=send_failed."""
     if attempts >= DELIVERY_RETRY_MAX_ATTEMPTS:
         await pool.execute(
             """
@@ -239,7 +241,7 @@ async def update_post_delivery_failed(
             (error or "")[:2000],
         )
     else:
-        delay_sec = DELIVERY_RETRY_BACKOFF_BASE_SEC * (2 ** attempts)
+        delay_sec = full_jitter_backoff(attempts, DELIVERY_RETRY_BACKOFF_BASE_SEC, DELIVERY_RETRY_BACKOFF_CAP_SEC)
         next_retry = datetime.now(timezone.utc) + timedelta(seconds=delay_sec)
         await pool.execute(
             """
@@ -339,6 +341,22 @@ async def get_post_counts_by_status(pool: asyncpg.Pool) -> dict[str, int]:
     return {r["status"]: r["cnt"] for r in rows}
 
 
+async def get_summary_cache_stats(pool: asyncpg.Pool, days: int = 7) -> Optional[tuple[int, int]]:
+    """(hits, misses) of the summary cache over the last `days` days; None before migration 017."""
+    try:
+        row = await pool.fetchrow(
+            """
+            SELECT COALESCE(SUM(hits), 0)::int AS hits, COALESCE(SUM(misses), 0)::int AS misses
+            FROM summary_cache_stats
+            WHERE day > CURRENT_DATE - $1::int
+            """,
+            days,
+        )
+    except asyncpg.UndefinedTableError:
+        return None
+    return row["hits"], row["misses"]
+
+
 async def add_audit_log(
     pool: asyncpg.Pool,
     post_id: Optional[int],
@@ -18,6 +18,10 @@ from src.database.connection import create_pool_with_retry, close_pool
 from src.database.admin_repository import bootstrap_admin_editor, get_config_value, set_config_value
 from src.bot.handlers import admin, commands, review
 from src.bot.middlewares import AdminPanelMiddleware, DataInjectionMiddleware, EditorOnlyMiddleware
+from src.services.discussion_links import DiscussionLinkListener, set_discussion_link_listener
+from src.services.pdf_gc import parse_retention, run_pdf_gc
+from src.services.pdf_optimizer import build_pdf_optimizer, set_pdf_optimizer
+from src.services.pdf_storage import PdfIndex, set_pdf_index
 from src.services.scheduler import run_scheduler
 from src.utils.alert import send_alert
 from src.webhook.n8n_receiver import create_app
@@ -150,14 +154,45 @@ def main() -> None:
                 alert_chat_id=config.ALERT_CHAT_ID,
             ),
         )
+        pdf_optimizer = build_pdf_optimizer(
+            config.PDF_OPTIMIZE_WORKERS,
+            config.PDF_OPTIMIZE_MIN_KB,
+            config.PDF_OPTIMIZE_MIN_SAVINGS_PCT,
+        )
+        set_pdf_optimizer(pdf_optimizer)
+        set_pdf_index(PdfIndex(pool, config.PDF_STORAGE_PATH))
+        link_listener = DiscussionLinkListener(pool)
+        set_discussion_link_listener(link_listener)
+        link_listener_task = asyncio.create_task(link_listener.run())
+        background_tasks = [scheduler_task, link_listener_task]
+        if config.PDF_GC_INTERVAL_MIN > 0:
+            background_tasks.append(
+                asyncio.create_task(
+                    run_pdf_gc(
+                        pool,
+                        config.PDF_STORAGE_PATH,
+                        parse_retention(config.PDF_GC_RETENTION_DAYS),
+                        config.PDF_GC_ORPHAN_DAYS,
+                        interval=config.PDF_GC_INTERVAL_MIN * 60,
+                        deletes_per_sec=config.PDF_GC_DELETES_PER_SEC,
+                        dry_run=config.PDF_GC_DRY_RUN,
+                    ),
+                ),
+            )
         try:
             await dp.start_polling(bot)
         finally:
-            scheduler_task.cancel()
-            try:
-                await scheduler_task
-            except asyncio.CancelledError:
-                pass
+            set_discussion_link_listener(None)
+            set_pdf_optimizer(None)
+            set_pdf_index(None)
+            if pdf_optimizer is not None:
+                pdf_optimizer.shutdown()
+            for task in background_tasks:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
             await bot.session.close()
             await runner.cleanup()
             await close_pool(pool)
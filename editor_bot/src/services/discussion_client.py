@@ -1,12 +1,17 @@
-"""Client for userbot internal API: resolve discussion message id."""
+"""Client for userbot internal API: resolve discussion message id (single or batch), restore archived PDFs."""
 
 from typing import Tuple
 
 import aiohttp
 import structlog
 
+from src.utils.resilience import get_endpoint
+
 log = structlog.get_logger()
 
+# Circuit breaker for the userbot internal API
+USERBOT_API_ENDPOINT = "userbot_api"
+
 
 async def resolve_discussion(
     base_url: str,
@@ -18,7 +23,8 @@ async def resolve_discussion(
     """
     Call userbot POST /discussion/resolve and return (discussion_chat_id, discussion_message_id).
 
-    Returns (None, None) on any failure (network, 4xx/5xx, ok: false).
+    Returns (None, None) on any failure (network, 4xx/5xx, ok: false). While the userbot API
+    circuit is open no request is made and (None, None) is returned at once.
     """
     base_url = (base_url or "").rstrip("/")
     if not base_url:
@@ -28,6 +34,15 @@ async def resolve_discussion(
     if (token or "").strip():
         headers["Authorization"] = f"Bearer {token.strip()}"
     payload = {"channel_id": channel_id, "message_id": message_id}
+    breaker = get_endpoint(USERBOT_API_ENDPOINT).breaker
+    if not breaker.allow():
+        log.warning(
+            "discussion_resolve_circuit_open",
+            channel_id=channel_id,
+            message_id=message_id,
+            retry_after=round(breaker.retry_after(), 1),
+        )
+        return None, None
     try:
         async with aiohttp.ClientSession() as session:
             async with session.post(
@@ -36,6 +51,10 @@ async def resolve_discussion(
                 headers=headers,
                 timeout=aiohttp.ClientTimeout(total=timeout),
             ) as resp:
+                if resp.status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
                 if resp.status != 200:
                     log.warning(
                         "discussion_resolve_http",
@@ -63,6 +82,7 @@ async def resolve_discussion(
                 except (ValueError, TypeError):
                     return None, None
     except Exception as e:
+        breaker.record_failure()
         log.warning(
             "discussion_resolve_error",
             url=url,
@@ -71,3 +91,121 @@ async def resolve_discussion(
             error=str(e),
         )
         return None, None
+
+
+def _parse_ids(data: dict) -> Tuple[int | None, int | None]:
+    cid = data.get("discussion_chat_id")
+    mid = data.get("discussion_message_id")
+    if not data.get("ok") or cid is None or mid is None:
+        return None, None
+    try:
+        return int(cid), int(mid)
+    except (ValueError, TypeError):
+        return None, None
+
+
+async def resolve_discussion_batch(
+    base_url: str,
+    token: str,
+    items: list[tuple[str, int]],
+    timeout: float = 90.0,
+) -> dict[tuple[str, int], Tuple[int | None, int | None]]:
+    """
+    Call userbot POST /discussion/resolve_batch once for all (channel_id, message_id) pairs.
+
+    Returns {(channel_id, message_id): (discussion_chat_id, discussion_message_id)}; unresolved
+    pairs map to (None, None). If the userbot does not have the batch endpoint (404), pairs are
+    resolved one by one via resolve_discussion. Same circuit breaker as resolve_discussion.
+    """
+    results: dict[tuple[str, int], Tuple[int | None, int | None]] = {item: (None, None) for item in items}
+    base_url = (base_url or "").rstrip("/")
+    if not base_url or not items:
+        return results
+    url = f"{base_url}/discussion/resolve_batch"
+    headers = {}
+    if (token or "").strip():
+        headers["Authorization"] = f"Bearer {token.strip()}"
+    payload = {"items": [{"channel_id": c, "message_id": m} for c, m in items]}
+    breaker = get_endpoint(USERBOT_API_ENDPOINT).breaker
+    if not breaker.allow():
+        log.warning(
+            "discussion_resolve_circuit_open",
+            items=len(items),
+            retry_after=round(breaker.retry_after(), 1),
+        )
+        return results
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                url,
+                json=payload,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                if resp.status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if resp.status == 404:
+                    log.info("discussion_resolve_batch_unsupported", url=url)
+                    for channel_id, message_id in items:
+                        results[(channel_id, message_id)] = await resolve_discussion(
+                            base_url, token, channel_id, message_id
+                        )
+                    return results
+                if resp.status != 200:
+                    log.warning("discussion_resolve_batch_http", url=url, status=resp.status, items=len(items))
+                    return results
+                data = await resp.json()
+    except Exception as e:
+        breaker.record_failure()
+        log.warning("discussion_resolve_batch_error", url=url, items=len(items), error=str(e))
+        return results
+    for entry in data.get("results") or []:
+        try:
+            key = (str(entry["channel_id"]), int(entry["message_id"]))
+        except (TypeError, KeyError, ValueError):
+            continue
+        if key in results:
+            results[key] = _parse_ids(entry)
+    return results
+
+
+async def restore_pdf(base_url: str, token: str, pdf_path: str, timeout: float = 60.0) -> bool:
+    """
+    Call userbot POST /pdf/restore so an archived PDF is back on the volume before it is uploaded.
+    Returns True if the file is there now; False on any failure or if it is not archived.
+    """
+    base_url = (base_url or "").rstrip("/")
+    if not base_url or not pdf_path:
+        return False
+    url = f"{base_url}/pdf/restore"
+    headers = {}
+    if (token or "").strip():
+        headers["Authorization"] = f"Bearer {token.strip()}"
+    breaker = get_endpoint(USERBOT_API_ENDPOINT).breaker
+    if not breaker.allow():
+        log.warning("pdf_restore_circuit_open", pdf_path=pdf_path, retry_after=round(breaker.retry_after(), 1))
+        return False
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                url,
+                json={"pdf_path": pdf_path},
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                if resp.status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if resp.status != 200:
+                    log.warning("pdf_restore_http", url=url, status=resp.status, pdf_path=pdf_path)
+                    return False
+                data = await resp.json()
+    except Exception as e:
+        breaker.record_failure()
+        log.warning("pdf_restore_error", url=url, pdf_path=pdf_path, error=str(e))
+        return False
+    log.info("pdf_restored", pdf_path=pdf_path, result=data.get("result"))
+    return bool(data.get("ok"))
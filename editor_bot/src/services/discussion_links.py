@@ -0,0 +1,133 @@
+"""LISTEN discussion_links: discussion thread of a channel post pushed by userbot as soon as it exists."""
+
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import asyncpg
+import structlog
+
+log = structlog.get_logger()
+
+DISCUSSION_LINKS_CHANNEL = "discussion_links"
+# Links remembered from notifications (a link may arrive before the publisher starts waiting)
+RECENT_LINKS_SIZE = 1024
+LISTENER_RECONNECT_DELAY_SEC = 5.0
+
+Link = Tuple[int, int]
+
+
+class DiscussionLinkListener:
+    """Holds one LISTEN connection; publishers wait on (channel chat id, message id) keys."""
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self._pool = pool
+        self._recent: OrderedDict[Link, Link] = OrderedDict()
+        self._waiters: dict[Link, list[asyncio.Future]] = {}
+        self._active = False
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def _on_notify(self, connection: object, pid: int, channel: str, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            key = (int(data["channel_id"]), int(data["channel_message_id"]))
+            link = (int(data["discussion_chat_id"]), int(data["discussion_message_id"]))
+        except (ValueError, KeyError, TypeError) as e:
+            log.warning("discussion_link_bad_payload", payload=payload[:200], error=str(e))
+            return
+        self._remember(key, link)
+
+    def _remember(self, key: Link, link: Link) -> None:
+        self._recent[key] = link
+        self._recent.move_to_end(key)
+        while len(self._recent) > RECENT_LINKS_SIZE:
+            self._recent.popitem(last=False)
+        for fut in self._waiters.pop(key, []):
+            if not fut.done():
+                fut.set_result(link)
+
+    async def _lookup(self, key: Link) -> Optional[Link]:
+        """Link already stored before we started listening (or during a reconnect)."""
+        try:
+            row = await self._pool.fetchrow(
+                """
+                SELECT discussion_chat_id, discussion_message_id
+                FROM discussion_links
+                WHERE channel_id = $1 AND channel_message_id = $2
+                """,
+                key[0],
+                key[1],
+            )
+        except asyncpg.UndefinedTableError:
+            return None
+        return (row["discussion_chat_id"], row["discussion_message_id"]) if row else None
+
+    async def wait(self, channel_chat_id: int, message_id: int, timeout: float) -> Optional[Link]:
+        """(discussion_chat_id, discussion_message_id) once userbot pushes it; None on timeout."""
+        key = (channel_chat_id, message_id)
+        if key in self._recent:
+            return self._recent[key]
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(fut)
+        try:
+            stored = await self._lookup(key)
+            if stored is not None:
+                return stored
+            return await asyncio.wait_for(asyncio.shield(fut), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(key)
+            if waiters and fut in waiters:
+                waiters.remove(fut)
+                if not waiters:
+                    del self._waiters[key]
+
+    async def run(self) -> None:
+        """Keep a LISTEN connection open; reconnects after connection loss. Runs until cancelled."""
+        while True:
+            terminated = asyncio.Event()
+            try:
+                async with self._pool.acquire() as conn:
+                    conn.add_termination_listener(lambda _conn: terminated.set())
+                    await conn.add_listener(DISCUSSION_LINKS_CHANNEL, self._on_notify)
+                    self._active = True
+                    log.info("discussion_link_listener_started")
+                    try:
+                        await terminated.wait()
+                    finally:
+                        self._active = False
+                        if not conn.is_closed():
+                            await conn.remove_listener(DISCUSSION_LINKS_CHANNEL, self._on_notify)
+                log.warning("discussion_link_listener_connection_lost")
+            except asyncio.CancelledError:
+                log.info("discussion_link_listener_stopped")
+                raise
+            except Exception as e:
+                self._active = False
+                log.error("discussion_link_listener_error", error=str(e), exc_info=True)
+            await asyncio.sleep(LISTENER_RECONNECT_DELAY_SEC)
+
+
+_listener: Optional[DiscussionLinkListener] = None
+
+
+def set_discussion_link_listener(listener: Optional[DiscussionLinkListener]) -> None:
+    """Install the process-wide listener used by wait_for_discussion_link (None to uninstall)."""
+    global _listener
+    _listener = listener
+
+
+def discussion_links_available() -> bool:
+    return _listener is not None and _listener.active
+
+
+async def wait_for_discussion_link(channel_chat_id: int, message_id: int, timeout: float) -> Optional[Link]:
+    """Wait for the pushed link of a channel post; None if no listener is running or on timeout."""
+    if not discussion_links_available():
+        return None
+    return await _listener.wait(channel_chat_id, message_id, timeout)
@@ -0,0 +1,232 @@
+"""
+PDF garbage collector: deletes files of the PDF volume that nothing needs any more.
+
+Files on disk are joined in batches against posts and live userbot_outbox rows by path.
+A file is kept while an outbox row is still pending or accepted or any post referencing it is in a status
+without a retention rule (processing, pending_review, scheduled, ...). It is deleted once every
+post referencing it has been in a status with a rule for that many days (e.g. rejected=2,
+published=30), or, with no references at all, once it is older than the orphan age. Deletes are
+paced to deletes_per_sec so a large first run does not saturate the volume.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import asyncpg
+import structlog
+
+from src.database.pdf_files import forget_pdf_files, get_pdf_references
+from src.services.pdf_optimizer import PDF_OPTIMIZED_SUFFIX, optimized_path
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+PDF_GC_BATCH_SIZE = 500
+PDF_GC_REASON_ORPHAN = "orphan"
+
+_deleted_files = metrics.counter(
+    "editor_bot_pdf_gc_deleted_files_total",
+    "PDFs deleted by the garbage collector by reason (orphan or the status of their posts)",
+    ("reason",),
+)
+_reclaimed_bytes = metrics.counter(
+    "editor_bot_pdf_gc_reclaimed_bytes_total",
+    "Bytes reclaimed by the PDF garbage collector (optimized variants included) by reason",
+    ("reason",),
+)
+
+
+def parse_retention(spec: str) -> dict[str, float]:
+    """'rejected=2,published=30' -> {status: days}; malformed entries are ignored."""
+    rules = {}
+    for part in (spec or "").split(","):
+        status, sep, days = part.partition("=")
+        if not sep or not status.strip():
+            continue
+        try:
+            rules[status.strip()] = float(days)
+        except ValueError:
+            log.warning("pdf_gc_retention_invalid", entry=part.strip())
+    return rules
+
+
+def gc_reason(
+    queued: bool,
+    posts: list[tuple[str, Any]],
+    file_mtime: float,
+    now: float,
+    retention: dict[str, float],
+    orphan_days: float,
+) -> Optional[str]:
+    """Why the file can be deleted (orphan or a post status), or None to keep it."""
+    if queued:
+        return None
+    if not posts:
+        return PDF_GC_REASON_ORPHAN if now - file_mtime >= orphan_days * 86400 else None
+    newest_status, newest_at = None, None
+    for status, updated_at in posts:
+        days = retention.get(status)
+        if days is None:
+            return None
+        changed = updated_at.timestamp() if updated_at is not None else file_mtime
+        if now - changed < days * 86400:
+            return None
+        if newest_at is None or changed > newest_at:
+            newest_status, newest_at = status, changed
+    return newest_status
+
+
+@dataclass
+class PdfGcReport:
+    scanned: int = 0
+    kept: int = 0
+    deleted: int = 0
+    bytes_reclaimed: int = 0
+    by_reason: dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def _list_pdfs(base: str) -> tuple[list[tuple[str, int, float]], set[str]]:
+    """Originals (path, size, mtime) in the volume, any depth, and the set of optimized variants."""
+    originals, variants = [], set()
+    for root, _, files in os.walk(base):
+        for name in files:
+            if not name.lower().endswith(".pdf"):
+                continue
+            path = os.path.join(root, name)
+            if name.endswith(PDF_OPTIMIZED_SUFFIX):
+                variants.add(path)
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            originals.append((path, st.st_size, st.st_mtime))
+    originals.sort()
+    return originals, variants
+
+
+class _Pacer:
+    """Spaces calls to at most `rate` per second (no limit when rate <= 0)."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+        self._next = max(self._next, now) + self.interval
+
+
+def _remove(path: str) -> int:
+    """Delete path; returns its size, 0 if it was already gone."""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
+
+
+async def collect_pdfs(
+    pool: asyncpg.Pool,
+    base: str,
+    retention: dict[str, float],
+    orphan_days: float,
+    deletes_per_sec: float = 0,
+    dry_run: bool = False,
+) -> PdfGcReport:
+    """One pass over the volume; with dry_run nothing is deleted but the report is the same."""
+    started = time.perf_counter()
+    report = PdfGcReport()
+    originals, variants = await asyncio.to_thread(_list_pdfs, base)
+    pacer = _Pacer(deletes_per_sec)
+    for start in range(0, len(originals), PDF_GC_BATCH_SIZE):
+        batch = originals[start : start + PDF_GC_BATCH_SIZE]
+        refs = await get_pdf_references(pool, [path for path, _, _ in batch])
+        now = datetime.now(timezone.utc).timestamp()
+        deleted_paths = []
+        for path, size, mtime in batch:
+            report.scanned += 1
+            queued, posts = refs.get(path, (False, []))
+            reason = gc_reason(queued, posts, mtime, now, retention, orphan_days)
+            if reason is None:
+                report.kept += 1
+                continue
+            variant = optimized_path(path)
+            variants.discard(variant)
+            freed = size + (os.path.getsize(variant) if os.path.exists(variant) else 0)
+            if not dry_run:
+                await pacer.wait()
+                try:
+                    freed = _remove(path) + _remove(variant)
+                except OSError as e:
+                    log.warning("pdf_gc_delete_failed", pdf_path=path, error=str(e))
+                    report.kept += 1
+                    continue
+                deleted_paths.append(path)
+                _deleted_files.inc(reason=reason)
+                _reclaimed_bytes.inc(freed, reason=reason)
+            report.deleted += 1
+            report.bytes_reclaimed += freed
+            report.by_reason[reason] = report.by_reason.get(reason, 0) + 1
+        if deleted_paths:
+            try:
+                await forget_pdf_files(pool, deleted_paths)
+            except asyncpg.UndefinedTableError:
+                pass
+    # Variants whose original is gone are never uploaded again
+    for variant in sorted(variants):
+        original = variant[: -len(PDF_OPTIMIZED_SUFFIX)] + ".pdf"
+        if os.path.exists(original):
+            continue
+        freed = os.path.getsize(variant) if dry_run else 0
+        if not dry_run:
+            await pacer.wait()
+            try:
+                freed = _remove(variant)
+            except OSError as e:
+                log.warning("pdf_gc_delete_failed", pdf_path=variant, error=str(e))
+                continue
+            _reclaimed_bytes.inc(freed, reason=PDF_GC_REASON_ORPHAN)
+        report.bytes_reclaimed += freed
+    report.seconds = time.perf_counter() - started
+    log.info(
+        "pdf_gc_done",
+        dry_run=dry_run,
+        scanned=report.scanned,
+        kept=report.kept,
+        deleted=report.deleted,
+        bytes_reclaimed=report.bytes_reclaimed,
+        by_reason=report.by_reason,
+        seconds=round(report.seconds, 1),
+    )
+    return report
+
+
+async def run_pdf_gc(
+    pool: asyncpg.Pool,
+    base: str,
+    retention: dict[str, float],
+    orphan_days: float,
+    interval: float,
+    deletes_per_sec: float = 0,
+    dry_run: bool = False,
+) -> None:
+    """Loop: collect_pdfs every `interval` seconds. Runs until cancelled."""
+    while True:
+        try:
+            await collect_pdfs(pool, base, retention, orphan_days, deletes_per_sec, dry_run)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("pdf_gc_failed", error=str(e), exc_info=True)
+        await asyncio.sleep(interval)
@@ -0,0 +1,283 @@
+"""
+Smaller PDF variant for Telegram uploads: one pikepdf pass per document in a process pool
+(Flate recompression, object streams, duplicate image streams merged, unused resources
+dropped). The variant is stored next to the original and replaces it only in uploads.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+import structlog
+
+from src.utils import metrics
+
+if TYPE_CHECKING:
+    from aiogram.types import FSInputFile
+
+log = structlog.get_logger()
+
+# Variant path: report.pdf -> report.opt.pdf
+PDF_OPTIMIZED_SUFFIX = ".opt.pdf"
+# Smaller files are uploaded as is: the upload is fast and the pass would not pay off
+PDF_OPTIMIZE_DEFAULT_MIN_BYTES = 1024 * 1024
+# The variant is used only if it saves at least this share of the original size
+PDF_OPTIMIZE_DEFAULT_MIN_SAVINGS = 0.10
+PDF_OPTIMIZE_TIMEOUT_SEC = 180
+# Decisions remembered per original path (the variant on disk survives restarts, "keep original" does not)
+PDF_OPTIMIZE_MEMO_SIZE = 1024
+
+_optimize_seconds = metrics.histogram(
+    "editor_bot_pdf_optimize_seconds",
+    "PDF optimization time per document by outcome (optimized, kept_original, failed)",
+    ("outcome",),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 180),
+)
+_saved_bytes = metrics.counter(
+    "editor_bot_pdf_optimize_saved_bytes_total",
+    "Bytes not uploaded to Telegram thanks to optimized PDF variants",
+)
+
+
+@dataclass
+class PdfOptimization:
+    """Result of one pass; error set (and nothing written) if pikepdf failed."""
+
+    original_bytes: int = 0
+    optimized_bytes: int = 0
+    deduplicated: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def savings(self) -> float:
+        if not self.original_bytes or not self.optimized_bytes:
+            return 0.0
+        return 1 - self.optimized_bytes / self.original_bytes
+
+
+def optimized_path(pdf_path: str) -> str:
+    root, _ = os.path.splitext(pdf_path)
+    return root + PDF_OPTIMIZED_SUFFIX
+
+
+def _dedupe_image_streams(pdf) -> int:
+    """Point every page at one copy of byte-identical image XObjects; returns replaced references."""
+    import pikepdf
+
+    seen: dict[tuple, pikepdf.Object] = {}
+    replaced = 0
+    for page in pdf.pages:
+        xobjects = page.obj.get("/Resources", {}).get("/XObject")
+        if not isinstance(xobjects, pikepdf.Dictionary):
+            continue
+        for name in list(xobjects.keys()):
+            image = xobjects[name]
+            if not isinstance(image, pikepdf.Stream) or image.get("/Subtype") != pikepdf.Name.Image:
+                continue
+            raw = image.read_raw_bytes()
+            key = (
+                hashlib.sha256(raw).digest(),
+                str(image.get("/Filter")),
+                int(image.get("/Width", 0)),
+                int(image.get("/Height", 0)),
+                str(image.get("/ColorSpace")),
+                "/SMask" in image,
+            )
+            first = seen.setdefault(key, image)
+            if first.objgen != image.objgen:
+                xobjects[name] = first
+                replaced += 1
+    return replaced
+
+
+def optimize_pdf(src: str, dst: str) -> PdfOptimization:
+    """
+    Rewrite src into dst: duplicate images merged, unreferenced resources removed, streams
+    recompressed (Flate, highest level) and packed into object streams. Content and page
+    images are not resampled, so the output looks the same. Runs in a pool worker.
+    """
+    started = time.perf_counter()
+    result = PdfOptimization()
+    tmp = dst + ".tmp"
+    try:
+        import pikepdf
+
+        result.original_bytes = os.path.getsize(src)
+        with pikepdf.open(src) as pdf:
+            result.deduplicated = _dedupe_image_streams(pdf)
+            pdf.remove_unreferenced_resources()
+            pdf.save(
+                tmp,
+                compress_streams=True,
+                recompress_flate=True,
+                stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            )
+        result.optimized_bytes = os.path.getsize(tmp)
+        os.replace(tmp, dst)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"[:500]
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+class PdfOptimizer:
+    """
+    Chooses the file to upload for a PDF. The first request for a document runs optimize_pdf in
+    a spawn-based ProcessPoolExecutor (concurrent requests for the same file wait for that one
+    pass); later requests reuse the variant on disk or the remembered "keep original" decision.
+    Any failure falls back to the original, so uploads never depend on the optimizer.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        min_bytes: int = PDF_OPTIMIZE_DEFAULT_MIN_BYTES,
+        min_savings: float = PDF_OPTIMIZE_DEFAULT_MIN_SAVINGS,
+        timeout: float = PDF_OPTIMIZE_TIMEOUT_SEC,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.min_bytes = max(0, min_bytes)
+        self.min_savings = min_savings
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: dict[str, asyncio.Future] = {}
+        self._memo: OrderedDict[str, str] = OrderedDict()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _remember(self, pdf_path: str, upload_path: str) -> str:
+        self._memo[pdf_path] = upload_path
+        self._memo.move_to_end(pdf_path)
+        while len(self._memo) > PDF_OPTIMIZE_MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return upload_path
+
+    async def upload_path(self, pdf_path: str) -> str:
+        """Path to upload instead of pdf_path: its optimized variant if that is meaningfully smaller."""
+        memo = self._memo.get(pdf_path)
+        if memo is not None and os.path.isfile(memo):
+            return memo
+        variant = optimized_path(pdf_path)
+        if os.path.isfile(variant) and os.path.getmtime(variant) >= os.path.getmtime(pdf_path):
+            return self._remember(pdf_path, variant)
+        try:
+            size = os.path.getsize(pdf_path)
+        except OSError:
+            return pdf_path
+        if size < self.min_bytes:
+            return self._remember(pdf_path, pdf_path)
+        pending = self._pending.get(pdf_path)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[pdf_path] = future
+        try:
+            chosen = await self._optimize(pdf_path, variant)
+            future.set_result(chosen)
+            return chosen
+        except BaseException:
+            future.set_result(pdf_path)
+            raise
+        finally:
+            del self._pending[pdf_path]
+
+    async def _optimize(self, pdf_path: str, variant: str) -> str:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), optimize_pdf, pdf_path, variant),
+                timeout=self.timeout,
+            )
+        except (asyncio.TimeoutError, BrokenProcessPool) as e:
+            if isinstance(e, BrokenProcessPool):
+                self.shutdown()
+            _optimize_seconds.observe(time.perf_counter() - started, outcome="failed")
+            log.warning("pdf_optimize_failed", pdf_path=pdf_path, error=str(e) or type(e).__name__)
+            return self._remember(pdf_path, pdf_path)
+        if result.error:
+            _optimize_seconds.observe(result.seconds, outcome="failed")
+            log.warning("pdf_optimize_failed", pdf_path=pdf_path, error=result.error)
+            return self._remember(pdf_path, pdf_path)
+        use_variant = result.savings >= self.min_savings
+        if not use_variant:
+            try:
+                os.remove(variant)
+            except OSError:
+                pass
+        _optimize_seconds.observe(result.seconds, outcome="optimized" if use_variant else "kept_original")
+        log.info(
+            "pdf_optimized",
+            pdf_path=pdf_path,
+            original_bytes=result.original_bytes,
+            optimized_bytes=result.optimized_bytes,
+            savings=round(result.savings, 3),
+            deduplicated_images=result.deduplicated,
+            seconds=round(result.seconds, 3),
+            used=use_variant,
+        )
+        return self._remember(pdf_path, variant if use_variant else pdf_path)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_optimizer: Optional[PdfOptimizer] = None
+
+
+def set_pdf_optimizer(optimizer: Optional[PdfOptimizer]) -> None:
+    """Install the process-wide optimizer used by pdf_input_file (None to uninstall)."""
+    global _optimizer
+    _optimizer = optimizer
+
+
+def build_pdf_optimizer(workers: int, min_kb: int, min_savings_pct: int) -> Optional[PdfOptimizer]:
+    """Optimizer from config values; None when workers is 0 or pikepdf is not installed."""
+    if workers <= 0:
+        return None
+    try:
+        import pikepdf  # noqa: F401
+    except ImportError:
+        log.warning("pdf_optimize_disabled", reason="pikepdf is not installed")
+        return None
+    return PdfOptimizer(workers=workers, min_bytes=min_kb * 1024, min_savings=min_savings_pct / 100)
+
+
+async def pdf_input_file(pdf_path: str) -> "FSInputFile":
+    """Upload source for pdf_path under its original file name (the optimized variant if there is one)."""
+    # Imported here so pool workers, which import this module, do not load aiogram
+    from aiogram.types import FSInputFile
+
+    path = pdf_path
+    if _optimizer is not None:
+        try:
+            path = await _optimizer.upload_path(pdf_path)
+        except Exception as e:
+            log.warning("pdf_optimize_failed", pdf_path=pdf_path, error=str(e))
+    if path != pdf_path:
+        try:
+            _saved_bytes.inc(max(0, os.path.getsize(pdf_path) - os.path.getsize(path)))
+        except OSError:
+            pass
+    return FSInputFile(path, filename=os.path.basename(pdf_path))
@@ -0,0 +1,104 @@
+"""
+PDF volume layout shared with userbot (same helpers as userbot/src/services/pdf_storage.py):
+files live in two levels of hashed subdirectories, /data/pdfs/ab/cd/<chat>_<msg>.pdf.
+
+Paths coming from n8n are checked against the pdf_files index instead of realpath()/isfile()
+on the volume: a path that is lexically under the storage directory and has an index row is a
+stored file (rows are removed together with their files). The lookup also bumps last_access_at,
+at most once per PDF_INDEX_TOUCH_INTERVAL_SEC per path. Paths unknown to the index (files
+downloaded before migration 020) fall back to the callers' filesystem checks.
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import asyncpg
+import structlog
+
+from src.database.pdf_files import touch_pdf_file
+
+log = structlog.get_logger()
+
+# Two levels of 256 directories each
+PDF_SHARD_LEVELS = 2
+PDF_SHARD_WIDTH = 2
+# Paths confirmed by the index are not looked up (and last_access_at not bumped) again for this long
+PDF_INDEX_TOUCH_INTERVAL_SEC = 300
+PDF_INDEX_CACHE_SIZE = 4096
+
+
+def shard_dir(base: str, name: str) -> str:
+    """Directory of file `name` under base, e.g. base/3f/a9."""
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    parts = [digest[i * PDF_SHARD_WIDTH : (i + 1) * PDF_SHARD_WIDTH] for i in range(PDF_SHARD_LEVELS)]
+    return os.path.join(base, *parts)
+
+
+def sharded_path(base: str, name: str) -> str:
+    return os.path.join(shard_dir(base, name), name)
+
+
+def is_under_base(pdf_path: str, base: str) -> bool:
+    """Lexical check: pdf_path is inside base and has no traversal (no filesystem access)."""
+    if not pdf_path or ".." in pdf_path:
+        return False
+    root = os.path.normpath(base)
+    return os.path.normpath(pdf_path).startswith(root + os.sep)
+
+
+class PdfIndex:
+    """Lookups in pdf_files with a small cache of recently confirmed paths."""
+
+    def __init__(self, pool: asyncpg.Pool, base: str) -> None:
+        self.pool = pool
+        self.base = base
+        self._confirmed: OrderedDict[str, float] = OrderedDict()
+        self._disabled = False
+
+    async def contains(self, pdf_path: str, reference: Optional[str] = None) -> bool:
+        """True if pdf_path is an indexed file under base; reference is added to its referenced_by."""
+        if self._disabled or not is_under_base(pdf_path, self.base):
+            return False
+        now = time.monotonic()
+        confirmed_at = self._confirmed.get(pdf_path)
+        if reference is None and confirmed_at is not None and now - confirmed_at < PDF_INDEX_TOUCH_INTERVAL_SEC:
+            return True
+        try:
+            found = await touch_pdf_file(self.pool, pdf_path, reference)
+        except asyncpg.UndefinedTableError:
+            self._disabled = True
+            log.warning(
+                "pdf_files_table_missing",
+                msg="Apply migration: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_020_pdf_files.sql",
+            )
+            return False
+        except Exception as e:
+            log.warning("pdf_index_lookup_failed", pdf_path=pdf_path, error=str(e))
+            return False
+        if not found:
+            self._confirmed.pop(pdf_path, None)
+            return False
+        self._confirmed[pdf_path] = now
+        self._confirmed.move_to_end(pdf_path)
+        while len(self._confirmed) > PDF_INDEX_CACHE_SIZE:
+            self._confirmed.popitem(last=False)
+        return True
+
+
+_index: Optional[PdfIndex] = None
+
+
+def set_pdf_index(index: Optional[PdfIndex]) -> None:
+    """Install the process-wide index used by is_indexed_pdf (None to uninstall)."""
+    global _index
+    _index = index
+
+
+async def is_indexed_pdf(pdf_path: str, reference: Optional[str] = None) -> bool:
+    """True if the installed index knows pdf_path; False without an index or for unknown paths."""
+    if _index is None or not pdf_path:
+        return False
+    return await _index.contains(pdf_path, reference)
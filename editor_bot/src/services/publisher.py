@@ -5,25 +5,47 @@ import os
 from typing import Any, Callable, Coroutine
 
 from aiogram import Bot
-from aiogram.types import FSInputFile
 import structlog
 
+from src.utils.resilience import CircuitOpenError, get_endpoint
 from src.utils.text import split_html_safe, strip_safe_html_to_plain, summary_to_safe_html
-from src.services.discussion_client import resolve_discussion
+from src.services.discussion_client import resolve_discussion, resolve_discussion_batch, restore_pdf
+from src.services.discussion_links import discussion_links_available, wait_for_discussion_link
+from src.services.pdf_optimizer import pdf_input_file
+from src.services.pdf_storage import is_indexed_pdf
 
 log = structlog.get_logger()
 
 # Pause between publishing to different channels (seconds) to reduce rate-limit risk
 PUBLISH_DELAY_BETWEEN_CHANNELS = 1.0
-# Delay before sending PDF to discussion so Telegram can link the post (seconds)
+# Delay before sending PDF to discussion so Telegram can link the post (seconds); used only when
+# the discussion_links listener is not running
 PUBLISH_DELAY_BEFORE_PDF = 2.0
+# How long to wait for the link pushed by userbot before falling back to /discussion/resolve; the
+# push normally lands within a second, and a channel without a linked chat never gets one, so the
+# resolve (answered at once by userbot's cache for such channels) takes over after a short grace
+PUBLISH_DISCUSSION_LINK_GRACE_SEC = 1.5
+# Wait for the pushed link when there is no userbot API to fall back to
+PUBLISH_DISCUSSION_LINK_TIMEOUT_SEC = 10.0
 # Retries when sending PDF to discussion (Broken pipe / connection errors)
 PUBLISH_DISCUSSION_RETRIES = 3
-PUBLISH_DISCUSSION_RETRY_DELAY = 2.0
+# Full-jitter backoff between Bot API retries (seconds)
+PUBLISH_RETRY_BACKOFF_BASE_SEC = 1.0
+PUBLISH_RETRY_BACKOFF_CAP_SEC = 10.0
+# Circuit breaker / retry budget shared by all Bot API sends
+BOT_API_ENDPOINT = "telegram_bot_api"
 
 _publish_lock = asyncio.Lock()
 
 
+class PublishError(Exception):
+    """PDF could not be sent to some channels of a multi-channel publish (their captions are posted)."""
+
+    def __init__(self, failures: list[tuple[str, Exception]]) -> None:
+        self.failures = failures
+        super().__init__("PDF not published to " + "; ".join(f"{ch}: {e}" for ch, e in failures))
+
+
 def _is_retriable_discussion_error(e: Exception) -> bool:
     """True if send to discussion failed due to timeout/connection/pipe error and retry may help."""
     if isinstance(e, asyncio.TimeoutError):
@@ -88,44 +110,44 @@ async def _send_with_retry(coro: Coroutine[Any, Any, Any]) -> Any:
 async def _send_channel_with_retry(
     coro_factory: Callable[[], Coroutine[Any, Any, Any]],
 ) -> Any:
-    """Run coro from factory; on timeout/connection error retry once. FloodWait handled inside."""
+    """
+    Run coro from factory through the Bot API circuit breaker; on timeout/connection error retry
+    once after a full-jitter pause if the retry budget allows. FloodWait handled inside.
+    Raises CircuitOpenError while the circuit is open.
+    """
+    endpoint = get_endpoint(BOT_API_ENDPOINT)
+    endpoint.budget.record_request()
     for attempt in range(1, 3):
+        endpoint.breaker.check()
         try:
-            return await _send_with_retry(coro_factory())
+            result = await _send_with_retry(coro_factory())
         except Exception as e:
-            if attempt == 1 and _is_retriable_channel_error(e):
-                log.warning(
-                    "publish_channel_send_retry",
-                    attempt=2,
-                    error=str(e),
-                )
-                await asyncio.sleep(PUBLISH_DISCUSSION_RETRY_DELAY)
-            else:
+            if not _is_retriable_channel_error(e):
+                endpoint.breaker.record_success()  # Telegram answered; the request itself was bad
+                raise
+            endpoint.breaker.record_failure()
+            delay = (
+                endpoint.retry_delay(attempt, PUBLISH_RETRY_BACKOFF_BASE_SEC, PUBLISH_RETRY_BACKOFF_CAP_SEC)
+                if attempt == 1
+                else None
+            )
+            if delay is None:
                 raise
+            log.warning(
+                "publish_channel_send_retry",
+                attempt=2,
+                delay=round(delay, 2),
+                error=str(e),
+            )
+            await asyncio.sleep(delay)
+            continue
+        endpoint.breaker.record_success()
+        return result
     raise AssertionError("unreachable")
 
 
-async def publish_to_channel(
-    bot: Bot,
-    target_channel_id: str,
-    caption: str,
-    pdf_path: str,
-    pdf_storage_path: str = "/data/pdfs",
-    userbot_api_url: str | None = None,
-    userbot_api_token: str | None = None,
-) -> None:
-    """
-    Send caption (summary) in chunks and PDF to the target channel.
-    If userbot_api_url is set, resolves discussion message via MTProto and sends PDF in linked group.
-    Otherwise or on resolve failure, PDF is sent in channel as reply to post.
-    Each send is retried once on FloodWait.
-    """
-    channel = target_channel_id.strip()
-    if not channel:
-        raise ValueError("TARGET_CHANNEL_ID is empty")
-    if pdf_path.strip() and not _is_path_safe(pdf_path, pdf_storage_path):
-        raise ValueError("pdf_path is outside allowed storage directory")
-
+async def _send_caption(bot: Bot, channel: str, caption: str) -> Any:
+    """Send caption (summary) in chunks as safe HTML (plain text fallback); return the first message."""
     caption_raw = caption or ""
     html_caption = summary_to_safe_html(caption_raw)
     chunks = split_html_safe(html_caption) or [html_caption or ""]
@@ -147,7 +169,6 @@ async def publish_to_channel(
             first_msg = await _send_channel_with_retry(lambda: _send_chunk(first_chunk, use_html=False))
         else:
             raise
-    channel_message_id = first_msg.message_id
     for part in chunks[1:]:
         try:
             await _send_channel_with_retry(lambda p=part: _send_chunk(p))
@@ -157,73 +178,187 @@ async def publish_to_channel(
                 await _send_channel_with_retry(lambda p=part: _send_chunk(p, use_html=False))
             else:
                 raise
+    return first_msg
+
 
-    if pdf_path and os.path.isfile(pdf_path):
+async def _wait_for_links(posts: list[Any], timeout: float) -> list[tuple[int | None, int | None]]:
+    """
+    Discussion thread of each sent post: pushed by userbot via discussion_links when the listener
+    runs (returns as soon as all links exist, (None, None) for posts without one after `timeout`),
+    else (None, None) after the fixed pre-PDF delay.
+    """
+    if not discussion_links_available():
         await asyncio.sleep(PUBLISH_DELAY_BEFORE_PDF)
-        discussion_chat_id: int | None = None
-        discussion_message_id: int | None = None
-        if (userbot_api_url or "").strip():
-            discussion_chat_id, discussion_message_id = await resolve_discussion(
-                userbot_api_url.strip(),
-                (userbot_api_token or "").strip(),
-                channel,
-                channel_message_id,
-            )
-        if discussion_chat_id is not None and discussion_message_id is not None:
-            last_error: Exception | None = None
-            for attempt in range(PUBLISH_DISCUSSION_RETRIES):
-                try:
-                    await _send_with_retry(
-                        bot.send_document(
-                            discussion_chat_id,
-                            FSInputFile(pdf_path),
-                            reply_to_message_id=discussion_message_id,
-                        )
+        return [(None, None)] * len(posts)
+    links = await asyncio.gather(
+        *(
+            wait_for_discussion_link(post.chat.id, post.message_id, timeout)
+            for post in posts
+        )
+    )
+    return [link or (None, None) for link in links]
+
+
+async def _send_pdf(
+    bot: Bot,
+    channel: str,
+    channel_message_id: int,
+    pdf_path: str,
+    discussion_chat_id: int | None,
+    discussion_message_id: int | None,
+) -> None:
+    """Send PDF into the discussion thread of the post; on failure (or unresolved) as reply in the channel."""
+    document = await pdf_input_file(pdf_path)
+    if discussion_chat_id is not None and discussion_message_id is not None:
+        endpoint = get_endpoint(BOT_API_ENDPOINT)
+        endpoint.budget.record_request()
+        last_error: Exception | None = None
+        for attempt in range(PUBLISH_DISCUSSION_RETRIES):
+            if not endpoint.breaker.allow():
+                last_error = CircuitOpenError(endpoint.name, endpoint.breaker.retry_after())
+                break
+            try:
+                await _send_with_retry(
+                    bot.send_document(
+                        discussion_chat_id,
+                        document,
+                        reply_to_message_id=discussion_message_id,
                     )
-                    log.info("published_to_channel", channel=channel, pdf_path=pdf_path, pdf_in_discussion=True)
-                    last_error = None
+                )
+                endpoint.breaker.record_success()
+                log.info("published_to_channel", channel=channel, pdf_path=pdf_path, pdf_in_discussion=True)
+                last_error = None
+                break
+            except Exception as e:
+                last_error = e
+                if not _is_retriable_discussion_error(e):
+                    endpoint.breaker.record_success()
+                    break
+                endpoint.breaker.record_failure()
+                delay = (
+                    endpoint.retry_delay(attempt + 1, PUBLISH_RETRY_BACKOFF_BASE_SEC, PUBLISH_RETRY_BACKOFF_CAP_SEC)
+                    if attempt < PUBLISH_DISCUSSION_RETRIES - 1
+                    else None
+                )
+                if delay is None:
                     break
-                except Exception as e:
-                    last_error = e
-                    if attempt < PUBLISH_DISCUSSION_RETRIES - 1 and _is_retriable_discussion_error(e):
-                        log.warning(
-                            "publish_pdf_to_discussion_retry",
-                            channel=channel,
-                            attempt=attempt + 1,
-                            max_attempts=PUBLISH_DISCUSSION_RETRIES,
-                            error=str(e),
-                        )
-                        await asyncio.sleep(PUBLISH_DISCUSSION_RETRY_DELAY)
-                    else:
-                        break
-            if last_error is not None:
                 log.warning(
-                    "publish_pdf_to_discussion_failed",
+                    "publish_pdf_to_discussion_retry",
                     channel=channel,
-                    error=str(last_error),
-                    fallback="channel_reply",
-                )
-                await _send_channel_with_retry(
-                    lambda: bot.send_document(
-                        channel,
-                        FSInputFile(pdf_path),
-                        reply_to_message_id=channel_message_id,
-                    )
-                )
-                log.info("published_to_channel", channel=channel, pdf_path=pdf_path, pdf_in_discussion=False)
-        else:
-            await _send_channel_with_retry(
-                lambda: bot.send_document(
-                    channel,
-                    FSInputFile(pdf_path),
-                    reply_to_message_id=channel_message_id,
+                    attempt=attempt + 1,
+                    max_attempts=PUBLISH_DISCUSSION_RETRIES,
+                    delay=round(delay, 2),
+                    error=str(e),
                 )
+                await asyncio.sleep(delay)
+        if last_error is None:
+            return
+        log.warning(
+            "publish_pdf_to_discussion_failed",
+            channel=channel,
+            error=str(last_error),
+            fallback="channel_reply",
+        )
+    await _send_channel_with_retry(
+        lambda: bot.send_document(
+            channel,
+            document,
+            reply_to_message_id=channel_message_id,
+        )
+    )
+    log.info("published_to_channel", channel=channel, pdf_path=pdf_path, pdf_in_discussion=False)
+
+
+async def publish_to_channel(
+    bot: Bot,
+    target_channel_id: str,
+    caption: str,
+    pdf_path: str,
+    pdf_storage_path: str = "/data/pdfs",
+    userbot_api_url: str | None = None,
+    userbot_api_token: str | None = None,
+) -> None:
+    """
+    Send caption (summary) in chunks and PDF to the target channel.
+    The PDF goes to the post's thread in the linked group: the link pushed by userbot (discussion_links
+    listener) is used as soon as it exists; without it, if userbot_api_url is set, the discussion
+    message is resolved via MTProto. Otherwise or on resolve failure, PDF is sent in channel as reply to post.
+    Each send is retried once on FloodWait.
+    """
+    channel = target_channel_id.strip()
+    if not channel:
+        raise ValueError("TARGET_CHANNEL_ID is empty")
+    indexed = bool(pdf_path.strip()) and await is_indexed_pdf(pdf_path)
+    if pdf_path.strip() and not indexed and not _is_path_safe(pdf_path, pdf_storage_path):
+        raise ValueError("pdf_path is outside allowed storage directory")
+
+    first_msg = await _send_caption(bot, channel, caption)
+    channel_message_id = first_msg.message_id
+
+    if pdf_path and (indexed or os.path.isfile(pdf_path)):
+        can_resolve = bool((userbot_api_url or "").strip())
+        timeout = PUBLISH_DISCUSSION_LINK_GRACE_SEC if can_resolve else PUBLISH_DISCUSSION_LINK_TIMEOUT_SEC
+        [(discussion_chat_id, discussion_message_id)] = await _wait_for_links([first_msg], timeout)
+        if discussion_chat_id is None and can_resolve:
+            discussion_chat_id, discussion_message_id = await resolve_discussion(
+                userbot_api_url.strip(),
+                (userbot_api_token or "").strip(),
+                channel,
+                channel_message_id,
             )
-            log.info("published_to_channel", channel=channel, pdf_path=pdf_path, pdf_in_discussion=False)
+        await _send_pdf(bot, channel, channel_message_id, pdf_path, discussion_chat_id, discussion_message_id)
     else:
         log.warning("published_text_only", channel=channel, reason="pdf_not_found", path=pdf_path)
 
 
+async def _publish_batched(
+    bot: Bot,
+    channels: list[str],
+    caption: str,
+    pdf_path: str,
+    userbot_api_url: str,
+    userbot_api_token: str,
+) -> None:
+    """
+    Multi-channel publish with PDF: post captions to every channel, wait for the pushed discussion
+    links, resolve the missing ones in one userbot request, then send the PDFs. Every channel that
+    got its caption also gets its PDF: a caption failure stops further captions but the PDFs of
+    the channels already posted are still sent before it is re-raised, and a failed PDF does not
+    stop the others (PublishError lists them after the loop).
+    """
+    posts: list[Any] = []
+    caption_error: Exception | None = None
+    for i, ch in enumerate(channels):
+        if i > 0:
+            await asyncio.sleep(PUBLISH_DELAY_BETWEEN_CHANNELS)
+        try:
+            posts.append(await _send_caption(bot, ch, caption))
+        except Exception as e:
+            log.error("publish_to_channel_failed", channel=ch, error=str(e), exc_info=True)
+            caption_error = e
+            break
+    posted = [(ch, post.message_id) for ch, post in zip(channels, posts)]
+    failed: list[tuple[str, Exception]] = []
+    if posted:
+        links = dict(zip(posted, await _wait_for_links(posts, PUBLISH_DISCUSSION_LINK_GRACE_SEC)))
+        missing = [key for key, link in links.items() if link[0] is None]
+        if missing:
+            links.update(await resolve_discussion_batch(userbot_api_url, userbot_api_token, missing))
+        for i, (ch, message_id) in enumerate(posted):
+            if i > 0:
+                await asyncio.sleep(PUBLISH_DELAY_BETWEEN_CHANNELS)
+            discussion_chat_id, discussion_message_id = links.get((ch, message_id), (None, None))
+            try:
+                await _send_pdf(bot, ch, message_id, pdf_path, discussion_chat_id, discussion_message_id)
+            except Exception as e:
+                log.error("publish_to_channel_failed", channel=ch, error=str(e), exc_info=True)
+                failed.append((ch, e))
+    if caption_error is not None:
+        raise caption_error
+    if failed:
+        raise PublishError(failed)
+
+
 async def publish_to_all_channels(
     bot: Bot,
     channels: list[str],
@@ -236,8 +371,23 @@ async def publish_to_all_channels(
     """
     Publish to all given channels. Pauses between channels to reduce rate limits.
     Serialized globally so only one publication runs at a time. Logs errors per channel but does not raise.
+    With a PDF, several channels and the userbot API configured, discussion threads of all channels
+    are resolved in one batch request instead of one request per channel.
     """
     async with _publish_lock:
+        targets = [(channel or "").strip() for channel in channels]
+        targets = [ch for ch in targets if ch]
+        api_url = (userbot_api_url or "").strip()
+        indexed = bool(pdf_path) and await is_indexed_pdf(pdf_path)
+        if pdf_path and not indexed and api_url and not os.path.isfile(pdf_path):
+            # Re-publishing an old post: its PDF may be in userbot's cold archive
+            if await restore_pdf(api_url, (userbot_api_token or "").strip(), pdf_path):
+                indexed = await is_indexed_pdf(pdf_path)
+        if api_url and len(targets) > 1 and pdf_path and (indexed or os.path.isfile(pdf_path)):
+            if not indexed and not _is_path_safe(pdf_path, pdf_storage_path):
+                raise ValueError("pdf_path is outside allowed storage directory")
+            await _publish_batched(bot, targets, caption, pdf_path, api_url, (userbot_api_token or "").strip())
+            return
         for i, channel in enumerate(channels):
             ch = (channel or "").strip()
             if not ch:
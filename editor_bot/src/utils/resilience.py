@@ -0,0 +1,232 @@
+"""Outbound call resilience: per-endpoint circuit breaker, full-jitter backoff and retry budget."""
+
+import random
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import structlog
+
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+_STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+_state_gauge = metrics.gauge(
+    "editor_bot_circuit_breaker_state",
+    "Circuit breaker state per endpoint (0 = closed, 1 = half-open, 2 = open)",
+    ("endpoint",),
+)
+_transitions = metrics.counter(
+    "editor_bot_circuit_breaker_transitions_total",
+    "Circuit breaker state changes per endpoint",
+    ("endpoint", "state"),
+)
+_rejected = metrics.counter(
+    "editor_bot_circuit_breaker_rejected_total",
+    "Calls not made because the endpoint circuit was open",
+    ("endpoint",),
+)
+_budget_exhausted = metrics.counter(
+    "editor_bot_retry_budget_exhausted_total",
+    "Retries skipped because the endpoint retry budget was spent",
+    ("endpoint",),
+)
+
+
+def full_jitter_backoff(
+    attempt: int,
+    base: float,
+    cap: float,
+    rand: Callable[[], float] = random.random,
+) -> float:
+    """Delay after `attempt` failures: uniform in [0, min(cap, base * 2**attempt)) ("full jitter")."""
+    return rand() * min(cap, base * (2 ** max(0, attempt)))
+
+
+class CircuitOpenError(Exception):
+    """Raised by CircuitBreaker.check() when the endpoint must not be called yet."""
+
+    def __init__(self, endpoint: str, retry_after: float) -> None:
+        super().__init__(f"circuit open for {endpoint}, retry in {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures; open -> half-open after
+    reset_timeout; half-open lets half_open_max_calls probes through: a success closes the
+    circuit, a failure opens it again. Probe slots with no outcome reported within reset_timeout
+    (caller cancelled or failed on an error it does not record) are freed for a new probe.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._probe_at = 0.0
+        _state_gauge.set(_STATE_VALUES[STATE_CLOSED], endpoint=name)
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        log.warning("circuit_breaker_state", endpoint=self.name, state=state, previous=self._state)
+        self._state = state
+        _state_gauge.set(_STATE_VALUES[state], endpoint=self.name)
+        _transitions.inc(endpoint=self.name, state=state)
+
+    @property
+    def state(self) -> str:
+        if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(STATE_HALF_OPEN)
+            self._half_open_calls = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through (0 when calls are allowed)."""
+        if self.state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """True if a call may be made now (reserves a probe slot in half-open state)."""
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN:
+            now = self._clock()
+            if self._half_open_calls >= self.half_open_max_calls and now - self._probe_at >= self.reset_timeout:
+                log.warning("circuit_breaker_probe_expired", endpoint=self.name, probes=self._half_open_calls)
+                self._half_open_calls = 0
+            if self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                self._probe_at = now
+                return True
+        _rejected.inc(endpoint=self.name)
+        return False
+
+    def check(self) -> None:
+        """Like allow(), but raises CircuitOpenError instead of returning False."""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after() or self.reset_timeout)
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._half_open_calls = 0
+        self._transition(STATE_CLOSED)
+
+    def record_failure(self) -> None:
+        if self._state == STATE_HALF_OPEN:
+            self._open()
+            return
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._half_open_calls = 0
+        self._failures = 0
+        self._transition(STATE_OPEN)
+
+
+class RetryBudget:
+    """
+    Cap retries to ratio of first attempts over a sliding window (plus min_retries so a quiet
+    endpoint can still retry). Keeps retries from multiplying load on a struggling endpoint.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ratio: float = 0.2,
+        min_retries: int = 3,
+        window_sec: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_sec = window_sec
+        self._clock = clock
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+
+    def _trim(self, now: float) -> None:
+        for q in (self._requests, self._retries):
+            while q and now - q[0] > self.window_sec:
+                q.popleft()
+
+    def record_request(self) -> None:
+        """Count a first attempt."""
+        self._requests.append(self._clock())
+
+    def try_retry(self) -> bool:
+        """Spend one retry if the budget allows it."""
+        now = self._clock()
+        self._trim(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+            _budget_exhausted.inc(endpoint=self.name)
+            return False
+        self._retries.append(now)
+        return True
+
+
+class Endpoint:
+    """Breaker and retry budget for one outbound dependency (n8n, Bot API, ...)."""
+
+    def __init__(self, name: str, breaker: CircuitBreaker, budget: RetryBudget) -> None:
+        self.name = name
+        self.breaker = breaker
+        self.budget = budget
+
+    def retry_delay(self, attempt: int, base: float, cap: float) -> Optional[float]:
+        """Spend one retry from the budget; return full-jitter delay, or None if the budget is spent."""
+        if not self.budget.try_retry():
+            return None
+        return full_jitter_backoff(attempt, base, cap)
+
+
+_endpoints: dict[str, Endpoint] = {}
+
+
+def get_endpoint(
+    name: str,
+    failure_threshold: int = 5,
+    reset_timeout: float = 30.0,
+    retry_ratio: float = 0.2,
+) -> Endpoint:
+    """Return the registered endpoint (created with the given limits on first call)."""
+    endpoint = _endpoints.get(name)
+    if endpoint is None:
+        endpoint = Endpoint(
+            name,
+            CircuitBreaker(name, failure_threshold=failure_threshold, reset_timeout=reset_timeout),
+            RetryBudget(name, ratio=retry_ratio),
+        )
+        _endpoints[name] = endpoint
+    return endpoint
+
+
+def reset_endpoints(names: Optional[list[str]] = None) -> None:
+    """Forget endpoint state (all or given names); used by tests."""
+    for name in list(_endpoints) if names is None else names:
+        _endpoints.pop(name, None)
@@ -9,7 +9,6 @@ from typing import Any, List, Optional
 import asyncpg
 from aiohttp import web
 from aiogram import Bot
-from aiogram.types import FSInputFile
 import structlog
 
 from src.bot.keyboards import review_keyboard
@@ -20,6 +19,11 @@ from src.database.repository import (
     update_post_delivery_failed,
 )
 from src.database.admin_repository import get_editors_list
+from src.services.pdf_optimizer import pdf_input_file
+from src.services.pdf_storage import is_indexed_pdf
+from src.services.publisher import BOT_API_ENDPOINT, PUBLISH_RETRY_BACKOFF_BASE_SEC, PUBLISH_RETRY_BACKOFF_CAP_SEC
+from src.utils.metrics import render_latest
+from src.utils.resilience import get_endpoint
 from src.utils.text import split_html_safe, summary_to_safe_html, SUMMARY_MAX_LENGTH
 
 log = structlog.get_logger()
@@ -108,9 +112,20 @@ async def _send_to_one_editor(
     use_pdf_file: bool,
 ) -> Optional[int]:
     """Send message chunks once, then optional PDF (up to 2 attempts with one retry on retriable errors).
-    Returns first message_id or None on text failure. Text is never retried. On PDF failure we still return first_message_id."""
+    Returns first message_id or None on text failure. Text is never retried. On PDF failure we still return first_message_id.
+    Sends go through the Bot API circuit breaker: while it is open nothing is sent (None, scheduler retries later)."""
     if not chunks:
         return None
+    endpoint = get_endpoint(BOT_API_ENDPOINT)
+    if not endpoint.breaker.allow():
+        log.warning(
+            "incoming_post_send_to_editor_failed",
+            post_id=post_id,
+            chat_id=chat_id,
+            error="Bot API circuit open",
+            retry_after=round(endpoint.breaker.retry_after(), 1),
+        )
+        return None
     log.info("incoming_post_send_to_editor_start", post_id=post_id, chat_id=chat_id)
     try:
         msg = await asyncio.wait_for(
@@ -123,7 +138,9 @@ async def _send_to_one_editor(
                 bot.send_message(chat_id, part),
                 timeout=SEND_TO_EDITOR_TIMEOUT,
             )
+        endpoint.breaker.record_success()
     except asyncio.TimeoutError:
+        endpoint.breaker.record_failure()
         log.warning(
             "incoming_post_send_to_editor_failed",
             post_id=post_id,
@@ -133,6 +150,10 @@ async def _send_to_one_editor(
         )
         return None
     except Exception as e:
+        if _is_retriable_pdf_error(e):
+            endpoint.breaker.record_failure()
+        else:
+            endpoint.breaker.record_success()
         err = str(e).lower()
         if (
             "can't initiate" in err
@@ -158,30 +179,45 @@ async def _send_to_one_editor(
 
     had_pdf = False
     if use_pdf_file and pdf_path:
+        endpoint.budget.record_request()
+        document = await pdf_input_file(pdf_path)
         for attempt in range(1, 3):
             try:
                 await asyncio.wait_for(
                     bot.send_document(
                         chat_id,
-                        FSInputFile(pdf_path),
+                        document,
                         caption=f"PDF к посту #{post_id}",
                         reply_to_message_id=first_message_id,
                     ),
                     timeout=SEND_PDF_TIMEOUT,
                 )
+                endpoint.breaker.record_success()
                 had_pdf = True
                 break
-            except asyncio.TimeoutError as e:
-                if attempt == 1 and _is_retriable_pdf_error(e):
+            except Exception as e:
+                retriable = _is_retriable_pdf_error(e)
+                if retriable:
+                    endpoint.breaker.record_failure()
+                else:
+                    endpoint.breaker.record_success()
+                delay = (
+                    endpoint.retry_delay(attempt, PUBLISH_RETRY_BACKOFF_BASE_SEC, PUBLISH_RETRY_BACKOFF_CAP_SEC)
+                    if attempt == 1 and retriable and endpoint.breaker.state == "closed"
+                    else None
+                )
+                if delay is not None:
                     log.warning(
                         "incoming_post_pdf_retry",
                         post_id=post_id,
                         chat_id=chat_id,
                         attempt=2,
-                        reason="timeout",
+                        reason="timeout" if isinstance(e, asyncio.TimeoutError) else "connection_error",
+                        delay=round(delay, 2),
                     )
-                    await asyncio.sleep(2)
-                else:
+                    await asyncio.sleep(delay)
+                    continue
+                if isinstance(e, asyncio.TimeoutError):
                     log.warning(
                         "incoming_post_pdf_send_failed",
                         post_id=post_id,
@@ -190,17 +226,6 @@ async def _send_to_one_editor(
                         error="Timeout sending PDF",
                         timeout_seconds=SEND_PDF_TIMEOUT,
                     )
-                    break
-            except Exception as e:
-                if attempt == 1 and _is_retriable_pdf_error(e):
-                    log.warning(
-                        "incoming_post_pdf_retry",
-                        post_id=post_id,
-                        chat_id=chat_id,
-                        attempt=2,
-                        reason="connection_error",
-                    )
-                    await asyncio.sleep(2)
                 else:
                     log.warning(
                         "incoming_post_pdf_send_failed",
@@ -209,7 +234,7 @@ async def _send_to_one_editor(
                         attempt=attempt,
                         error=str(e),
                     )
-                    break
+                break
 
     log.info(
         "incoming_post_sent_to_editor",
@@ -259,10 +284,10 @@ async def _send_to_editors_background(
                 )
                 return
 
-            use_pdf_file = (
-                pdf_path
-                and _is_pdf_path_safe(pdf_path, pdf_storage_path)
-                and os.path.isfile(pdf_path)
+            # Indexed files need no realpath()/isfile() on the volume; older ones are checked the old way
+            use_pdf_file = bool(pdf_path) and (
+                await is_indexed_pdf(pdf_path, reference=f"post:{post_id}")
+                or (_is_pdf_path_safe(pdf_path, pdf_storage_path) and os.path.isfile(pdf_path))
             )
             log.info(
                 "incoming_post_send_start",
@@ -441,6 +466,11 @@ async def handle_incoming_post(request: web.Request) -> web.Response:
     return web.json_response({"ok": True, "post_id": post_id})
 
 
+async def handle_metrics(request: web.Request) -> web.Response:
+    """GET /metrics: in-process metrics in Prometheus text format (no auth, internal network only)."""
+    return web.Response(text=render_latest(), content_type="text/plain", charset="utf-8")
+
+
 def create_app(
     pool: asyncpg.Pool,
     bot: Bot,
@@ -459,4 +489,5 @@ def create_app(
     app["pdf_storage_path"] = pdf_storage_path.rstrip("/") or "/data/pdfs"
     app["alert_chat_id"] = alert_chat_id
     app.router.add_post(webhook_path.rstrip("/") or "/incoming/post", handle_incoming_post)
+    app.router.add_get("/metrics", handle_metrics)
     return app
@@ -0,0 +1,13 @@
+"""Shared fixtures for editor_bot tests."""
+
+import pytest
+
+from src.utils.resilience import reset_endpoints
+
+
+@pytest.fixture(autouse=True)
+def _fresh_circuit_breakers():
+    """Each test starts with closed breakers and full retry budgets."""
+    reset_endpoints()
+    yield
+    reset_endpoints()
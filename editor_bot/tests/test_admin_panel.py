@@ -128,3 +128,17 @@ async def test_cb_admin_sched_cancel_calls_clear_and_audit() -> None:
     callback.answer.assert_called_once()
     assert "отменена" in callback.answer.call_args[0][0].lower()
     callback.message.edit_text.assert_called_once()
+
+
+def test_admin_sources_keyboard_weight_and_priority_buttons() -> None:
+    """With migrated columns each channel row has weight and priority buttons; without them only delete."""
+    from src.bot.admin_keyboards import ADMIN_SRC_PRIO, ADMIN_SRC_WEIGHT, admin_sources_keyboard
+
+    kb = admin_sources_keyboard([
+        {"id": 5, "channel_identifier": "-1001", "weight": 3, "priority": True},
+        {"id": 6, "channel_identifier": "-1002"},
+    ])
+    first, second = kb.inline_keyboard[0], kb.inline_keyboard[1]
+    assert [b.callback_data for b in first] == ["admin_src_del_5", f"{ADMIN_SRC_WEIGHT}_5", f"{ADMIN_SRC_PRIO}_5"]
+    assert first[1].text == "⚖️ 3" and first[2].text == "⚡"
+    assert [b.callback_data for b in second] == ["admin_src_del_6"]
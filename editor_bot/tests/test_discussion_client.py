@@ -31,3 +31,55 @@ async def test_resolve_discussion_returns_none_when_api_returns_invalid_id_types
         cid, mid = await resolve_discussion("http://userbot:8081", "token", "-100123", 42)
     assert cid is None
     assert mid is None
+
+
+@pytest.mark.asyncio
+async def test_resolve_discussion_skips_request_while_circuit_open() -> None:
+    """After repeated failures the userbot API circuit opens and no further requests are made."""
+    from src.services.discussion_client import USERBOT_API_ENDPOINT
+    from src.utils.resilience import get_endpoint
+
+    breaker = get_endpoint(USERBOT_API_ENDPOINT).breaker
+    with patch(
+        "src.services.discussion_client.aiohttp.ClientSession",
+        side_effect=ConnectionError("refused"),
+    ) as session_cls:
+        for _ in range(breaker.failure_threshold):
+            assert await resolve_discussion("http://userbot:8081", "token", "-100123", 42) == (None, None)
+        assert breaker.state == "open"
+        calls = session_cls.call_count
+        assert await resolve_discussion("http://userbot:8081", "token", "-100123", 42) == (None, None)
+        assert session_cls.call_count == calls
+
+
+@pytest.mark.asyncio
+async def test_resolve_discussion_batch_maps_results_by_pair() -> None:
+    """One request for all pairs; results are matched by (channel_id, message_id)."""
+    from src.services.discussion_client import resolve_discussion_batch
+
+    fake_resp = MagicMock()
+    fake_resp.status = 200
+    fake_resp.json = AsyncMock(
+        return_value={
+            "ok": True,
+            "results": [
+                {"channel_id": "-1002", "message_id": 20, "ok": False, "error": "x"},
+                {"channel_id": "-1001", "message_id": 10, "ok": True,
+                 "discussion_chat_id": -1005001, "discussion_message_id": 7},
+            ],
+        }
+    )
+    post_cm = MagicMock()
+    post_cm.__aenter__ = AsyncMock(return_value=fake_resp)
+    post_cm.__aexit__ = AsyncMock(return_value=None)
+    session = MagicMock()
+    session.post = MagicMock(return_value=post_cm)
+    session_cm = MagicMock()
+    session_cm.__aenter__ = AsyncMock(return_value=session)
+    session_cm.__aexit__ = AsyncMock(return_value=None)
+
+    with patch("src.services.discussion_client.aiohttp.ClientSession", return_value=session_cm):
+        results = await resolve_discussion_batch("http://userbot:8081", "token", [("-1001", 10), ("-1002", 20)])
+    assert results == {("-1001", 10): (-1005001, 7), ("-1002", 20): (None, None)}
+    assert session.post.call_count == 1
+    assert session.post.call_args.args[0] == "http://userbot:8081/discussion/resolve_batch"
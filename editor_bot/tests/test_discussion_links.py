@@ -0,0 +1,45 @@
+"""Tests for the discussion_links LISTEN client."""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.services.discussion_links import DiscussionLinkListener
+
+
+def _payload(channel_id: int, message_id: int, chat_id: int, discussion_message_id: int) -> str:
+    return json.dumps(
+        {
+            "channel_id": channel_id,
+            "channel_message_id": message_id,
+            "discussion_chat_id": chat_id,
+            "discussion_message_id": discussion_message_id,
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_wait_returns_as_soon_as_link_is_notified() -> None:
+    """A waiting publisher gets the link from NOTIFY without polling."""
+    pool = MagicMock()
+    pool.fetchrow = AsyncMock(return_value=None)
+    listener = DiscussionLinkListener(pool)
+    waiter = asyncio.create_task(listener.wait(-1001, 42, timeout=5))
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    listener._on_notify(None, 1, "discussion_links", _payload(-1001, 42, -1005, 7))
+    assert await asyncio.wait_for(waiter, 1) == (-1005, 7)
+
+
+@pytest.mark.asyncio
+async def test_wait_uses_link_notified_before_waiting_and_times_out_otherwise() -> None:
+    """Links that arrived early are remembered; unknown posts time out with None."""
+    pool = MagicMock()
+    pool.fetchrow = AsyncMock(return_value=None)
+    listener = DiscussionLinkListener(pool)
+    listener._on_notify(None, 1, "discussion_links", _payload(-1001, 42, -1005, 7))
+    assert await listener.wait(-1001, 42, timeout=1) == (-1005, 7)
+    assert await listener.wait(-1001, 43, timeout=0.01) is None
+    assert listener._waiters == {}
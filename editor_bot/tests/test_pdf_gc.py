@@ -0,0 +1,76 @@
+"""Tests for the reference-aware PDF garbage collector."""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.services.pdf_gc import collect_pdfs, gc_reason, parse_retention
+
+RETENTION = {"rejected": 2, "published": 30}
+DAY = 86400
+
+
+def _ago(days: float) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def test_parse_retention():
+    assert parse_retention("rejected=2, published=30,bad,x=y") == {"rejected": 2.0, "published": 30.0}
+    assert parse_retention("") == {}
+
+
+def test_gc_reason_respects_references_and_retention():
+    now = time.time()
+    old_file = now - 10 * DAY
+    # Pending outbox row or an active post keep the file regardless of age
+    assert gc_reason(True, [], old_file, now, RETENTION, 3) is None
+    assert gc_reason(False, [("scheduled", _ago(100))], old_file, now, RETENTION, 3) is None
+    assert gc_reason(False, [("rejected", _ago(100)), ("pending_review", _ago(1))], old_file, now, RETENTION, 3) is None
+    # Terminal statuses expire after their own retention
+    assert gc_reason(False, [("rejected", _ago(3))], old_file, now, RETENTION, 3) == "rejected"
+    assert gc_reason(False, [("published", _ago(3))], old_file, now, RETENTION, 3) is None
+    assert gc_reason(False, [("published", _ago(31)), ("rejected", _ago(5))], old_file, now, RETENTION, 3) == "rejected"
+    # Unreferenced files get a grace period
+    assert gc_reason(False, [], old_file, now, RETENTION, 3) == "orphan"
+    assert gc_reason(False, [], now - DAY, now, RETENTION, 3) is None
+
+
+@pytest.mark.asyncio
+async def test_collect_pdfs_deletes_only_collectable_files(tmp_path):
+    shard = tmp_path / "ab" / "cd"
+    shard.mkdir(parents=True)
+    files = {name: shard / name for name in ("1_1.pdf", "1_2.pdf", "1_3.pdf")}
+    for path in files.values():
+        path.write_bytes(b"x" * 100)
+    (shard / "1_1.opt.pdf").write_bytes(b"x" * 40)
+    (shard / "9_9.opt.pdf").write_bytes(b"x" * 10)
+    old = time.time() - 10 * DAY
+    os.utime(files["1_3.pdf"], (old, old))
+
+    refs = {
+        str(files["1_1.pdf"]): (False, [("rejected", _ago(5))]),
+        str(files["1_2.pdf"]): (False, [("pending_review", _ago(5))]),
+    }
+    pool = MagicMock()
+    pool.fetch = AsyncMock(
+        return_value=[
+            {"path": str(path), "queued": refs.get(str(path), (False, []))[0],
+             "statuses": [s for s, _ in refs.get(str(path), (False, []))[1]],
+             "updated": [u for _, u in refs.get(str(path), (False, []))[1]]}
+            for path in files.values()
+        ]
+    )
+    pool.execute = AsyncMock()
+
+    dry = await collect_pdfs(pool, str(tmp_path), RETENTION, 3, dry_run=True)
+    assert (dry.deleted, dry.kept, dry.bytes_reclaimed) == (2, 1, 250)
+    assert all(path.exists() for path in files.values())
+
+    report = await collect_pdfs(pool, str(tmp_path), RETENTION, 3)
+    assert report.by_reason == {"rejected": 1, "orphan": 1}
+    assert report.bytes_reclaimed == 250
+    assert sorted(os.listdir(shard)) == ["1_2.pdf"]
+    assert sorted(pool.execute.await_args.args[1]) == [str(files["1_1.pdf"]), str(files["1_3.pdf"])]
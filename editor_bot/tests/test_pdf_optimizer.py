@@ -0,0 +1,63 @@
+"""Tests for the PDF upload optimizer (pikepdf pass in a process pool, variant choice)."""
+
+import os
+
+import pikepdf
+import pytest
+
+from src.services import pdf_optimizer
+from src.services.pdf_optimizer import PdfOptimizer, optimize_pdf, optimized_path, pdf_input_file
+
+
+def _write_bloated_pdf(path, pages: int = 3) -> str:
+    """Pages that each embed their own uncompressed copy of the same 200x200 image."""
+    pdf = pikepdf.new()
+    pixels = bytes(range(200)) * 600
+    for _ in range(pages):
+        image = pikepdf.Stream(pdf, pixels)
+        image.Type = pikepdf.Name.XObject
+        image.Subtype = pikepdf.Name.Image
+        image.Width, image.Height = 200, 200
+        image.ColorSpace = pikepdf.Name.DeviceRGB
+        image.BitsPerComponent = 8
+        page = pdf.add_blank_page(page_size=(200, 200))
+        page.Resources = pikepdf.Dictionary(XObject=pikepdf.Dictionary(Im0=image))
+        page.Contents = pdf.make_stream(b"q 200 0 0 200 0 0 cm /Im0 Do Q")
+    pdf.save(path, compress_streams=False)
+    return str(path)
+
+
+def test_optimize_pdf_dedupes_and_recompresses(tmp_path):
+    src = _write_bloated_pdf(tmp_path / "report.pdf")
+    result = optimize_pdf(src, optimized_path(src))
+    assert result.error is None
+    assert result.deduplicated == 2
+    assert result.savings > 0.9
+    assert optimized_path(src) == str(tmp_path / "report.opt.pdf")
+    with pikepdf.open(optimized_path(src)) as pdf:
+        assert len(pdf.pages) == 3
+        images = {page.Resources.XObject.Im0.objgen for page in pdf.pages}
+        assert len(images) == 1
+    broken = optimize_pdf(str(tmp_path / "missing.pdf"), str(tmp_path / "missing.opt.pdf"))
+    assert broken.error and not os.path.exists(tmp_path / "missing.opt.pdf.tmp")
+
+
+@pytest.mark.asyncio
+async def test_upload_uses_variant_once_and_keeps_original_name(tmp_path):
+    """The first upload optimizes in the pool; later ones reuse the variant; small files are left alone."""
+    src = _write_bloated_pdf(tmp_path / "big.pdf")
+    small = _write_bloated_pdf(tmp_path / "small.pdf", pages=1)
+    optimizer = PdfOptimizer(workers=1, min_bytes=200_000)
+    pdf_optimizer.set_pdf_optimizer(optimizer)
+    try:
+        document = await pdf_input_file(src)
+        assert document.path == optimized_path(src) and document.filename == "big.pdf"
+        mtime = os.path.getmtime(optimized_path(src))
+        assert await optimizer.upload_path(src) == optimized_path(src)
+        assert os.path.getmtime(optimized_path(src)) == mtime
+        assert await optimizer.upload_path(small) == small
+        assert not os.path.exists(optimized_path(small))
+    finally:
+        pdf_optimizer.set_pdf_optimizer(None)
+        optimizer.shutdown()
+    assert (await pdf_input_file(src)).path == src
@@ -0,0 +1,45 @@
+"""Tests for resolving PDF paths through the pdf_files index."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import asyncpg
+import pytest
+
+from src.services.pdf_storage import PdfIndex, is_under_base
+
+
+def test_is_under_base_is_lexical():
+    assert is_under_base("/data/pdfs/ab/cd/1_2.pdf", "/data/pdfs")
+    assert is_under_base("/data/pdfs/1_2.pdf", "/data/pdfs/")
+    assert not is_under_base("/data/pdfs-other/1_2.pdf", "/data/pdfs")
+    assert not is_under_base("/data/pdfs/../etc/passwd", "/data/pdfs")
+    assert not is_under_base("", "/data/pdfs")
+
+
+@pytest.mark.asyncio
+async def test_index_lookup_is_cached_and_adds_references():
+    """A confirmed path is not looked up again until it needs a new reference; outside paths never hit the DB."""
+    pool = MagicMock()
+    pool.fetchrow = AsyncMock(return_value={"path": "/data/pdfs/ab/cd/1_2.pdf"})
+    index = PdfIndex(pool, "/data/pdfs")
+
+    assert await index.contains("/data/pdfs/ab/cd/1_2.pdf")
+    assert await index.contains("/data/pdfs/ab/cd/1_2.pdf")
+    assert pool.fetchrow.await_count == 1
+    assert await index.contains("/data/pdfs/ab/cd/1_2.pdf", reference="post:7")
+    assert pool.fetchrow.await_args.args[1:] == ("/data/pdfs/ab/cd/1_2.pdf", "post:7")
+    assert not await index.contains("/tmp/1_2.pdf")
+    assert pool.fetchrow.await_count == 2
+
+    pool.fetchrow = AsyncMock(return_value=None)
+    assert not await index.contains("/data/pdfs/ef/01/3_4.pdf")
+
+
+@pytest.mark.asyncio
+async def test_index_disables_itself_without_the_table():
+    pool = MagicMock()
+    pool.fetchrow = AsyncMock(side_effect=asyncpg.UndefinedTableError("relation \"pdf_files\" does not exist"))
+    index = PdfIndex(pool, "/data/pdfs")
+    assert not await index.contains("/data/pdfs/ab/cd/1_2.pdf")
+    assert not await index.contains("/data/pdfs/ab/cd/5_6.pdf")
+    assert pool.fetchrow.await_count == 1
@@ -212,3 +212,106 @@ async def test_publish_to_all_channels_serialized() -> None:
             publish_to_all_channels(bot, ["-1002"], "T2", ""),
         )
     assert order == ["start", "end", "start", "end"]
+
+
+@pytest.mark.asyncio
+async def test_publish_to_channel_fails_fast_when_bot_api_circuit_open() -> None:
+    """Open Bot API circuit: nothing is sent, CircuitOpenError is raised for the scheduler to retry later."""
+    from src.services.publisher import BOT_API_ENDPOINT
+    from src.utils.resilience import CircuitOpenError, get_endpoint
+
+    breaker = get_endpoint(BOT_API_ENDPOINT).breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    with pytest.raises(CircuitOpenError):
+        await publish_to_channel(bot, "-100123", "Summary", "", "/data/pdfs")
+    bot.send_message.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_publish_to_all_channels_resolves_discussions_in_one_batch() -> None:
+    """Several channels with PDF: one batch resolve, PDF of each channel goes to its own thread."""
+    bot = MagicMock()
+    bot.send_message = AsyncMock(side_effect=[MagicMock(message_id=10), MagicMock(message_id=20)])
+    bot.send_document = AsyncMock(return_value=MagicMock())
+    resolved = {("-1001", 10): (-1005001, 1), ("-1002", 20): (None, None)}
+    with patch("os.path.isfile", return_value=True), patch("asyncio.sleep", new_callable=AsyncMock), patch(
+        "src.services.publisher.resolve_discussion_batch",
+        new_callable=AsyncMock,
+        return_value=resolved,
+    ) as batch, patch("src.services.publisher.resolve_discussion", new_callable=AsyncMock) as single:
+        await publish_to_all_channels(
+            bot,
+            ["-1001", "-1002"],
+            "Summary",
+            "/data/pdfs/ok.pdf",
+            "/data/pdfs",
+            userbot_api_url="http://userbot:8081",
+            userbot_api_token="secret",
+        )
+    batch.assert_awaited_once_with("http://userbot:8081", "secret", [("-1001", 10), ("-1002", 20)])
+    single.assert_not_called()
+    targets = [(c.args[0], c.kwargs["reply_to_message_id"]) for c in bot.send_document.call_args_list]
+    assert targets == [(-1005001, 1), ("-1002", 20)]
+
+
+@pytest.mark.asyncio
+async def test_publish_resolves_after_grace_when_no_link_is_pushed() -> None:
+    """A channel without a linked chat never gets a pushed link: resolve takes over after the grace period."""
+    from src.services import publisher
+
+    bot = MagicMock()
+    bot.send_message = AsyncMock(return_value=MagicMock(message_id=42, chat=MagicMock(id=-1001)))
+    bot.send_document = AsyncMock(return_value=MagicMock())
+    with patch("os.path.isfile", return_value=True), patch(
+        "src.services.publisher.discussion_links_available", return_value=True
+    ), patch(
+        "src.services.publisher.wait_for_discussion_link", new_callable=AsyncMock, return_value=None
+    ) as wait, patch(
+        "src.services.publisher.resolve_discussion", new_callable=AsyncMock, return_value=(None, None)
+    ) as resolve:
+        await publish_to_channel(
+            bot, "-1001", "Summary", "/data/pdfs/ok.pdf", "/data/pdfs", userbot_api_url="http://userbot:8081"
+        )
+        wait.assert_awaited_once_with(-1001, 42, publisher.PUBLISH_DISCUSSION_LINK_GRACE_SEC)
+        resolve.assert_awaited_once()
+        assert publisher.PUBLISH_DISCUSSION_LINK_GRACE_SEC <= 2
+
+        # Without the userbot API there is nothing to fall back to: the full wait applies
+        wait.reset_mock()
+        await publish_to_channel(bot, "-1001", "Summary", "/data/pdfs/ok.pdf", "/data/pdfs")
+        wait.assert_awaited_once_with(-1001, 42, publisher.PUBLISH_DISCUSSION_LINK_TIMEOUT_SEC)
+
+
+@pytest.mark.asyncio
+async def test_batched_publish_completes_posted_channels_when_second_channel_fails() -> None:
+    """A failing second channel does not leave the first with a caption and no PDF."""
+    from src.services.publisher import PublishError
+
+    bot = MagicMock()
+    bot.send_document = AsyncMock(return_value=MagicMock())
+    resolved = {("-1001", 10): (None, None), ("-1003", 30): (None, None)}
+    with patch("os.path.isfile", return_value=True), patch("asyncio.sleep", new_callable=AsyncMock), patch(
+        "src.services.publisher.resolve_discussion_batch", new_callable=AsyncMock, return_value=resolved
+    ):
+        # Caption of the second channel fails: the first channel still gets its PDF
+        bot.send_message = AsyncMock(side_effect=[MagicMock(message_id=10), RuntimeError("chat not found")])
+        with pytest.raises(RuntimeError, match="chat not found"):
+            await publish_to_all_channels(
+                bot, ["-1001", "-1002", "-1003"], "Summary", "/data/pdfs/ok.pdf", "/data/pdfs",
+                userbot_api_url="http://userbot:8081",
+            )
+        assert [c.args[0] for c in bot.send_document.call_args_list] == ["-1001"]
+
+        # PDF of the first channel fails: the third still gets its PDF, one aggregated error
+        bot.send_document = AsyncMock(side_effect=[RuntimeError("file too big"), MagicMock()])
+        bot.send_message = AsyncMock(side_effect=[MagicMock(message_id=10), MagicMock(message_id=30)])
+        with pytest.raises(PublishError) as exc_info:
+            await publish_to_all_channels(
+                bot, ["-1001", "-1003"], "Summary", "/data/pdfs/ok.pdf", "/data/pdfs",
+                userbot_api_url="http://userbot:8081",
+            )
+        assert [c.args[0] for c in bot.send_document.call_args_list] == ["-1001", "-1003"]
+        assert [ch for ch, _ in exc_info.value.failures] == ["-1001"]
@@ -0,0 +1,35 @@
+"""Tests for /status (post counts and summary cache hit rate)."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.bot.handlers import commands
+
+
+@pytest.mark.asyncio
+async def test_status_shows_summary_cache_hit_rate():
+    message = MagicMock()
+    message.answer = AsyncMock()
+    with (
+        patch.object(commands, "get_post_counts_by_status", new_callable=AsyncMock, return_value={"published": 5}),
+        patch.object(commands, "get_summary_cache_stats", new_callable=AsyncMock, return_value=(3, 9)),
+    ):
+        await commands.cmd_status(message, pool=MagicMock())
+    text = message.answer.await_args.args[0]
+    assert "published: 5" in text
+    assert "Кэш саммари (7 дн.): 3 из 12 (25%)" in text
+
+
+@pytest.mark.asyncio
+async def test_status_without_summary_cache_table():
+    """Before migration 017 the cache line is omitted."""
+    message = MagicMock()
+    message.answer = AsyncMock()
+    with (
+        patch.object(commands, "get_post_counts_by_status", new_callable=AsyncMock, return_value={}),
+        patch.object(commands, "get_summary_cache_stats", new_callable=AsyncMock, return_value=None),
+    ):
+        await commands.cmd_status(message, pool=MagicMock())
+    assert message.answer.await_args.args[0] == "Постов пока нет."
+    assert commands.format_summary_cache_line(0, 0).endswith("0 из 0 (—)")
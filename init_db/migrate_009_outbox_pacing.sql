@@ -0,0 +1,8 @@
+-- Migration 009: Token-bucket pacing state for userbot outbox delivery (survives restarts)
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_009_outbox_pacing.sql
+
+CREATE TABLE IF NOT EXISTS userbot_rate_buckets (
+    bucket_key TEXT PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,25 @@
+-- Migration 010: Outbox retention — partial indexes for the pending queue and an archive without post_text
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_010_outbox_retention.sql
+
+-- The full status index covered every sent row; the worker only ever scans pending ones.
+DROP INDEX IF EXISTS idx_userbot_outbox_status;
+CREATE INDEX IF NOT EXISTS idx_userbot_outbox_pending ON userbot_outbox (created_at) WHERE status = 'pending';
+-- Lets the compactor find old delivered rows without a sequential scan
+CREATE INDEX IF NOT EXISTS idx_userbot_outbox_done_updated ON userbot_outbox (updated_at) WHERE status <> 'pending';
+
+-- Archived outbox rows (OUTBOX_ARCHIVE_SENT=true): metadata only, post text is dropped
+CREATE TABLE IF NOT EXISTS userbot_outbox_archive (
+    id BIGINT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    message_id BIGINT NOT NULL,
+    pdf_path TEXT DEFAULT '',
+    source_channel TEXT DEFAULT '',
+    status TEXT NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ,
+    archived_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_userbot_outbox_archive_created ON userbot_outbox_archive (created_at);
@@ -0,0 +1,12 @@
+-- Migration 011: Two-phase delivery to n8n — accepted/completed outbox states and n8n execution id
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_011_outbox_ack.sql
+
+ALTER TABLE userbot_outbox DROP CONSTRAINT IF EXISTS userbot_outbox_status_check;
+ALTER TABLE userbot_outbox ADD CONSTRAINT userbot_outbox_status_check
+    CHECK (status IN ('pending', 'accepted', 'sent', 'completed', 'failed'));
+
+ALTER TABLE userbot_outbox ADD COLUMN IF NOT EXISTS execution_id TEXT;
+ALTER TABLE userbot_outbox ADD COLUMN IF NOT EXISTS accepted_at TIMESTAMPTZ;
+
+-- Sweeper: rows acked by n8n but never reported back
+CREATE INDEX IF NOT EXISTS idx_userbot_outbox_accepted ON userbot_outbox (accepted_at) WHERE status = 'accepted';
@@ -0,0 +1,12 @@
+-- Migration 012: Fair outbox scheduling — per-source weight and priority flag
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_012_source_weights.sql
+
+-- weight: posts per round-robin round for this source; priority: urgent source, served before all others
+ALTER TABLE source_channels ADD COLUMN IF NOT EXISTS weight INT NOT NULL DEFAULT 1;
+ALTER TABLE source_channels ADD COLUMN IF NOT EXISTS priority BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE source_channels DROP CONSTRAINT IF EXISTS source_channels_weight_check;
+ALTER TABLE source_channels ADD CONSTRAINT source_channels_weight_check CHECK (weight BETWEEN 1 AND 100);
+
+-- Per-source queue order for the claim query window (row_number per source_channel)
+CREATE INDEX IF NOT EXISTS idx_userbot_outbox_pending_source
+    ON userbot_outbox (source_channel, created_at, id) WHERE status = 'pending';
@@ -0,0 +1,15 @@
+-- Migration 013: Staleness-aware outbox draining — expired status and low-priority digest lane
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_013_outbox_drain.sql
+
+ALTER TABLE userbot_outbox DROP CONSTRAINT IF EXISTS userbot_outbox_status_check;
+ALTER TABLE userbot_outbox ADD CONSTRAINT userbot_outbox_status_check
+    CHECK (status IN ('pending', 'accepted', 'sent', 'completed', 'failed', 'expired'));
+
+-- lane: 'normal' — regular queue; 'digest' — stale rows delivered only when the normal lane is empty
+ALTER TABLE userbot_outbox ADD COLUMN IF NOT EXISTS lane TEXT NOT NULL DEFAULT 'normal';
+ALTER TABLE userbot_outbox DROP CONSTRAINT IF EXISTS userbot_outbox_lane_check;
+ALTER TABLE userbot_outbox ADD CONSTRAINT userbot_outbox_lane_check CHECK (lane IN ('normal', 'digest'));
+
+-- Stale sweep and backlog count: pending rows of the normal lane by age
+CREATE INDEX IF NOT EXISTS idx_userbot_outbox_pending_lane
+    ON userbot_outbox (lane, created_at) WHERE status = 'pending';
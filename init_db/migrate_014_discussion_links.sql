@@ -0,0 +1,16 @@
+-- Migration 014: Discussion links pushed by userbot — channel post -> auto-forwarded copy in linked chat
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_014_discussion_links.sql
+
+-- Ids in Bot API format (-100...). userbot inserts a row and NOTIFYs channel discussion_links;
+-- editor_bot LISTENs and attaches the PDF as soon as the link exists.
+CREATE TABLE IF NOT EXISTS discussion_links (
+    channel_id BIGINT NOT NULL,
+    channel_message_id INT NOT NULL,
+    discussion_chat_id BIGINT NOT NULL,
+    discussion_message_id INT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (channel_id, channel_message_id)
+);
+
+-- Pruning of old links (userbot linked-chat refresher)
+CREATE INDEX IF NOT EXISTS idx_discussion_links_created ON discussion_links (created_at);
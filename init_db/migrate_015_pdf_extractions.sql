@@ -0,0 +1,21 @@
+-- Migration 015: PDF text extracted by userbot (process pool) — sidecar to userbot_outbox / posts
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_015_pdf_extractions.sql
+
+-- One row per downloaded PDF. The outbox worker sends text with the post, so n8n skips
+-- Read PDF / Extract From PDF and writes it to posts.extracted_text. truncated = page or
+-- character cap was hit; error is set (and text empty) when extraction failed.
+CREATE TABLE IF NOT EXISTS pdf_extractions (
+    pdf_path TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    message_id BIGINT NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    pages INT NOT NULL DEFAULT 0,
+    total_pages INT NOT NULL DEFAULT 0,
+    chars INT NOT NULL DEFAULT 0,
+    truncated BOOLEAN NOT NULL DEFAULT FALSE,
+    seconds REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pdf_extractions_message ON pdf_extractions (channel_id, message_id);
@@ -0,0 +1,23 @@
+-- Migration 016: PDF extraction cache keyed by content hash (same PDF reposted or retried is extracted once)
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_016_pdf_extraction_cache.sql
+
+-- extractor_version covers the pypdf version, page/char caps and extraction code revision; a row
+-- of another version is a miss and is replaced. Eviction drops least recently used rows once
+-- the total text size exceeds PDF_EXTRACT_CACHE_MAX_MB.
+CREATE TABLE IF NOT EXISTS pdf_extraction_cache (
+    sha256 TEXT PRIMARY KEY,
+    extractor_version TEXT NOT NULL,
+    text TEXT NOT NULL,
+    pages INT NOT NULL,
+    total_pages INT NOT NULL,
+    truncated BOOLEAN NOT NULL DEFAULT FALSE,
+    text_bytes INT NOT NULL,
+    hits INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_access_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pdf_extraction_cache_last_access ON pdf_extraction_cache (last_access_at);
+
+-- Content hash of each downloaded file (computed during download)
+ALTER TABLE pdf_extractions ADD COLUMN IF NOT EXISTS sha256 TEXT;
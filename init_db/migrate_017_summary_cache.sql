@@ -0,0 +1,94 @@
+-- Migration 017: LLM summary cache keyed by hash(prompt, model, normalized input) with TTL and hit/miss stats
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_017_summary_cache.sql
+
+-- n8n (and Python callers) look up a summary before calling the model and store it after.
+-- The key covers the prompt text, so changing openai_prompt in the admin panel is a miss.
+-- TTL: config key summary_cache_ttl_hours (default 168); 0 — summaries are not stored.
+CREATE TABLE IF NOT EXISTS summary_cache (
+    cache_key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    hits INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_hit_at TIMESTAMPTZ,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_summary_cache_expires ON summary_cache (expires_at);
+
+-- Lookups per day (editor-bot /status shows the hit rate)
+CREATE TABLE IF NOT EXISTS summary_cache_stats (
+    day DATE PRIMARY KEY,
+    hits INT NOT NULL DEFAULT 0,
+    misses INT NOT NULL DEFAULT 0
+);
+
+INSERT INTO config (key, value, description) VALUES
+    ('summary_cache_ttl_hours', '168', 'Сколько часов хранить саммари в кэше (0 — не кэшировать)')
+ON CONFLICT (key) DO NOTHING;
+
+-- Whitespace runs collapse to one space, so re-extracted or re-pasted text hits the same key.
+-- Parts are length-prefixed: a prompt ending where the input starts cannot collide.
+CREATE OR REPLACE FUNCTION summary_cache_key(p_prompt TEXT, p_model TEXT, p_input TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT encode(sha256(convert_to(concat_ws(
+        ':',
+        length(coalesce(p_model, '')), coalesce(p_model, ''),
+        length(btrim(coalesce(p_prompt, ''))), btrim(coalesce(p_prompt, '')),
+        btrim(regexp_replace(coalesce(p_input, ''), '\s+', ' ', 'g'))
+    ), 'UTF8')), 'hex')
+$$;
+
+-- Always returns one row: the key (NULL for empty input) and the cached summary (NULL on a miss).
+CREATE OR REPLACE FUNCTION summary_cache_lookup(p_prompt TEXT, p_model TEXT, p_input TEXT)
+RETURNS TABLE (summary_key TEXT, cached_summary TEXT)
+LANGUAGE plpgsql AS $$
+DECLARE
+    k TEXT;
+    s TEXT;
+BEGIN
+    IF btrim(coalesce(p_input, '')) = '' THEN
+        RETURN QUERY SELECT NULL::TEXT, NULL::TEXT;
+        RETURN;
+    END IF;
+    k := summary_cache_key(p_prompt, p_model, p_input);
+    UPDATE summary_cache c
+    SET hits = c.hits + 1, last_hit_at = NOW()
+    WHERE c.cache_key = k AND c.expires_at > NOW()
+    RETURNING c.summary INTO s;
+    INSERT INTO summary_cache_stats AS st (day, hits, misses)
+    VALUES (CURRENT_DATE, (s IS NOT NULL)::INT, (s IS NULL)::INT)
+    ON CONFLICT (day) DO UPDATE SET
+        hits = st.hits + EXCLUDED.hits,
+        misses = st.misses + EXCLUDED.misses;
+    RETURN QUERY SELECT k, s;
+END;
+$$;
+
+-- Store a fresh summary under the key from summary_cache_lookup; also drops expired rows.
+CREATE OR REPLACE FUNCTION summary_cache_put(p_key TEXT, p_model TEXT, p_summary TEXT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql AS $$
+DECLARE
+    ttl_hours INT;
+BEGIN
+    SELECT CASE WHEN value ~ '^\d+$' THEN value::INT END INTO ttl_hours
+    FROM config WHERE key = 'summary_cache_ttl_hours';
+    ttl_hours := coalesce(ttl_hours, 168);
+    IF p_key IS NULL OR p_key = '' OR btrim(coalesce(p_summary, '')) = '' OR ttl_hours <= 0 THEN
+        RETURN FALSE;
+    END IF;
+    DELETE FROM summary_cache WHERE expires_at < NOW();
+    INSERT INTO summary_cache (cache_key, model, summary, expires_at)
+    VALUES (p_key, coalesce(p_model, ''), p_summary, NOW() + make_interval(hours => ttl_hours))
+    ON CONFLICT (cache_key) DO UPDATE SET
+        model = EXCLUDED.model,
+        summary = EXCLUDED.summary,
+        hits = 0,
+        created_at = NOW(),
+        last_hit_at = NULL,
+        expires_at = EXCLUDED.expires_at;
+    RETURN TRUE;
+END;
+$$;
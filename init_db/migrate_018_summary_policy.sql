@@ -0,0 +1,10 @@
+-- Migration 018: summary policy decision stored on each post
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_018_summary_policy.sql
+
+-- Written by userbot (native pipeline) and the n8n workflows from the summary_policy field of the
+-- webhook payload: {"rule": "short", "action": "passthrough", "chars": 120, ...}.
+-- NULL for posts processed before this migration or without a decision.
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS summary_policy JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_posts_summary_policy_rule ON posts ((summary_policy->>'rule'))
+    WHERE summary_policy IS NOT NULL;
@@ -0,0 +1,25 @@
+-- Migration 019: PDF probe at download time (page count, encryption, text layer, producer)
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_019_pdf_meta.sql
+
+-- One row per downloaded PDF, written by userbot right after the download. status is ok,
+-- encrypted (a password is needed), no_text (no text layer on the first pages, e.g. a scan)
+-- or corrupt (cannot be parsed); the outbox worker sends it with the post as pdf_meta and
+-- unreadable files go down the text-only path instead of Extract From PDF.
+CREATE TABLE IF NOT EXISTS pdf_meta (
+    pdf_path TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    message_id BIGINT NOT NULL,
+    sha256 TEXT,
+    size_bytes BIGINT NOT NULL DEFAULT 0,
+    pages INT NOT NULL DEFAULT 0,
+    encrypted BOOLEAN NOT NULL DEFAULT FALSE,
+    has_text BOOLEAN NOT NULL DEFAULT FALSE,
+    producer TEXT NOT NULL DEFAULT '',
+    pdf_version TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'ok',
+    error TEXT,
+    seconds REAL NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pdf_meta_status ON pdf_meta (status) WHERE status <> 'ok';
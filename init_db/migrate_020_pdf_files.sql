@@ -0,0 +1,18 @@
+-- Migration 020: Index of files in the PDF volume (sharded layout /data/pdfs/ab/cd/<chat>_<msg>.pdf)
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_020_pdf_files.sql
+
+-- One row per stored PDF, written by userbot after the download (and by tools/migrate_pdf_storage.py
+-- for files of the old flat layout). referenced_by lists what points at the file: outbox:<id>
+-- (userbot) and post:<id> (editor-bot). editor-bot resolves paths through this table instead of
+-- realpath()/isfile() on the volume and bumps last_access_at when it uploads the file.
+CREATE TABLE IF NOT EXISTS pdf_files (
+    path TEXT PRIMARY KEY,
+    size_bytes BIGINT NOT NULL DEFAULT 0,
+    sha256 TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_access_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    referenced_by TEXT[] NOT NULL DEFAULT '{}'
+);
+
+CREATE INDEX IF NOT EXISTS idx_pdf_files_last_access ON pdf_files (last_access_at);
+CREATE INDEX IF NOT EXISTS idx_pdf_files_referenced_by ON pdf_files USING GIN (referenced_by);
@@ -0,0 +1,9 @@
+-- Migration 021: Lookups by pdf_path for the editor-bot PDF garbage collector
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_021_pdf_gc.sql
+
+-- The collector joins batches of files on disk against posts and live (pending or accepted)
+-- outbox rows by path. An accepted row is still being processed by n8n, which reads the PDF.
+CREATE INDEX IF NOT EXISTS idx_posts_pdf_path ON posts (pdf_path) WHERE pdf_path <> '';
+DROP INDEX IF EXISTS idx_userbot_outbox_pending_pdf_path;
+CREATE INDEX IF NOT EXISTS idx_userbot_outbox_live_pdf_path ON userbot_outbox (pdf_path)
+    WHERE status IN ('pending', 'accepted') AND pdf_path <> '';
@@ -0,0 +1,19 @@
+-- Migration 022: Cold archive of old PDFs (append-only segment files + offset index)
+-- Apply: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_022_pdf_archive.sql
+
+-- One row per archived PDF, written by the userbot archiver. The file content is the byte range
+-- [data_offset, data_offset + data_length) of the segment file in PDF_ARCHIVE_PATH, compressed with
+-- codec ('zlib' or 'none'); sha256 is of the original file. Rows are never updated by restores:
+-- a restored file is copied back to its hot path and the archive copy stays.
+CREATE TABLE IF NOT EXISTS pdf_archive (
+    path TEXT PRIMARY KEY,
+    segment TEXT NOT NULL,
+    data_offset BIGINT NOT NULL,
+    data_length BIGINT NOT NULL,
+    codec TEXT NOT NULL DEFAULT 'zlib',
+    size_bytes BIGINT NOT NULL,
+    sha256 TEXT NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pdf_archive_archived_at ON pdf_archive (archived_at);
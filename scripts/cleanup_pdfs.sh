@@ -1,7 +1,10 @@
 #!/bin/sh
 # Remove PDF files older than KEEP_PDF_DAYS. Run from project root (e.g. via cron).
+# Deletes by age only, even files of scheduled or pending_review posts; editor-bot's PDF_GC_* collector
+# checks references and should be preferred where it is enabled.
 # Env: PDF_STORAGE_PATH (default ./shared/pdf_storage), KEEP_PDF_DAYS (default 30).
 # With Docker volume: run inside a container or mount volume and set PDF_STORAGE_PATH to the host path.
+# Files live in hashed subdirectories (ab/cd/<chat>_<msg>.pdf), so the search is recursive.
 
 set -e
 PDF_DIR="${PDF_STORAGE_PATH:-./shared/pdf_storage}"
@@ -12,5 +15,5 @@ if [ ! -d "$PDF_DIR" ]; then
   exit 1
 fi
 
-COUNT=$(find "$PDF_DIR" -maxdepth 1 -type f \( -name "*.pdf" -o -name "*_*.pdf" \) -mtime +"$KEEP_DAYS" -print -delete | wc -l)
+COUNT=$(find "$PDF_DIR" -type f \( -name "*.pdf" -o -name "*_*.pdf" \) -mtime +"$KEEP_DAYS" -print -delete | wc -l)
 echo "Cleaned $COUNT PDF(s) older than $KEEP_DAYS days in $PDF_DIR"
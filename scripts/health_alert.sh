@@ -36,4 +36,18 @@ if [ -n "$bad" ]; then
     exit 1
 fi
 
+# Готовность userbot: клиент Telegram подключён, БД отвечает (GET /readyz внутри контейнера)
+ready_out=$(docker compose exec -T userbot python -c "
+import os, sys, urllib.request, urllib.error
+url = 'http://127.0.0.1:%s/readyz' % os.environ.get('USERBOT_API_PORT', '8081')
+try:
+    print(urllib.request.urlopen(url, timeout=5).read().decode())
+except urllib.error.HTTPError as e:
+    print(e.read().decode())
+    sys.exit(1)
+" 2>&1) || {
+    send_telegram "⚠️ Parser: userbot не готов: $(echo "$ready_out" | tail -n 1 | cut -c1-300)"
+    exit 1
+}
+
 exit 0
@@ -38,9 +38,98 @@ class Settings(BaseSettings):
     # Прокси для MTProto (Telegram). Если пусто — используется HTTP_PROXY из env.
     TELEGRAM_PROXY: Optional[str] = None
 
-    # Буфер outbox: пауза в минутах между отправкой постов в n8n; 0 — отключено.
+    # Устарело: один пост в N минут (эквивалент OUTBOX_RATE_PER_MINUTE=1/N, burst 1); 0 — отключено.
     OUTBOX_BUFFER_MINUTES: int = 0
 
+    # Темп отправки outbox в n8n (token bucket): постов в минуту; 0 — без ограничения.
+    OUTBOX_RATE_PER_MINUTE: float = 0
+    # Запас токенов: сколько постов можно отправить подряд после простоя.
+    OUTBOX_RATE_BURST: int = 1
+    # true — отдельный bucket для каждого канала-источника.
+    OUTBOX_RATE_PER_CHANNEL: bool = False
+    # Окна по времени суток (UTC) со своим темпом: "08:00-23:00=10/5;23:00-08:00=1" (постов/мин[/burst]).
+    # Темп 0 в окне — пауза. Вне окон действует OUTBOX_RATE_PER_MINUTE.
+    OUTBOX_RATE_WINDOWS: str = ""
+
+    # Пакетная отправка outbox: URL bulk-workflow n8n (например http://n8n:5678/webhook/pdf-post-bulk).
+    # Если пусто — по одному посту на запрос в N8N_WEBHOOK_URL.
+    N8N_BULK_WEBHOOK_URL: Optional[str] = None
+    # Сколько постов максимум в одном bulk-запросе.
+    OUTBOX_BULK_SIZE: int = 10
+
+    # Хранение outbox: строки sent старше N дней удаляются фоновым компактором; 0 — хранить всё.
+    OUTBOX_RETENTION_DAYS: int = 14
+    # Строк за один DELETE (маленькие пачки — без долгих блокировок).
+    OUTBOX_COMPACT_BATCH_SIZE: int = 500
+    # true — перед удалением переносить метаданные в userbot_outbox_archive (без post_text).
+    OUTBOX_ARCHIVE_SENT: bool = False
+
+    # Двухфазная доставка: n8n сразу подтверждает приём (execution id), результат присылает
+    # на USERBOT_CALLBACK_URL. false — пост считается отправленным, как только n8n принял запрос.
+    OUTBOX_ACK_MODE: bool = False
+    # URL колбэка, доступный из n8n (POST /outbox/complete этого сервиса).
+    USERBOT_CALLBACK_URL: str = "http://userbot:8081/outbox/complete"
+    # Через сколько минут без колбэка пост снова ставится в очередь.
+    OUTBOX_ACK_TIMEOUT_MINUTES: int = 30
+
+    # Разбор очереди после простоя n8n/OpenAI: посты старше N минут не отправляются обычным
+    # порядком (см. OUTBOX_STALE_POLICY); 0 — отключено.
+    OUTBOX_MAX_AGE_MINUTES: int = 0
+    # expire — пометить expired и не отправлять; digest — отправить позже, когда свежих постов нет.
+    OUTBOX_STALE_POLICY: str = "expire"
+    # Пока в очереди больше N постов, сначала отправляются самые новые; 0 — всегда от старых к новым.
+    OUTBOX_NEWEST_FIRST_BACKLOG: int = 0
+
+    # Извлечение текста PDF в userbot (пул процессов, миграция 015): текст уходит в n8n вместе с постом,
+    # узел Extract From PDF пропускается. 0 — отключено, текст извлекает n8n.
+    PDF_EXTRACT_WORKERS: int = 2
+    # Лимиты на документ: сколько страниц читать и сколько символов текста оставлять.
+    PDF_EXTRACT_MAX_PAGES: int = 50
+    PDF_EXTRACT_MAX_CHARS: int = 100000
+    # Кэш извлечённого текста по SHA-256 файла (миграция 016): бюджет в МБ текста, при превышении
+    # удаляются давно не использованные записи. 0 — без кэша.
+    PDF_EXTRACT_CACHE_MAX_MB: int = 256
+    # Фильтр по маркерам для постов с PDF: если в тексте поста маркеров нет, ищутся в первых N страницах
+    # PDF (в пуле извлечения, до первого совпадения); без совпадения пост не уходит в LLM. 0 — не искать.
+    PDF_KEYWORD_SCAN_PAGES: int = 10
+
+    # Холодный архив PDF (миграция 022): файлы старше N дней, которые не нужны ожидающим отправкам и
+    # активным постам, сжимаются в сегменты PDF_ARCHIVE_PATH и удаляются из PDF_STORAGE_PATH. Вернуть файл:
+    # POST /pdf/restore (editor-bot делает это сам при повторной публикации). 0 — не архивировать.
+    PDF_ARCHIVE_AFTER_DAYS: int = 0
+    PDF_ARCHIVE_PATH: str = "/data/pdf_archive"
+    # Размер сегмента архива в МБ (дописывается только в конец), проход архиватора — раз в N минут.
+    PDF_ARCHIVE_SEGMENT_MB: int = 1024
+    PDF_ARCHIVE_INTERVAL_MIN: int = 60
+
+    # Политика саммари (миграция 018): JSON-список правил, срабатывает первое подходящее. Условия:
+    # sources, has_pdf, max_chars, min_chars, min_pages; действия: passthrough (саммари = исходный текст),
+    # first_pages (для LLM — первые N страниц и оглавление), model (другая модель). Пусто — как раньше.
+    SUMMARY_POLICY: str = ""
+
+    # Обработка постов: n8n — outbox отправляется в workflow n8n; native — userbot сам проверяет дубли,
+    # делает саммари, пишет в posts и уведомляет editor-bot (без n8n).
+    PIPELINE_MODE: str = "n8n"
+    # Обработчиков на этап native-конвейера: "summarize=8,notify=2" (этапы dedupe, prompt, extract,
+    # summarize, insert, notify); пусто — значения по умолчанию.
+    PIPELINE_STAGE_CONCURRENCY: str = ""
+    # Куда native-конвейер отправляет готовый пост (тот же эндпоинт, что у n8n) и Bearer-токен.
+    EDITOR_BOT_WEBHOOK_URL: str = "http://editor-bot:8080/incoming/post"
+    EDITOR_BOT_WEBHOOK_TOKEN: Optional[str] = None
+    # LLM для native-конвейера (OpenAI-совместимый API).
+    OPENAI_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    # Длинный текст делится на части по N токенов (map-reduce); сколько частей обрабатывать параллельно.
+    SUMMARY_CHUNK_TOKENS: int = 3000
+    SUMMARY_MAP_CONCURRENCY: int = 4
+    # Лимиты аккаунта OpenAI: запросов и токенов в минуту (0 — без ограничения). Запросы ждут в очереди
+    # (сначала новые посты, потом догоняющие и повторные), 429 с Retry-After приостанавливает очередь.
+    LLM_RPM: int = 0
+    LLM_TPM: int = 0
+    # Сколько запросов к LLM одновременно.
+    LLM_MAX_CONCURRENCY: int = 8
+
     def get_source_channel_fallback(self) -> str:
         """Return SOURCE_CHANNEL as-is for fallback when DB is empty."""
         return (self.SOURCE_CHANNEL or "").strip()
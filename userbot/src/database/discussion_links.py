@@ -0,0 +1,52 @@
+"""discussion_links table: channel post -> its auto-forwarded copy in the linked discussion chat."""
+
+import asyncpg
+
+# LISTEN channel used by editor_bot (payload: JSON with the four ids)
+DISCUSSION_LINKS_CHANNEL = "discussion_links"
+
+
+async def insert_discussion_link(
+    pool: asyncpg.Pool,
+    channel_id: int,
+    channel_message_id: int,
+    discussion_chat_id: int,
+    discussion_message_id: int,
+) -> bool:
+    """
+    Store the link (ids in Bot API format) and NOTIFY discussion_links in the same statement.
+    Returns False if the link was already stored (no notification is sent then).
+    """
+    row = await pool.fetchrow(
+        """
+        WITH ins AS (
+            INSERT INTO discussion_links
+                (channel_id, channel_message_id, discussion_chat_id, discussion_message_id)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (channel_id, channel_message_id) DO NOTHING
+            RETURNING channel_id, channel_message_id, discussion_chat_id, discussion_message_id
+        )
+        SELECT pg_notify($5, json_build_object(
+                   'channel_id', channel_id,
+                   'channel_message_id', channel_message_id,
+                   'discussion_chat_id', discussion_chat_id,
+                   'discussion_message_id', discussion_message_id
+               )::text) AS notified
+        FROM ins
+        """,
+        channel_id,
+        channel_message_id,
+        discussion_chat_id,
+        discussion_message_id,
+        DISCUSSION_LINKS_CHANNEL,
+    )
+    return row is not None
+
+
+async def prune_discussion_links(pool: asyncpg.Pool, older_than_days: int) -> int:
+    """Delete links older than older_than_days. Returns number of deleted rows."""
+    result = await pool.execute(
+        "DELETE FROM discussion_links WHERE created_at < NOW() - make_interval(days => $1)",
+        older_than_days,
+    )
+    return int(result.split()[-1]) if result else 0
@@ -6,10 +6,13 @@ from typing import Any, Optional
 import asyncpg
 import structlog
 
+from src.utils.resilience import full_jitter_backoff
+
 log = structlog.get_logger()
 
 OUTBOX_MAX_ATTEMPTS = 5
 OUTBOX_BACKOFF_BASE_SEC = 60
+OUTBOX_BACKOFF_CAP_SEC = 3600
 
 
 async def insert_outbox(
@@ -47,27 +50,118 @@ async def insert_outbox(
         return None
 
 
+OUTBOX_LANE_NORMAL = "normal"
+OUTBOX_LANE_DIGEST = "digest"
+
+
+def fair_outbox_order(candidates: list[dict[str, Any]], limit: int, newest_first: bool = False) -> list[int]:
+    """
+    Ids of up to `limit` candidates in weighted fair order across source channels.
+
+    Each candidate carries id, created_at, weight, priority and rn (1-based position in its
+    source's queue). Row n of a source with weight w belongs to round (n - 1) // w, so every
+    round serves w posts per source (weighted round robin). Rows from priority sources come
+    first; within a round the oldest goes first (newest first with newest_first=True).
+    """
+    ordered = sorted(candidates, key=lambda c: (c["created_at"], c["id"]), reverse=newest_first)
+    ordered.sort(key=lambda c: (not c["priority"], (c["rn"] - 1) // max(c["weight"] or 1, 1)))
+    return [c["id"] for c in ordered[:limit]]
+
+
 async def get_pending_outbox_batch(
     pool: asyncpg.Pool,
     limit: int = 10,
+    newest_first: bool = False,
+    lane: str = OUTBOX_LANE_NORMAL,
 ) -> list[dict[str, Any]]:
-    """Return pending rows where next_retry_at is null or past, ordered by created_at."""
+    """
+    Return due pending rows of one lane in weighted fair order across source channels (see
+    fair_outbox_order).
+
+    Sources with pending rows are found by a skip scan of the partial pending index and only the
+    first `limit` due rows of each are read, so a poll costs O(sources * limit), not O(backlog).
+    Sources missing from source_channels (or before migration 012) get weight 1, no priority.
+    Before migration 013 there are no lanes and all pending rows are returned oldest first.
+    """
     now = datetime.now(timezone.utc)
+    order = "DESC" if newest_first else "ASC"
+    try:
+        candidates = await pool.fetch(
+            f"""
+            WITH RECURSIVE sources AS (
+                (SELECT source_channel FROM userbot_outbox WHERE status = 'pending' ORDER BY source_channel LIMIT 1)
+                UNION ALL
+                SELECT (
+                    SELECT o.source_channel FROM userbot_outbox o
+                    WHERE o.status = 'pending' AND o.source_channel > s.source_channel
+                    ORDER BY o.source_channel
+                    LIMIT 1
+                )
+                FROM sources s
+                WHERE s.source_channel IS NOT NULL
+            )
+            SELECT d.id, d.created_at, d.rn,
+                   COALESCE(w.weight, 1) AS weight, COALESCE(w.priority, FALSE) AS priority
+            FROM sources s
+            CROSS JOIN LATERAL (
+                SELECT q.id, q.created_at,
+                       row_number() OVER (ORDER BY q.created_at {order}, q.id {order}) AS rn
+                FROM (
+                    SELECT id, created_at
+                    FROM userbot_outbox
+                    WHERE source_channel = s.source_channel
+                      AND status = 'pending'
+                      AND lane = $3
+                      AND attempts < $1
+                      AND (next_retry_at IS NULL OR next_retry_at <= $2)
+                    ORDER BY created_at {order}, id {order}
+                    LIMIT $4
+                ) q
+            ) d
+            LEFT JOIN LATERAL (
+                SELECT sc.weight, sc.priority
+                FROM source_channels sc
+                WHERE sc.channel_identifier IN (s.source_channel, '-100' || s.source_channel)
+                ORDER BY sc.id
+                LIMIT 1
+            ) w ON TRUE
+            """,
+            OUTBOX_MAX_ATTEMPTS,
+            now,
+            lane,
+            limit,
+        )
+    except asyncpg.UndefinedColumnError:
+        if lane != OUTBOX_LANE_NORMAL:
+            return []
+        rows = await pool.fetch(
+            f"""
+            SELECT id, channel_id, message_id, pdf_path, pdf_missing, post_text, source_channel, attempts, created_at
+            FROM userbot_outbox
+            WHERE status = 'pending'
+              AND attempts < $1
+              AND (next_retry_at IS NULL OR next_retry_at <= $2)
+            ORDER BY created_at {order}
+            LIMIT $3
+            """,
+            OUTBOX_MAX_ATTEMPTS,
+            now,
+            limit,
+        )
+        return [dict(r) for r in rows]
+    ids = fair_outbox_order([dict(c) for c in candidates], limit, newest_first)
+    if not ids:
+        return []
     rows = await pool.fetch(
         """
-        SELECT id, channel_id, message_id, pdf_path, pdf_missing, post_text, source_channel, attempts
+        SELECT id, channel_id, message_id, pdf_path, pdf_missing, post_text, source_channel, attempts, created_at
         FROM userbot_outbox
-        WHERE status = 'pending'
-          AND attempts < $1
-          AND (next_retry_at IS NULL OR next_retry_at <= $2)
-        ORDER BY created_at
-        LIMIT $3
+        WHERE id = ANY($1::int[])
         """,
-        OUTBOX_MAX_ATTEMPTS,
-        now,
-        limit,
+        ids,
     )
-    return [dict(r) for r in rows]
+    by_id = {r["id"]: dict(r) for r in rows}
+    return [by_id[i] for i in ids if i in by_id]
 
 
 async def mark_outbox_sent(pool: asyncpg.Pool, outbox_id: int) -> None:
@@ -84,7 +178,7 @@ async def mark_outbox_failed(
     error: str,
     attempts: int,
 ) -> None:
-    """Set last_error, attempts, next_retry_at (backoff), or status=failed if attempts >= max."""
+    """Set last_error, attempts, next_retry_at (full-jitter backoff), or status=failed if attempts >= max."""
     if attempts >= OUTBOX_MAX_ATTEMPTS:
         await pool.execute(
             """
@@ -98,7 +192,7 @@ async def mark_outbox_failed(
         )
         log.warning("outbox_marked_failed", outbox_id=outbox_id, attempts=attempts, error=error[:200])
     else:
-        delay_sec = OUTBOX_BACKOFF_BASE_SEC * (2 ** attempts)
+        delay_sec = full_jitter_backoff(attempts, OUTBOX_BACKOFF_BASE_SEC, OUTBOX_BACKOFF_CAP_SEC)
         next_retry = datetime.now(timezone.utc) + timedelta(seconds=delay_sec)
         await pool.execute(
             """
@@ -111,3 +205,274 @@ async def mark_outbox_failed(
             attempts,
             next_retry,
         )
+
+
+async def get_next_outbox_retry_at(pool: asyncpg.Pool) -> Optional[datetime]:
+    """Return the earliest future next_retry_at among pending rows (None if nothing is scheduled)."""
+    return await pool.fetchval(
+        """
+        SELECT MIN(next_retry_at)
+        FROM userbot_outbox
+        WHERE status = 'pending'
+          AND attempts < $1
+          AND next_retry_at > NOW()
+        """,
+        OUTBOX_MAX_ATTEMPTS,
+    )
+
+
+async def count_pending_outbox(pool: asyncpg.Pool, lane: str = OUTBOX_LANE_NORMAL) -> int:
+    """Number of pending rows in the lane (backlog size; includes rows waiting for a retry)."""
+    return int(
+        await pool.fetchval(
+            "SELECT count(*) FROM userbot_outbox WHERE status = 'pending' AND lane = $1 AND attempts < $2",
+            lane,
+            OUTBOX_MAX_ATTEMPTS,
+        )
+        or 0
+    )
+
+
+async def expire_stale_outbox(pool: asyncpg.Pool, max_age_minutes: int) -> list[int]:
+    """
+    Mark pending rows older than max_age_minutes as expired (never delivered); the reason goes
+    to last_error. Returns ids of expired rows.
+    """
+    rows = await pool.fetch(
+        """
+        UPDATE userbot_outbox
+        SET status = 'expired',
+            last_error = 'expired: waited ' || floor(extract(epoch FROM NOW() - created_at) / 60)::int
+                         || ' min, max age ' || $1::text || ' min',
+            next_retry_at = NULL,
+            updated_at = NOW()
+        WHERE status = 'pending'
+          AND created_at < NOW() - make_interval(mins => $1)
+        RETURNING id
+        """,
+        max_age_minutes,
+    )
+    return [r["id"] for r in rows]
+
+
+async def demote_stale_outbox(pool: asyncpg.Pool, max_age_minutes: int) -> list[int]:
+    """
+    Move pending normal-lane rows older than max_age_minutes to the digest lane (delivered only
+    when the normal lane is empty); the reason goes to last_error. Returns ids of moved rows.
+    """
+    rows = await pool.fetch(
+        """
+        UPDATE userbot_outbox
+        SET lane = 'digest',
+            last_error = 'digest lane: waited ' || floor(extract(epoch FROM NOW() - created_at) / 60)::int
+                         || ' min, max age ' || $1::text || ' min',
+            updated_at = NOW()
+        WHERE status = 'pending'
+          AND lane = 'normal'
+          AND created_at < NOW() - make_interval(mins => $1)
+        RETURNING id
+        """,
+        max_age_minutes,
+    )
+    return [r["id"] for r in rows]
+
+
+async def note_outbox_rows(pool: asyncpg.Pool, outbox_ids: list[int], note: str) -> None:
+    """Record a scheduling decision for the rows in last_error (kept after successful delivery)."""
+    if not outbox_ids:
+        return
+    await pool.execute(
+        "UPDATE userbot_outbox SET last_error = $2 WHERE id = ANY($1::int[])",
+        outbox_ids,
+        note[:2000],
+    )
+
+
+async def get_outbox_depth(pool: asyncpg.Pool) -> tuple[dict[str, int], Optional[float]]:
+    """Row count per status and age in seconds of the oldest pending row (None if none pending)."""
+    rows = await pool.fetch(
+        """
+        SELECT status, count(*)::bigint AS n,
+               extract(epoch FROM NOW() - min(created_at) FILTER (WHERE status = 'pending'))::float8 AS oldest
+        FROM userbot_outbox
+        GROUP BY status
+        """
+    )
+    counts = {r["status"]: int(r["n"]) for r in rows}
+    oldest = next((r["oldest"] for r in rows if r["status"] == "pending"), None)
+    return counts, oldest
+
+
+# Statuses whose rows are history only and may be compacted after the retention window
+OUTBOX_TERMINAL_STATUSES = ("sent", "completed", "expired")
+
+
+async def compact_outbox_batch(
+    pool: asyncpg.Pool,
+    retention_days: int,
+    batch_size: int = 500,
+    archive: bool = False,
+) -> tuple[int, int]:
+    """
+    Delete up to batch_size terminal rows older than retention_days (by updated_at), oldest first.
+    With archive=True the rows are copied to userbot_outbox_archive (without post_text) first.
+
+    Returns:
+        (rows deleted, bytes of deleted row data).
+    """
+    row = await pool.fetchrow(
+        """
+        WITH victims AS (
+            SELECT id FROM userbot_outbox
+            WHERE status = ANY($1::text[])
+              AND updated_at < NOW() - make_interval(days => $2)
+            ORDER BY updated_at
+            LIMIT $3
+            FOR UPDATE SKIP LOCKED
+        ), deleted AS (
+            DELETE FROM userbot_outbox o
+            USING victims v
+            WHERE o.id = v.id
+            RETURNING o.*
+        ), archived AS (
+            INSERT INTO userbot_outbox_archive
+                (id, channel_id, message_id, pdf_path, source_channel, status, attempts,
+                 last_error, created_at, updated_at)
+            SELECT id, channel_id, message_id, pdf_path, source_channel, status, attempts,
+                   last_error, created_at, updated_at
+            FROM deleted
+            WHERE $4
+            ON CONFLICT (id) DO NOTHING
+        )
+        SELECT count(*)::int AS rows, COALESCE(sum(pg_column_size(deleted.*)), 0)::bigint AS bytes
+        FROM deleted
+        """,
+        list(OUTBOX_TERMINAL_STATUSES),
+        retention_days,
+        batch_size,
+        archive,
+    )
+    return (row["rows"], row["bytes"]) if row else (0, 0)
+
+
+async def get_outbox_table_bytes(pool: asyncpg.Pool) -> int:
+    """Total on-disk size of userbot_outbox including indexes and TOAST."""
+    return int(await pool.fetchval("SELECT pg_total_relation_size('userbot_outbox')") or 0)
+
+
+async def vacuum_outbox(pool: asyncpg.Pool) -> None:
+    """VACUUM (ANALYZE) userbot_outbox so freed space is reused and planner stats stay fresh."""
+    await pool.execute("VACUUM (ANALYZE) userbot_outbox")
+
+
+async def mark_outbox_accepted(pool: asyncpg.Pool, outbox_id: int, execution_id: str) -> None:
+    """
+    n8n acked the row: status=accepted with its execution id. Only a pending row moves, so a
+    completion callback that arrived before this update is not overwritten; a failure callback
+    leaves the row pending with the failed execution id, which a late ack of that execution
+    must not turn back into accepted.
+    """
+    await pool.execute(
+        """
+        UPDATE userbot_outbox
+        SET status = 'accepted', execution_id = $2, accepted_at = NOW(), updated_at = NOW()
+        WHERE id = $1 AND status = 'pending' AND execution_id IS DISTINCT FROM $2
+        """,
+        outbox_id,
+        execution_id,
+    )
+
+
+async def get_outbox_created_at(pool: asyncpg.Pool, outbox_id: int) -> Optional[datetime]:
+    return await pool.fetchval("SELECT created_at FROM userbot_outbox WHERE id = $1", outbox_id)
+
+
+async def complete_outbox(
+    pool: asyncpg.Pool,
+    outbox_id: int,
+    execution_id: str,
+    ok: bool,
+    error: str = "",
+) -> bool:
+    """
+    Apply n8n completion callback. ok=True sets status=completed and keeps last_error (drain notes
+    and earlier failures stay as history, as with mark_outbox_sent); ok=False counts an attempt and
+    schedules a retry with the same backoff as mark_outbox_failed (or status=failed at max attempts).
+    Callbacks from a stale execution (row re-queued and sent again) are ignored. A pending row
+    keeps the id of the execution that failed, so that execution's late ack and repeated
+    callbacks are ignored too, while a callback of the next send may still precede its ack.
+
+    Returns:
+        True if the row was updated, False if unknown, already finished or from another execution.
+    """
+    if ok:
+        row = await pool.fetchrow(
+            """
+            UPDATE userbot_outbox
+            SET status = 'completed', execution_id = $2, next_retry_at = NULL, updated_at = NOW()
+            WHERE id = $1
+              AND (
+                  (status = 'accepted' AND (execution_id IS NULL OR execution_id = $2))
+                  OR (status = 'pending' AND execution_id IS DISTINCT FROM $2)
+              )
+            RETURNING id
+            """,
+            outbox_id,
+            execution_id,
+        )
+        return row is not None
+    message = f"n8n execution {execution_id} failed: {error}"[:2000]
+    row = await pool.fetchrow(
+        """
+        UPDATE userbot_outbox
+        SET status = CASE WHEN attempts + 1 >= $4 THEN 'failed' ELSE 'pending' END,
+            attempts = attempts + 1,
+            last_error = $3,
+            execution_id = $2,
+            next_retry_at = CASE
+                WHEN attempts + 1 >= $4 THEN NULL
+                ELSE NOW() + make_interval(secs => random() * LEAST($6, $5 * power(2, attempts + 1)))
+            END,
+            updated_at = NOW()
+        WHERE id = $1
+          AND (
+              (status = 'accepted' AND (execution_id IS NULL OR execution_id = $2))
+              OR (status = 'pending' AND execution_id IS DISTINCT FROM $2)
+          )
+        RETURNING status
+        """,
+        outbox_id,
+        execution_id,
+        message,
+        OUTBOX_MAX_ATTEMPTS,
+        float(OUTBOX_BACKOFF_BASE_SEC),
+        float(OUTBOX_BACKOFF_CAP_SEC),
+    )
+    if row is not None and row["status"] == "failed":
+        log.warning("outbox_marked_failed", outbox_id=outbox_id, error=message[:200])
+    return row is not None
+
+
+async def requeue_stale_accepted(pool: asyncpg.Pool, timeout_minutes: int) -> list[int]:
+    """
+    Return accepted rows with no callback for timeout_minutes to pending (attempts + 1, due now),
+    or to failed once attempts reach OUTBOX_MAX_ATTEMPTS. Returns ids of affected rows.
+    """
+    rows = await pool.fetch(
+        """
+        UPDATE userbot_outbox
+        SET status = CASE WHEN attempts + 1 >= $2 THEN 'failed' ELSE 'pending' END,
+            attempts = attempts + 1,
+            last_error = 'no completion from n8n execution ' || COALESCE(execution_id, '?')
+                         || ' within ' || $1::text || ' min',
+            execution_id = NULL,
+            next_retry_at = CASE WHEN attempts + 1 >= $2 THEN NULL ELSE NOW() END,
+            updated_at = NOW()
+        WHERE status = 'accepted'
+          AND accepted_at < NOW() - make_interval(mins => $1)
+        RETURNING id
+        """,
+        timeout_minutes,
+        OUTBOX_MAX_ATTEMPTS,
+    )
+    return [r["id"] for r in rows]
@@ -0,0 +1,66 @@
+"""pdf_archive table (migration 022): where each archived PDF is in the segment files."""
+
+from typing import Any
+
+import asyncpg
+
+# Posts in these statuses may still upload their PDF, so it stays on the hot volume
+PDF_HOT_POST_STATUSES = (
+    "processing", "pending_review", "approved", "scheduled", "publishing", "send_failed", "publish_failed",
+)
+
+
+async def get_archivable(pool: asyncpg.Pool, paths: list[str]) -> list[str]:
+    """Paths that no live (pending or accepted) outbox row and no post in a hot status refer to."""
+    rows = await pool.fetch(
+        """
+        SELECT f.path FROM unnest($1::text[]) AS f(path)
+        WHERE NOT EXISTS (
+                SELECT 1 FROM userbot_outbox o
+                WHERE o.pdf_path = f.path AND o.status IN ('pending', 'accepted') AND o.pdf_path <> ''
+            )
+          AND NOT EXISTS (
+                SELECT 1 FROM posts p
+                WHERE p.pdf_path = f.path AND p.pdf_path <> '' AND p.status = ANY($2::text[])
+            )
+        """,
+        paths,
+        list(PDF_HOT_POST_STATUSES),
+    )
+    return [row["path"] for row in rows]
+
+
+async def get_archive_entries(pool: asyncpg.Pool, paths: list[str]) -> dict[str, dict[str, Any]]:
+    """Archive rows by path (segment, data_offset, data_length, codec, size_bytes, sha256)."""
+    rows = await pool.fetch(
+        """
+        SELECT path, segment, data_offset, data_length, codec, size_bytes, sha256
+        FROM pdf_archive WHERE path = ANY($1::text[])
+        """,
+        paths,
+    )
+    return {row["path"]: dict(row) for row in rows}
+
+
+async def save_archive_entries(pool: asyncpg.Pool, entries: list[dict[str, Any]]) -> None:
+    """Insert archive rows; a path archived again (new content) points at its newest copy."""
+    if not entries:
+        return
+    await pool.execute(
+        """
+        INSERT INTO pdf_archive (path, segment, data_offset, data_length, codec, size_bytes, sha256)
+        SELECT * FROM unnest($1::text[], $2::text[], $3::bigint[], $4::bigint[], $5::text[], $6::bigint[], $7::text[])
+        ON CONFLICT (path) DO UPDATE SET
+            segment = EXCLUDED.segment,
+            data_offset = EXCLUDED.data_offset,
+            data_length = EXCLUDED.data_length,
+            codec = EXCLUDED.codec,
+            size_bytes = EXCLUDED.size_bytes,
+            sha256 = EXCLUDED.sha256,
+            archived_at = NOW()
+        """,
+        *(
+            [entry[key] for entry in entries]
+            for key in ("path", "segment", "data_offset", "data_length", "codec", "size_bytes", "sha256")
+        ),
+    )
@@ -0,0 +1,161 @@
+"""pdf_extractions table: text extracted from downloaded PDFs (sent to n8n with the outbox row);
+pdf_extraction_cache: the same results keyed by file content hash."""
+
+from typing import Optional
+
+import asyncpg
+
+from src.services.pdf_extractor import PdfExtraction
+
+
+async def save_pdf_extraction(
+    pool: asyncpg.Pool,
+    *,
+    pdf_path: str,
+    channel_id: str,
+    message_id: int,
+    extraction: PdfExtraction,
+    sha256: Optional[str] = None,
+) -> None:
+    """Insert or replace the extraction result for pdf_path (sha256 is stored from migration 016)."""
+    args = (
+        pdf_path,
+        channel_id,
+        message_id,
+        extraction.text,
+        extraction.pages,
+        extraction.total_pages,
+        len(extraction.text),
+        extraction.truncated,
+        extraction.seconds,
+        extraction.error,
+    )
+    try:
+        await pool.execute(
+            """
+            INSERT INTO pdf_extractions
+                (pdf_path, channel_id, message_id, text, pages, total_pages, chars, truncated, seconds, error, sha256)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+            ON CONFLICT (pdf_path) DO UPDATE SET
+                text = EXCLUDED.text,
+                pages = EXCLUDED.pages,
+                total_pages = EXCLUDED.total_pages,
+                chars = EXCLUDED.chars,
+                truncated = EXCLUDED.truncated,
+                seconds = EXCLUDED.seconds,
+                error = EXCLUDED.error,
+                sha256 = EXCLUDED.sha256,
+                created_at = NOW()
+            """,
+            *args,
+            sha256,
+        )
+    except asyncpg.UndefinedColumnError:
+        await pool.execute(
+            """
+            INSERT INTO pdf_extractions
+                (pdf_path, channel_id, message_id, text, pages, total_pages, chars, truncated, seconds, error)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+            ON CONFLICT (pdf_path) DO UPDATE SET
+                text = EXCLUDED.text,
+                pages = EXCLUDED.pages,
+                total_pages = EXCLUDED.total_pages,
+                chars = EXCLUDED.chars,
+                truncated = EXCLUDED.truncated,
+                seconds = EXCLUDED.seconds,
+                error = EXCLUDED.error,
+                created_at = NOW()
+            """,
+            *args,
+        )
+
+
+async def get_extractions(pool: asyncpg.Pool, pdf_paths: list[str]) -> dict[str, tuple[str, int]]:
+    """pdf_path -> (extracted text, total pages) for paths with a non-empty result; {} before migration 015."""
+    paths = [p for p in pdf_paths if p]
+    if not paths:
+        return {}
+    try:
+        rows = await pool.fetch(
+            "SELECT pdf_path, text, total_pages FROM pdf_extractions WHERE pdf_path = ANY($1::text[]) AND text <> ''",
+            paths,
+        )
+    except asyncpg.UndefinedTableError:
+        return {}
+    return {row["pdf_path"]: (row["text"], int(row["total_pages"] or 0)) for row in rows}
+
+
+async def get_cached_extraction(
+    pool: asyncpg.Pool,
+    sha256: str,
+    extractor_version: str,
+) -> Optional[PdfExtraction]:
+    """Cached result for this content and extractor version (touches last_access_at); None on a miss."""
+    row = await pool.fetchrow(
+        """
+        UPDATE pdf_extraction_cache
+        SET last_access_at = NOW(), hits = hits + 1
+        WHERE sha256 = $1 AND extractor_version = $2
+        RETURNING text, pages, total_pages, truncated
+        """,
+        sha256,
+        extractor_version,
+    )
+    if row is None:
+        return None
+    return PdfExtraction(
+        text=row["text"],
+        pages=row["pages"],
+        total_pages=row["total_pages"],
+        truncated=row["truncated"],
+    )
+
+
+async def put_cached_extraction(
+    pool: asyncpg.Pool,
+    sha256: str,
+    extractor_version: str,
+    extraction: PdfExtraction,
+) -> None:
+    """Store a successful extraction; replaces a row of an older extractor version."""
+    await pool.execute(
+        """
+        INSERT INTO pdf_extraction_cache
+            (sha256, extractor_version, text, pages, total_pages, truncated, text_bytes)
+        VALUES ($1, $2, $3, $4, $5, $6, octet_length($3))
+        ON CONFLICT (sha256) DO UPDATE SET
+            extractor_version = EXCLUDED.extractor_version,
+            text = EXCLUDED.text,
+            pages = EXCLUDED.pages,
+            total_pages = EXCLUDED.total_pages,
+            truncated = EXCLUDED.truncated,
+            text_bytes = EXCLUDED.text_bytes,
+            hits = 0,
+            created_at = NOW(),
+            last_access_at = NOW()
+        """,
+        sha256,
+        extractor_version,
+        extraction.text,
+        extraction.pages,
+        extraction.total_pages,
+        extraction.truncated,
+    )
+
+
+async def evict_extraction_cache(pool: asyncpg.Pool, max_bytes: int) -> int:
+    """Delete least recently used rows beyond max_bytes of cached text. Returns deleted rows."""
+    result = await pool.execute(
+        """
+        WITH ranked AS (
+            SELECT sha256,
+                   SUM(text_bytes) OVER (ORDER BY last_access_at DESC, sha256) AS running_bytes
+            FROM pdf_extraction_cache
+        )
+        DELETE FROM pdf_extraction_cache c
+        USING ranked r
+        WHERE c.sha256 = r.sha256 AND r.running_bytes > $1
+        """,
+        max_bytes,
+    )
+    return int(result.split()[-1]) if result else 0
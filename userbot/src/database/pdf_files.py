@@ -0,0 +1,38 @@
+"""pdf_files table: index of stored PDFs (size, hash, access time, what references them)."""
+
+from typing import Optional
+
+import asyncpg
+
+
+async def register_pdf_file(
+    pool: asyncpg.Pool,
+    path: str,
+    size_bytes: int,
+    sha256: Optional[str] = None,
+    references: Optional[list[str]] = None,
+) -> None:
+    """Add or refresh the index row of path; references are merged into referenced_by."""
+    await pool.execute(
+        """
+        INSERT INTO pdf_files (path, size_bytes, sha256, referenced_by)
+        VALUES ($1, $2, $3, $4::text[])
+        ON CONFLICT (path) DO UPDATE SET
+            size_bytes = EXCLUDED.size_bytes,
+            sha256 = COALESCE(EXCLUDED.sha256, pdf_files.sha256),
+            last_access_at = NOW(),
+            referenced_by = ARRAY(
+                SELECT DISTINCT r FROM unnest(pdf_files.referenced_by || EXCLUDED.referenced_by) AS r
+            )
+        """,
+        path,
+        size_bytes,
+        sha256,
+        references or [],
+    )
+
+
+
+async def forget_pdf_files(pool: asyncpg.Pool, paths: list[str]) -> None:
+    """Drop index rows of files removed from the volume."""
+    await pool.execute("DELETE FROM pdf_files WHERE path = ANY($1::text[])", paths)
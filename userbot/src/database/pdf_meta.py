@@ -0,0 +1,80 @@
+"""pdf_meta table: probe results of downloaded PDFs (sent to n8n with the outbox row)."""
+
+from typing import Any, Optional
+
+import asyncpg
+
+from src.services.pdf_probe import PdfProbe
+
+
+async def save_pdf_meta(
+    pool: asyncpg.Pool,
+    *,
+    pdf_path: str,
+    channel_id: str,
+    message_id: int,
+    probe: PdfProbe,
+    sha256: Optional[str] = None,
+) -> None:
+    """Insert or replace the probe result for pdf_path."""
+    await pool.execute(
+        """
+        INSERT INTO pdf_meta
+            (pdf_path, channel_id, message_id, sha256, size_bytes, pages, encrypted, has_text,
+             producer, pdf_version, status, error, seconds)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+        ON CONFLICT (pdf_path) DO UPDATE SET
+            sha256 = EXCLUDED.sha256,
+            size_bytes = EXCLUDED.size_bytes,
+            pages = EXCLUDED.pages,
+            encrypted = EXCLUDED.encrypted,
+            has_text = EXCLUDED.has_text,
+            producer = EXCLUDED.producer,
+            pdf_version = EXCLUDED.pdf_version,
+            status = EXCLUDED.status,
+            error = EXCLUDED.error,
+            seconds = EXCLUDED.seconds,
+            created_at = NOW()
+        """,
+        pdf_path,
+        channel_id,
+        message_id,
+        sha256,
+        probe.size_bytes,
+        probe.pages,
+        probe.encrypted,
+        probe.has_text,
+        probe.producer,
+        probe.pdf_version,
+        probe.status,
+        probe.error,
+        probe.seconds,
+    )
+
+
+async def get_pdf_meta(pool: asyncpg.Pool, pdf_paths: list[str]) -> dict[str, dict[str, Any]]:
+    """pdf_path -> probe fields as sent in the payload (PdfProbe.as_payload); {} before migration 019."""
+    paths = [p for p in pdf_paths if p]
+    if not paths:
+        return {}
+    try:
+        rows = await pool.fetch(
+            """
+            SELECT pdf_path, status, pages, encrypted, has_text, producer
+            FROM pdf_meta
+            WHERE pdf_path = ANY($1::text[])
+            """,
+            paths,
+        )
+    except asyncpg.UndefinedTableError:
+        return {}
+    return {
+        row["pdf_path"]: PdfProbe(
+            status=row["status"],
+            pages=row["pages"],
+            encrypted=row["encrypted"],
+            has_text=row["has_text"],
+            producer=row["producer"],
+        ).as_payload()
+        for row in rows
+    }
@@ -0,0 +1,85 @@
+"""posts and config tables as used by the native pipeline (same statements as the n8n workflow)."""
+
+import json
+from typing import Any, Optional
+
+import asyncpg
+
+
+async def is_post_in_progress(pool: asyncpg.Pool, source_channel: str, source_message_id: int) -> bool:
+    """True if the post is already being processed or reviewed (n8n 'Check duplicate')."""
+    return bool(
+        await pool.fetchval(
+            """
+            SELECT EXISTS(
+                SELECT 1 FROM posts
+                WHERE source_channel = $1 AND source_message_id = $2
+                  AND status IN ('processing', 'pending_review')
+            )
+            """,
+            source_channel,
+            source_message_id,
+        )
+    )
+
+
+async def get_config_value(pool: asyncpg.Pool, key: str) -> Optional[str]:
+    return await pool.fetchval("SELECT value FROM config WHERE key = $1", key)
+
+
+async def upsert_processing_post(
+    pool: asyncpg.Pool,
+    *,
+    source_channel: str,
+    source_message_id: int,
+    original_text: str,
+    pdf_path: str,
+    extracted_text: str,
+    summary: str,
+    summary_policy: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """Insert the post with status processing (or overwrite a finished one); returns the row."""
+    args = [
+        source_channel,
+        source_message_id,
+        original_text.replace("\x00", ""),
+        pdf_path,
+        extracted_text.replace("\x00", ""),
+        summary.replace("\x00", ""),
+    ]
+    try:
+        row = await pool.fetchrow(
+            """
+            INSERT INTO posts (source_channel, source_message_id, original_text, pdf_path, extracted_text, summary,
+                               summary_policy, status)
+            VALUES ($1, $2, $3, $4, $5, $6, $7::jsonb, 'processing')
+            ON CONFLICT (source_channel, source_message_id) DO UPDATE SET
+                original_text = EXCLUDED.original_text,
+                pdf_path = EXCLUDED.pdf_path,
+                extracted_text = EXCLUDED.extracted_text,
+                summary = EXCLUDED.summary,
+                summary_policy = EXCLUDED.summary_policy,
+                status = EXCLUDED.status
+            RETURNING id, source_channel, source_message_id, original_text, pdf_path, summary
+            """,
+            *args,
+            json.dumps(summary_policy, ensure_ascii=False) if summary_policy else None,
+        )
+        return dict(row)
+    except asyncpg.UndefinedColumnError:
+        pass  # before migration 018: the decision is not stored
+    row = await pool.fetchrow(
+        """
+        INSERT INTO posts (source_channel, source_message_id, original_text, pdf_path, extracted_text, summary, status)
+        VALUES ($1, $2, $3, $4, $5, $6, 'processing')
+        ON CONFLICT (source_channel, source_message_id) DO UPDATE SET
+            original_text = EXCLUDED.original_text,
+            pdf_path = EXCLUDED.pdf_path,
+            extracted_text = EXCLUDED.extracted_text,
+            summary = EXCLUDED.summary,
+            status = EXCLUDED.status
+        RETURNING id, source_channel, source_message_id, original_text, pdf_path, summary
+        """,
+        *args,
+    )
+    return dict(row)
@@ -0,0 +1,46 @@
+"""Persisted token-bucket state for outbox pacing (table userbot_rate_buckets)."""
+
+from datetime import datetime
+
+import asyncpg
+import structlog
+
+log = structlog.get_logger()
+
+
+async def load_bucket_states(pool: asyncpg.Pool) -> dict[str, tuple[float, datetime]]:
+    """
+    Return {bucket_key: (tokens, updated_at)}.
+    If table is missing (migration 009 not applied), returns {} and pacing starts from a full bucket.
+    """
+    try:
+        rows = await pool.fetch("SELECT bucket_key, tokens, updated_at FROM userbot_rate_buckets")
+    except asyncpg.UndefinedTableError:
+        log.warning(
+            "rate_buckets_table_missing",
+            msg="Apply init_db/migrate_009_outbox_pacing.sql to persist pacing across restarts",
+        )
+        return {}
+    return {r["bucket_key"]: (float(r["tokens"]), r["updated_at"]) for r in rows}
+
+
+async def save_bucket_state(
+    pool: asyncpg.Pool,
+    bucket_key: str,
+    tokens: float,
+    updated_at: datetime,
+) -> None:
+    """Upsert bucket state. Missing table is ignored (state stays in memory only)."""
+    try:
+        await pool.execute(
+            """
+            INSERT INTO userbot_rate_buckets (bucket_key, tokens, updated_at)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (bucket_key) DO UPDATE SET tokens = $2, updated_at = $3
+            """,
+            bucket_key,
+            tokens,
+            updated_at,
+        )
+    except asyncpg.UndefinedTableError:
+        pass
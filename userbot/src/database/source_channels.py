@@ -1,4 +1,4 @@
-"""Read active source channels and keywords from DB (same schema as editor_bot)."""
+"""Read active source/target channels and keywords from DB (same schema as editor_bot)."""
 
 import asyncpg
 
@@ -33,3 +33,21 @@ async def get_active_channel_identifiers(pool: asyncpg.Pool) -> list[str]:
         """
     )
     return [r["channel_identifier"] for r in rows]
+
+
+async def get_active_target_channel_identifiers(pool: asyncpg.Pool) -> list[str]:
+    """
+    Return channel_identifier of active target (publishing) channels; [] if migration 004 is not applied.
+    """
+    try:
+        rows = await pool.fetch(
+            """
+            SELECT channel_identifier
+            FROM target_channels
+            WHERE is_active = TRUE
+            ORDER BY created_at
+            """
+        )
+    except asyncpg.UndefinedTableError:
+        return []
+    return [r["channel_identifier"] for r in rows]
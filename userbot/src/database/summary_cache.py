@@ -0,0 +1,42 @@
+"""summary_cache (migration 017): SQL functions shared with the n8n workflows, so keys match."""
+
+from typing import Optional
+
+import asyncpg
+
+
+async def lookup_summary(pool: asyncpg.Pool, prompt: str, model: str, text: str) -> Optional[str]:
+    """Cached summary for (prompt, model, normalized text); None on a miss. Counts in summary_cache_stats."""
+    row = await pool.fetchrow(
+        "SELECT cached_summary FROM summary_cache_lookup($1, $2, $3)",
+        prompt,
+        model,
+        text,
+    )
+    return row["cached_summary"] if row else None
+
+
+async def peek_summary(pool: asyncpg.Pool, prompt: str, model: str, text: str) -> Optional[str]:
+    """Like lookup_summary, but not counted in summary_cache_stats or the entry's hits (internal lookups)."""
+    return await pool.fetchval(
+        """
+        SELECT summary FROM summary_cache
+        WHERE cache_key = summary_cache_key($1, $2, $3) AND expires_at > NOW()
+        """,
+        prompt,
+        model,
+        text,
+    )
+
+
+async def store_summary(pool: asyncpg.Pool, prompt: str, model: str, text: str, summary: str) -> bool:
+    """Store summary under the same key summary_cache_lookup uses; False if not stored (empty, TTL 0)."""
+    return bool(
+        await pool.fetchval(
+            "SELECT summary_cache_put(summary_cache_key($1, $2, $3), $2, $4)",
+            prompt,
+            model,
+            text,
+            summary,
+        )
+    )
@@ -0,0 +1,58 @@
+"""Handler for auto-forwarded channel posts in linked discussion chats: push post -> thread links."""
+
+import asyncpg
+from telethon import events
+from telethon.tl.types import PeerChannel
+import structlog
+
+from src.database.discussion_links import insert_discussion_link
+from src.services.discussion_cache import DiscussionCache
+from src.services.discussion_resolver import bot_api_chat_id
+
+log = structlog.get_logger()
+
+
+def register_discussion_link_handler(client, pool: asyncpg.Pool, cache: DiscussionCache) -> None:
+    """
+    Register handler for new messages in linked discussion chats of known target channels.
+
+    When Telegram creates the auto-forwarded copy of a channel post (fwd_from.channel_post) in the
+    linked chat, the (channel post -> discussion message) link is stored in discussion_links with
+    NOTIFY (editor_bot attaches the PDF at once) and in the resolve cache.
+    Linked chats come from DiscussionCache (precomputed by the linked-chat refresher); the userbot
+    account must be a member of those chats to receive their updates.
+    """
+
+    @client.on(events.NewMessage())
+    async def on_discussion_message(event: events.NewMessage.Event) -> None:
+        message = event.message
+        fwd = getattr(message, "fwd_from", None)
+        post_id = getattr(fwd, "channel_post", None) if fwd is not None else None
+        origin = getattr(fwd, "from_id", None) if fwd is not None else None
+        if not post_id or not isinstance(origin, PeerChannel):
+            return
+        discussion_chat_id = bot_api_chat_id(getattr(message, "peer_id", None))
+        target = cache.linked_chats().get(discussion_chat_id) if discussion_chat_id is not None else None
+        if target is None:
+            return
+        channel_id, identifiers = target
+        if bot_api_chat_id(origin) != channel_id:
+            return  # manual forward from another channel, not the auto-forward of our post
+        for identifier in {str(channel_id), *identifiers}:
+            cache.remember(identifier, post_id, discussion_chat_id, message.id)
+        try:
+            inserted = await insert_discussion_link(pool, channel_id, post_id, discussion_chat_id, message.id)
+        except asyncpg.UndefinedTableError:
+            log.warning(
+                "discussion_links_table_missing",
+                msg="Apply init_db/migrate_014_discussion_links.sql",
+            )
+            return
+        log.info(
+            "discussion_link_recorded",
+            channel_id=channel_id,
+            message_id=post_id,
+            discussion_chat_id=discussion_chat_id,
+            discussion_message_id=message.id,
+            new=inserted,
+        )
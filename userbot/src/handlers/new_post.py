@@ -1,21 +1,43 @@
 """Handler for new channel posts: PDF, text, or both. Monitored channels from DB (cached 30s)."""
 
+import os
 import time
 
 import asyncpg
 from telethon import events
+from telethon.tl.types import DocumentAttributeFilename
 import structlog
 
 from src.database.source_channels import get_active_channel_identifiers, get_keywords
 from src.database.outbox import insert_outbox
-from src.services.pdf_downloader import download_pdf_to_storage, get_pdf_document
+from src.database.pdf_extractions import save_pdf_extraction
+from src.database.pdf_files import register_pdf_file
+from src.database.pdf_meta import save_pdf_meta
+from src.services.outbox_worker import wake_outbox_worker
+from src.services.extraction_cache import ExtractionCache
+from src.services.keyword_filter import KeywordMatcher
+from src.services.pdf_downloader import PdfDownload, download_pdf, get_pdf_document
+from src.services.pdf_extractor import PdfExtractionPool
+from src.services.pdf_probe import PdfProbe, run_pdf_probe
+from src.utils import health, metrics
 
 log = structlog.get_logger()
 
+_handler_seconds = metrics.histogram(
+    "userbot_update_handler_seconds",
+    "New-message handler latency by outcome (incl. PDF download, text extraction and outbox insert)",
+    ("outcome",),
+)
+_posts = metrics.counter(
+    "userbot_updates_total",
+    "New-message updates by outcome (accepted, duplicate, skipped_*)",
+    ("outcome",),
+)
+
 CACHE_TTL_SEC = 30
 _monitored_cache: set[str] = set()
 _monitored_last_refresh: float = 0.0
-_keywords_cache: list[str] = []
+_keywords_cache = KeywordMatcher([])
 _keywords_last_refresh: float = 0.0
 
 
@@ -61,12 +83,12 @@ async def _get_monitored(pool: asyncpg.Pool, fallback_source: str) -> set[str]:
     return _monitored_cache
 
 
-async def _get_keywords(pool: asyncpg.Pool) -> list[str]:
-    """Return list of keyword words (cached CACHE_TTL_SEC). Empty = no filter."""
+async def _get_keywords(pool: asyncpg.Pool) -> KeywordMatcher:
+    """Return matcher compiled from keyword words (cached CACHE_TTL_SEC). Empty = no filter."""
     global _keywords_cache, _keywords_last_refresh
     now = time.monotonic()
     if now - _keywords_last_refresh > CACHE_TTL_SEC:
-        _keywords_cache = await get_keywords(pool)
+        _keywords_cache = KeywordMatcher(await get_keywords(pool))
         _keywords_last_refresh = now
     return _keywords_cache
 
@@ -81,7 +103,110 @@ def _is_message_from_monitored(channel_id_str: str, monitored: set[str]) -> bool
     return False
 
 
-def register_new_post_handler(client, config, pool: asyncpg.Pool) -> None:
+async def _extract_and_store(
+    pool: asyncpg.Pool,
+    extractor: PdfExtractionPool,
+    extraction_cache: ExtractionCache | None,
+    pdf_path: str,
+    sha256: str,
+    channel_id: str,
+    message_id: int,
+) -> None:
+    """Extract PDF text (cache by content hash, else process pool) and store it; failures only cost n8n the extraction."""
+    if extraction_cache is not None:
+        extraction = await extraction_cache.extract(pdf_path, sha256)
+    else:
+        extraction = await extractor.extract(pdf_path)
+    try:
+        await save_pdf_extraction(
+            pool,
+            pdf_path=pdf_path,
+            channel_id=channel_id,
+            message_id=message_id,
+            extraction=extraction,
+            sha256=sha256,
+        )
+    except asyncpg.UndefinedTableError:
+        log.warning(
+            "pdf_extractions_table_missing",
+            msg="Apply migration: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_015_pdf_extractions.sql",
+        )
+    except Exception as e:
+        log.error("pdf_extraction_save_failed", pdf_path=pdf_path, error=str(e))
+
+
+async def _probe_and_store(
+    pool: asyncpg.Pool,
+    downloaded: PdfDownload,
+    channel_id: str,
+    message_id: int,
+) -> PdfProbe:
+    """Probe the downloaded PDF and store the result in pdf_meta; a failed save only loses the record."""
+    probe = await run_pdf_probe(downloaded.path)
+    try:
+        await save_pdf_meta(
+            pool,
+            pdf_path=downloaded.path,
+            channel_id=channel_id,
+            message_id=message_id,
+            probe=probe,
+            sha256=downloaded.sha256,
+        )
+    except asyncpg.UndefinedTableError:
+        log.warning(
+            "pdf_meta_table_missing",
+            msg="Apply migration: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_019_pdf_meta.sql",
+        )
+    except Exception as e:
+        log.error("pdf_meta_save_failed", pdf_path=downloaded.path, error=str(e))
+    return probe
+
+
+async def _index_pdf(pool: asyncpg.Pool, downloaded: PdfDownload, outbox_id: int | None) -> None:
+    """Record the stored file in pdf_files with the outbox row that references it."""
+    try:
+        await register_pdf_file(
+            pool,
+            downloaded.path,
+            os.path.getsize(downloaded.path),
+            downloaded.sha256,
+            [f"outbox:{outbox_id}"] if outbox_id is not None else [],
+        )
+    except asyncpg.UndefinedTableError:
+        log.warning(
+            "pdf_files_table_missing",
+            msg="Apply migration: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_020_pdf_files.sql",
+        )
+    except Exception as e:
+        log.error("pdf_index_failed", pdf_path=downloaded.path, error=str(e))
+
+
+def _unreadable_pdf_text(probe: PdfProbe, document) -> str:
+    """Post text for a captionless post whose PDF has no extractable text: its title or file name."""
+    name = probe.title
+    if not name:
+        for attr in getattr(document, "attributes", None) or []:
+            if isinstance(attr, DocumentAttributeFilename) and attr.file_name:
+                name = os.path.splitext(attr.file_name)[0]
+                break
+    return f"{name or 'PDF'} (PDF без текстового слоя: {probe.status})"
+
+
+def _remove_pdf(path: str) -> None:
+    """Delete a downloaded PDF of a post that is not going to the outbox."""
+    try:
+        os.remove(path)
+    except OSError as e:
+        log.warning("pdf_remove_failed", path=path, error=str(e))
+
+
+def register_new_post_handler(
+    client,
+    config,
+    pool: asyncpg.Pool,
+    extractor: PdfExtractionPool | None = None,
+    extraction_cache: ExtractionCache | None = None,
+) -> None:
     """
     Register handler for new messages in monitored channels: PDF, text, or both.
 
@@ -92,15 +217,38 @@ def register_new_post_handler(client, config, pool: asyncpg.Pool) -> None:
         client: Telethon TelegramClient (connected).
         config: Settings with N8N_WEBHOOK_URL, PDF_STORAGE_PATH, get_source_channel_fallback().
         pool: asyncpg pool to read source_channels.
+        extractor: process pool for PDF text; the text is stored before the outbox row is
+            inserted, so the worker sends it with the post. None — n8n extracts the text.
+        extraction_cache: content-hash cache in front of extractor (None — always extract).
+
+    With keywords configured, a post whose text has none is still accepted if its PDF has one
+    in the first config.PDF_KEYWORD_SCAN_PAGES pages (scanned by extractor, stopping at the first hit);
+    otherwise the downloaded PDF is deleted and the post skipped before it reaches the LLM. A PDF
+    the probe finds unreadable cannot be scanned and is skipped the same way.
+
+    Every downloaded PDF is probed (pdf_meta, migration 019). An encrypted, corrupt or
+    image-only PDF is not extracted: the post goes on with its text only or, without text, with
+    the document title (or file name) as text and the PDF attached for the editors.
     """
     fallback_source = config.get_source_channel_fallback()
 
     @client.on(events.NewMessage())
     async def on_new_message(event: events.NewMessage.Event) -> None:
+        health.mark_update()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            outcome = await _handle(event)
+        finally:
+            _handler_seconds.observe(time.perf_counter() - started, outcome=outcome)
+            _posts.inc(outcome=outcome)
+
+    async def _handle(event: events.NewMessage.Event) -> str:
+        """Process one update; returns outcome label for metrics."""
         message = event.message
         channel_id_str = get_channel_identifier(message)
         if not channel_id_str:
-            return
+            return "skipped_no_peer"
         monitored = await _get_monitored(pool, fallback_source)
         if not monitored:
             log.warning(
@@ -109,7 +257,7 @@ def register_new_post_handler(client, config, pool: asyncpg.Pool) -> None:
                 channel_id=channel_id_str,
                 fallback=fallback_source or "(none)",
             )
-            return
+            return "skipped_no_monitored"
         if not _is_message_from_monitored(channel_id_str, monitored):
             log.info(
                 "skip_channel_not_monitored",
@@ -117,7 +265,7 @@ def register_new_post_handler(client, config, pool: asyncpg.Pool) -> None:
                 channel_id=channel_id_str,
                 monitored_count=len(monitored),
             )
-            return
+            return "skipped_not_monitored"
 
         has_pdf = get_pdf_document(message)
         post_text = message.text or ""
@@ -129,31 +277,82 @@ def register_new_post_handler(client, config, pool: asyncpg.Pool) -> None:
                 channel_id=channel_id_str,
                 has_media=bool(message.media),
             )
-            return  # пустой пост — пропустить
+            return "skipped_empty"  # пустой пост — пропустить
 
         keywords = await _get_keywords(pool)
-        if keywords:
-            text_lower = post_text.lower()
-            if not any(kw in text_lower for kw in keywords):
+        scan_pdf = False
+        if keywords and not keywords.search(post_text):
+            # Текст без маркеров: PDF проверяется по первым страницам, иначе пост пропускается
+            scan_pdf = bool(has_pdf) and extractor is not None and config.PDF_KEYWORD_SCAN_PAGES > 0
+            if not scan_pdf:
                 log.info(
                     "skip_no_keyword_match",
                     message_id=message.id,
                     channel_id=channel_id_str,
-                    keyword_count=len(keywords),
+                    keyword_count=len(keywords.keywords),
                 )
-                return  # нет совпадений по маркерам — пропустить
+                return "skipped_keyword"  # нет совпадений по маркерам — пропустить
 
         pdf_path = ""
         pdf_missing = False
         if has_pdf:
-            pdf_path = await download_pdf_to_storage(
+            downloaded = await download_pdf(
                 client,
                 message,
                 config.PDF_STORAGE_PATH,
             )
-            if not pdf_path:
+            probe = None
+            if downloaded:
+                probe = await _probe_and_store(pool, downloaded, channel_id_str, message.id)
+            if scan_pdf:
+                scan = None
+                scan_error = "download failed"
+                if downloaded and not probe.readable:
+                    # Маркеры в PDF без текста не найти: как и неудачный скан, пост пропускается
+                    scan_error = f"unreadable pdf: {probe.status}"
+                elif downloaded:
+                    scan = await extractor.scan_keywords(
+                        downloaded.path, keywords.pattern, keywords.max_len, config.PDF_KEYWORD_SCAN_PAGES
+                    )
+                if scan is None or not scan.keyword:
+                    if downloaded:
+                        _remove_pdf(downloaded.path)
+                    log.info(
+                        "skip_no_keyword_match",
+                        message_id=message.id,
+                        channel_id=channel_id_str,
+                        keyword_count=len(keywords.keywords),
+                        pdf_pages_scanned=scan.pages if scan else 0,
+                        pdf_scan_error=scan.error if scan else scan_error,
+                    )
+                    return "skipped_keyword_pdf"
+            if not downloaded:
                 pdf_missing = True
                 log.warning("pdf_download_failed_using_outbox", message_id=message.id)
+            elif not probe.readable and not post_text.strip():
+                # Ни текста поста, ни текста в PDF: пост идёт с названием документа, файл остаётся для редактора
+                post_text = _unreadable_pdf_text(probe, has_pdf)
+                pdf_path = downloaded.path
+                log.warning(
+                    "unreadable_pdf_title_only",
+                    message_id=message.id,
+                    channel_id=channel_id_str,
+                    status=probe.status,
+                    error=probe.error,
+                )
+            else:
+                pdf_path = downloaded.path
+                # Unreadable PDFs go with the post text only (pdf_meta tells n8n to skip extraction)
+                if extractor is not None and probe.readable:
+                    await _extract_and_store(
+                        pool,
+                        extractor,
+                        extraction_cache,
+                        pdf_path,
+                        downloaded.sha256,
+                        channel_id_str,
+                        message.id,
+                    )
 
         log.info(
             "new_post",
@@ -171,5 +370,10 @@ def register_new_post_handler(client, config, pool: asyncpg.Pool) -> None:
             post_text=post_text,
             source_channel=channel_id_str,
         )
+        if pdf_path:
+            await _index_pdf(pool, downloaded, outbox_id)
         if outbox_id is None:
             log.debug("outbox_duplicate_skipped", message_id=message.id, channel_id=channel_id_str)
+            return "duplicate"
+        wake_outbox_worker()
+        return "accepted"
@@ -11,8 +11,24 @@ from src.config import Settings
 from src.utils.logging import configure_logging
 from src.client import create_client, _parse_proxy_url
 from src.database.connection import create_pool_with_retry, close_pool
+from src.handlers.discussion_link import register_discussion_link_handler
 from src.handlers.new_post import register_new_post_handler
+from src.services.discussion_cache import DiscussionCache, run_linked_chat_refresher
+from src.services.extraction_cache import build_extraction_cache
+from src.services.llm_client import LLMClient
+from src.services.llm_scheduler import LLMScheduler
+from src.services.outbox_ack import run_outbox_ack_sweeper
+from src.services.outbox_compactor import run_outbox_compactor
+from src.services.outbox_depth import run_outbox_depth_sampler
+from src.services.outbox_drain import build_drain_policy
 from src.services.outbox_worker import run_outbox_worker
+from src.services.pdf_archive import build_pdf_archive, set_pdf_archive
+from src.services.pdf_extractor import build_pdf_extraction_pool
+from src.services.pdf_probe import shutdown_pdf_probe_pool
+from src.services.pipeline import build_native_pipeline
+from src.services.rate_limiter import build_outbox_pacer
+from src.services.summarizer import PgSummaryCache, Summarizer
+from src.services.summary_policy import build_summary_policy
 from src.web.app import create_app
 
 
@@ -50,33 +66,130 @@ def main() -> None:
             session_string=config.TELEGRAM_SESSION_STRING,
             proxy=proxy_tuple,
         )
-        register_new_post_handler(client, config, pool)
+        extractor = build_pdf_extraction_pool(
+            workers=config.PDF_EXTRACT_WORKERS,
+            max_pages=config.PDF_EXTRACT_MAX_PAGES,
+            max_chars=config.PDF_EXTRACT_MAX_CHARS,
+        )
+        extraction_cache = build_extraction_cache(pool, extractor, max_mb=config.PDF_EXTRACT_CACHE_MAX_MB)
+        register_new_post_handler(client, config, pool, extractor=extractor, extraction_cache=extraction_cache)
+        discussion_cache = DiscussionCache()
+        register_discussion_link_handler(client, pool, discussion_cache)
+        pacer = build_outbox_pacer(
+            pool,
+            rate_per_minute=config.OUTBOX_RATE_PER_MINUTE,
+            burst=config.OUTBOX_RATE_BURST,
+            per_channel=config.OUTBOX_RATE_PER_CHANNEL,
+            windows_spec=config.OUTBOX_RATE_WINDOWS,
+            buffer_minutes=config.OUTBOX_BUFFER_MINUTES,
+        )
+        drain = build_drain_policy(
+            max_age_minutes=config.OUTBOX_MAX_AGE_MINUTES,
+            stale_policy=config.OUTBOX_STALE_POLICY,
+            newest_first_backlog=config.OUTBOX_NEWEST_FIRST_BACKLOG,
+        )
+        policy = build_summary_policy(config.SUMMARY_POLICY)
+        pipeline = build_native_pipeline(
+            config.PIPELINE_MODE,
+            pool,
+            lambda: Summarizer(
+                LLMClient(
+                    base_url=config.OPENAI_BASE_URL,
+                    api_key=config.OPENAI_API_KEY or "",
+                    model=config.OPENAI_MODEL,
+                    scheduler=LLMScheduler(
+                        rpm=config.LLM_RPM,
+                        tpm=config.LLM_TPM,
+                        max_concurrency=config.LLM_MAX_CONCURRENCY,
+                    ),
+                ),
+                cache=PgSummaryCache(pool),
+                chunk_tokens=config.SUMMARY_CHUNK_TOKENS,
+                map_concurrency=config.SUMMARY_MAP_CONCURRENCY,
+            ),
+            config.EDITOR_BOT_WEBHOOK_URL,
+            config.EDITOR_BOT_WEBHOOK_TOKEN or "",
+            extractor=extractor,
+            stage_concurrency=config.PIPELINE_STAGE_CONCURRENCY,
+            policy=policy,
+        )
+        pdf_archive = build_pdf_archive(
+            pool,
+            config.PDF_STORAGE_PATH,
+            config.PDF_ARCHIVE_PATH,
+            after_days=config.PDF_ARCHIVE_AFTER_DAYS,
+            segment_mb=config.PDF_ARCHIVE_SEGMENT_MB,
+        )
+        set_pdf_archive(pdf_archive)
         fallback = config.get_source_channel_fallback()
-        log.info("userbot_starting", source_fallback=fallback or "(from DB)")
+        log.info("userbot_starting", source_fallback=fallback or "(from DB)", pipeline_mode=config.PIPELINE_MODE)
         try:
             async with client:
-                api_app = create_app(client, config.USERBOT_API_TOKEN)
+                api_app = create_app(
+                    client,
+                    config.USERBOT_API_TOKEN,
+                    pool=pool,
+                    discussion_cache=discussion_cache,
+                    pdf_archive=pdf_archive,
+                )
                 runner = web.AppRunner(api_app)
                 await runner.setup()
                 site = web.TCPSite(runner, "0.0.0.0", config.USERBOT_API_PORT)
                 await site.start()
                 log.info("userbot_api_started", port=config.USERBOT_API_PORT)
-                worker_task = asyncio.create_task(
-                    run_outbox_worker(
-                        pool,
-                        config.N8N_WEBHOOK_URL,
-                        buffer_minutes=config.OUTBOX_BUFFER_MINUTES,
+                background_tasks = [
+                    asyncio.create_task(
+                        run_outbox_worker(
+                            pool,
+                            config.N8N_WEBHOOK_URL,
+                            bulk_webhook_url=config.N8N_BULK_WEBHOOK_URL,
+                            bulk_size=config.OUTBOX_BULK_SIZE,
+                            pacer=pacer,
+                            ack_callback_url=config.USERBOT_CALLBACK_URL if config.OUTBOX_ACK_MODE else None,
+                            drain=drain,
+                            pipeline=pipeline,
+                            policy=policy,
+                        ),
                     ),
-                )
+                    asyncio.create_task(
+                        run_outbox_compactor(
+                            pool,
+                            retention_days=config.OUTBOX_RETENTION_DAYS,
+                            batch_size=config.OUTBOX_COMPACT_BATCH_SIZE,
+                            archive=config.OUTBOX_ARCHIVE_SENT,
+                        ),
+                    ),
+                    asyncio.create_task(run_linked_chat_refresher(client, pool, discussion_cache)),
+                    asyncio.create_task(run_outbox_depth_sampler(pool)),
+                ]
+                if pdf_archive is not None and config.PDF_ARCHIVE_AFTER_DAYS > 0:
+                    background_tasks.append(
+                        asyncio.create_task(pdf_archive.run(config.PDF_ARCHIVE_INTERVAL_MIN * 60)),
+                    )
+                if config.OUTBOX_ACK_MODE:
+                    background_tasks.append(
+                        asyncio.create_task(
+                            run_outbox_ack_sweeper(pool, config.OUTBOX_ACK_TIMEOUT_MINUTES),
+                        )
+                    )
                 try:
                     await client.run_until_disconnected()
                 finally:
-                    worker_task.cancel()
-                    try:
-                        await worker_task
-                    except asyncio.CancelledError:
-                        pass
+                    for task in background_tasks:
+                        task.cancel()
+                    for task in background_tasks:
+                        try:
+                            await task
+                        except asyncio.CancelledError:
+                            pass
         finally:
+            if pipeline is not None:
+                await pipeline.stop()
+                await pipeline.summarizer.client.close()
+            set_pdf_archive(None)
+            shutdown_pdf_probe_pool()
+            if extractor is not None:
+                extractor.shutdown()
             await close_pool(pool)
 
     try:
@@ -0,0 +1,255 @@
+"""Discussion resolution cache: linked chat per channel and LRU+TTL of resolved (channel, msg) pairs."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+import asyncpg
+import structlog
+from telethon import TelegramClient
+from telethon.tl.functions.channels import GetFullChannelRequest
+from telethon.tl.types import PeerChannel
+
+from src.database.discussion_links import prune_discussion_links
+from src.database.source_channels import get_active_target_channel_identifiers
+from src.services.discussion_resolver import bot_api_chat_id, channel_entity_arg
+from src.services.mtproto_scheduler import PRIORITY_BACKFILL, PRIORITY_RESOLVE, get_mtproto_scheduler
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+RESOLVED_CACHE_SIZE = 4096
+# A channel post keeps its discussion copy; the TTL only bounds memory held by old posts
+RESOLVED_CACHE_TTL_SEC = 24 * 3600
+# Linked chat changes only when an admin re-links the group
+LINKED_CHAT_TTL_SEC = 6 * 3600
+LINKED_CHAT_REFRESH_INTERVAL_SEC = 3600
+# Pause between GetFullChannel calls during a refresh (flood-wait friendly)
+LINKED_CHAT_REFRESH_PAUSE_SEC = 1.0
+# Batch resolve: MTProto calls in flight at once (FloodWait pauses all of them, see discussion_resolver)
+RESOLVE_BATCH_CONCURRENCY = 4
+RESOLVE_BATCH_MAX_ITEMS = 50
+# discussion_links rows are needed only while a post is being published
+DISCUSSION_LINKS_RETENTION_DAYS = 7
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+Resolver = Callable[[TelegramClient, str, int], Awaitable[Tuple[Optional[int], Optional[int]]]]
+
+_lookups = metrics.counter(
+    "userbot_discussion_cache_lookups_total",
+    "Discussion cache lookups by cache (resolved, linked) and result (hit, miss)",
+    ("cache", "result"),
+)
+_hit_ratio = metrics.gauge(
+    "userbot_discussion_cache_hit_ratio",
+    "Share of /discussion/resolve requests answered from the resolved-pairs cache",
+)
+_resolve_seconds = metrics.histogram(
+    "userbot_discussion_resolve_seconds",
+    "Discussion resolve latency by outcome (cached, no_linked_chat, resolved, failed)",
+    ("outcome",),
+)
+
+
+class TTLCache(Generic[K, V]):
+    """LRU cache with per-entry TTL; expired entries are dropped on access."""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if self._clock() >= expires_at:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        self._data[key] = (value, self._clock() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def items(self) -> list[tuple[K, V]]:
+        """Unexpired entries (does not touch LRU order)."""
+        now = self._clock()
+        return [(k, v) for k, (v, expires_at) in self._data.items() if now < expires_at]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+async def fetch_linked_chat_id(
+    client: TelegramClient,
+    channel_id: str,
+    priority: int = PRIORITY_RESOLVE,
+) -> tuple[int, Optional[int]]:
+    """(channel id, linked discussion chat id) in Bot API format; linked is None if the channel has none."""
+    scheduler = get_mtproto_scheduler()
+    peer = await scheduler.call(
+        "get_input_entity",
+        lambda: client.get_input_entity(channel_entity_arg(channel_id)),
+        priority,
+    )
+    full = await scheduler.call("GetFullChannelRequest", lambda: client(GetFullChannelRequest(channel=peer)), priority)
+    linked = getattr(full.full_chat, "linked_chat_id", None)
+    own_id = bot_api_chat_id(PeerChannel(full.full_chat.id))
+    return own_id, bot_api_chat_id(PeerChannel(linked)) if linked else None
+
+
+class DiscussionCache:
+    """
+    Answers /discussion/resolve without MTProto calls where possible: resolved pairs come from an
+    LRU+TTL cache, and channels known to have no linked discussion chat are answered at once
+    instead of going through the resolve retries.
+    """
+
+    def __init__(
+        self,
+        resolved_size: int = RESOLVED_CACHE_SIZE,
+        resolved_ttl: float = RESOLVED_CACHE_TTL_SEC,
+        linked_ttl: float = LINKED_CHAT_TTL_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._resolved: TTLCache[tuple[str, int], tuple[int, int]] = TTLCache(resolved_size, resolved_ttl, clock)
+        # channel -> (channel id, linked chat id); linked None = channel has no discussion group
+        self._linked: TTLCache[str, tuple[int, Optional[int]]] = TTLCache(resolved_size, linked_ttl, clock)
+        self._linked_known: set[str] = set()
+        self._hits = 0
+        self._requests = 0
+
+    def known_channels(self) -> list[str]:
+        return sorted(self._linked_known)
+
+    async def refresh_linked(
+        self,
+        client: TelegramClient,
+        channel_id: str,
+        priority: int = PRIORITY_RESOLVE,
+    ) -> Optional[int]:
+        """Fetch and store the linked chat of channel_id; raises on MTProto errors."""
+        own_id, linked = await fetch_linked_chat_id(client, channel_id, priority)
+        self._linked.put(channel_id, (own_id, linked))
+        self._linked_known.add(channel_id)
+        return linked
+
+    def linked_chats(self) -> dict[int, tuple[int, list[str]]]:
+        """Linked chat id -> (channel id, identifiers the channel was requested by) for known channels."""
+        out: dict[int, tuple[int, list[str]]] = {}
+        for channel_id, (own_id, linked) in self._linked.items():
+            if linked is not None:
+                out.setdefault(linked, (own_id, []))[1].append(channel_id)
+        return out
+
+    def remember(self, channel_id: str, message_id: int, chat_id: int, discussion_message_id: int) -> None:
+        """Store a link pushed by Telegram (auto-forward seen in the linked chat)."""
+        self._resolved.put(((channel_id or "").strip(), message_id), (chat_id, discussion_message_id))
+
+    async def _has_linked_chat(self, client: TelegramClient, channel_id: str) -> bool:
+        """False only if the channel is known to have no discussion chat; errors count as unknown."""
+        entry = self._linked.get(channel_id)
+        if entry is not None:
+            _lookups.inc(cache="linked", result="hit")
+            return entry[1] is not None
+        _lookups.inc(cache="linked", result="miss")
+        try:
+            linked = await self.refresh_linked(client, channel_id)
+        except Exception as e:
+            log.warning("linked_chat_lookup_failed", channel_id=channel_id, error=str(e))
+            return True
+        return linked is not None
+
+    async def resolve(
+        self,
+        client: TelegramClient,
+        channel_id: str,
+        message_id: int,
+        resolver: Resolver,
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """Cached resolve_discussion_message; only successful resolutions are cached."""
+        started = time.perf_counter()
+        channel_id = (channel_id or "").strip()
+        key = (channel_id, message_id)
+        self._requests += 1
+        cached = self._resolved.get(key)
+        if cached is not None:
+            self._hits += 1
+            _lookups.inc(cache="resolved", result="hit")
+            self._observe("cached", started)
+            return cached
+        _lookups.inc(cache="resolved", result="miss")
+        if not await self._has_linked_chat(client, channel_id):
+            self._observe("no_linked_chat", started)
+            return None, None
+        chat_id, msg_id = await resolver(client, channel_id, message_id)
+        if chat_id is None or msg_id is None:
+            self._observe("failed", started)
+            return None, None
+        self._resolved.put(key, (chat_id, msg_id))
+        self._observe("resolved", started)
+        return chat_id, msg_id
+
+    async def resolve_many(
+        self,
+        client: TelegramClient,
+        items: list[tuple[str, int]],
+        resolver: Resolver,
+        concurrency: int = RESOLVE_BATCH_CONCURRENCY,
+    ) -> list[Tuple[Optional[int], Optional[int]]]:
+        """Resolve (channel_id, message_id) pairs concurrently, at most `concurrency` at a time; results keep input order."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _one(channel_id: str, message_id: int) -> Tuple[Optional[int], Optional[int]]:
+            async with semaphore:
+                return await self.resolve(client, channel_id, message_id, resolver)
+
+        return list(await asyncio.gather(*(_one(c, m) for c, m in items)))
+
+    def _observe(self, outcome: str, started: float) -> None:
+        _resolve_seconds.observe(time.perf_counter() - started, outcome=outcome)
+        _hit_ratio.set(self._hits / self._requests if self._requests else 0.0)
+
+
+async def run_linked_chat_refresher(
+    client: TelegramClient,
+    pool: asyncpg.Pool,
+    cache: DiscussionCache,
+    interval: float = LINKED_CHAT_REFRESH_INTERVAL_SEC,
+) -> None:
+    """
+    Loop: precompute linked chats of active target channels (and channels seen by the API),
+    then refresh them every interval; old discussion_links rows are pruned on each pass.
+    Runs until cancelled.
+    """
+    while True:
+        try:
+            channels = set(await get_active_target_channel_identifiers(pool)) | set(cache.known_channels())
+            refreshed = 0
+            for channel_id in sorted(channels):
+                try:
+                    await cache.refresh_linked(client, channel_id, PRIORITY_BACKFILL)
+                    refreshed += 1
+                except Exception as e:
+                    log.warning("linked_chat_refresh_failed", channel_id=channel_id, error=str(e))
+                await asyncio.sleep(LINKED_CHAT_REFRESH_PAUSE_SEC)
+            log.info("linked_chats_refreshed", channels=len(channels), refreshed=refreshed)
+            try:
+                await prune_discussion_links(pool, DISCUSSION_LINKS_RETENTION_DAYS)
+            except asyncpg.UndefinedTableError:
+                pass
+        except asyncio.CancelledError:
+            log.info("linked_chat_refresher_stopped")
+            raise
+        except Exception as e:
+            log.error("linked_chat_refresher_error", error=str(e), exc_info=True)
+        await asyncio.sleep(interval)
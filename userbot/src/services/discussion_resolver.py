@@ -5,13 +5,38 @@ from typing import Tuple
 
 import structlog
 from telethon import TelegramClient
+from telethon.errors import FloodWaitError
 from telethon.tl.functions.messages import GetDiscussionMessageRequest
 from telethon.tl.types import PeerChannel
 
+from src.services.mtproto_scheduler import PRIORITY_RESOLVE, FloodPausedError, get_mtproto_scheduler
+
 log = structlog.get_logger()
 
 # Retries when discussion message not yet available (Telegram may need a moment)
 RESOLVE_RETRIES = (0.5, 1.0, 2.0)
+# FloodWait longer than this fails the resolve at once (the caller falls back to a channel reply)
+RESOLVE_MAX_FLOOD_WAIT_SEC = 30
+
+
+def channel_entity_arg(channel_id: str) -> int | str:
+    """Argument for client.get_input_entity: int peer id for Bot API "-100..." ids, else @username."""
+    # Telethon get_input_entity(str) ищет по username; для Bot API id "-100..." передаём int (peer id)
+    try:
+        peer_id_int = int(channel_id)
+        return peer_id_int if peer_id_int < 0 else channel_id
+    except ValueError:
+        return channel_id  # @username
+
+
+def bot_api_chat_id(peer: object) -> int | None:
+    """Bot API chat id (-100... for channels/supergroups, -N for basic groups) of a Telethon peer."""
+    if isinstance(peer, PeerChannel):
+        return -(1000000000000 + peer.channel_id)
+    chat_id = getattr(peer, "chat_id", None)
+    if chat_id is None:
+        return None
+    return -chat_id if chat_id > 0 else chat_id
 
 
 async def resolve_discussion_message(
@@ -37,20 +62,36 @@ async def resolve_discussion_message(
     if not channel_id or message_id is None or message_id < 1:
         return None, None
 
-    # Telethon get_input_entity(str) ищет по username; для Bot API id "-100..." передаём int (peer id)
-    try:
-        peer_id_int = int(channel_id)
-        entity_arg: int | str = peer_id_int if peer_id_int < 0 else channel_id
-    except ValueError:
-        entity_arg = channel_id  # @username
+    entity_arg = channel_entity_arg(channel_id)
 
+    scheduler = get_mtproto_scheduler()
     last_error: Exception | None = None
     for attempt, delay in enumerate([0.0] + list(RESOLVE_RETRIES)):
         if delay > 0:
             await asyncio.sleep(delay)
         try:
-            peer = await client.get_input_entity(entity_arg)
-            result = await client(GetDiscussionMessageRequest(peer=peer, msg_id=message_id))
+            peer = await scheduler.call(
+                "get_input_entity",
+                lambda: client.get_input_entity(entity_arg),
+                PRIORITY_RESOLVE,
+                RESOLVE_MAX_FLOOD_WAIT_SEC,
+            )
+            result = await scheduler.call(
+                "GetDiscussionMessageRequest",
+                lambda: client(GetDiscussionMessageRequest(peer=peer, msg_id=message_id)),
+                PRIORITY_RESOLVE,
+                RESOLVE_MAX_FLOOD_WAIT_SEC,
+            )
+        except (FloodWaitError, FloodPausedError) as e:
+            # Short waits are sat out by the scheduler; this one is too long for a publish to wait
+            last_error = e
+            log.warning(
+                "discussion_resolve_flood_wait",
+                channel_id=channel_id,
+                message_id=message_id,
+                error=str(e),
+            )
+            break
         except Exception as e:
             last_error = e
             log.warning(
@@ -74,14 +115,9 @@ async def resolve_discussion_message(
         peer = getattr(msg, "peer_id", None)
         if peer is None:
             return None, None
-        if isinstance(peer, PeerChannel):
-            # Bot API format: -100xxxxxxxxx
-            discussion_chat_id = -(1000000000000 + peer.channel_id)
-        else:
-            chat_id = getattr(peer, "chat_id", None)
-            if chat_id is None:
-                return None, None
-            discussion_chat_id = -chat_id if chat_id > 0 else chat_id
+        discussion_chat_id = bot_api_chat_id(peer)
+        if discussion_chat_id is None:
+            return None, None
         discussion_message_id = msg.id
         log.info(
             "discussion_resolved",
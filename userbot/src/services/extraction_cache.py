@@ -0,0 +1,96 @@
+"""PDF extraction cache: one extraction per file content (SHA-256), LRU eviction within a size budget."""
+
+import time
+from typing import Callable, Optional
+
+import asyncpg
+import structlog
+
+from src.database.pdf_extractions import evict_extraction_cache, get_cached_extraction, put_cached_extraction
+from src.services.pdf_extractor import PdfExtraction, PdfExtractionPool
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+PDF_EXTRACT_CACHE_DEFAULT_MAX_MB = 256
+# Eviction scans the whole cache table; running it after every insert is wasteful
+PDF_EXTRACT_CACHE_EVICT_INTERVAL_SEC = 600
+
+_lookups = metrics.counter(
+    "userbot_pdf_extract_cache_lookups_total",
+    "PDF extraction cache lookups by result (hit, miss, error)",
+    ("result",),
+)
+_evicted = metrics.counter(
+    "userbot_pdf_extract_cache_evicted_total",
+    "Rows evicted from the PDF extraction cache (size budget)",
+)
+
+
+class ExtractionCache:
+    """
+    Wraps a PdfExtractionPool: a document whose content hash and extractor version are in
+    pdf_extraction_cache costs one indexed UPDATE ... RETURNING instead of a worker process.
+    Only successful extractions are cached. Cache errors (e.g. before migration 016) fall back
+    to extracting.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        extractor: PdfExtractionPool,
+        max_bytes: int = PDF_EXTRACT_CACHE_DEFAULT_MAX_MB * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._pool = pool
+        self.extractor = extractor
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._last_evict: Optional[float] = None
+
+    async def extract(self, path: str, sha256: Optional[str]) -> PdfExtraction:
+        """Cached result for sha256 or a fresh extraction of path (stored in the cache on success)."""
+        if not sha256:
+            return await self.extractor.extract(path)
+        version = self.extractor.version
+        try:
+            cached = await get_cached_extraction(self._pool, sha256, version)
+        except Exception as e:
+            _lookups.inc(result="error")
+            log.warning("pdf_extract_cache_lookup_failed", sha256=sha256, error=str(e))
+            return await self.extractor.extract(path)
+        if cached is not None:
+            _lookups.inc(result="hit")
+            log.info("pdf_extract_cache_hit", path=path, sha256=sha256, pages=cached.pages)
+            return cached
+        _lookups.inc(result="miss")
+        extraction = await self.extractor.extract(path)
+        if extraction.error:
+            return extraction
+        try:
+            await put_cached_extraction(self._pool, sha256, version, extraction)
+            await self._maybe_evict()
+        except Exception as e:
+            log.warning("pdf_extract_cache_store_failed", sha256=sha256, error=str(e))
+        return extraction
+
+    async def _maybe_evict(self) -> None:
+        now = self._clock()
+        if self._last_evict is not None and now - self._last_evict < PDF_EXTRACT_CACHE_EVICT_INTERVAL_SEC:
+            return
+        self._last_evict = now
+        deleted = await evict_extraction_cache(self._pool, self.max_bytes)
+        if deleted:
+            _evicted.inc(deleted)
+            log.info("pdf_extract_cache_evicted", rows=deleted, max_bytes=self.max_bytes)
+
+
+def build_extraction_cache(
+    pool: asyncpg.Pool,
+    extractor: Optional[PdfExtractionPool],
+    max_mb: int = PDF_EXTRACT_CACHE_DEFAULT_MAX_MB,
+) -> Optional[ExtractionCache]:
+    """Cache from config values; None when extraction is off or max_mb is 0."""
+    if extractor is None or max_mb <= 0:
+        return None
+    return ExtractionCache(pool, extractor, max_bytes=max_mb * 1024 * 1024)
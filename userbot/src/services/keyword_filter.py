@@ -0,0 +1,33 @@
+"""Keyword (marker) filter: one compiled regex for all keywords, applied to post text and PDF pages."""
+
+import re
+from typing import Optional
+
+
+class KeywordMatcher:
+    """
+    Substring match of any keyword, case-insensitive, as the plain `kw in text.lower()` loop did,
+    but with a single alternation regex (longest keywords first) instead of one scan per keyword.
+    An empty keyword list matches nothing; callers treat it as "no filter".
+    """
+
+    def __init__(self, keywords: list[str]) -> None:
+        self.keywords = sorted({kw.strip().lower() for kw in keywords if kw and kw.strip()}, key=len, reverse=True)
+        self.pattern: Optional[re.Pattern] = (
+            re.compile("|".join(re.escape(kw) for kw in self.keywords)) if self.keywords else None
+        )
+
+    def __bool__(self) -> bool:
+        return self.pattern is not None
+
+    @property
+    def max_len(self) -> int:
+        """Length of the longest keyword (a match across a page break needs this much overlap)."""
+        return len(self.keywords[0]) if self.keywords else 0
+
+    def search(self, text: str) -> Optional[str]:
+        """First keyword found in text, or None."""
+        if self.pattern is None or not text:
+            return None
+        match = self.pattern.search(text.lower())
+        return match.group(0) if match else None
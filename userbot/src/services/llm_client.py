@@ -0,0 +1,177 @@
+"""
+Minimal OpenAI-compatible chat completions client (one user message in, text and token usage out),
+optionally paced by an LLMScheduler (RPM/TPM budget, priorities, Retry-After).
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+import structlog
+
+from src.services.llm_scheduler import PRIORITY_LIVE, LLMScheduler, rate_limit_backoff
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+OPENAI_DEFAULT_BASE_URL = "https://api.openai.com/v1"
+OPENAI_DEFAULT_MODEL = "gpt-4o-mini"
+LLM_TIMEOUT_SEC = 120
+# Rough tokens-per-character ratio for budgeting before the API reports real usage
+CHARS_PER_TOKEN = 4
+# Completion tokens reserved in the TPM budget when the request sets no max_tokens
+LLM_COMPLETION_ESTIMATE_TOKENS = 512
+# Rate-limit responses a scheduled request sits out before the error is raised
+LLM_MAX_RATE_LIMIT_RETRIES = 3
+
+_tokens = metrics.counter(
+    "userbot_llm_tokens_total",
+    "LLM tokens reported by the API by stage (single, map, reduce) and kind (prompt, completion)",
+    ("stage", "kind"),
+)
+_requests = metrics.counter(
+    "userbot_llm_requests_total",
+    "LLM requests by stage and outcome (ok, error)",
+    ("stage", "outcome"),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Token estimate without a tokenizer (about 4 characters per token)."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Time spent in the scheduler queue (0 without a scheduler)
+    queue_seconds: float = 0.0
+
+
+class LLMError(Exception):
+    """Request failed; status is the HTTP status (0 for network errors), retry_after from the Retry-After header."""
+
+    def __init__(self, message: str, status: int = 0, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (only the delta-seconds form is used by LLM APIs)."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+class LLMClient:
+    """
+    Sends a prompt as a single user message to {base_url}/chat/completions; one HTTP session per
+    client. With a scheduler every request first reserves its estimated tokens, and 429 responses
+    (and 5xx with Retry-After) pause the scheduler and are retried at the same priority.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OPENAI_DEFAULT_BASE_URL,
+        api_key: str = "",
+        model: str = OPENAI_DEFAULT_MODEL,
+        timeout: float = LLM_TIMEOUT_SEC,
+        scheduler: Optional[LLMScheduler] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def complete(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        stage: str = "single",
+        priority: int = PRIORITY_LIVE,
+        model: Optional[str] = None,
+    ) -> LLMResponse:
+        """
+        Run one completion (with model instead of the client's model if given); raises LLMError on
+        HTTP errors, timeouts and malformed responses.
+        """
+        if self.scheduler is None:
+            return await self._request(prompt, max_tokens, stage, model)
+        reserved = estimate_tokens(prompt) + (max_tokens or LLM_COMPLETION_ESTIMATE_TOKENS)
+        queue_seconds = 0.0
+        for attempt in range(LLM_MAX_RATE_LIMIT_RETRIES + 1):
+            queue_seconds += await self.scheduler.acquire(reserved, priority)
+            used: Optional[int] = None
+            charged: Optional[int] = None
+            try:
+                result = await self._request(prompt, max_tokens, stage, model)
+                used = (result.prompt_tokens + result.completion_tokens) or reserved
+                # The API's limiter counts max_tokens, not the completion actually produced
+                charged = result.prompt_tokens + max_tokens if max_tokens and result.prompt_tokens else used
+                result.queue_seconds = queue_seconds
+                return result
+            except LLMError as e:
+                if not (e.status == 429 or (e.status >= 500 and e.retry_after is not None)):
+                    raise
+                await self.scheduler.pause(e.retry_after if e.retry_after is not None else rate_limit_backoff(attempt))
+                if attempt >= LLM_MAX_RATE_LIMIT_RETRIES:
+                    raise
+            finally:
+                await self.scheduler.release(reserved, used, charged)
+        raise AssertionError("unreachable")
+
+    async def _request(self, prompt: str, max_tokens: Optional[int], stage: str, model: Optional[str]) -> LLMResponse:
+        body: dict = {"model": model or self.model, "messages": [{"role": "user", "content": prompt}]}
+        if max_tokens:
+            body["max_tokens"] = max_tokens
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            async with self._get_session().post(
+                f"{self.base_url}/chat/completions", json=body, headers=headers
+            ) as resp:
+                if resp.status != 200:
+                    text = await resp.text()
+                    raise LLMError(
+                        f"HTTP {resp.status}: {text[:200]}",
+                        status=resp.status,
+                        retry_after=parse_retry_after(resp.headers.get("Retry-After")),
+                    )
+                data = await resp.json()
+        except LLMError:
+            _requests.inc(stage=stage, outcome="error")
+            raise
+        except (aiohttp.ClientError, TimeoutError) as e:
+            _requests.inc(stage=stage, outcome="error")
+            raise LLMError(str(e) or type(e).__name__) from e
+        try:
+            text = data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError) as e:
+            _requests.inc(stage=stage, outcome="error")
+            raise LLMError(f"malformed response: {str(data)[:200]}") from e
+        usage = data.get("usage") or {}
+        result = LLMResponse(
+            text=text,
+            prompt_tokens=int(usage.get("prompt_tokens") or 0),
+            completion_tokens=int(usage.get("completion_tokens") or 0),
+        )
+        _requests.inc(stage=stage, outcome="ok")
+        _tokens.inc(result.prompt_tokens, stage=stage, kind="prompt")
+        _tokens.inc(result.completion_tokens, stage=stage, kind="completion")
+        return result
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
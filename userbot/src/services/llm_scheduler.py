@@ -0,0 +1,166 @@
+"""Request scheduler for the LLM API: RPM/TPM token buckets, priorities and shared Retry-After pauses."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Callable, Optional
+
+import structlog
+
+from src.services.rate_limiter import TokenBucket
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+# Lower value runs first
+PRIORITY_LIVE = 0
+PRIORITY_BACKFILL = 1
+PRIORITY_REPROCESS = 2
+_PRIORITY_NAMES = {PRIORITY_LIVE: "live", PRIORITY_BACKFILL: "backfill", PRIORITY_REPROCESS: "reprocess"}
+
+LLM_DEFAULT_CONCURRENCY = 8
+# Pause after a 429 without Retry-After: base * 2^attempt seconds, capped
+LLM_RATE_LIMIT_BACKOFF_SEC = 2.0
+LLM_RATE_LIMIT_BACKOFF_MAX_SEC = 60.0
+
+_queue_seconds = metrics.histogram(
+    "userbot_llm_queue_seconds",
+    "Time an LLM request waited for RPM/TPM budget and a slot (incl. Retry-After pauses) by priority",
+    ("priority",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+_queue_depth = metrics.gauge(
+    "userbot_llm_queue_depth",
+    "LLM requests waiting in the scheduler",
+)
+_rate_limited = metrics.counter(
+    "userbot_llm_rate_limited_total",
+    "Rate-limit responses from the LLM API that paused the scheduler",
+)
+_reserved_tokens = metrics.counter(
+    "userbot_llm_scheduled_tokens_total",
+    "Tokens by kind: reserved (estimate at admission) and used (reported by the API)",
+    ("kind",),
+)
+
+
+def priority_name(priority: int) -> str:
+    return _PRIORITY_NAMES.get(priority, str(priority))
+
+
+def rate_limit_backoff(attempt: int) -> float:
+    return min(LLM_RATE_LIMIT_BACKOFF_MAX_SEC, LLM_RATE_LIMIT_BACKOFF_SEC * (2**attempt))
+
+
+class LLMScheduler:
+    """
+    Admits LLM requests one at a time in priority order (FIFO within a priority) once the
+    requests-per-minute bucket has a token, the tokens-per-minute bucket holds the request's
+    estimated tokens and fewer than max_concurrency requests are in flight. Buckets start full
+    and refill continuously, the way OpenAI describes its limits; rpm/tpm 0 disables a bucket.
+    After the response the estimate is replaced by what the API charged. A rate-limit response
+    pauses every request until its Retry-After has passed. `period` is 60 s except in benchmarks.
+    """
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = LLM_DEFAULT_CONCURRENCY,
+        period: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._rpm = TokenBucket(rpm / period, rpm) if rpm > 0 else None
+        self._tpm = TokenBucket(tpm / period, tpm) if tpm > 0 else None
+        self.max_concurrency = max(1, max_concurrency)
+        self._clock = clock
+        self._queue: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._cond = asyncio.Condition()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self.tokens_reserved = 0
+        self.tokens_used = 0
+        self.rate_limited = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def pause_remaining(self) -> float:
+        return max(0.0, self._paused_until - self._clock())
+
+    def _budget_wait(self, tokens: int) -> float:
+        now = self._clock()
+        wait = self._paused_until - now
+        if self._rpm is not None:
+            wait = max(wait, self._rpm.time_until(now))
+        if self._tpm is not None:
+            wait = max(wait, self._tpm.time_until(now, tokens))
+        return max(0.0, wait)
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_LIVE) -> float:
+        """Wait for the request's turn and budget, reserve it; returns seconds waited."""
+        entry = (priority, next(self._seq))
+        started = time.perf_counter()
+        async with self._cond:
+            heapq.heappush(self._queue, entry)
+            _queue_depth.set(len(self._queue))
+            try:
+                while True:
+                    if self._queue[0] == entry and self._in_flight < self.max_concurrency:
+                        wait = self._budget_wait(tokens)
+                        if wait <= 0:
+                            heapq.heappop(self._queue)
+                            now = self._clock()
+                            if self._rpm is not None:
+                                self._rpm.try_take(now)
+                            if self._tpm is not None:
+                                self._tpm.try_take(now, tokens)
+                            self._in_flight += 1
+                            self.tokens_reserved += tokens
+                            self._cond.notify_all()
+                            break
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+                    await self._cond.wait()
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+            finally:
+                _queue_depth.set(len(self._queue))
+        waited = time.perf_counter() - started
+        _queue_seconds.observe(waited, priority=priority_name(priority))
+        _reserved_tokens.inc(tokens, kind="reserved")
+        return waited
+
+    async def release(self, reserved: int, used: Optional[int] = None, charged: Optional[int] = None) -> None:
+        """
+        Free the slot. used is the usage the API reported; charged is what its limiter counted
+        (defaults to used) and replaces the reservation in the TPM bucket.
+        """
+        async with self._cond:
+            self._in_flight -= 1
+            if used is not None:
+                self.tokens_used += used
+                _reserved_tokens.inc(used, kind="used")
+                if self._tpm is not None:
+                    charged = used if charged is None else charged
+                    self._tpm.tokens = min(self._tpm.burst, self._tpm.tokens + reserved - charged)
+            self._cond.notify_all()
+
+    async def pause(self, seconds: float) -> None:
+        """Hold every queued request for seconds (Retry-After of a rate-limit response)."""
+        async with self._cond:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            self.rate_limited += 1
+            self._cond.notify_all()
+        _rate_limited.inc()
+        log.warning("llm_rate_limited", pause_seconds=round(seconds, 3))
@@ -0,0 +1,199 @@
+"""Central scheduler for MTProto calls: per-method concurrency, priorities and shared FloodWait pauses."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import structlog
+from telethon.errors import FloodWaitError
+
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+T = TypeVar("T")
+
+# Lower value runs first
+PRIORITY_RESOLVE = 0
+PRIORITY_LIVE = 1
+PRIORITY_BACKFILL = 2
+_PRIORITY_NAMES = {PRIORITY_RESOLVE: "resolve", PRIORITY_LIVE: "live", PRIORITY_BACKFILL: "backfill"}
+
+# Calls in flight per method; methods not listed use MTPROTO_DEFAULT_CONCURRENCY
+MTPROTO_CONCURRENCY = {
+    "download_media": 2,
+    "get_input_entity": 4,
+    "GetDiscussionMessageRequest": 2,
+    "GetFullChannelRequest": 1,
+}
+MTPROTO_DEFAULT_CONCURRENCY = 2
+# A call that would have to wait longer than this for a method's FloodWait fails at once
+MTPROTO_DEFAULT_MAX_WAIT_SEC = 300.0
+# FloodWaits a single call sits out before giving up
+MTPROTO_MAX_FLOOD_RETRIES = 3
+
+_flood_waits = metrics.counter(
+    "userbot_mtproto_flood_waits_total",
+    "FloodWait errors returned by Telegram per method",
+    ("method",),
+)
+_flood_wait_seconds = metrics.counter(
+    "userbot_mtproto_flood_wait_seconds_total",
+    "Seconds Telegram asked us to wait per method",
+    ("method",),
+)
+_queue_seconds = metrics.histogram(
+    "userbot_mtproto_queue_seconds",
+    "Time an MTProto call waited for a slot (incl. FloodWait pauses) by method and priority",
+    ("method", "priority"),
+)
+_in_flight = metrics.gauge(
+    "userbot_mtproto_in_flight",
+    "MTProto calls in flight per method",
+    ("method",),
+)
+
+
+class FloodPausedError(Exception):
+    """Raised instead of queueing when the method is paused by FloodWait for longer than max_wait."""
+
+    def __init__(self, method: str, seconds: float) -> None:
+        super().__init__(f"{method} paused by FloodWait for {seconds:.0f}s")
+        self.method = method
+        self.seconds = seconds
+
+
+class _Lane:
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self.flood_until = 0.0
+        self.queue: list[tuple[int, int]] = []
+        self.cond = asyncio.Condition()
+
+
+class MTProtoScheduler:
+    """
+    Runs MTProto calls through per-method lanes. Each lane admits at most `limit` calls at once,
+    highest priority (lowest number) first, FIFO within a priority. A FloodWaitError pauses the
+    whole lane until the wait is over; the call that hit it is queued again (up to
+    MTPROTO_MAX_FLOOD_RETRIES times).
+    """
+
+    def __init__(
+        self,
+        limits: Optional[dict[str, int]] = None,
+        default_limit: int = MTPROTO_DEFAULT_CONCURRENCY,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._limits = dict(MTPROTO_CONCURRENCY if limits is None else limits)
+        self._default_limit = default_limit
+        self._clock = clock
+        self._lanes: dict[str, _Lane] = {}
+        self._seq = itertools.count()
+
+    def _lane(self, method: str) -> _Lane:
+        lane = self._lanes.get(method)
+        if lane is None:
+            lane = _Lane(self._limits.get(method, self._default_limit))
+            self._lanes[method] = lane
+        return lane
+
+    def flood_wait_remaining(self, method: str) -> float:
+        """Seconds until the method's FloodWait pause ends (0 if not paused)."""
+        lane = self._lanes.get(method)
+        return max(0.0, lane.flood_until - self._clock()) if lane else 0.0
+
+    async def _acquire(self, method: str, lane: _Lane, priority: int, max_wait: float) -> None:
+        entry = (priority, next(self._seq))
+        started = time.perf_counter()
+        async with lane.cond:
+            heapq.heappush(lane.queue, entry)
+            try:
+                while True:
+                    pause = lane.flood_until - self._clock()
+                    if pause > max_wait:
+                        raise FloodPausedError(method, pause)
+                    if pause > 0:
+                        try:
+                            await asyncio.wait_for(lane.cond.wait(), timeout=pause)
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+                    if lane.in_flight < lane.limit and lane.queue[0] == entry:
+                        heapq.heappop(lane.queue)
+                        lane.in_flight += 1
+                        # The next entry may already have woken and gone back to sleep while
+                        # it was not the head; a free slot left by this pop is its turn
+                        lane.cond.notify_all()
+                        break
+                    await lane.cond.wait()
+            except BaseException:
+                if entry in lane.queue:
+                    lane.queue.remove(entry)
+                    heapq.heapify(lane.queue)
+                    lane.cond.notify_all()
+                raise
+        _in_flight.set(lane.in_flight, method=method)
+        _queue_seconds.observe(
+            time.perf_counter() - started,
+            method=method,
+            priority=_PRIORITY_NAMES.get(priority, str(priority)),
+        )
+
+    async def _release(self, method: str, lane: _Lane) -> None:
+        async with lane.cond:
+            lane.in_flight -= 1
+            lane.cond.notify_all()
+        _in_flight.set(lane.in_flight, method=method)
+
+    async def _pause(self, method: str, lane: _Lane, seconds: float) -> None:
+        async with lane.cond:
+            lane.flood_until = max(lane.flood_until, self._clock() + seconds)
+            lane.cond.notify_all()
+        _flood_waits.inc(method=method)
+        _flood_wait_seconds.inc(seconds, method=method)
+        log.warning("mtproto_flood_wait", method=method, seconds=seconds)
+
+    async def call(
+        self,
+        method: str,
+        factory: Callable[[], Awaitable[T]],
+        priority: int = PRIORITY_LIVE,
+        max_wait: float = MTPROTO_DEFAULT_MAX_WAIT_SEC,
+    ) -> T:
+        """
+        Run factory() in the method's lane. Raises FloodPausedError if the lane is paused for longer
+        than max_wait, or the FloodWaitError itself after MTPROTO_MAX_FLOOD_RETRIES pauses.
+        """
+        lane = self._lane(method)
+        for flood_retry in range(MTPROTO_MAX_FLOOD_RETRIES + 1):
+            await self._acquire(method, lane, priority, max_wait)
+            try:
+                return await factory()
+            except FloodWaitError as e:
+                await self._pause(method, lane, float(e.seconds))
+                if flood_retry >= MTPROTO_MAX_FLOOD_RETRIES or e.seconds > max_wait:
+                    raise
+            finally:
+                await self._release(method, lane)
+        raise AssertionError("unreachable")
+
+
+_scheduler: Optional[MTProtoScheduler] = None
+
+
+def get_mtproto_scheduler() -> MTProtoScheduler:
+    """Process-wide scheduler (created on first call)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = MTProtoScheduler()
+    return _scheduler
+
+
+def reset_mtproto_scheduler() -> None:
+    """Forget lanes and FloodWait state; used by tests."""
+    global _scheduler
+    _scheduler = None
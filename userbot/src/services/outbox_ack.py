@@ -0,0 +1,72 @@
+"""Two-phase delivery: apply n8n completion callbacks and re-queue executions that never reported back."""
+
+import asyncio
+
+import asyncpg
+import structlog
+
+from src.database.outbox import complete_outbox, get_outbox_created_at, requeue_stale_accepted
+from src.services.outbox_worker import wake_outbox_worker
+from src.services.pipeline import PIPELINE_MODE_N8N, observe_post_e2e
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+OUTBOX_ACK_SWEEP_INTERVAL_SEC = 60
+
+_ack_events = metrics.counter(
+    "userbot_outbox_ack_events_total",
+    "Two-phase delivery events (accepted, completed, failed, timeout, ignored)",
+    ("event",),
+)
+
+
+async def apply_outbox_completion(
+    pool: asyncpg.Pool,
+    outbox_id: int,
+    execution_id: str,
+    ok: bool,
+    error: str = "",
+) -> bool:
+    """Record the outcome reported by n8n. A failure re-queues the row and wakes the worker."""
+    updated = await complete_outbox(pool, outbox_id, execution_id, ok, error)
+    if not updated:
+        _ack_events.inc(event="ignored")
+        log.info("outbox_completion_ignored", outbox_id=outbox_id, execution_id=execution_id)
+        return False
+    if ok:
+        _ack_events.inc(event="completed")
+        log.info("outbox_completed", outbox_id=outbox_id, execution_id=execution_id)
+        observe_post_e2e(PIPELINE_MODE_N8N, await get_outbox_created_at(pool, outbox_id))
+    else:
+        _ack_events.inc(event="failed")
+        log.warning("outbox_execution_failed", outbox_id=outbox_id, execution_id=execution_id, error=error[:200])
+        wake_outbox_worker()
+    return True
+
+
+async def run_outbox_ack_sweeper(
+    pool: asyncpg.Pool,
+    timeout_minutes: int,
+    interval: int = OUTBOX_ACK_SWEEP_INTERVAL_SEC,
+) -> None:
+    """Loop: re-queue accepted rows older than timeout_minutes (lost executions). Runs until cancelled."""
+    while True:
+        try:
+            requeued = await requeue_stale_accepted(pool, timeout_minutes)
+            if requeued:
+                _ack_events.inc(len(requeued), event="timeout")
+                log.warning("outbox_ack_timeout_requeued", count=len(requeued), outbox_ids=requeued[:20])
+                wake_outbox_worker()
+        except asyncio.CancelledError:
+            log.info("outbox_ack_sweeper_stopped")
+            raise
+        except asyncpg.UndefinedColumnError as e:
+            log.warning(
+                "outbox_ack_columns_missing",
+                error=str(e),
+                msg="Apply init_db/migrate_011_outbox_ack.sql",
+            )
+        except Exception as e:
+            log.error("outbox_ack_sweeper_error", error=str(e), exc_info=True)
+        await asyncio.sleep(interval)
@@ -0,0 +1,98 @@
+"""Background compactor: delete (or archive) delivered outbox rows older than the retention window."""
+
+import asyncio
+
+import asyncpg
+import structlog
+
+from src.database.outbox import compact_outbox_batch, get_outbox_table_bytes, vacuum_outbox
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+OUTBOX_COMPACT_INTERVAL_SEC = 3600
+# Pause between delete batches so the compactor never holds locks or I/O for long
+OUTBOX_COMPACT_BATCH_PAUSE_SEC = 0.5
+# VACUUM after a run that removed at least this many rows
+OUTBOX_VACUUM_MIN_ROWS = 1000
+
+_compacted_rows = metrics.counter(
+    "userbot_outbox_compacted_rows_total",
+    "Outbox rows removed by the compactor",
+)
+_compacted_bytes = metrics.counter(
+    "userbot_outbox_compacted_bytes_total",
+    "Row data bytes removed by the outbox compactor",
+)
+_table_bytes = metrics.gauge(
+    "userbot_outbox_table_bytes",
+    "Total size of userbot_outbox incl. indexes after the last compaction run",
+)
+
+
+async def compact_outbox_once(
+    pool: asyncpg.Pool,
+    retention_days: int,
+    batch_size: int = 500,
+    archive: bool = False,
+) -> dict[str, int]:
+    """
+    Run batches until no old terminal rows remain. Returns report:
+    rows, row_bytes, table_bytes_before, table_bytes_after.
+    """
+    size_before = await get_outbox_table_bytes(pool)
+    total_rows = 0
+    total_bytes = 0
+    while True:
+        rows, row_bytes = await compact_outbox_batch(pool, retention_days, batch_size, archive)
+        total_rows += rows
+        total_bytes += row_bytes
+        _compacted_rows.inc(rows)
+        _compacted_bytes.inc(row_bytes)
+        if rows < batch_size:
+            break
+        await asyncio.sleep(OUTBOX_COMPACT_BATCH_PAUSE_SEC)
+    if total_rows >= OUTBOX_VACUUM_MIN_ROWS:
+        try:
+            await vacuum_outbox(pool)
+        except asyncpg.PostgresError as e:
+            log.warning("outbox_vacuum_failed", error=str(e))
+    size_after = await get_outbox_table_bytes(pool)
+    _table_bytes.set(size_after)
+    report = {
+        "rows": total_rows,
+        "row_bytes": total_bytes,
+        "table_bytes_before": size_before,
+        "table_bytes_after": size_after,
+    }
+    if total_rows:
+        log.info("outbox_compacted", archived=archive, retention_days=retention_days, **report)
+    return report
+
+
+async def run_outbox_compactor(
+    pool: asyncpg.Pool,
+    retention_days: int,
+    batch_size: int = 500,
+    archive: bool = False,
+    interval: int = OUTBOX_COMPACT_INTERVAL_SEC,
+) -> None:
+    """Loop: compact once per interval. Runs until cancelled; retention_days <= 0 disables it."""
+    if retention_days <= 0:
+        log.info("outbox_compactor_disabled")
+        return
+    while True:
+        try:
+            await compact_outbox_once(pool, retention_days, batch_size, archive)
+        except asyncio.CancelledError:
+            log.info("outbox_compactor_stopped")
+            raise
+        except asyncpg.UndefinedTableError as e:
+            log.warning(
+                "outbox_compactor_table_missing",
+                error=str(e),
+                msg="Apply init_db/migrate_006_userbot_outbox.sql and migrate_010_outbox_retention.sql",
+            )
+        except Exception as e:
+            log.error("outbox_compactor_error", error=str(e), exc_info=True)
+        await asyncio.sleep(interval)
@@ -0,0 +1,54 @@
+"""Background sampler: outbox depth by status and oldest pending age, cached for /metrics and /readyz."""
+
+import asyncio
+
+import asyncpg
+import structlog
+
+from src.database.outbox import get_outbox_depth
+from src.utils import health, metrics
+
+log = structlog.get_logger()
+
+OUTBOX_DEPTH_SAMPLE_INTERVAL_SEC = 30
+# Statuses always exported (0 when absent) so dashboards see a stable set of series
+OUTBOX_STATUSES = ("pending", "accepted", "sent", "completed", "failed", "expired")
+
+_rows = metrics.gauge(
+    "userbot_outbox_rows",
+    "Outbox rows per status at the last sample",
+    ("status",),
+)
+_oldest_pending = metrics.gauge(
+    "userbot_outbox_oldest_pending_age_seconds",
+    "Age of the oldest pending outbox row at the last sample (0 if none)",
+)
+
+
+async def sample_outbox_depth(pool: asyncpg.Pool) -> dict[str, int]:
+    """Query outbox depth once and publish it as gauges. Returns counts per status."""
+    counts, oldest = await get_outbox_depth(pool)
+    for status in set(OUTBOX_STATUSES) | set(counts):
+        _rows.set(counts.get(status, 0), status=status)
+    _oldest_pending.set(oldest or 0.0)
+    health.mark_outbox_sampled()
+    return counts
+
+
+async def run_outbox_depth_sampler(
+    pool: asyncpg.Pool,
+    interval: float = OUTBOX_DEPTH_SAMPLE_INTERVAL_SEC,
+) -> None:
+    """Loop: sample outbox depth every interval. Runs until cancelled."""
+    while True:
+        try:
+            await sample_outbox_depth(pool)
+        except asyncio.CancelledError:
+            log.info("outbox_depth_sampler_stopped")
+            raise
+        except asyncpg.UndefinedTableError:
+            # No outbox yet: the DB answered, so readiness still holds
+            health.mark_outbox_sampled()
+        except Exception as e:
+            log.warning("outbox_depth_sample_failed", error=str(e))
+        await asyncio.sleep(interval)
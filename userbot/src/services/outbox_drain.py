@@ -0,0 +1,111 @@
+"""Outbox drain policy: keep fresh posts flowing after an outage instead of replaying the backlog oldest-first."""
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import asyncpg
+import structlog
+
+from src.database.outbox import count_pending_outbox, demote_stale_outbox, expire_stale_outbox
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+STALE_POLICY_EXPIRE = "expire"
+STALE_POLICY_DIGEST = "digest"
+STALE_POLICIES = (STALE_POLICY_EXPIRE, STALE_POLICY_DIGEST)
+
+# The stale sweep is an UPDATE over the pending index; no need to run it every worker cycle
+OUTBOX_STALE_SWEEP_INTERVAL_SEC = 60
+
+_decisions = metrics.counter(
+    "userbot_outbox_drain_decisions_total",
+    "Outbox rows affected by the drain policy (expired, digest, newest_first)",
+    ("decision",),
+)
+_backlog = metrics.gauge(
+    "userbot_outbox_backlog",
+    "Pending rows in the normal outbox lane at the last worker cycle",
+)
+
+
+@dataclass
+class DrainPolicy:
+    """
+    max_age_minutes: pending rows older than this are expired or moved to the digest lane
+    (stale_policy); 0 disables the sweep. newest_first_backlog: while the normal lane holds
+    more pending rows than this, the worker claims newest rows first; 0 disables it.
+    """
+
+    max_age_minutes: int = 0
+    stale_policy: str = STALE_POLICY_EXPIRE
+    newest_first_backlog: int = 0
+    clock: Callable[[], float] = time.monotonic
+    _last_sweep: Optional[float] = field(default=None, repr=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_age_minutes > 0 or self.newest_first_backlog > 0
+
+    @property
+    def uses_digest_lane(self) -> bool:
+        return self.max_age_minutes > 0 and self.stale_policy == STALE_POLICY_DIGEST
+
+    async def sweep_stale(self, pool: asyncpg.Pool, force: bool = False) -> list[int]:
+        """Expire or demote rows past max age (at most once per sweep interval). Returns affected ids."""
+        if self.max_age_minutes <= 0:
+            return []
+        now = self.clock()
+        if not force and self._last_sweep is not None and now - self._last_sweep < OUTBOX_STALE_SWEEP_INTERVAL_SEC:
+            return []
+        self._last_sweep = now
+        if self.stale_policy == STALE_POLICY_DIGEST:
+            ids = await demote_stale_outbox(pool, self.max_age_minutes)
+            decision = "digest"
+        else:
+            ids = await expire_stale_outbox(pool, self.max_age_minutes)
+            decision = "expired"
+        if ids:
+            _decisions.inc(len(ids), decision=decision)
+            log.warning(
+                "outbox_stale_drained",
+                decision=decision,
+                rows=len(ids),
+                max_age_minutes=self.max_age_minutes,
+            )
+        return ids
+
+    async def claim_order(self, pool: asyncpg.Pool) -> tuple[bool, Optional[str]]:
+        """
+        Decide the claim order for this cycle. Returns (newest_first, note); the note is written
+        to last_error of rows delivered out of order.
+        """
+        if self.newest_first_backlog <= 0:
+            return False, None
+        backlog = await count_pending_outbox(pool)
+        _backlog.set(backlog)
+        if backlog <= self.newest_first_backlog:
+            return False, None
+        return True, f"newest-first: backlog {backlog} > {self.newest_first_backlog}"
+
+    @staticmethod
+    def record_newest_first(rows: int) -> None:
+        if rows:
+            _decisions.inc(rows, decision="newest_first")
+
+
+def build_drain_policy(
+    max_age_minutes: int = 0,
+    stale_policy: str = STALE_POLICY_EXPIRE,
+    newest_first_backlog: int = 0,
+) -> DrainPolicy:
+    """Build DrainPolicy from config values; raises ValueError on an unknown stale policy."""
+    policy = (stale_policy or STALE_POLICY_EXPIRE).strip().lower()
+    if policy not in STALE_POLICIES:
+        raise ValueError(f"OUTBOX_STALE_POLICY must be one of {', '.join(STALE_POLICIES)}, got {stale_policy!r}")
+    return DrainPolicy(
+        max_age_minutes=max(0, max_age_minutes),
+        stale_policy=policy,
+        newest_first_backlog=max(0, newest_first_backlog),
+    )
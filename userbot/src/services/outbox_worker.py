@@ -1,62 +1,329 @@
-"""Background worker: send pending outbox rows to n8n webhook."""
+"""Background worker: send pending outbox rows to n8n webhook (or process them in the native pipeline)."""
 
 import asyncio
 import time
+from datetime import datetime, timezone
+from typing import Optional
 
 import asyncpg
 import structlog
 
 from src.database.outbox import (
+    OUTBOX_LANE_DIGEST,
+    get_next_outbox_retry_at,
     get_pending_outbox_batch,
+    mark_outbox_accepted,
     mark_outbox_sent,
     mark_outbox_failed,
+    note_outbox_rows,
 )
-from src.services.webhook_sender import send_to_n8n_webhook
+from src.database.pdf_extractions import get_extractions
+from src.database.pdf_meta import get_pdf_meta
+from src.services.outbox_drain import DrainPolicy
+from src.services.pdf_archive import ensure_hot_pdf
+from src.services.pipeline import NativePipeline
+from src.services.rate_limiter import OutboxPacer, build_outbox_pacer
+from src.services.summary_policy import SummaryPolicy
+from src.services.webhook_sender import (
+    N8N_ENDPOINT,
+    send_bulk_to_n8n_webhook,
+    send_to_n8n_webhook,
+    send_to_n8n_webhook_ack,
+)
+from src.utils import metrics
+from src.utils.resilience import Endpoint, get_endpoint
 
 log = structlog.get_logger()
 
 OUTBOX_POLL_INTERVAL_SEC = 30
 OUTBOX_TABLE_MISSING_LOG_INTERVAL_SEC = 300  # remind once per 5 min
 
+_ack_events = metrics.counter(
+    "userbot_outbox_ack_events_total",
+    "Two-phase delivery events (accepted, completed, failed, timeout, ignored)",
+    ("event",),
+)
+
+_webhook_seconds = metrics.histogram(
+    "userbot_webhook_seconds",
+    "n8n webhook call latency incl. retries by mode (single, ack, bulk) and outcome (ok, failed)",
+    ("mode", "outcome"),
+)
+
+# Set by the new-post handler after insert so the worker does not wait for the poll interval
+_wakeup = asyncio.Event()
+
+
+def wake_outbox_worker() -> None:
+    """Signal the worker that a new row is pending."""
+    _wakeup.set()
+
+
+async def _sleep_until_wakeup(timeout: float) -> None:
+    """Sleep up to timeout seconds; return early if wake_outbox_worker() is called."""
+    if timeout <= 0:
+        return
+    try:
+        await asyncio.wait_for(_wakeup.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    _wakeup.clear()
+
+
+async def _next_sleep_seconds(pool: asyncpg.Pool, token_wait: Optional[float]) -> float:
+    """Sleep until the next token, the next due retry or the poll interval, whichever is first."""
+    sleep_sec = float(OUTBOX_POLL_INTERVAL_SEC)
+    if token_wait is not None:
+        sleep_sec = min(sleep_sec, token_wait)
+    next_retry_at = await get_next_outbox_retry_at(pool)
+    if next_retry_at is not None:
+        due_in = (next_retry_at - datetime.now(timezone.utc)).total_seconds()
+        sleep_sec = min(sleep_sec, max(due_in, 0.0))
+    return max(sleep_sec, 0.05)
+
+
+async def _deliver_one(pool: asyncpg.Pool, webhook_url: str, row: dict) -> None:
+    """POST one row to n8n and mark it sent or failed."""
+    started = time.perf_counter()
+    ok = await send_to_n8n_webhook(
+        webhook_url,
+        post_text=row.get("post_text") or "",
+        pdf_path=row.get("pdf_path") or "",
+        message_id=row["message_id"],
+        channel_id=row["channel_id"],
+        source_channel=row.get("source_channel") or row["channel_id"],
+        extracted_text=row.get("extracted_text") or "",
+        summary=row.get("summary") or "",
+        summary_policy=row.get("summary_policy"),
+        pdf_meta=row.get("pdf_meta"),
+    )
+    _webhook_seconds.observe(time.perf_counter() - started, mode="single", outcome="ok" if ok else "failed")
+    if ok:
+        await mark_outbox_sent(pool, row["id"])
+        log.info("outbox_sent", outbox_id=row["id"], message_id=row["message_id"])
+    else:
+        await mark_outbox_failed(
+            pool,
+            row["id"],
+            error="webhook returned False or all retries failed",
+            attempts=(row.get("attempts") or 0) + 1,
+        )
+
+
+async def _deliver_one_ack(pool: asyncpg.Pool, webhook_url: str, callback_url: str, row: dict) -> None:
+    """POST one row in two-phase mode: on ack mark it accepted; the outcome arrives via callback."""
+    started = time.perf_counter()
+    accepted, execution_id, error = await send_to_n8n_webhook_ack(
+        webhook_url,
+        outbox_id=row["id"],
+        callback_url=callback_url,
+        post_text=row.get("post_text") or "",
+        pdf_path=row.get("pdf_path") or "",
+        message_id=row["message_id"],
+        channel_id=row["channel_id"],
+        source_channel=row.get("source_channel") or row["channel_id"],
+        extracted_text=row.get("extracted_text") or "",
+        summary=row.get("summary") or "",
+        summary_policy=row.get("summary_policy"),
+        pdf_meta=row.get("pdf_meta"),
+    )
+    _webhook_seconds.observe(time.perf_counter() - started, mode="ack", outcome="ok" if accepted else "failed")
+    if accepted:
+        await mark_outbox_accepted(pool, row["id"], execution_id)
+        _ack_events.inc(event="accepted")
+        log.info("outbox_accepted", outbox_id=row["id"], message_id=row["message_id"], execution_id=execution_id)
+    else:
+        await mark_outbox_failed(
+            pool,
+            row["id"],
+            error=error,
+            attempts=(row.get("attempts") or 0) + 1,
+        )
+
+
+async def _deliver_bulk(
+    pool: asyncpg.Pool,
+    bulk_webhook_url: str,
+    batch: list[dict],
+) -> None:
+    """POST batch in one request to the bulk workflow and mark each outbox row by its own result."""
+    started = time.perf_counter()
+    results = await send_bulk_to_n8n_webhook(bulk_webhook_url, batch)
+    ok_any = any(ok for ok, _ in results.values())
+    _webhook_seconds.observe(time.perf_counter() - started, mode="bulk", outcome="ok" if ok_any else "failed")
+    for row in batch:
+        ok, error = results.get(row["id"], (False, "no result for item in bulk response"))
+        if ok:
+            await mark_outbox_sent(pool, row["id"])
+            log.info("outbox_sent", outbox_id=row["id"], message_id=row["message_id"], bulk=True)
+        else:
+            await mark_outbox_failed(
+                pool,
+                row["id"],
+                error=error,
+                attempts=(row.get("attempts") or 0) + 1,
+            )
+
+
+async def _deliver_ready(
+    pool: asyncpg.Pool,
+    n8n: Endpoint,
+    rows: list[dict],
+    webhook_url: str,
+    bulk_url: str = "",
+    callback_url: str = "",
+) -> int:
+    """
+    Send rows to n8n: in one bulk request, or one by one (two-phase with callback_url). The n8n
+    circuit is checked before each request, so when it opens partway through a batch the
+    remaining rows stay pending with their attempts untouched. Returns the number of rows sent.
+    """
+    if bulk_url:
+        if n8n.breaker.retry_after() > 0:
+            log.info("outbox_batch_paused_circuit_open", remaining=len(rows))
+            return 0
+        await _deliver_bulk(pool, bulk_url, rows)
+        return len(rows)
+    for sent, row in enumerate(rows):
+        if n8n.breaker.retry_after() > 0:
+            log.info("outbox_batch_paused_circuit_open", remaining=len(rows) - sent)
+            return sent
+        if callback_url:
+            await _deliver_one_ack(pool, webhook_url, callback_url, row)
+        else:
+            await _deliver_one(pool, webhook_url, row)
+    return len(rows)
+
+
+async def _process_native(pool: asyncpg.Pool, pipeline: NativePipeline, batch: list[dict]) -> None:
+    """Run batch through the native pipeline and mark each row by its own result."""
+    results = await pipeline.process(batch)
+    for row in batch:
+        ok, error = results.get(row["id"], (False, "no result from pipeline"))
+        if ok:
+            await mark_outbox_sent(pool, row["id"])
+            log.info("outbox_processed", outbox_id=row["id"], message_id=row["message_id"])
+        else:
+            await mark_outbox_failed(
+                pool,
+                row["id"],
+                error=error,
+                attempts=(row.get("attempts") or 0) + 1,
+            )
+
+
+async def _take_paced(pacer: OutboxPacer, batch: list[dict]) -> tuple[list[dict], Optional[float]]:
+    """Split batch into rows that got a token now and the soonest wait among throttled rows."""
+    ready: list[dict] = []
+    token_wait: Optional[float] = None
+    for row in batch:
+        wait = await pacer.acquire(row.get("source_channel") or row["channel_id"])
+        if wait > 0:
+            token_wait = wait if token_wait is None else min(token_wait, wait)
+            continue
+        ready.append(row)
+    return ready, token_wait
+
+
+async def _attach_extracted_text(pool: asyncpg.Pool, rows: list[dict]) -> None:
+    """
+    Add extracted_text and total_pages (from pdf_extractions) to rows with a PDF so n8n can skip
+    extraction, and pdf_meta (probe result) so unreadable PDFs skip it too.
+    """
+    paths = [row.get("pdf_path") or "" for row in rows]
+    for path in paths:
+        # Replayed rows may point at PDFs moved to the cold archive since; n8n reads the file
+        await ensure_hot_pdf(path)
+    extractions = await get_extractions(pool, paths)
+    meta = await get_pdf_meta(pool, paths)
+    for row in rows:
+        path = row.get("pdf_path") or ""
+        text, total_pages = extractions.get(path, ("", 0))
+        if text:
+            row["extracted_text"] = text
+            row["total_pages"] = total_pages
+        if path in meta:
+            row["pdf_meta"] = meta[path]
+
 
 async def run_outbox_worker(
     pool: asyncpg.Pool,
     webhook_url: str,
     buffer_minutes: int = 0,
+    bulk_webhook_url: str | None = None,
+    bulk_size: int = 10,
+    pacer: Optional[OutboxPacer] = None,
+    ack_callback_url: Optional[str] = None,
+    drain: Optional[DrainPolicy] = None,
+    pipeline: Optional[NativePipeline] = None,
+    policy: Optional[SummaryPolicy] = None,
 ) -> None:
     """
-    Loop: fetch pending outbox rows, POST to n8n, mark sent or failed with backoff.
+    Loop: fetch pending outbox rows (weighted round robin across source channels, priority
+    sources first), POST to n8n, mark sent or failed with backoff.
     Runs until cancelled. If table userbot_outbox is missing, logs a hint and keeps running.
-    If buffer_minutes > 0: one post per cycle, then sleep buffer_minutes before next cycle.
+
+    Delivery is paced by a token bucket (pacer); legacy buffer_minutes=N means one post per N
+    minutes. Rows without a token stay pending; the worker sleeps only until the next token,
+    the next due retry, a new row (wake_outbox_worker) or the poll interval.
+    If bulk_webhook_url is set: up to bulk_size rows go in one request to the bulk workflow;
+    per-item results from n8n are mapped back to the individual rows.
+    While the n8n circuit breaker is open the worker does not touch rows; if it opens partway
+    through a batch, the rest of the batch stays pending without spending attempts.
+    If ack_callback_url is set (single-post mode only): n8n acks receipt with an execution id,
+    the row becomes accepted and is completed or re-queued by the callback / ack sweeper.
+    Drain policy (after outages): rows older than its max age are expired or moved to the digest
+    lane, which is served only when the normal lane has nothing due; while the backlog is above
+    its threshold rows are claimed newest first. Each decision is written to the row's last_error.
+    PDF text already extracted by userbot (pdf_extractions) is sent as extracted_text, after the
+    summary policy (rules from SUMMARY_POLICY) has trimmed it or chosen passthrough / a model.
+    If pipeline is set (PIPELINE_MODE=native): up to bulk_size rows are processed in-process
+    (dedupe, summary, posts insert, editor-bot notify) and n8n is not called at all.
     """
     last_table_missing_log = 0.0
-    batch_limit = 1 if buffer_minutes > 0 else 10
+    bulk_url = (bulk_webhook_url or "").strip()
+    callback_url = (ack_callback_url or "").strip()
+    batch_limit = max(1, bulk_size) if bulk_url or pipeline is not None else 10
+    if pacer is None:
+        pacer = build_outbox_pacer(pool, buffer_minutes=buffer_minutes)
+    if policy is None:
+        policy = SummaryPolicy()
+    n8n = get_endpoint(N8N_ENDPOINT)
     while True:
         try:
-            batch = await get_pending_outbox_batch(pool, limit=batch_limit)
-            for row in batch:
-                ok = await send_to_n8n_webhook(
-                    webhook_url,
-                    post_text=row.get("post_text") or "",
-                    pdf_path=row.get("pdf_path") or "",
-                    message_id=row["message_id"],
-                    channel_id=row["channel_id"],
-                    source_channel=row.get("source_channel") or row["channel_id"],
-                )
-                if ok:
-                    await mark_outbox_sent(pool, row["id"])
-                    log.info("outbox_sent", outbox_id=row["id"], message_id=row["message_id"])
-                    if buffer_minutes > 0:
-                        await asyncio.sleep(buffer_minutes * 60)
-                else:
-                    attempts = (row.get("attempts") or 0) + 1
-                    await mark_outbox_failed(
-                        pool,
-                        row["id"],
-                        error="webhook returned False or all retries failed",
-                        attempts=attempts,
-                    )
-            await asyncio.sleep(OUTBOX_POLL_INTERVAL_SEC)
+            _wakeup.clear()
+            circuit_wait = n8n.breaker.retry_after() if pipeline is None else 0.0
+            if circuit_wait > 0:
+                # n8n is down: leave rows pending instead of burning their attempts
+                log.info("outbox_paused_circuit_open", retry_after=round(circuit_wait, 1))
+                await asyncio.sleep(min(circuit_wait, OUTBOX_POLL_INTERVAL_SEC))
+                continue
+            newest_first, order_note = False, None
+            if drain is not None and drain.enabled:
+                await drain.sweep_stale(pool)
+                newest_first, order_note = await drain.claim_order(pool)
+            batch = await get_pending_outbox_batch(pool, limit=batch_limit, newest_first=newest_first)
+            if not batch and drain is not None and drain.uses_digest_lane:
+                batch = await get_pending_outbox_batch(pool, limit=batch_limit, lane=OUTBOX_LANE_DIGEST)
+            ready, token_wait = await _take_paced(pacer, batch)
+            pacer.report_wait(token_wait)
+            if order_note and ready:
+                await note_outbox_rows(pool, [row["id"] for row in ready], order_note)
+                drain.record_newest_first(len(ready))
+            if ready:
+                await _attach_extracted_text(pool, ready)
+                if pipeline is None:
+                    # The native pipeline applies the policy itself, after its own extraction
+                    for row in ready:
+                        policy.apply(row)
+            if pipeline is not None:
+                if ready:
+                    await _process_native(pool, pipeline, ready)
+            elif ready:
+                await _deliver_ready(pool, n8n, ready, webhook_url, bulk_url, callback_url)
+            if ready and len(batch) >= batch_limit:
+                continue  # backlog: next batch right away
+            await _sleep_until_wakeup(await _next_sleep_seconds(pool, token_wait))
         except asyncio.CancelledError:
             log.info("outbox_worker_stopped")
             raise
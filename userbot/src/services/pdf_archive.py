@@ -0,0 +1,338 @@
+"""
+Cold archive of the PDF volume: PDFs older than N days that nothing on the hot path needs (no
+pending or accepted outbox row, no post that may still upload them) are appended, zlib-compressed, to
+append-only segment files in PDF_ARCHIVE_PATH and removed from /data/pdfs. pdf_archive keeps
+the segment, offset and length of each file, so a restore is one mmap read of a byte range,
+written back to the original path (re-publish, re-summarize) and registered in pdf_files again.
+
+Segment entry: PDFA | path length (u16) | data length (u64) | path (utf-8) | data. The header
+makes segments readable without the database; the index points straight at the data.
+"""
+
+import asyncio
+import hashlib
+import mmap
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import asyncpg
+import structlog
+
+from src.database.pdf_archive import get_archivable, get_archive_entries, save_archive_entries
+from src.database.pdf_files import forget_pdf_files, register_pdf_file
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+PDF_ARCHIVE_SEGMENT_PREFIX = "seg-"
+PDF_ARCHIVE_SEGMENT_SUFFIX = ".pdfa"
+PDF_ARCHIVE_ENTRY_MAGIC = b"PDFA"
+PDF_ARCHIVE_BATCH_SIZE = 200
+PDF_ARCHIVE_ZLIB_LEVEL = 6
+# editor-bot's optimized upload variant; it is dropped with its original and rebuilt on demand
+PDF_OPTIMIZED_SUFFIX = ".opt.pdf"
+CODEC_ZLIB = "zlib"
+CODEC_NONE = "none"
+
+_HEADER = struct.Struct(">4sHQ")
+
+_archived_files = metrics.counter(
+    "userbot_pdf_archive_files_total",
+    "PDFs moved from the hot volume to the archive",
+)
+_archived_bytes = metrics.counter(
+    "userbot_pdf_archive_bytes_total",
+    "Bytes of archived PDFs by kind (original: removed from the hot volume, stored: written to segments)",
+    ("kind",),
+)
+_restores = metrics.counter(
+    "userbot_pdf_restore_total",
+    "PDF restore requests by result (restored, hot, not_archived, failed)",
+    ("result",),
+)
+_restore_seconds = metrics.histogram(
+    "userbot_pdf_restore_seconds",
+    "Time to copy an archived PDF back to the hot volume",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+
+@dataclass
+class ArchiveReport:
+    scanned: int = 0
+    archived: int = 0
+    original_bytes: int = 0
+    stored_bytes: int = 0
+    seconds: float = 0.0
+
+
+def _segment_name(number: int) -> str:
+    return f"{PDF_ARCHIVE_SEGMENT_PREFIX}{number:06d}{PDF_ARCHIVE_SEGMENT_SUFFIX}"
+
+
+def _segment_number(name: str) -> Optional[int]:
+    if not (name.startswith(PDF_ARCHIVE_SEGMENT_PREFIX) and name.endswith(PDF_ARCHIVE_SEGMENT_SUFFIX)):
+        return None
+    digits = name[len(PDF_ARCHIVE_SEGMENT_PREFIX) : -len(PDF_ARCHIVE_SEGMENT_SUFFIX)]
+    return int(digits) if digits.isdigit() else None
+
+
+def _compress(data: bytes) -> tuple[str, bytes]:
+    """zlib unless it does not shrink the file (most PDF streams are compressed already)."""
+    packed = zlib.compress(data, PDF_ARCHIVE_ZLIB_LEVEL)
+    if len(packed) < len(data):
+        return CODEC_ZLIB, packed
+    return CODEC_NONE, data
+
+
+class SegmentWriter:
+    """Appends entries to the newest segment, starting a new one past max_bytes. Not thread-safe."""
+
+    def __init__(self, archive_dir: str, max_bytes: int) -> None:
+        self.archive_dir = archive_dir
+        self.max_bytes = max(1, max_bytes)
+
+    def _open_segment(self):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        numbers = [n for n in map(_segment_number, os.listdir(self.archive_dir)) if n is not None]
+        number = max(numbers, default=1)
+        name = _segment_name(number)
+        path = os.path.join(self.archive_dir, name)
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+            name = _segment_name(number + 1)
+            path = os.path.join(self.archive_dir, name)
+        return name, open(path, "ab")
+
+    def append_files(self, files: list[str], known: dict[str, str]) -> tuple[list[dict[str, Any]], list[str]]:
+        """
+        Archive files (runs in a thread). known maps path -> sha256 already in the archive: an
+        unchanged file is not written again. Returns the new index rows and every path that is
+        safely in the archive; segments are fsynced before returning.
+        """
+        entries, done = [], []
+        name, f = self._open_segment()
+        try:
+            for path in files:
+                try:
+                    with open(path, "rb") as src:
+                        data = src.read()
+                except OSError as e:
+                    log.warning("pdf_archive_read_failed", pdf_path=path, error=str(e))
+                    continue
+                sha256 = hashlib.sha256(data).hexdigest()
+                if known.get(path) == sha256:
+                    done.append(path)
+                    continue
+                if f.tell() >= self.max_bytes:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    name, f = self._open_segment()
+                codec, packed = _compress(data)
+                encoded = path.encode()
+                f.write(_HEADER.pack(PDF_ARCHIVE_ENTRY_MAGIC, len(encoded), len(packed)) + encoded)
+                offset = f.tell()
+                f.write(packed)
+                entries.append({
+                    "path": path,
+                    "segment": name,
+                    "data_offset": offset,
+                    "data_length": len(packed),
+                    "codec": codec,
+                    "size_bytes": len(data),
+                    "sha256": sha256,
+                })
+                done.append(path)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        return entries, done
+
+
+def read_archived(archive_dir: str, entry: dict[str, Any]) -> bytes:
+    """Content of an archived PDF: one mmap slice of its segment, decompressed and checked."""
+    with open(os.path.join(archive_dir, entry["segment"]), "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = entry["data_offset"]
+            data = mm[start : start + entry["data_length"]]
+    if entry["codec"] == CODEC_ZLIB:
+        data = zlib.decompress(data)
+    if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+        raise ValueError("archived PDF does not match its sha256")
+    return data
+
+
+def _list_cold(base: str, older_than: float) -> list[tuple[str, int]]:
+    """Originals (path, size) under base last modified before older_than."""
+    found = []
+    for root, _, files in os.walk(base):
+        for name in files:
+            if not name.lower().endswith(".pdf") or name.endswith(PDF_OPTIMIZED_SUFFIX):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_mtime < older_than:
+                found.append((path, st.st_size))
+    found.sort()
+    return found
+
+
+def _remove_hot(path: str) -> None:
+    for victim in (path, os.path.splitext(path)[0] + PDF_OPTIMIZED_SUFFIX):
+        try:
+            os.remove(victim)
+        except FileNotFoundError:
+            pass
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".restore"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class PdfArchive:
+    """Archive passes over the hot volume and restores of single files."""
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        storage_path: str,
+        archive_dir: str,
+        after_days: float = 0,
+        segment_max_bytes: int = 1024 * 1024 * 1024,
+    ) -> None:
+        self.pool = pool
+        self.storage_path = storage_path
+        self.archive_dir = archive_dir
+        self.after_days = after_days
+        self.writer = SegmentWriter(archive_dir, segment_max_bytes)
+        self._restore_lock = asyncio.Lock()
+
+    async def archive_once(self) -> ArchiveReport:
+        """
+        Move cold files to the archive in batches: segments are written and fsynced, then the
+        index rows saved, and only then the hot copies (and pdf_files rows) removed.
+        """
+        started = time.perf_counter()
+        report = ArchiveReport()
+        cold = await asyncio.to_thread(_list_cold, self.storage_path, time.time() - self.after_days * 86400)
+        sizes = dict(cold)
+        for start in range(0, len(cold), PDF_ARCHIVE_BATCH_SIZE):
+            paths = [path for path, _ in cold[start : start + PDF_ARCHIVE_BATCH_SIZE]]
+            report.scanned += len(paths)
+            archivable = await get_archivable(self.pool, paths)
+            if not archivable:
+                continue
+            known = {path: row["sha256"] for path, row in (await get_archive_entries(self.pool, archivable)).items()}
+            entries, done = await asyncio.to_thread(self.writer.append_files, archivable, known)
+            await save_archive_entries(self.pool, entries)
+            try:
+                await forget_pdf_files(self.pool, done)
+            except asyncpg.UndefinedTableError:
+                pass
+            for path in done:
+                _remove_hot(path)
+            stored = sum(entry["data_length"] for entry in entries)
+            original = sum(sizes.get(path, 0) for path in done)
+            report.archived += len(done)
+            report.original_bytes += original
+            report.stored_bytes += stored
+            _archived_files.inc(len(done))
+            _archived_bytes.inc(original, kind="original")
+            _archived_bytes.inc(stored, kind="stored")
+        report.seconds = time.perf_counter() - started
+        log.info(
+            "pdf_archive_done",
+            scanned=report.scanned,
+            archived=report.archived,
+            original_bytes=report.original_bytes,
+            stored_bytes=report.stored_bytes,
+            seconds=round(report.seconds, 1),
+        )
+        return report
+
+    async def restore(self, pdf_path: str) -> str:
+        """
+        Copy an archived PDF back to its path. Returns "hot" (file is there), "restored" or
+        "not_archived"; raises if the archive copy cannot be read.
+        """
+        started = time.perf_counter()
+        async with self._restore_lock:
+            if os.path.isfile(pdf_path):
+                result = "hot"
+            else:
+                entry = (await get_archive_entries(self.pool, [pdf_path])).get(pdf_path)
+                if entry is None:
+                    result = "not_archived"
+                else:
+                    try:
+                        data = await asyncio.to_thread(read_archived, self.archive_dir, entry)
+                        await asyncio.to_thread(_write_atomic, pdf_path, data)
+                    except Exception:
+                        _restores.inc(result="failed")
+                        raise
+                    await register_pdf_file(self.pool, pdf_path, len(data), entry["sha256"])
+                    result = "restored"
+                    _restore_seconds.observe(time.perf_counter() - started)
+        _restores.inc(result=result)
+        log.info("pdf_restore", pdf_path=pdf_path, result=result, seconds=round(time.perf_counter() - started, 4))
+        return result
+
+    async def run(self, interval: float) -> None:
+        """Loop: archive_once every `interval` seconds. Runs until cancelled."""
+        while True:
+            try:
+                await self.archive_once()
+            except asyncio.CancelledError:
+                raise
+            except asyncpg.UndefinedTableError:
+                log.warning(
+                    "pdf_archive_table_missing",
+                    msg="Apply migration: docker compose exec -T postgres psql -U parser_user -d parser_db < init_db/migrate_022_pdf_archive.sql",
+                )
+            except Exception as e:
+                log.error("pdf_archive_failed", error=str(e), exc_info=True)
+            await asyncio.sleep(interval)
+
+
+def build_pdf_archive(
+    pool: asyncpg.Pool,
+    storage_path: str,
+    archive_dir: str,
+    after_days: float,
+    segment_mb: int,
+) -> Optional[PdfArchive]:
+    """Archive from config values; None when archiving is off and there is no archive to restore from."""
+    if after_days <= 0 and not os.path.isdir(archive_dir):
+        return None
+    return PdfArchive(pool, storage_path, archive_dir, after_days, segment_mb * 1024 * 1024)
+
+
+_archive: Optional[PdfArchive] = None
+
+
+def set_pdf_archive(archive: Optional[PdfArchive]) -> None:
+    """Install the process-wide archive used by ensure_hot_pdf (None to uninstall)."""
+    global _archive
+    _archive = archive
+
+
+async def ensure_hot_pdf(pdf_path: str) -> None:
+    """Bring an archived PDF back before it is read; no-op if it is on the volume or there is no archive."""
+    if _archive is None or not pdf_path or os.path.isfile(pdf_path):
+        return
+    try:
+        await _archive.restore(pdf_path)
+    except Exception as e:
+        log.warning("pdf_restore_failed", pdf_path=pdf_path, error=str(e))
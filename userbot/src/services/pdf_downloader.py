@@ -1,13 +1,31 @@
 """Download PDF from Telegram to local storage."""
 
 import asyncio
+import hashlib
+import time
 from pathlib import Path
+from typing import BinaryIO, NamedTuple
 
 import structlog
 from telethon.tl.types import Message, Document, DocumentAttributeFilename
 
+from src.services.mtproto_scheduler import PRIORITY_LIVE, get_mtproto_scheduler
+from src.services.pdf_storage import sharded_path
+from src.utils import metrics
+
 log = structlog.get_logger()
 
+_download_bytes = metrics.counter(
+    "userbot_pdf_download_bytes_total",
+    "Bytes of PDFs downloaded from Telegram",
+)
+_download_seconds = metrics.histogram(
+    "userbot_pdf_download_seconds",
+    "PDF download duration incl. retries by outcome (ok, failed)",
+    ("outcome",),
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+
 # MIME type for PDF
 PDF_MIME = "application/pdf"
 PDF_DOWNLOAD_TIMEOUT_SEC = 180
@@ -15,6 +33,31 @@ PDF_DOWNLOAD_RETRIES = 3
 PDF_DOWNLOAD_RETRY_DELAY_SEC = 5
 
 
+class PdfDownload(NamedTuple):
+    """Saved file and SHA-256 of its content (hashed while the chunks were written)."""
+
+    path: str
+    sha256: str
+
+
+class _HashingWriter:
+    """File-like sink for download_media: writes chunks to the file and feeds them to SHA-256."""
+
+    def __init__(self, f: BinaryIO) -> None:
+        self._f = f
+        self._hash = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        return self._f.write(data)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
 def get_pdf_document(message: Message) -> Document | None:
     """
     Return the first PDF document attached to the message, if any.
@@ -46,6 +89,7 @@ async def download_pdf_to_storage(
     client: "telethon.client.telegramclient.TelegramClient",
     message: Message,
     storage_path: str,
+    priority: int = PRIORITY_LIVE,
 ) -> str | None:
     """
     Download the PDF from the message to storage_path and return the file path.
@@ -54,26 +98,51 @@ async def download_pdf_to_storage(
         client: Telethon client (used to download file).
         message: Message that contains the PDF.
         storage_path: Directory path to save the file (must exist and be writable).
+        priority: MTProto scheduler priority (live ingestion by default, PRIORITY_BACKFILL for catch-up).
 
     Returns:
         Full path to the saved file (str), or None if no PDF or download failed.
     """
+    downloaded = await download_pdf(client, message, storage_path, priority)
+    return downloaded.path if downloaded else None
+
+
+async def _download_hashed(client, message: Message, file_path: Path) -> str:
+    """Stream the document into file_path; returns SHA-256 of the written bytes."""
+    with open(file_path, "wb") as f:
+        writer = _HashingWriter(f)
+        result = await client.download_media(message.media, file=writer)
+    if result is None:
+        file_path.unlink(missing_ok=True)
+        raise RuntimeError("message media has no downloadable document")
+    return writer.hexdigest()
+
+
+async def download_pdf(
+    client: "telethon.client.telegramclient.TelegramClient",
+    message: Message,
+    storage_path: str,
+    priority: int = PRIORITY_LIVE,
+) -> PdfDownload | None:
+    """
+    Same as download_pdf_to_storage, but also returns the SHA-256 of the file, computed from the
+    downloaded chunks (the file is not read again).
+    """
     doc = get_pdf_document(message)
     if not doc:
         return None
 
-    base_dir = Path(storage_path)
-    base_dir.mkdir(parents=True, exist_ok=True)
-
-    # Unique filename: channel_message_id.pdf
+    # Unique filename: channel_message_id.pdf, in its hashed subdirectory (see pdf_storage)
     chat_id = getattr(message.peer_id, "channel_id", None) or getattr(
         message.peer_id, "chat_id", None
     )
     if chat_id is None:
         chat_id = 0
     safe_name = f"{chat_id}_{message.id}.pdf"
-    file_path = base_dir / safe_name
+    file_path = Path(sharded_path(storage_path, safe_name))
+    file_path.parent.mkdir(parents=True, exist_ok=True)
 
+    started = time.perf_counter()
     last_error: Exception | None = None
     for attempt in range(PDF_DOWNLOAD_RETRIES):
         if attempt > 0:
@@ -85,13 +154,19 @@ async def download_pdf_to_storage(
             )
             await asyncio.sleep(PDF_DOWNLOAD_RETRY_DELAY_SEC)
         try:
-            await asyncio.wait_for(
-                client.download_media(message.media, file=str(file_path)),
-                timeout=PDF_DOWNLOAD_TIMEOUT_SEC,
+            sha256 = await get_mtproto_scheduler().call(
+                "download_media",
+                lambda: asyncio.wait_for(
+                    _download_hashed(client, message, file_path),
+                    timeout=PDF_DOWNLOAD_TIMEOUT_SEC,
+                ),
+                priority,
             )
             if file_path.is_file():
-                log.info("pdf_downloaded", path=str(file_path), message_id=message.id)
-                return str(file_path)
+                _download_bytes.inc(file_path.stat().st_size)
+                _download_seconds.observe(time.perf_counter() - started, outcome="ok")
+                log.info("pdf_downloaded", path=str(file_path), message_id=message.id, sha256=sha256)
+                return PdfDownload(str(file_path), sha256)
         except asyncio.TimeoutError as e:
             last_error = e
             log.warning(
@@ -108,6 +183,7 @@ async def download_pdf_to_storage(
                 attempt=attempt + 1,
                 error=str(e),
             )
+    _download_seconds.observe(time.perf_counter() - started, outcome="failed")
     log.error(
         "pdf_download_failed",
         message_id=message.id,
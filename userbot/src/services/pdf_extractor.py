@@ -0,0 +1,308 @@
+"""PDF text extraction in a process pool: page by page from a memory-mapped file, with page/char caps."""
+
+import asyncio
+import mmap
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import cached_property
+from importlib import metadata
+from typing import Any, Callable, Optional, TypeVar
+
+import structlog
+
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+T = TypeVar("T")
+
+PDF_EXTRACT_DEFAULT_WORKERS = 2
+PDF_EXTRACT_DEFAULT_MAX_PAGES = 50
+PDF_EXTRACT_DEFAULT_MAX_CHARS = 100_000
+# The worker process cannot be interrupted; past this the handler stops waiting and the post
+# goes out without text (n8n extracts it as before)
+PDF_EXTRACT_TIMEOUT_SEC = 120
+# Bump when extract_pdf_text output changes, so cached results of the old code stop matching
+PDF_EXTRACTOR_REVISION = 2
+# Between pages of the extracted text (form feed, as pdftotext); the summary policy splits on it
+PDF_PAGE_BREAK = "\f"
+
+_extract_seconds = metrics.histogram(
+    "userbot_pdf_extract_seconds",
+    "PDF text extraction time per document by outcome (ok, truncated, failed, timeout)",
+    ("outcome",),
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+_extract_pages = metrics.counter(
+    "userbot_pdf_extract_pages_total",
+    "PDF pages whose text was extracted",
+)
+_pages_per_second = metrics.gauge(
+    "userbot_pdf_extract_pages_per_second",
+    "Extraction throughput of the last document (pages/sec, in-worker time)",
+)
+_keyword_scans = metrics.counter(
+    "userbot_pdf_keyword_scan_total",
+    "PDF keyword scans by result (match, no_match, failed)",
+    ("result",),
+)
+_keyword_scan_pages = metrics.histogram(
+    "userbot_pdf_keyword_scan_pages",
+    "Pages read by a PDF keyword scan before the first match or the page budget",
+    buckets=(1, 2, 3, 5, 10, 20, 50),
+)
+
+
+@dataclass
+class PdfExtraction:
+    """Result of one document; text is empty and error set if extraction failed."""
+
+    text: str = ""
+    pages: int = 0
+    total_pages: int = 0
+    truncated: bool = False
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def outcome(self) -> str:
+        if self.error:
+            return "failed"
+        return "truncated" if self.truncated else "ok"
+
+
+def extract_pdf_text(path: str, max_pages: int, max_chars: int) -> PdfExtraction:
+    """
+    Extract text of the first max_pages pages, stopping once max_chars characters are collected.
+    Pages are joined with PDF_PAGE_BREAK (empty pages included); no text at all gives "".
+    Runs in a pool worker: the file is memory-mapped (pages are read by pypdf on demand, not
+    copied into the process) and only the capped text travels back to the event loop.
+    """
+    from pypdf import PdfReader
+
+    started = time.perf_counter()
+    result = PdfExtraction()
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            reader = PdfReader(mm)
+            result.total_pages = len(reader.pages)
+            parts: list[str] = []
+            chars = 0
+            for index in range(result.total_pages):
+                if index >= max_pages or chars >= max_chars:
+                    result.truncated = True
+                    break
+                try:
+                    page_text = reader.pages[index].extract_text() or ""
+                except Exception as e:
+                    # One broken page should not lose the rest of the document
+                    page_text = ""
+                    log.warning("pdf_extract_page_failed", path=path, page=index + 1, error=str(e))
+                page_text = page_text.replace("\x00", "").strip()
+                result.pages += 1
+                # Empty pages stay as empty slots so page numbers survive the join
+                parts.append(page_text)
+                chars += len(page_text) + len(PDF_PAGE_BREAK)
+            text = PDF_PAGE_BREAK.join(parts) if any(parts) else ""
+            if len(text) > max_chars:
+                text = text[:max_chars]
+                result.truncated = True
+            result.text = text
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"[:500]
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+@dataclass
+class PdfKeywordScan:
+    """Result of a keyword scan: the first keyword found (None if none) and pages read."""
+
+    keyword: Optional[str] = None
+    pages: int = 0
+    total_pages: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def outcome(self) -> str:
+        if self.error:
+            return "failed"
+        return "match" if self.keyword else "no_match"
+
+
+def scan_pdf_keywords(path: str, pattern: re.Pattern, overlap: int, max_pages: int) -> PdfKeywordScan:
+    """
+    Search the first max_pages pages for pattern (lowercase keywords), stopping at the first
+    match, so a relevant document usually costs a page or two of extraction. The last `overlap`
+    characters of a page are kept in front of the next one to catch a keyword split by the break:
+    joined with a space (a phrase split between words) and without one (a word split mid-word,
+    trailing hyphen dropped). Runs in a pool worker, like extract_pdf_text.
+    """
+    from pypdf import PdfReader
+
+    started = time.perf_counter()
+    result = PdfKeywordScan()
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            reader = PdfReader(mm)
+            result.total_pages = len(reader.pages)
+            tail = ""
+            for index in range(min(result.total_pages, max_pages)):
+                try:
+                    page_text = reader.pages[index].extract_text() or ""
+                except Exception:
+                    page_text = ""
+                result.pages += 1
+                page_text = page_text.replace("\x00", "").lower()
+                text = tail + " " + page_text
+                match = pattern.search(text)
+                if match is None and tail:
+                    match = pattern.search(tail.rstrip().rstrip("-\u00ad") + page_text.lstrip()[:overlap])
+                if match:
+                    result.keyword = match.group(0)
+                    break
+                tail = text[-overlap:] if overlap > 0 else ""
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"[:500]
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+class PdfExtractionPool:
+    """
+    Runs extract_pdf_text in a ProcessPoolExecutor so extraction uses all cores and never blocks
+    the Telethon event loop. Workers are started with spawn (the parent runs threads and an
+    event loop, which fork does not copy safely). A crashed worker breaks the executor; it is
+    replaced on the next call.
+    """
+
+    def __init__(
+        self,
+        workers: int = PDF_EXTRACT_DEFAULT_WORKERS,
+        max_pages: int = PDF_EXTRACT_DEFAULT_MAX_PAGES,
+        max_chars: int = PDF_EXTRACT_DEFAULT_MAX_CHARS,
+        timeout: float = PDF_EXTRACT_TIMEOUT_SEC,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_pages = max(1, max_pages)
+        self.max_chars = max(1, max_chars)
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @cached_property
+    def version(self) -> str:
+        """Identifies the output of this pool: pypdf version, caps and extraction code revision."""
+        try:
+            pypdf_version = metadata.version("pypdf")
+        except metadata.PackageNotFoundError:
+            pypdf_version = "unknown"
+        return f"pypdf-{pypdf_version}/r{PDF_EXTRACTOR_REVISION}/p{self.max_pages}/c{self.max_chars}"
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _discard_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def extract(self, path: str) -> PdfExtraction:
+        """Extract text of the PDF at path; errors are returned in PdfExtraction.error, not raised."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), extract_pdf_text, path, self.max_pages, self.max_chars),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            _extract_seconds.observe(time.perf_counter() - started, outcome="timeout")
+            log.warning("pdf_extract_timeout", path=path, timeout=self.timeout)
+            return PdfExtraction(error=f"timeout after {self.timeout:.0f}s", seconds=time.perf_counter() - started)
+        except BrokenProcessPool as e:
+            self._discard_executor()
+            _extract_seconds.observe(time.perf_counter() - started, outcome="failed")
+            log.error("pdf_extract_pool_broken", path=path, error=str(e))
+            return PdfExtraction(error="extraction worker crashed", seconds=time.perf_counter() - started)
+        _extract_seconds.observe(time.perf_counter() - started, outcome=result.outcome)
+        if result.error:
+            log.warning("pdf_extract_failed", path=path, error=result.error)
+            return result
+        _extract_pages.inc(result.pages)
+        if result.seconds > 0:
+            _pages_per_second.set(result.pages / result.seconds)
+        log.info(
+            "pdf_extracted",
+            path=path,
+            pages=result.pages,
+            total_pages=result.total_pages,
+            chars=len(result.text),
+            truncated=result.truncated,
+            seconds=round(result.seconds, 3),
+        )
+        return result
+
+    async def run(self, fn: Callable[..., T], *args: Any, timeout: Optional[float] = None) -> T:
+        """
+        Run fn(*args) in a pool worker (fn must be importable by the worker). Raises
+        asyncio.TimeoutError past timeout (default self.timeout) and BrokenProcessPool if the
+        worker died; the broken executor is replaced on the next call.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), fn, *args),
+                timeout=self.timeout if timeout is None else timeout,
+            )
+        except BrokenProcessPool:
+            self._discard_executor()
+            raise
+
+    async def scan_keywords(self, path: str, pattern: re.Pattern, overlap: int, max_pages: int) -> PdfKeywordScan:
+        """Run scan_pdf_keywords in the pool; errors are returned in PdfKeywordScan.error, not raised."""
+        started = time.perf_counter()
+        try:
+            result = await self.run(scan_pdf_keywords, path, pattern, overlap, max_pages)
+        except asyncio.TimeoutError:
+            result = PdfKeywordScan(error=f"timeout after {self.timeout:.0f}s")
+        except BrokenProcessPool:
+            result = PdfKeywordScan(error="extraction worker crashed")
+        result.seconds = time.perf_counter() - started
+        _keyword_scans.inc(result=result.outcome)
+        if result.error:
+            log.warning("pdf_keyword_scan_failed", path=path, error=result.error)
+            return result
+        _keyword_scan_pages.observe(result.pages)
+        log.info(
+            "pdf_keyword_scan",
+            path=path,
+            keyword=result.keyword,
+            pages=result.pages,
+            total_pages=result.total_pages,
+            seconds=round(result.seconds, 3),
+        )
+        return result
+
+    def shutdown(self) -> None:
+        self._discard_executor()
+
+
+def build_pdf_extraction_pool(
+    workers: int = PDF_EXTRACT_DEFAULT_WORKERS,
+    max_pages: int = PDF_EXTRACT_DEFAULT_MAX_PAGES,
+    max_chars: int = PDF_EXTRACT_DEFAULT_MAX_CHARS,
+) -> Optional[PdfExtractionPool]:
+    """Pool from config values; None when workers is 0 (text is extracted by n8n)."""
+    if workers <= 0:
+        return None
+    return PdfExtractionPool(workers=workers, max_pages=max_pages, max_chars=max_chars)
@@ -0,0 +1,240 @@
+"""PDF probe at download time: page count, encryption, text layer and producer, before any extraction."""
+
+import asyncio
+import mmap
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TypeVar
+
+import structlog
+
+from src.utils import metrics
+
+T = TypeVar("T")
+
+log = structlog.get_logger()
+
+PDF_STATUS_OK = "ok"
+PDF_STATUS_ENCRYPTED = "encrypted"
+PDF_STATUS_NO_TEXT = "no_text"
+PDF_STATUS_CORRUPT = "corrupt"
+# The probe did not finish in time: nothing is known, the PDF is treated as readable
+PDF_STATUS_UNKNOWN = "unknown"
+# Statuses that send the post down the text-only path: extracting the PDF cannot give text
+PDF_UNREADABLE_STATUSES = (PDF_STATUS_ENCRYPTED, PDF_STATUS_NO_TEXT, PDF_STATUS_CORRUPT)
+# Pages looked at for a text layer: the first ones plus pages spread over the rest of the document,
+# so image-only cover pages do not make a report look scanned
+PDF_PROBE_TEXT_PAGES = 3
+PDF_PROBE_SAMPLE_PAGES = 5
+# Whole wait for a probe, time in the queue included; past it the probe is unknown
+PDF_PROBE_TIMEOUT_SEC = 30
+# Probes run in their own small process pool (PdfProbePool), not behind extraction jobs
+PDF_PROBE_WORKERS = 2
+
+_probes = metrics.counter(
+    "userbot_pdf_probe_total",
+    "PDF probes at download time by status (ok, encrypted, no_text, corrupt, unknown)",
+    ("status",),
+)
+_probe_seconds = metrics.histogram(
+    "userbot_pdf_probe_seconds",
+    "PDF probe time per document",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+@dataclass
+class PdfProbe:
+    """What a PDF is before extraction; status says whether its text can be extracted at all."""
+
+    status: str = PDF_STATUS_OK
+    pages: int = 0
+    encrypted: bool = False
+    has_text: bool = False
+    producer: str = ""
+    title: str = ""
+    pdf_version: str = ""
+    size_bytes: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def readable(self) -> bool:
+        return self.status not in PDF_UNREADABLE_STATUSES
+
+    def as_payload(self) -> dict[str, Any]:
+        """Fields sent with the post so n8n and the native pipeline can route it."""
+        return {
+            "status": self.status,
+            "pages": self.pages,
+            "encrypted": self.encrypted,
+            "has_text": self.has_text,
+            "producer": self.producer,
+            "title": self.title,
+        }
+
+
+def sample_pages(total: int, first: int = PDF_PROBE_TEXT_PAGES, spread: int = PDF_PROBE_SAMPLE_PAGES) -> list[int]:
+    """Page indexes checked for text: the first `first` pages and `spread` evenly spaced ones after them."""
+    pages = list(range(min(total, first)))
+    rest = total - len(pages)
+    if rest > 0 and spread > 0:
+        step = rest / min(rest, spread)
+        pages += sorted({len(pages) + int(i * step) for i in range(min(rest, spread))})
+        if total - 1 not in pages:
+            pages.append(total - 1)
+    return pages
+
+
+def probe_pdf(path: str, text_pages: int = PDF_PROBE_TEXT_PAGES) -> PdfProbe:
+    """
+    Open the PDF and look at it without extracting it: corrupt (cannot be parsed or has no
+    pages), encrypted (a user password is needed; an empty one is tried), no_text (no text on
+    the first text_pages pages nor on pages sampled across the rest, e.g. a scan) or ok.
+    Runs in a probe pool worker; never raises.
+    """
+    from pypdf import PdfReader
+
+    started = time.perf_counter()
+    result = PdfProbe()
+    try:
+        result.size_bytes = os.path.getsize(path)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            reader = PdfReader(mm)
+            result.pdf_version = (reader.pdf_header or "").removeprefix("%PDF-")[:10]
+            if reader.is_encrypted:
+                result.encrypted = True
+                # PasswordType.NOT_DECRYPTED is 0: only an owner password (or none) is set otherwise
+                if not reader.decrypt(""):
+                    result.status = PDF_STATUS_ENCRYPTED
+                    result.seconds = time.perf_counter() - started
+                    return result
+            try:
+                producer = reader.metadata.producer if reader.metadata else None
+                title = reader.metadata.title if reader.metadata else None
+            except Exception:
+                producer = title = None
+            result.producer = str(producer or "").replace("\x00", "").strip()[:200]
+            result.title = str(title or "").replace("\x00", "").strip()[:300]
+            result.pages = len(reader.pages)
+            if result.pages == 0:
+                result.status = PDF_STATUS_CORRUPT
+                result.error = "no pages"
+            else:
+                for index in sample_pages(result.pages, text_pages):
+                    try:
+                        if (reader.pages[index].extract_text() or "").strip():
+                            result.has_text = True
+                            break
+                    except Exception:
+                        continue
+                if not result.has_text:
+                    result.status = PDF_STATUS_NO_TEXT
+    except Exception as e:
+        result.status = PDF_STATUS_CORRUPT
+        result.error = f"{type(e).__name__}: {e}"[:500]
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+class PdfProbePool:
+    """
+    Probes in a small spawn process pool of their own, not behind extraction jobs: pypdf holds
+    the GIL while it parses and can hang on a pathological file, and neither may reach the
+    Telethon process. The whole wait, queue included, is bounded by timeout; a probe that runs
+    past it takes the pool down with it (its workers are terminated) and the next probe starts
+    a fresh one, so a hanging file cannot pin the workers for good.
+    """
+
+    def __init__(self, workers: int = PDF_PROBE_WORKERS, timeout: float = PDF_PROBE_TIMEOUT_SEC) -> None:
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _discard_executor(self, executor: Optional[ProcessPoolExecutor]) -> None:
+        # A job failing late must not take down a pool that replaced its own
+        if executor is None or executor is not self._executor:
+            return
+        self._executor = None
+        # Running workers are not stopped by shutdown(); a hung one would live on
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            if process.is_alive():
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., T], *args: Any, timeout: Optional[float] = None) -> T:
+        """
+        Run fn(*args) in a pool worker (fn must be importable by the worker). Raises
+        asyncio.TimeoutError past timeout and BrokenProcessPool if a worker died (jobs sharing
+        the pool with one that timed out get the latter); either way the executor is replaced
+        on the next call.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, fn, *args),
+                timeout=self.timeout if timeout is None else timeout,
+            )
+        except (asyncio.TimeoutError, BrokenProcessPool):
+            self._discard_executor(executor)
+            raise
+
+    def shutdown(self) -> None:
+        self._discard_executor(self._executor)
+
+
+_pool: Optional[PdfProbePool] = None
+
+
+def get_pdf_probe_pool() -> PdfProbePool:
+    global _pool
+    if _pool is None:
+        _pool = PdfProbePool()
+    return _pool
+
+
+def shutdown_pdf_probe_pool() -> None:
+    """Stop the probe workers (userbot shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+async def run_pdf_probe(path: str) -> PdfProbe:
+    """Probe in the probe pool; a probe that runs out of time (or loses its worker) gives status unknown."""
+    started = time.perf_counter()
+    try:
+        result = await get_pdf_probe_pool().run(probe_pdf, path, timeout=PDF_PROBE_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        # Slow is not broken: the PDF goes on as readable and extraction decides
+        result = PdfProbe(status=PDF_STATUS_UNKNOWN, error=f"probe timeout after {PDF_PROBE_TIMEOUT_SEC}s")
+    except BrokenProcessPool:
+        result = PdfProbe(status=PDF_STATUS_UNKNOWN, error="probe worker crashed")
+    result.seconds = time.perf_counter() - started
+    _probes.inc(status=result.status)
+    _probe_seconds.observe(result.seconds)
+    log.info(
+        "pdf_probed",
+        path=path,
+        status=result.status,
+        pages=result.pages,
+        encrypted=result.encrypted,
+        has_text=result.has_text,
+        producer=result.producer,
+        error=result.error,
+    )
+    return result
@@ -0,0 +1,28 @@
+"""
+PDF volume layout shared with editor-bot: files live in two levels of hashed subdirectories
+(/data/pdfs/ab/cd/<chat>_<msg>.pdf) so no directory grows past a few thousand entries.
+The shard is derived from the file name alone, so any service can compute where a file is.
+"""
+
+import hashlib
+import os
+
+# Two levels of 256 directories each
+PDF_SHARD_LEVELS = 2
+PDF_SHARD_WIDTH = 2
+
+
+def shard_dir(base: str, name: str) -> str:
+    """Directory of file `name` under base, e.g. base/3f/a9."""
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    parts = [digest[i * PDF_SHARD_WIDTH : (i + 1) * PDF_SHARD_WIDTH] for i in range(PDF_SHARD_LEVELS)]
+    return os.path.join(base, *parts)
+
+
+def sharded_path(base: str, name: str) -> str:
+    return os.path.join(shard_dir(base, name), name)
+
+
+def is_sharded_path(base: str, path: str) -> bool:
+    """True if path is exactly where sharded_path(base, basename) puts it (lexical, no filesystem access)."""
+    return os.path.normpath(path) == os.path.normpath(sharded_path(base, os.path.basename(path)))
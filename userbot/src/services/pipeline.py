@@ -0,0 +1,347 @@
+"""
+Native processing pipeline: the outbox worker drives dedupe, prompt, extraction, summary policy,
+LLM summary, posts insert and editor-bot notify in-process instead of handing each post to n8n.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+import asyncpg
+import structlog
+
+from src.database.posts import get_config_value, is_post_in_progress, upsert_processing_post
+from src.services.llm_scheduler import PRIORITY_BACKFILL, PRIORITY_LIVE, PRIORITY_REPROCESS
+from src.services.pdf_archive import ensure_hot_pdf
+from src.services.pdf_extractor import PdfExtractionPool
+from src.services.pdf_probe import PDF_UNREADABLE_STATUSES
+from src.services.summarizer import DEFAULT_SUMMARY_PROMPT, Summarizer
+from src.services.summary_policy import SummaryPolicy
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+PIPELINE_MODE_N8N = "n8n"
+PIPELINE_MODE_NATIVE = "native"
+PIPELINE_MODES = (PIPELINE_MODE_N8N, PIPELINE_MODE_NATIVE)
+
+STAGES = ("dedupe", "prompt", "extract", "policy", "summarize", "insert", "notify")
+# Workers per stage; the LLM stage is the slow one
+PIPELINE_DEFAULT_CONCURRENCY = {
+    "dedupe": 2,
+    "prompt": 1,
+    "extract": 2,
+    "policy": 1,
+    "summarize": 4,
+    "insert": 2,
+    "notify": 1,
+}
+# Jobs waiting in front of each stage; a full queue makes the previous stage wait
+PIPELINE_QUEUE_SIZE = 16
+PROMPT_CACHE_TTL_SEC = 30
+# Same budget as the n8n Notify Editor Bot node (3 attempts, 5 min timeout)
+NOTIFY_MAX_ATTEMPTS = 3
+NOTIFY_TIMEOUT_SEC = 300
+NOTIFY_RETRY_DELAY_SEC = 2.0
+# Posts that waited in the outbox longer than this are summarized as backfill (after live posts)
+PIPELINE_BACKFILL_AGE_SEC = 900
+
+_stage_seconds = metrics.histogram(
+    "userbot_pipeline_stage_seconds",
+    "Native pipeline time per stage and job (excluding queue wait)",
+    ("stage",),
+)
+_stage_jobs = metrics.counter(
+    "userbot_pipeline_jobs_total",
+    "Native pipeline jobs per stage and outcome (ok, skipped, failed)",
+    ("stage", "outcome"),
+)
+_queue_depth = metrics.gauge(
+    "userbot_pipeline_queue_depth",
+    "Jobs waiting in front of a native pipeline stage",
+    ("stage",),
+)
+_e2e_seconds = metrics.histogram(
+    "userbot_post_e2e_seconds",
+    "Outbox row creation to finished processing by mode (native, n8n — two-phase mode only)",
+    ("mode",),
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600),
+)
+
+
+def observe_post_e2e(mode: str, created_at: Optional[datetime]) -> None:
+    """Record end-to-end latency of a post from its outbox created_at."""
+    if created_at is None:
+        return
+    _e2e_seconds.observe((datetime.now(timezone.utc) - created_at).total_seconds(), mode=mode)
+
+
+def llm_priority(row: dict) -> int:
+    """Retried rows are reprocessing, old rows backfill, everything else live."""
+    if (row.get("attempts") or 0) > 0:
+        return PRIORITY_REPROCESS
+    created_at = row.get("created_at")
+    if created_at is not None and (datetime.now(timezone.utc) - created_at).total_seconds() > PIPELINE_BACKFILL_AGE_SEC:
+        return PRIORITY_BACKFILL
+    return PRIORITY_LIVE
+
+
+def parse_stage_concurrency(spec: str) -> dict[str, int]:
+    """'summarize=8,notify=1' -> defaults with overrides; raises ValueError on unknown stages or bad values."""
+    out = dict(PIPELINE_DEFAULT_CONCURRENCY)
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        stage, sep, value = part.partition("=")
+        stage = stage.strip()
+        if not sep or stage not in out:
+            raise ValueError(f"PIPELINE_STAGE_CONCURRENCY: unknown stage in {part!r} (stages: {', '.join(STAGES)})")
+        try:
+            out[stage] = max(1, int(value))
+        except ValueError:
+            raise ValueError(f"PIPELINE_STAGE_CONCURRENCY: bad number in {part!r}") from None
+    return out
+
+
+@dataclass
+class PostJob:
+    row: dict
+    future: asyncio.Future
+    prompt: str = ""
+    text: str = ""
+    summary: str = ""
+    post_id: Optional[int] = None
+    skipped: Optional[str] = None
+
+
+class NativePipeline:
+    """
+    One bounded asyncio.Queue in front of every stage and a fixed number of worker tasks per
+    stage, so a slow LLM call holds back only the summarize stage while other posts are deduped,
+    extracted or notified. process() feeds outbox rows in and returns {outbox_id: (ok, error)};
+    a duplicate post counts as ok (as in the n8n workflow).
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        summarizer: Summarizer,
+        editor_webhook_url: str,
+        editor_webhook_token: str = "",
+        extractor: Optional[PdfExtractionPool] = None,
+        concurrency: Optional[dict[str, int]] = None,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        policy: Optional[SummaryPolicy] = None,
+    ) -> None:
+        self._pool = pool
+        self.summarizer = summarizer
+        self.editor_webhook_url = editor_webhook_url
+        self.editor_webhook_token = editor_webhook_token
+        self.extractor = extractor
+        self.policy = policy or SummaryPolicy()
+        self.concurrency = dict(PIPELINE_DEFAULT_CONCURRENCY if concurrency is None else concurrency)
+        self.queue_size = max(1, queue_size)
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._prompt: Optional[str] = None
+        self._prompt_loaded_at = 0.0
+        self._handlers: dict[str, Callable[[PostJob], Awaitable[None]]] = {
+            "dedupe": self._dedupe,
+            "prompt": self._load_prompt,
+            "extract": self._extract,
+            "policy": self._apply_policy,
+            "summarize": self._summarize,
+            "insert": self._insert,
+            "notify": self._notify,
+        }
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queues = {stage: asyncio.Queue(self.queue_size) for stage in STAGES}
+        for index, stage in enumerate(STAGES):
+            next_stage = STAGES[index + 1] if index + 1 < len(STAGES) else None
+            for _ in range(max(1, self.concurrency.get(stage, 1))):
+                self._tasks.append(asyncio.create_task(self._worker(stage, next_stage)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def process(self, rows: list[dict]) -> dict[int, tuple[bool, str]]:
+        """Run rows through all stages; waits until every row finished or failed."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        jobs = [PostJob(row=row, future=loop.create_future()) for row in rows]
+        for job in jobs:
+            await self._queues[STAGES[0]].put(job)
+            _queue_depth.set(self._queues[STAGES[0]].qsize(), stage=STAGES[0])
+        results = await asyncio.gather(*(job.future for job in jobs))
+        return {int(job.row["id"]): result for job, result in zip(jobs, results)}
+
+    async def _worker(self, stage: str, next_stage: Optional[str]) -> None:
+        queue = self._queues[stage]
+        handler = self._handlers[stage]
+        while True:
+            job: PostJob = await queue.get()
+            _queue_depth.set(queue.qsize(), stage=stage)
+            started = time.perf_counter()
+            try:
+                await handler(job)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.set_result((False, f"{stage}: pipeline stopped"))
+                raise
+            except Exception as e:
+                _stage_jobs.inc(stage=stage, outcome="failed")
+                log.warning("pipeline_stage_failed", stage=stage, outbox_id=job.row.get("id"), error=str(e))
+                job.future.set_result((False, f"{stage}: {e}"[:500]))
+                continue
+            finally:
+                _stage_seconds.observe(time.perf_counter() - started, stage=stage)
+            if job.skipped:
+                _stage_jobs.inc(stage=stage, outcome="skipped")
+                log.info("pipeline_post_skipped", outbox_id=job.row.get("id"), reason=job.skipped)
+                job.future.set_result((True, ""))
+                continue
+            _stage_jobs.inc(stage=stage, outcome="ok")
+            if next_stage is None:
+                observe_post_e2e(PIPELINE_MODE_NATIVE, job.row.get("created_at"))
+                log.info("pipeline_post_done", outbox_id=job.row.get("id"), post_id=job.post_id)
+                job.future.set_result((True, ""))
+                continue
+            await self._queues[next_stage].put(job)
+            _queue_depth.set(self._queues[next_stage].qsize(), stage=next_stage)
+
+    @staticmethod
+    def _source(job: PostJob) -> str:
+        return job.row.get("source_channel") or job.row["channel_id"]
+
+    async def _dedupe(self, job: PostJob) -> None:
+        if await is_post_in_progress(self._pool, self._source(job), int(job.row["message_id"])):
+            job.skipped = "duplicate"
+
+    async def _load_prompt(self, job: PostJob) -> None:
+        now = time.monotonic()
+        if self._prompt is None or now - self._prompt_loaded_at > PROMPT_CACHE_TTL_SEC:
+            self._prompt = (await get_config_value(self._pool, "openai_prompt") or "").strip() or DEFAULT_SUMMARY_PROMPT
+            self._prompt_loaded_at = now
+        job.prompt = self._prompt
+
+    async def _extract(self, job: PostJob) -> None:
+        pdf_path = job.row.get("pdf_path") or ""
+        status = (job.row.get("pdf_meta") or {}).get("status")
+        if status in PDF_UNREADABLE_STATUSES:
+            # The probe found no text to extract: summarize the post text alone
+            return
+        if pdf_path and not job.row.get("extracted_text"):
+            if self.extractor is None:
+                raise RuntimeError("PDF text not extracted and PDF_EXTRACT_WORKERS=0")
+            await ensure_hot_pdf(pdf_path)
+            extraction = await self.extractor.extract(pdf_path)
+            if extraction.error:
+                raise RuntimeError(f"PDF extraction failed: {extraction.error}")
+            job.row["extracted_text"] = extraction.text
+            job.row["total_pages"] = extraction.total_pages
+
+    async def _apply_policy(self, job: PostJob) -> None:
+        self.policy.apply(job.row)
+        job.text = job.row.get("extracted_text") or ""
+
+    async def _summarize(self, job: PostJob) -> None:
+        if job.row.get("summary"):
+            # Passthrough decided by the summary policy: no LLM call
+            job.summary = job.row["summary"]
+            return
+        text = job.text or job.row.get("post_text") or ""
+        if not text.strip():
+            raise RuntimeError("nothing to summarize")
+        result = await self.summarizer.summarize(
+            text,
+            job.prompt,
+            priority=llm_priority(job.row),
+            model=(job.row.get("summary_policy") or {}).get("model"),
+        )
+        job.summary = result.text
+
+    async def _insert(self, job: PostJob) -> None:
+        post = await upsert_processing_post(
+            self._pool,
+            source_channel=self._source(job),
+            source_message_id=int(job.row["message_id"]),
+            original_text=job.row.get("post_text") or "",
+            pdf_path=job.row.get("pdf_path") or "",
+            extracted_text=job.text,
+            summary=job.summary,
+            summary_policy=job.row.get("summary_policy"),
+        )
+        job.post_id = int(post["id"])
+
+    async def _notify(self, job: PostJob) -> None:
+        """POST the post to editor-bot /incoming/post (same body as the n8n Notify Editor Bot node)."""
+        payload = {
+            "post_id": job.post_id,
+            "summary": job.summary,
+            "pdf_path": job.row.get("pdf_path") or "",
+            "original_text": job.row.get("post_text") or "",
+            "source_channel": self._source(job),
+            "source_message_id": int(job.row["message_id"]),
+        }
+        headers = {"Authorization": f"Bearer {self.editor_webhook_token}"} if self.editor_webhook_token else {}
+        last_error = ""
+        for attempt in range(NOTIFY_MAX_ATTEMPTS):
+            if attempt > 0:
+                await asyncio.sleep(NOTIFY_RETRY_DELAY_SEC * attempt)
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(
+                        self.editor_webhook_url,
+                        json=payload,
+                        headers=headers,
+                        timeout=aiohttp.ClientTimeout(total=NOTIFY_TIMEOUT_SEC),
+                    ) as resp:
+                        if 200 <= resp.status < 300:
+                            return
+                        last_error = f"editor-bot HTTP {resp.status}: {(await resp.text())[:200]}"
+                        if 400 <= resp.status < 500:
+                            break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = f"editor-bot request failed: {e or type(e).__name__}"
+        raise RuntimeError(last_error)
+
+
+def build_native_pipeline(
+    mode: str,
+    pool: asyncpg.Pool,
+    summarizer_factory: Callable[[], Summarizer],
+    editor_webhook_url: str,
+    editor_webhook_token: str = "",
+    extractor: Optional[PdfExtractionPool] = None,
+    stage_concurrency: str = "",
+    policy: Optional[SummaryPolicy] = None,
+) -> Optional[NativePipeline]:
+    """Pipeline for PIPELINE_MODE=native, None for n8n; raises ValueError on a bad mode or concurrency spec."""
+    mode = (mode or PIPELINE_MODE_N8N).strip().lower()
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"PIPELINE_MODE must be one of {', '.join(PIPELINE_MODES)}, got {mode!r}")
+    if mode == PIPELINE_MODE_N8N:
+        return None
+    return NativePipeline(
+        pool,
+        summarizer_factory(),
+        editor_webhook_url,
+        editor_webhook_token,
+        extractor=extractor,
+        concurrency=parse_stage_concurrency(stage_concurrency),
+        policy=policy,
+    )
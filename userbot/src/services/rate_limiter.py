@@ -0,0 +1,250 @@
+"""Token-bucket pacing for outbox delivery: rate + burst, optional per-channel buckets and time-of-day windows."""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+import asyncpg
+import structlog
+
+from src.database.rate_buckets import load_bucket_states, save_bucket_state
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+GLOBAL_BUCKET_KEY = "outbox:global"
+# Wait reported when pacing is paused and no window end is known (seconds)
+PAUSED_RECHECK_SEC = 60.0
+
+_RE_WINDOW = re.compile(
+    r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*(\d+(?:\.\d+)?)\s*(?:/\s*(\d+))?\s*$"
+)
+
+_decisions = metrics.counter(
+    "userbot_outbox_pacing_decisions_total",
+    "Outbox pacing decisions (sent = token taken, throttled = wait for token, paused = window rate 0)",
+    ("decision",),
+)
+_tokens_gauge = metrics.gauge(
+    "userbot_outbox_pacing_tokens",
+    "Tokens left in outbox pacing bucket after last decision",
+    ("bucket",),
+)
+_wait_gauge = metrics.gauge(
+    "userbot_outbox_pacing_next_token_seconds",
+    "Seconds until next token in the soonest throttled bucket (0 = not throttled)",
+)
+
+
+@dataclass
+class RateWindow:
+    """Time-of-day window (UTC minutes from midnight) with its own rate; end < start wraps midnight."""
+
+    start_minute: int
+    end_minute: int
+    rate_per_minute: float
+    burst: Optional[int] = None
+
+    def contains(self, minute_of_day: int) -> bool:
+        if self.start_minute <= self.end_minute:
+            return self.start_minute <= minute_of_day < self.end_minute
+        return minute_of_day >= self.start_minute or minute_of_day < self.end_minute
+
+    def seconds_until_end(self, now: datetime) -> float:
+        minute_of_day = now.hour * 60 + now.minute
+        minutes = (self.end_minute - minute_of_day) % (24 * 60) or 24 * 60
+        return minutes * 60.0 - now.second - now.microsecond / 1_000_000
+
+
+def parse_rate_windows(spec: str) -> list[RateWindow]:
+    """
+    Parse "08:00-23:00=10/5;23:00-08:00=1" into windows (posts per minute, optional /burst).
+
+    Raises:
+        ValueError: on malformed window.
+    """
+    windows: list[RateWindow] = []
+    for part in (spec or "").replace(",", ";").split(";"):
+        if not part.strip():
+            continue
+        m = _RE_WINDOW.match(part)
+        if not m:
+            raise ValueError(f"Invalid rate window {part!r}; expected HH:MM-HH:MM=rate[/burst]")
+        h1, m1, h2, m2 = (int(m.group(i)) for i in range(1, 5))
+        if h1 > 24 or h2 > 24 or m1 > 59 or m2 > 59:
+            raise ValueError(f"Invalid time in rate window {part!r}")
+        windows.append(
+            RateWindow(
+                start_minute=(h1 * 60 + m1) % (24 * 60),
+                end_minute=(h2 * 60 + m2) % (24 * 60),
+                rate_per_minute=float(m.group(5)),
+                burst=int(m.group(6)) if m.group(6) else None,
+            )
+        )
+    return windows
+
+
+class TokenBucket:
+    """Classic token bucket: refills at rate_per_sec up to burst; one token per delivered post by default."""
+
+    def __init__(
+        self,
+        rate_per_sec: float,
+        burst: float,
+        tokens: Optional[float] = None,
+        updated_at: Optional[float] = None,
+    ) -> None:
+        self.rate_per_sec = rate_per_sec
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst if tokens is None else min(float(tokens), self.burst)
+        self.updated_at = updated_at
+
+    def refill(self, now: float) -> None:
+        """Add tokens for time elapsed since last update (wall-clock seconds)."""
+        if self.updated_at is not None and now > self.updated_at:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate_per_sec)
+        self.updated_at = now
+
+    def time_until(self, now: float, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens (capped at burst) are available; 0.0 if they are now."""
+        self.refill(now)
+        amount = min(amount, self.burst)
+        if self.tokens >= amount:
+            return 0.0
+        if self.rate_per_sec <= 0:
+            return PAUSED_RECHECK_SEC
+        return (amount - self.tokens) / self.rate_per_sec
+
+    def try_take(self, now: float, amount: float = 1.0) -> float:
+        """Take `amount` tokens if available. Returns 0.0 on success, else seconds until they are."""
+        wait = self.time_until(now, amount)
+        if wait == 0.0:
+            self.tokens -= min(amount, self.burst)
+        return wait
+
+
+class OutboxPacer:
+    """
+    Decide whether the outbox worker may deliver a row now.
+
+    One global bucket, or one bucket per source channel when per_channel is set. Bucket state is
+    persisted to userbot_rate_buckets after each token, so restarts do not reset pacing.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[asyncpg.Pool],
+        rate_per_minute: float = 0.0,
+        burst: int = 1,
+        per_channel: bool = False,
+        windows: Optional[list[RateWindow]] = None,
+    ) -> None:
+        self.pool = pool
+        self.rate_per_minute = max(0.0, rate_per_minute)
+        self.burst = max(1, burst)
+        self.per_channel = per_channel
+        self.windows = windows or []
+        self._buckets: dict[str, TokenBucket] = {}
+        self._persisted: dict[str, tuple[float, datetime]] = {}
+        self._loaded = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_minute > 0 or bool(self.windows)
+
+    def bucket_key(self, source_channel: str) -> str:
+        return f"outbox:channel:{source_channel}" if self.per_channel else GLOBAL_BUCKET_KEY
+
+    def _current_limits(self, now: datetime) -> tuple[float, int, Optional[RateWindow]]:
+        """(rate per minute, burst, active window) for the given moment."""
+        minute_of_day = now.hour * 60 + now.minute
+        for window in self.windows:
+            if window.contains(minute_of_day):
+                return window.rate_per_minute, window.burst or self.burst, window
+        return self.rate_per_minute, self.burst, None
+
+    async def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.pool is not None:
+            self._persisted = await load_bucket_states(self.pool)
+
+    def _bucket(self, key: str, rate_per_sec: float, burst: int) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            persisted = self._persisted.get(key)
+            if persisted is not None:
+                tokens, updated_at = persisted
+                bucket = TokenBucket(rate_per_sec, burst, tokens, updated_at.timestamp())
+            else:
+                bucket = TokenBucket(rate_per_sec, burst)
+            self._buckets[key] = bucket
+        bucket.rate_per_sec = rate_per_sec
+        bucket.burst = float(max(1, burst))
+        return bucket
+
+    async def acquire(self, source_channel: str, now: Optional[datetime] = None) -> float:
+        """
+        Try to take a token for a row from source_channel.
+
+        Returns:
+            0.0 if the row may be delivered now, else seconds until a token (or the window) frees up.
+        """
+        if not self.enabled:
+            return 0.0
+        await self._load()
+        now = now or datetime.now(timezone.utc)
+        rate_per_minute, burst, window = self._current_limits(now)
+        key = self.bucket_key(source_channel)
+        if rate_per_minute <= 0:
+            wait = window.seconds_until_end(now) if window else PAUSED_RECHECK_SEC
+            _decisions.inc(decision="paused")
+            return wait
+        bucket = self._bucket(key, rate_per_minute / 60.0, burst)
+        wait = bucket.try_take(now.timestamp())
+        _tokens_gauge.set(bucket.tokens, bucket=key)
+        if wait > 0:
+            _decisions.inc(decision="throttled")
+            return wait
+        _decisions.inc(decision="sent")
+        if self.pool is not None:
+            try:
+                await save_bucket_state(self.pool, key, bucket.tokens, now)
+            except Exception as e:
+                log.warning("rate_bucket_save_failed", bucket=key, error=str(e))
+        return 0.0
+
+    @staticmethod
+    def report_wait(wait: Optional[float]) -> None:
+        """Expose the soonest token wait of the last worker cycle."""
+        _wait_gauge.set(wait or 0.0)
+
+
+def build_outbox_pacer(
+    pool: Optional[asyncpg.Pool],
+    rate_per_minute: float = 0.0,
+    burst: int = 1,
+    per_channel: bool = False,
+    windows_spec: str = "",
+    buffer_minutes: int = 0,
+) -> OutboxPacer:
+    """
+    Build pacer from settings. Legacy OUTBOX_BUFFER_MINUTES=N maps to one post per N minutes
+    (rate 1/N, burst 1) when no explicit rate is configured.
+    """
+    if rate_per_minute <= 0 and buffer_minutes > 0:
+        rate_per_minute = 1.0 / buffer_minutes
+        burst = 1
+    windows = parse_rate_windows(windows_spec) if windows_spec else []
+    pacer = OutboxPacer(pool, rate_per_minute, burst, per_channel, windows)
+    if pacer.enabled:
+        log.info(
+            "outbox_pacing_enabled",
+            rate_per_minute=pacer.rate_per_minute,
+            burst=pacer.burst,
+            per_channel=per_channel,
+            windows=len(windows),
+        )
+    return pacer
@@ -0,0 +1,309 @@
+"""Summarization engine: single call for short texts, map-reduce over token-sized chunks for long PDFs."""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Protocol
+
+import asyncpg
+import structlog
+
+from src.database.summary_cache import lookup_summary, peek_summary, store_summary
+from src.services.llm_client import CHARS_PER_TOKEN, LLMResponse, estimate_tokens
+from src.services.llm_scheduler import PRIORITY_LIVE
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+# Same fallback prompt as the n8n workflows
+DEFAULT_SUMMARY_PROMPT = "Напиши краткое саммари текста для публикации в канале. Сохраняй смысл, будь лаконичен."
+MAP_PROMPT = (
+    "Кратко перескажи фрагмент длинного документа: сохрани ключевые факты, цифры и выводы. "
+    "Без вступлений и оценок."
+)
+SUMMARY_DEFAULT_CHUNK_TOKENS = 3000
+SUMMARY_DEFAULT_MAP_CONCURRENCY = 4
+# Partial summaries that still do not fit one chunk are mapped again, at most this many times;
+# after that each partial is cut to an equal share of the chunk so the reduce input fits
+SUMMARY_MAX_REDUCE_ROUNDS = 3
+
+_stage_seconds = metrics.histogram(
+    "userbot_summary_stage_seconds",
+    "Summarization latency per stage (single, map, reduce); map covers all chunks of a document",
+    ("stage",),
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+_cache_lookups = metrics.counter(
+    "userbot_summary_cache_lookups_total",
+    "Summary cache lookups by stage (single, document, map, reduce) and result (hit, miss)",
+    ("stage", "result"),
+)
+
+
+class CompletionClient(Protocol):
+    model: str
+
+    async def complete(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        stage: str = "single",
+        priority: int = PRIORITY_LIVE,
+        model: Optional[str] = None,
+    ) -> LLMResponse: ...
+
+
+class SummaryCache(Protocol):
+    async def get(self, prompt: str, model: str, text: str, count: bool = True) -> Optional[str]:
+        """Cached summary or None; count=False for internal (map/reduce) lookups kept out of hit-rate stats."""
+
+    async def put(self, prompt: str, model: str, text: str, summary: str) -> None: ...
+
+
+class MemorySummaryCache:
+    """In-process cache (tests, runs without a database)."""
+
+    def __init__(self) -> None:
+        self._data: dict[tuple[str, str, str], str] = {}
+
+    @staticmethod
+    def _key(prompt: str, model: str, text: str) -> tuple[str, str, str]:
+        return model, prompt.strip(), " ".join(text.split())
+
+    async def get(self, prompt: str, model: str, text: str, count: bool = True) -> Optional[str]:
+        return self._data.get(self._key(prompt, model, text))
+
+    async def put(self, prompt: str, model: str, text: str, summary: str) -> None:
+        self._data[self._key(prompt, model, text)] = summary
+
+
+class PgSummaryCache:
+    """summary_cache table shared with n8n; cache errors are logged and treated as misses."""
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self._pool = pool
+
+    async def get(self, prompt: str, model: str, text: str, count: bool = True) -> Optional[str]:
+        try:
+            if not count:
+                return await peek_summary(self._pool, prompt, model, text)
+            return await lookup_summary(self._pool, prompt, model, text)
+        except Exception as e:
+            log.warning("summary_cache_lookup_failed", error=str(e))
+            return None
+
+    async def put(self, prompt: str, model: str, text: str, summary: str) -> None:
+        try:
+            await store_summary(self._pool, prompt, model, text, summary)
+        except Exception as e:
+            log.warning("summary_cache_store_failed", error=str(e))
+
+
+def _split_long(paragraph: str, limit: int) -> list[str]:
+    """Split a paragraph longer than limit characters at sentence ends, hard-cutting very long sentences."""
+    out: list[str] = []
+    current = ""
+    for sentence in re.split(r"(?<=[.!?…])\s+", paragraph):
+        while len(sentence) > limit:
+            if current:
+                out.append(current)
+                current = ""
+            out.append(sentence[:limit])
+            sentence = sentence[limit:]
+        if current and len(current) + 1 + len(sentence) > limit:
+            out.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        out.append(current)
+    return out
+
+
+def chunk_text(text: str, max_tokens: int) -> list[str]:
+    """Pack paragraphs into chunks of at most max_tokens (estimated); paragraph breaks are kept."""
+    limit = max(1, max_tokens) * CHARS_PER_TOKEN
+    pieces: list[str] = []
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        paragraph = paragraph.strip()
+        if paragraph:
+            pieces.extend(_split_long(paragraph, limit) if len(paragraph) > limit else [paragraph])
+    chunks: list[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > limit:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def join_partials(partials: list[str], max_tokens: Optional[int] = None) -> str:
+    """
+    Partial summaries numbered for the reduce prompt. With max_tokens each one is cut to an equal
+    share of the budget, so every part of the document stays represented and the result fits.
+    """
+    parts = [s.strip() for s in partials]
+    if max_tokens is not None:
+        limit = max(1, max_tokens) * CHARS_PER_TOKEN
+        overhead = sum(len(f"Часть {i}:\n") + 2 for i in range(1, len(parts) + 1))
+        share = max(1, (limit - overhead) // max(1, len(parts)))
+        parts = [p[:share] for p in parts]
+    joined = "\n\n".join(f"Часть {i}:\n{p}" for i, p in enumerate(parts, start=1))
+    return joined[: max(1, max_tokens) * CHARS_PER_TOKEN] if max_tokens is not None else joined
+
+
+@dataclass
+class SummaryStats:
+    chunks: int = 0
+    llm_calls: int = 0
+    cached_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    queue_seconds: float = 0.0
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class SummaryResult:
+    text: str
+    stats: SummaryStats
+
+
+class Summarizer:
+    """
+    Texts up to chunk_tokens go to the model in one call with the channel prompt. Longer texts are
+    split into chunks summarized concurrently (at most map_concurrency calls in flight) with
+    MAP_PROMPT; the joined partial summaries then get the channel prompt (reduce). Every call goes
+    through the cache, so a failed reduce retried later does not repeat the map phase. Only the
+    lookup of the whole text counts in summary_cache_stats (the /status hit rate); chunk and
+    reduce lookups do not.
+    """
+
+    def __init__(
+        self,
+        client: CompletionClient,
+        cache: Optional[SummaryCache] = None,
+        chunk_tokens: int = SUMMARY_DEFAULT_CHUNK_TOKENS,
+        map_concurrency: int = SUMMARY_DEFAULT_MAP_CONCURRENCY,
+    ) -> None:
+        self.client = client
+        self.cache = cache
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.map_concurrency = max(1, map_concurrency)
+
+    async def _call(
+        self,
+        stage: str,
+        prompt: str,
+        text: str,
+        stats: SummaryStats,
+        priority: int,
+        model: Optional[str],
+        top_level: bool = False,
+    ) -> str:
+        model = model or self.client.model
+        cached = await self._lookup(stage, prompt, model, text, stats, top_level)
+        if cached:
+            return cached
+        response = await self.client.complete(f"{prompt}\n\nТекст:\n{text}", stage=stage, priority=priority, model=model)
+        stats.llm_calls += 1
+        stats.queue_seconds += response.queue_seconds
+        stats.prompt_tokens += response.prompt_tokens
+        stats.completion_tokens += response.completion_tokens
+        if self.cache is not None and response.text.strip():
+            await self.cache.put(prompt, model, text, response.text)
+        return response.text
+
+    async def _lookup(
+        self,
+        stage: str,
+        prompt: str,
+        model: str,
+        text: str,
+        stats: SummaryStats,
+        top_level: bool,
+    ) -> Optional[str]:
+        if self.cache is None:
+            return None
+        cached = await self.cache.get(prompt, model, text, count=top_level)
+        _cache_lookups.inc(stage=stage, result="hit" if cached else "miss")
+        if cached:
+            stats.cached_calls += 1
+        return cached
+
+    async def _map(self, parts: list[str], stats: SummaryStats, priority: int, model: Optional[str]) -> list[str]:
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+
+        async def _one(part: str) -> str:
+            async with semaphore:
+                return await self._call("map", MAP_PROMPT, part, stats, priority, model)
+
+        return list(await asyncio.gather(*(_one(p) for p in parts)))
+
+    async def summarize(
+        self,
+        text: str,
+        prompt: Optional[str] = None,
+        priority: int = PRIORITY_LIVE,
+        model: Optional[str] = None,
+    ) -> SummaryResult:
+        """
+        Summary of text with prompt (DEFAULT_SUMMARY_PROMPT if empty); priority is passed to the
+        client's scheduler, model (summary policy) replaces the client's model. Raises LLMError.
+        """
+        prompt = (prompt or "").strip() or DEFAULT_SUMMARY_PROMPT
+        text = (text or "").strip()
+        stats = SummaryStats()
+        if estimate_tokens(text) <= self.chunk_tokens:
+            stats.chunks = 1
+            started = time.perf_counter()
+            summary = await self._call("single", prompt, text, stats, priority, model, top_level=True)
+            self._observe(stats, "single", started)
+            return SummaryResult(summary, stats)
+
+        cached = await self._lookup("document", prompt, model or self.client.model, text, stats, top_level=True)
+        if cached:
+            return SummaryResult(cached, stats)
+
+        started = time.perf_counter()
+        parts = chunk_text(text, self.chunk_tokens)
+        stats.chunks = len(parts)
+        for _ in range(SUMMARY_MAX_REDUCE_ROUNDS):
+            partials = await self._map(parts, stats, priority, model)
+            joined = join_partials(partials)
+            if estimate_tokens(joined) <= self.chunk_tokens:
+                break
+            parts = chunk_text(joined, self.chunk_tokens)
+        else:
+            log.warning("summary_reduce_input_truncated", tokens=estimate_tokens(joined), budget=self.chunk_tokens)
+            joined = join_partials(partials, self.chunk_tokens)
+        self._observe(stats, "map", started)
+
+        started = time.perf_counter()
+        summary = await self._call("reduce", prompt, joined, stats, priority, model)
+        self._observe(stats, "reduce", started)
+        if self.cache is not None and summary.strip():
+            await self.cache.put(prompt, model or self.client.model, text, summary)
+        log.info(
+            "summary_map_reduce_done",
+            chunks=stats.chunks,
+            llm_calls=stats.llm_calls,
+            cached_calls=stats.cached_calls,
+            prompt_tokens=stats.prompt_tokens,
+            completion_tokens=stats.completion_tokens,
+            queue_seconds=round(stats.queue_seconds, 3),
+            map_seconds=round(stats.stage_seconds["map"], 3),
+            reduce_seconds=round(stats.stage_seconds["reduce"], 3),
+        )
+        return SummaryResult(summary, stats)
+
+    @staticmethod
+    def _observe(stats: SummaryStats, stage: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        stats.stage_seconds[stage] = elapsed
+        _stage_seconds.observe(elapsed, stage=stage)
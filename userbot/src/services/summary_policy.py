@@ -0,0 +1,208 @@
+"""
+Summarization policy evaluated before the LLM: rules decide per post whether to pass the
+original text through, trim a long PDF to its first pages plus table of contents, or use
+another model. The decision travels with the post and is stored in posts.summary_policy.
+"""
+
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+import structlog
+
+from src.services.pdf_extractor import PDF_PAGE_BREAK
+from src.utils import metrics
+
+log = structlog.get_logger()
+
+ACTION_SUMMARIZE = "summarize"
+ACTION_PASSTHROUGH = "passthrough"
+POLICY_ACTIONS = (ACTION_SUMMARIZE, ACTION_PASSTHROUGH)
+DEFAULT_RULE_NAME = "default"
+# A table of contents past the first pages is looked for among this many extracted pages
+TOC_MAX_PAGES = 3
+
+_RE_TOC_HEADING = re.compile(r"^\s*(содержание|оглавление|contents|table of contents)\s*$", re.IGNORECASE | re.MULTILINE)
+_RE_TOC_LINE = re.compile(r"(?:\.{3,}|…{2,})\s*\d{1,4}\s*$", re.MULTILINE)
+_RE_SPACES = re.compile(r"[ \t\u00a0]+")
+_RE_BLANK_LINES = re.compile(r"\n{3,}")
+_RE_ZERO_WIDTH = re.compile(r"[\u200b-\u200d\u2060\ufeff]")
+
+_decisions = metrics.counter(
+    "userbot_summary_policy_decisions_total",
+    "Summary policy decisions by rule and action (summarize, passthrough)",
+    ("rule", "action"),
+)
+
+_RULE_FIELDS = {"name", "action", "sources", "has_pdf", "max_chars", "min_chars", "min_pages", "first_pages", "model"}
+_INT_FIELDS = ("max_chars", "min_chars", "min_pages", "first_pages")
+
+
+@dataclass(frozen=True)
+class PolicyRule:
+    """
+    A post matches when every condition that is set holds: sources (source channel is one of),
+    has_pdf, max_chars / min_chars (length of the text that would be summarized) and min_pages
+    (PDF page count). Actions: summarize (optionally with first_pages and model) or passthrough.
+    """
+
+    name: str
+    action: str = ACTION_SUMMARIZE
+    sources: tuple[str, ...] = ()
+    has_pdf: Optional[bool] = None
+    max_chars: Optional[int] = None
+    min_chars: Optional[int] = None
+    min_pages: Optional[int] = None
+    first_pages: Optional[int] = None
+    model: Optional[str] = None
+
+    def matches(self, source_channel: str, has_pdf: bool, chars: int, pages: int) -> bool:
+        if self.sources and source_channel not in self.sources and source_channel.removeprefix("-100") not in self.sources:
+            return False
+        if self.has_pdf is not None and has_pdf != self.has_pdf:
+            return False
+        if self.max_chars is not None and chars > self.max_chars:
+            return False
+        if self.min_chars is not None and chars < self.min_chars:
+            return False
+        if self.min_pages is not None and pages < self.min_pages:
+            return False
+        return True
+
+
+@dataclass
+class PolicyDecision:
+    rule: str = DEFAULT_RULE_NAME
+    action: str = ACTION_SUMMARIZE
+    model: Optional[str] = None
+    chars: int = 0
+    pages: int = 0
+    pages_kept: Optional[int] = None
+    toc_pages: list[int] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {k: v for k, v in asdict(self).items() if v not in (None, [])}
+
+
+def parse_policy_rules(spec: str) -> list[PolicyRule]:
+    """
+    Rules from a JSON list, first match wins, e.g.
+    [{"name": "short", "has_pdf": false, "max_chars": 400, "action": "passthrough"},
+     {"name": "long_pdf", "min_pages": 60, "first_pages": 20},
+     {"name": "cheap", "sources": ["@digest"], "model": "gpt-4.1-nano"}].
+    Raises ValueError on malformed JSON, unknown keys or actions and values of the wrong type
+    (e.g. "max_chars": "400"), so a bad spec stops startup instead of every outbox batch.
+    """
+    spec = (spec or "").strip()
+    if not spec:
+        return []
+    try:
+        raw = json.loads(spec)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"SUMMARY_POLICY: invalid JSON: {e}") from None
+    if not isinstance(raw, list):
+        raise ValueError("SUMMARY_POLICY: expected a JSON list of rules")
+    rules: list[PolicyRule] = []
+    for index, item in enumerate(raw, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"SUMMARY_POLICY: rule {index} is not an object")
+        unknown = set(item) - _RULE_FIELDS
+        if unknown:
+            raise ValueError(f"SUMMARY_POLICY: rule {index}: unknown keys {', '.join(sorted(unknown))}")
+        action = item.get("action", ACTION_SUMMARIZE)
+        if action not in POLICY_ACTIONS:
+            raise ValueError(f"SUMMARY_POLICY: rule {index}: action must be one of {', '.join(POLICY_ACTIONS)}")
+        for key in _INT_FIELDS:
+            value = item.get(key)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+                raise ValueError(f"SUMMARY_POLICY: rule {index}: {key} must be a non-negative integer, got {value!r}")
+        if item.get("has_pdf") is not None and not isinstance(item["has_pdf"], bool):
+            raise ValueError(f"SUMMARY_POLICY: rule {index}: has_pdf must be true or false, got {item['has_pdf']!r}")
+        sources = item.get("sources") or ()
+        if not isinstance(sources, (str, list, tuple)):
+            raise ValueError(f"SUMMARY_POLICY: rule {index}: sources must be a string or a list")
+        if item.get("model") is not None and not isinstance(item["model"], str):
+            raise ValueError(f"SUMMARY_POLICY: rule {index}: model must be a string")
+        rules.append(
+            PolicyRule(
+                name=str(item.get("name") or f"rule{index}"),
+                action=action,
+                sources=tuple(str(s).strip() for s in ([sources] if isinstance(sources, str) else sources)),
+                has_pdf=item.get("has_pdf"),
+                max_chars=item.get("max_chars"),
+                min_chars=item.get("min_chars"),
+                min_pages=item.get("min_pages"),
+                first_pages=item.get("first_pages"),
+                model=item.get("model") or None,
+            )
+        )
+    return rules
+
+
+def normalize_post_text(text: str) -> str:
+    """Original post as a summary: no zero-width characters, single spaces, at most one blank line."""
+    text = _RE_ZERO_WIDTH.sub("", text or "")
+    lines = [_RE_SPACES.sub(" ", line).strip() for line in text.replace("\r\n", "\n").split("\n")]
+    return _RE_BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def is_toc_page(page: str) -> bool:
+    """A page with a contents heading or at least five 'title .... 12' lines."""
+    return bool(_RE_TOC_HEADING.search(page)) or len(_RE_TOC_LINE.findall(page)) >= 5
+
+
+def join_pages(pages: list[str]) -> str:
+    return "\n\n".join(p for p in pages if p)
+
+
+def first_pages_with_toc(pages: list[str], keep: int) -> tuple[str, list[int]]:
+    """First `keep` pages plus up to TOC_MAX_PAGES contents pages found after them (1-based numbers)."""
+    toc = [i for i in range(keep, len(pages)) if is_toc_page(pages[i])][:TOC_MAX_PAGES]
+    return join_pages(pages[:keep] + [pages[i] for i in toc]), [i + 1 for i in toc]
+
+
+class SummaryPolicy:
+    """Evaluates rules in order; without a match the post is summarized as before (rule "default")."""
+
+    def __init__(self, rules: Optional[list[PolicyRule]] = None) -> None:
+        self.rules = list(rules or [])
+
+    def apply(self, row: dict) -> PolicyDecision:
+        """
+        Decide for an outbox row (post_text, pdf_path, source_channel, optional extracted_text and
+        total_pages) and rewrite it: extracted_text loses page breaks (and pages the rule drops),
+        passthrough sets row["summary"], and row["summary_policy"] holds the decision.
+        """
+        source = row.get("source_channel") or str(row.get("channel_id") or "")
+        post_text = row.get("post_text") or ""
+        has_pdf = bool(row.get("pdf_path"))
+        pages = (row.get("extracted_text") or "").split(PDF_PAGE_BREAK) if row.get("extracted_text") else []
+        total_pages = int(row.get("total_pages") or 0) or len(pages)
+        extracted = join_pages(pages)
+        chars = len(extracted or post_text)
+        decision = PolicyDecision(chars=chars, pages=total_pages)
+        for rule in self.rules:
+            if rule.matches(source, has_pdf, chars, total_pages):
+                decision.rule = rule.name
+                decision.action = rule.action
+                decision.model = rule.model
+                if rule.first_pages and len(pages) > rule.first_pages:
+                    extracted, decision.toc_pages = first_pages_with_toc(pages, rule.first_pages)
+                    decision.pages_kept = rule.first_pages + len(decision.toc_pages)
+                break
+        if extracted:
+            row["extracted_text"] = extracted
+        if decision.action == ACTION_PASSTHROUGH:
+            row["summary"] = normalize_post_text(post_text or extracted)
+        row["summary_policy"] = decision.as_dict()
+        _decisions.inc(rule=decision.rule, action=decision.action)
+        return decision
+
+
+def build_summary_policy(spec: str) -> SummaryPolicy:
+    """Policy from SUMMARY_POLICY; raises ValueError on a bad spec."""
+    policy = SummaryPolicy(parse_policy_rules(spec))
+    if policy.rules:
+        log.info("summary_policy_rules", rules=[r.name for r in policy.rules])
+    return policy
@@ -2,15 +2,84 @@
 
 import asyncio
 import json
-from typing import Any
+from typing import Any, Optional
 
 import aiohttp
 import structlog
 
+from src.utils.resilience import CircuitOpenError, Endpoint, get_endpoint
+
 log = structlog.get_logger()
 
-# Retry delays in seconds (exponential backoff)
-WEBHOOK_RETRY_DELAYS = (1, 3, 5)
+# Circuit breaker / retry budget shared by all requests to n8n
+N8N_ENDPOINT = "n8n"
+# Attempts per request; delays between them are full-jitter exponential (base, cap in seconds)
+WEBHOOK_MAX_ATTEMPTS = 3
+WEBHOOK_BACKOFF_BASE_SEC = 1.0
+WEBHOOK_BACKOFF_CAP_SEC = 10.0
+# The workflow answers as soon as the post is received, so there is no LLM latency to wait for
+WEBHOOK_TIMEOUT_SEC = 60
+# Bulk requests carry several posts processed sequentially by n8n, so they get a longer budget
+WEBHOOK_BULK_TIMEOUT_SEC = 1200
+# Two-phase mode: n8n only acks receipt, the result comes later via callback
+WEBHOOK_ACK_TIMEOUT_SEC = 30
+
+
+async def _wait_before_retry(endpoint: Endpoint, attempt: int, event: str, **fields: Any) -> bool:
+    """Spend a retry from the endpoint budget and sleep a jittered backoff. False if budget is spent."""
+    delay = endpoint.retry_delay(attempt, WEBHOOK_BACKOFF_BASE_SEC, WEBHOOK_BACKOFF_CAP_SEC)
+    if delay is None:
+        log.warning("webhook_retry_budget_exhausted", endpoint=endpoint.name, **fields)
+        return False
+    log.info(event, attempt=attempt + 1, delay=round(delay, 2), **fields)
+    await asyncio.sleep(delay)
+    return True
+
+
+def _circuit_open_error(endpoint: Endpoint, **fields: Any) -> CircuitOpenError:
+    """Error for a call skipped because the endpoint circuit is open."""
+    error = CircuitOpenError(endpoint.name, endpoint.breaker.retry_after())
+    log.warning("webhook_circuit_open", endpoint=endpoint.name, retry_after=round(error.retry_after, 1), **fields)
+    return error
+
+
+def build_webhook_payload(
+    *,
+    post_text: str,
+    pdf_path: str,
+    message_id: int,
+    channel_id: str | int,
+    source_channel: str,
+    extracted_text: str = "",
+    summary: str = "",
+    summary_policy: Optional[dict[str, Any]] = None,
+    pdf_meta: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """
+    Build JSON payload for one post (same shape for single and bulk requests). extracted_text
+    (PDF text from the extraction pool) is sent only when present; without it n8n reads the PDF.
+    summary (passthrough decided by the summary policy) makes n8n skip OpenAI; summary_policy is
+    the decision stored on the post, its model (if any) replaces the workflow's default model.
+    pdf_meta (probe at download time) with an unreadable status sends n8n down the text-only path.
+    """
+    payload: dict[str, Any] = {
+        "post_text": post_text or "",
+        "pdf_path": pdf_path,
+        "message_id": message_id,
+        "channel_id": str(channel_id),
+        "source_channel": source_channel,
+    }
+    if extracted_text:
+        payload["extracted_text"] = extracted_text
+    if summary:
+        payload["summary"] = summary
+    if summary_policy:
+        payload["summary_policy"] = summary_policy
+        if summary_policy.get("model"):
+            payload["model"] = summary_policy["model"]
+    if pdf_meta:
+        payload["pdf_meta"] = pdf_meta
+    return payload
 
 
 async def send_to_n8n_webhook(
@@ -21,10 +90,14 @@ async def send_to_n8n_webhook(
     message_id: int,
     channel_id: str | int,
     source_channel: str,
+    extracted_text: str = "",
+    summary: str = "",
+    summary_policy: Optional[dict[str, Any]] = None,
+    pdf_meta: Optional[dict[str, Any]] = None,
 ) -> bool:
     """
-    Send new post data to n8n webhook. Retries only on 5xx (not on 504); 504 is treated as accepted.
-    Retry delays: 1, 3, 5 s.
+    Send new post data to n8n webhook. Retries on 5xx and connection errors with full-jitter
+    backoff, within the n8n retry budget; no request is made while the n8n circuit is open.
 
     Args:
         webhook_url: Full URL of the n8n webhook (e.g. https://n8n.neurascope.pro/webhook/xxx).
@@ -33,36 +106,45 @@ async def send_to_n8n_webhook(
         message_id: Telegram message ID.
         channel_id: Telegram channel/chat ID (string or int).
         source_channel: Source channel identifier (username or ID string).
+        extracted_text: PDF text extracted by userbot (empty: n8n extracts it).
+        summary: Ready summary from the summary policy (empty: n8n calls OpenAI).
+        summary_policy: Summary policy decision to store on the post.
+        pdf_meta: PDF probe result (status, pages, encrypted, has_text, producer).
 
     Returns:
         True if request succeeded (2xx), False otherwise.
     """
-    payload: dict[str, Any] = {
-        "post_text": post_text or "",
-        "pdf_path": pdf_path,
-        "message_id": message_id,
-        "channel_id": str(channel_id),
-        "source_channel": source_channel,
-    }
+    payload = build_webhook_payload(
+        post_text=post_text,
+        pdf_path=pdf_path,
+        message_id=message_id,
+        channel_id=channel_id,
+        source_channel=source_channel,
+        extracted_text=extracted_text,
+        summary=summary,
+        summary_policy=summary_policy,
+        pdf_meta=pdf_meta,
+    )
+    endpoint = get_endpoint(N8N_ENDPOINT)
+    endpoint.budget.record_request()
     last_error: Exception | None = None
-    for attempt, delay in enumerate(WEBHOOK_RETRY_DELAYS):
-        if attempt > 0:
-            log.info(
-                "webhook_retry",
-                url=webhook_url,
-                message_id=message_id,
-                attempt=attempt + 1,
-                delay=delay,
-            )
-            await asyncio.sleep(delay)
+    for attempt in range(WEBHOOK_MAX_ATTEMPTS):
+        if attempt > 0 and not await _wait_before_retry(
+            endpoint, attempt, "webhook_retry", url=webhook_url, message_id=message_id
+        ):
+            break
+        if not endpoint.breaker.allow():
+            last_error = _circuit_open_error(endpoint, message_id=message_id)
+            break
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.post(
                     webhook_url,
                     json=payload,
-                    timeout=aiohttp.ClientTimeout(total=400),
+                    timeout=aiohttp.ClientTimeout(total=WEBHOOK_TIMEOUT_SEC),
                 ) as resp:
                     if resp.status >= 200 and resp.status < 300:
+                        endpoint.breaker.record_success()
                         body = await resp.text()
                         try:
                             data = json.loads(body) if body.strip() else {}
@@ -86,6 +168,7 @@ async def send_to_n8n_webhook(
                         )
                         return True
                     if resp.status == 504:
+                        endpoint.breaker.record_failure()
                         body = await resp.text()
                         last_error = RuntimeError(f"HTTP 504: {body[:200]}")
                         log.warning(
@@ -94,7 +177,7 @@ async def send_to_n8n_webhook(
                             message_id=message_id,
                             attempt=attempt + 1,
                         )
-                        if attempt >= len(WEBHOOK_RETRY_DELAYS) - 1:
+                        if attempt >= WEBHOOK_MAX_ATTEMPTS - 1:
                             return False
                         continue
                     body = await resp.text()
@@ -108,8 +191,11 @@ async def send_to_n8n_webhook(
                         attempt=attempt + 1,
                     )
                     if resp.status < 500:
+                        endpoint.breaker.record_success()
                         return False
+                    endpoint.breaker.record_failure()
         except aiohttp.ClientError as e:
+            endpoint.breaker.record_failure()
             last_error = e
             log.warning(
                 "webhook_request_error",
@@ -119,6 +205,7 @@ async def send_to_n8n_webhook(
                 error=str(e),
             )
         except Exception as e:
+            endpoint.breaker.record_failure()
             last_error = e
             log.warning(
                 "webhook_unexpected_error",
@@ -133,3 +220,258 @@ async def send_to_n8n_webhook(
         error=str(last_error),
     )
     return False
+
+
+async def send_to_n8n_webhook_ack(
+    webhook_url: str,
+    *,
+    outbox_id: int,
+    callback_url: str,
+    post_text: str,
+    pdf_path: str,
+    message_id: int,
+    channel_id: str | int,
+    source_channel: str,
+    extracted_text: str = "",
+    summary: str = "",
+    summary_policy: Optional[dict[str, Any]] = None,
+    pdf_meta: Optional[dict[str, Any]] = None,
+) -> tuple[bool, str, str]:
+    """
+    Send post in two-phase mode: payload carries outbox_id and callback_url; n8n answers right
+    away with { "ok": true, "execution_id": "..." } and later POSTs the outcome to callback_url.
+    Retries on 5xx and connection errors like send_to_n8n_webhook (same n8n breaker and budget).
+
+    Returns:
+        (accepted, execution_id, error). A 2xx without execution_id is not an ack.
+    """
+    payload = build_webhook_payload(
+        post_text=post_text,
+        pdf_path=pdf_path,
+        message_id=message_id,
+        channel_id=channel_id,
+        source_channel=source_channel,
+        extracted_text=extracted_text,
+        summary=summary,
+        summary_policy=summary_policy,
+        pdf_meta=pdf_meta,
+    )
+    payload["outbox_id"] = outbox_id
+    payload["callback_url"] = callback_url
+    endpoint = get_endpoint(N8N_ENDPOINT)
+    endpoint.budget.record_request()
+    error = ""
+    for attempt in range(WEBHOOK_MAX_ATTEMPTS):
+        if attempt > 0 and not await _wait_before_retry(
+            endpoint, attempt, "webhook_ack_retry", url=webhook_url, outbox_id=outbox_id
+        ):
+            break
+        if not endpoint.breaker.allow():
+            error = str(_circuit_open_error(endpoint, outbox_id=outbox_id))
+            break
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    webhook_url,
+                    json=payload,
+                    timeout=aiohttp.ClientTimeout(total=WEBHOOK_ACK_TIMEOUT_SEC),
+                ) as resp:
+                    body = await resp.text()
+                    if 200 <= resp.status < 300:
+                        endpoint.breaker.record_success()
+                        try:
+                            data = json.loads(body) if body.strip() else {}
+                        except ValueError:
+                            data = {}
+                        execution_id = str(data.get("execution_id") or "") if isinstance(data, dict) else ""
+                        if not execution_id:
+                            log.warning(
+                                "webhook_ack_without_execution_id",
+                                url=webhook_url,
+                                outbox_id=outbox_id,
+                                body=body[:200],
+                            )
+                            return False, "", "n8n response has no execution_id (workflow not in ack mode?)"
+                        log.info(
+                            "webhook_accepted",
+                            url=webhook_url,
+                            outbox_id=outbox_id,
+                            message_id=message_id,
+                            execution_id=execution_id,
+                            attempt=attempt + 1,
+                        )
+                        return True, execution_id, ""
+                    error = f"HTTP {resp.status}: {body[:200]}"
+                    log.warning(
+                        "webhook_ack_failed",
+                        url=webhook_url,
+                        outbox_id=outbox_id,
+                        status=resp.status,
+                        body=body[:500],
+                        attempt=attempt + 1,
+                    )
+                    if resp.status < 500:
+                        endpoint.breaker.record_success()
+                        break
+                    endpoint.breaker.record_failure()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            endpoint.breaker.record_failure()
+            error = str(e) or type(e).__name__
+            log.warning(
+                "webhook_ack_request_error",
+                url=webhook_url,
+                outbox_id=outbox_id,
+                attempt=attempt + 1,
+                error=error,
+            )
+        except Exception as e:
+            endpoint.breaker.record_failure()
+            error = str(e) or type(e).__name__
+            log.warning(
+                "webhook_ack_unexpected_error",
+                outbox_id=outbox_id,
+                attempt=attempt + 1,
+                error=error,
+            )
+    return False, "", error or "webhook ack failed"
+
+
+def _parse_bulk_results(
+    data: Any,
+    outbox_ids: list[int],
+) -> dict[int, tuple[bool, str]]:
+    """
+    Map n8n bulk response to per-outbox results.
+
+    Accepts { "results": [...] } or a bare list. Each result should carry outbox_id; results
+    without outbox_id are matched by position. Items missing from the response are failures.
+    """
+    results = data.get("results") if isinstance(data, dict) else data
+    out: dict[int, tuple[bool, str]] = {}
+    if isinstance(results, list):
+        for index, item in enumerate(results):
+            if not isinstance(item, dict):
+                continue
+            raw_id = item.get("outbox_id")
+            try:
+                outbox_id = int(raw_id) if raw_id is not None else outbox_ids[index]
+            except (TypeError, ValueError, IndexError):
+                continue
+            if outbox_id not in outbox_ids:
+                continue
+            if item.get("ok") is True:
+                out[outbox_id] = (True, "")
+            else:
+                out[outbox_id] = (False, str(item.get("error") or "item failed in n8n")[:500])
+    for outbox_id in outbox_ids:
+        out.setdefault(outbox_id, (False, "no result for item in bulk response"))
+    return out
+
+
+async def send_bulk_to_n8n_webhook(
+    webhook_url: str,
+    items: list[dict[str, Any]],
+) -> dict[int, tuple[bool, str]]:
+    """
+    Send several posts in one request: { "posts": [ {...payload, "outbox_id": id}, ... ] }.
+
+    n8n answers with { "ok": true, "results": [ { "outbox_id": id, "ok": bool, "error": "..." } ] }.
+    The whole request is retried on 5xx like send_to_n8n_webhook (same n8n breaker and budget);
+    on final failure every item gets the same error.
+
+    Args:
+        webhook_url: URL of the bulk workflow webhook (e.g. http://n8n:5678/webhook/pdf-post-bulk).
+        items: Outbox rows (id, post_text, pdf_path, message_id, channel_id, source_channel,
+            optional extracted_text, summary, summary_policy, pdf_meta).
+
+    Returns:
+        Dict outbox_id -> (ok, error). Every input id is present.
+    """
+    outbox_ids = [int(row["id"]) for row in items]
+    if not outbox_ids:
+        return {}
+    posts = []
+    for row in items:
+        payload = build_webhook_payload(
+            post_text=row.get("post_text") or "",
+            pdf_path=row.get("pdf_path") or "",
+            message_id=row["message_id"],
+            channel_id=row["channel_id"],
+            source_channel=row.get("source_channel") or row["channel_id"],
+            extracted_text=row.get("extracted_text") or "",
+            summary=row.get("summary") or "",
+            summary_policy=row.get("summary_policy"),
+            pdf_meta=row.get("pdf_meta"),
+        )
+        payload["outbox_id"] = int(row["id"])
+        posts.append(payload)
+    endpoint = get_endpoint(N8N_ENDPOINT)
+    endpoint.budget.record_request()
+    last_error: Exception | None = None
+    for attempt in range(WEBHOOK_MAX_ATTEMPTS):
+        if attempt > 0 and not await _wait_before_retry(
+            endpoint, attempt, "webhook_bulk_retry", url=webhook_url, count=len(posts)
+        ):
+            break
+        if not endpoint.breaker.allow():
+            last_error = _circuit_open_error(endpoint, count=len(posts))
+            break
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    webhook_url,
+                    json={"posts": posts},
+                    timeout=aiohttp.ClientTimeout(total=WEBHOOK_BULK_TIMEOUT_SEC),
+                ) as resp:
+                    body = await resp.text()
+                    if 200 <= resp.status < 300:
+                        endpoint.breaker.record_success()
+                        try:
+                            data = json.loads(body) if body.strip() else {}
+                        except ValueError:
+                            data = {}
+                        results = _parse_bulk_results(data, outbox_ids)
+                        log.info(
+                            "webhook_bulk_sent",
+                            url=webhook_url,
+                            count=len(posts),
+                            ok_count=sum(1 for ok, _ in results.values() if ok),
+                            status=resp.status,
+                            attempt=attempt + 1,
+                        )
+                        return results
+                    last_error = RuntimeError(f"HTTP {resp.status}: {body[:200]}")
+                    log.warning(
+                        "webhook_bulk_failed",
+                        url=webhook_url,
+                        count=len(posts),
+                        status=resp.status,
+                        body=body[:500],
+                        attempt=attempt + 1,
+                    )
+                    if resp.status < 500:
+                        endpoint.breaker.record_success()
+                        break
+                    endpoint.breaker.record_failure()
+        except aiohttp.ClientError as e:
+            endpoint.breaker.record_failure()
+            last_error = e
+            log.warning(
+                "webhook_bulk_request_error",
+                url=webhook_url,
+                count=len(posts),
+                attempt=attempt + 1,
+                error=str(e),
+            )
+        except Exception as e:
+            endpoint.breaker.record_failure()
+            last_error = e
+            log.warning(
+                "webhook_bulk_unexpected_error",
+                count=len(posts),
+                attempt=attempt + 1,
+                error=str(e),
+            )
+    error = f"bulk webhook failed: {last_error}"[:500]
+    log.error("webhook_bulk_all_retries_failed", url=webhook_url, count=len(posts), error=error)
+    return {outbox_id: (False, error) for outbox_id in outbox_ids}
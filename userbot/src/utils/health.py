@@ -0,0 +1,36 @@
+"""In-process liveness/readiness state for /healthz, /readyz and /metrics (no DB access)."""
+
+import time
+from typing import Optional
+
+_last_update_at: Optional[float] = None
+_outbox_sampled_at: Optional[float] = None
+
+
+def mark_update() -> None:
+    """Record that an update from Telegram reached the handlers."""
+    global _last_update_at
+    _last_update_at = time.monotonic()
+
+
+def seconds_since_last_update() -> Optional[float]:
+    """Seconds since the last Telegram update (None before the first one)."""
+    return None if _last_update_at is None else time.monotonic() - _last_update_at
+
+
+def mark_outbox_sampled() -> None:
+    """Record a successful outbox depth sample (proves the DB is reachable)."""
+    global _outbox_sampled_at
+    _outbox_sampled_at = time.monotonic()
+
+
+def outbox_sample_age() -> Optional[float]:
+    """Seconds since the last outbox depth sample (None before the first one)."""
+    return None if _outbox_sampled_at is None else time.monotonic() - _outbox_sampled_at
+
+
+def reset() -> None:
+    """Forget recorded state; used by tests."""
+    global _last_update_at, _outbox_sampled_at
+    _last_update_at = None
+    _outbox_sampled_at = None
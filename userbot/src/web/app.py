@@ -1,15 +1,41 @@
-"""aiohttp app for internal API: POST /discussion/resolve."""
+"""aiohttp app for internal API: POST /discussion/resolve[_batch], /outbox/complete, /pdf/restore, GET /metrics, /healthz, /readyz."""
 
 from typing import Optional
 
+import asyncpg
 from aiohttp import web
 import structlog
 from telethon import TelegramClient
 
+from src.services.discussion_cache import RESOLVE_BATCH_MAX_ITEMS, DiscussionCache
 from src.services.discussion_resolver import resolve_discussion_message
+from src.services.outbox_ack import apply_outbox_completion
+from src.services.outbox_depth import OUTBOX_DEPTH_SAMPLE_INTERVAL_SEC
+from src.services.pdf_archive import PdfArchive
+from src.utils import health, metrics
+from src.utils.metrics import render_latest
 
 log = structlog.get_logger()
 
+# /readyz fails if the outbox depth sample (DB round trip) is older than this
+READY_MAX_SAMPLE_AGE_SEC = 3 * OUTBOX_DEPTH_SAMPLE_INTERVAL_SEC
+
+_telegram_connected = metrics.gauge(
+    "userbot_telegram_connected",
+    "1 if the Telethon client is connected to Telegram",
+)
+_since_last_update = metrics.gauge(
+    "userbot_seconds_since_last_update",
+    "Seconds since the last Telegram update reached the handlers (-1 before the first one)",
+)
+
+
+def _telegram_is_connected(client: Optional[TelegramClient]) -> bool:
+    try:
+        return bool(client is not None and client.is_connected())
+    except Exception:
+        return False
+
 
 def _check_auth(request: web.Request, expected_token: Optional[str]) -> bool:
     if not expected_token or not expected_token.strip():
@@ -24,6 +50,7 @@ async def handle_discussion_resolve(request: web.Request) -> web.Response:
     """
     POST /discussion/resolve with JSON { "channel_id": "-100...", "message_id": 123 }.
     Returns { "ok": true, "discussion_chat_id": int, "discussion_message_id": int } or { "ok": false, "error": "..." }.
+    Answered from DiscussionCache when possible (resolved pairs, channels without a linked chat).
     """
     client: Optional[TelegramClient] = request.app.get("client")
     token = request.app.get("api_token") or ""
@@ -54,8 +81,9 @@ async def handle_discussion_resolve(request: web.Request) -> web.Response:
     if message_id < 1:
         return web.json_response({"ok": False, "error": "message_id must be positive"}, status=400)
 
-    discussion_chat_id, discussion_message_id = await resolve_discussion_message(
-        client, str(channel_id), message_id
+    cache: DiscussionCache = request.app["discussion_cache"]
+    discussion_chat_id, discussion_message_id = await cache.resolve(
+        client, str(channel_id), message_id, resolve_discussion_message
     )
     if discussion_chat_id is None or discussion_message_id is None:
         return web.json_response(
@@ -72,9 +100,197 @@ async def handle_discussion_resolve(request: web.Request) -> web.Response:
     )
 
 
-def create_app(client: TelegramClient, api_token: Optional[str] = None) -> web.Application:
+async def handle_discussion_resolve_batch(request: web.Request) -> web.Response:
+    """
+    POST /discussion/resolve_batch with JSON { "items": [{ "channel_id": "-100...", "message_id": 123 }, ...] }.
+    Returns { "ok": true, "results": [...] } in request order; each result is
+    { "channel_id", "message_id", "ok", "discussion_chat_id", "discussion_message_id" } or with "error".
+    Items are resolved concurrently under a small limit; a FloodWait pauses the whole batch.
+    """
+    client: Optional[TelegramClient] = request.app.get("client")
+    token = request.app.get("api_token") or ""
+
+    if not _check_auth(request, token):
+        log.warning("discussion_resolve_unauthorized", path=request.path)
+        return web.json_response({"ok": False, "error": "Forbidden"}, status=403)
+    if not client:
+        return web.json_response({"ok": False, "error": "Server not ready"}, status=503)
+
+    try:
+        body = await request.json()
+    except Exception as e:
+        log.error("discussion_resolve_bad_json", error=str(e))
+        return web.json_response({"ok": False, "error": "Invalid JSON"}, status=400)
+
+    raw_items = body.get("items") if isinstance(body, dict) else None
+    if not isinstance(raw_items, list) or not raw_items:
+        return web.json_response({"ok": False, "error": "items required"}, status=400)
+    if len(raw_items) > RESOLVE_BATCH_MAX_ITEMS:
+        return web.json_response(
+            {"ok": False, "error": f"at most {RESOLVE_BATCH_MAX_ITEMS} items per request"},
+            status=400,
+        )
+    items: list[tuple[str, int]] = []
+    for raw in raw_items:
+        try:
+            channel_id = str(raw["channel_id"]).strip()
+            message_id = int(raw["message_id"])
+        except (TypeError, KeyError, ValueError):
+            return web.json_response(
+                {"ok": False, "error": "each item needs channel_id and integer message_id"},
+                status=400,
+            )
+        if not channel_id or message_id < 1:
+            return web.json_response(
+                {"ok": False, "error": "each item needs channel_id and positive message_id"},
+                status=400,
+            )
+        items.append((channel_id, message_id))
+
+    cache: DiscussionCache = request.app["discussion_cache"]
+    resolved = await cache.resolve_many(client, items, resolve_discussion_message)
+    results = []
+    for (channel_id, message_id), (chat_id, msg_id) in zip(items, resolved):
+        result: dict = {"channel_id": channel_id, "message_id": message_id}
+        if chat_id is not None and msg_id is not None:
+            result.update(ok=True, discussion_chat_id=chat_id, discussion_message_id=msg_id)
+        else:
+            result.update(ok=False, error="Could not resolve discussion message")
+        results.append(result)
+    return web.json_response({"ok": True, "results": results})
+
+
+async def handle_outbox_complete(request: web.Request) -> web.Response:
+    """
+    POST /outbox/complete: completion callback from n8n (two-phase delivery).
+    JSON { "outbox_id": int, "execution_id": "...", "status": "completed" | "failed", "error": "..." }.
+    Returns { "ok": true, "updated": bool }; updated=false for unknown, finished or stale executions.
+    """
+    pool: Optional[asyncpg.Pool] = request.app.get("pool")
+    token = request.app.get("api_token") or ""
+
+    if not _check_auth(request, token):
+        log.warning("outbox_complete_unauthorized", path=request.path)
+        return web.json_response({"ok": False, "error": "Forbidden"}, status=403)
+    if pool is None:
+        return web.json_response({"ok": False, "error": "Server not ready"}, status=503)
+
+    try:
+        body = await request.json()
+    except Exception as e:
+        log.error("outbox_complete_bad_json", error=str(e))
+        return web.json_response({"ok": False, "error": "Invalid JSON"}, status=400)
+
+    status = body.get("status")
+    execution_id = str(body.get("execution_id") or "").strip()
+    if status not in ("completed", "failed") or not execution_id:
+        return web.json_response(
+            {"ok": False, "error": "execution_id and status (completed|failed) required"},
+            status=400,
+        )
+    try:
+        outbox_id = int(body.get("outbox_id"))
+    except (TypeError, ValueError):
+        return web.json_response({"ok": False, "error": "outbox_id must be integer"}, status=400)
+
+    updated = await apply_outbox_completion(
+        pool,
+        outbox_id,
+        execution_id,
+        ok=status == "completed",
+        error=str(body.get("error") or ""),
+    )
+    return web.json_response({"ok": True, "updated": updated})
+
+
+async def handle_pdf_restore(request: web.Request) -> web.Response:
+    """
+    POST /pdf/restore with JSON { "pdf_path": "/data/pdfs/..." }: copy an archived PDF back to the
+    hot volume (re-publish, re-summarize). Returns { "ok": true, "pdf_path", "result": "restored" | "hot" };
+    404 if the file is neither on the volume nor in the archive.
+    """
+    archive: Optional[PdfArchive] = request.app.get("pdf_archive")
+    token = request.app.get("api_token") or ""
+
+    if not _check_auth(request, token):
+        log.warning("pdf_restore_unauthorized", path=request.path)
+        return web.json_response({"ok": False, "error": "Forbidden"}, status=403)
+    if archive is None:
+        return web.json_response({"ok": False, "error": "PDF archive is not configured"}, status=503)
+
+    try:
+        body = await request.json()
+    except Exception as e:
+        log.error("pdf_restore_bad_json", error=str(e))
+        return web.json_response({"ok": False, "error": "Invalid JSON"}, status=400)
+    pdf_path = str((body.get("pdf_path") if isinstance(body, dict) else None) or "").strip()
+    if not pdf_path:
+        return web.json_response({"ok": False, "error": "pdf_path required"}, status=400)
+
+    try:
+        result = await archive.restore(pdf_path)
+    except Exception as e:
+        log.error("pdf_restore_failed", pdf_path=pdf_path, error=str(e), exc_info=True)
+        return web.json_response({"ok": False, "error": "Restore failed"}, status=500)
+    if result == "not_archived":
+        return web.json_response({"ok": False, "error": "PDF not found"}, status=404)
+    return web.json_response({"ok": True, "pdf_path": pdf_path, "result": result})
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """GET /metrics: in-process metrics in Prometheus text format (no auth, internal network only)."""
+    _telegram_connected.set(1 if _telegram_is_connected(request.app.get("client")) else 0)
+    since = health.seconds_since_last_update()
+    _since_last_update.set(-1 if since is None else since)
+    return web.Response(text=render_latest(), content_type="text/plain", charset="utf-8")
+
+
+async def handle_healthz(request: web.Request) -> web.Response:
+    """GET /healthz: liveness — the event loop answers."""
+    return web.json_response({"ok": True})
+
+
+async def handle_readyz(request: web.Request) -> web.Response:
+    """
+    GET /readyz: readiness — Telegram client connected and a recent outbox depth sample (DB reachable).
+    Returns 200 or 503 with per-check details; no DB query is made here.
+    """
+    sample_age = health.outbox_sample_age()
+    since_update = health.seconds_since_last_update()
+    checks = {
+        "telegram_connected": _telegram_is_connected(request.app.get("client")),
+        "database": sample_age is not None and sample_age <= READY_MAX_SAMPLE_AGE_SEC,
+    }
+    ready = all(checks.values())
+    return web.json_response(
+        {
+            "ok": ready,
+            "checks": checks,
+            "outbox_sample_age_sec": None if sample_age is None else round(sample_age, 1),
+            "seconds_since_last_update": None if since_update is None else round(since_update, 1),
+        },
+        status=200 if ready else 503,
+    )
+
+
+def create_app(
+    client: TelegramClient,
+    api_token: Optional[str] = None,
+    pool: Optional[asyncpg.Pool] = None,
+    discussion_cache: Optional[DiscussionCache] = None,
+    pdf_archive: Optional[PdfArchive] = None,
+) -> web.Application:
     app = web.Application()
     app["client"] = client
     app["api_token"] = api_token or ""
+    app["pool"] = pool
+    app["discussion_cache"] = discussion_cache or DiscussionCache()
+    app["pdf_archive"] = pdf_archive
     app.router.add_post("/discussion/resolve", handle_discussion_resolve)
+    app.router.add_post("/discussion/resolve_batch", handle_discussion_resolve_batch)
+    app.router.add_post("/outbox/complete", handle_outbox_complete)
+    app.router.add_post("/pdf/restore", handle_pdf_restore)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_get("/healthz", handle_healthz)
+    app.router.add_get("/readyz", handle_readyz)
     return app
@@ -0,0 +1,16 @@
+"""Shared fixtures for userbot tests."""
+
+import pytest
+
+from src.services.mtproto_scheduler import reset_mtproto_scheduler
+from src.utils.resilience import reset_endpoints
+
+
+@pytest.fixture(autouse=True)
+def _fresh_circuit_breakers():
+    """Each test starts with closed breakers, full retry budgets and no FloodWait pauses."""
+    reset_endpoints()
+    reset_mtproto_scheduler()
+    yield
+    reset_endpoints()
+    reset_mtproto_scheduler()
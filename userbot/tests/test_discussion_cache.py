@@ -0,0 +1,47 @@
+"""Tests for the discussion resolution cache."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.discussion_cache import DiscussionCache, TTLCache
+
+
+def test_ttl_cache_evicts_lru_and_expired() -> None:
+    """Oldest unused key is evicted at maxsize; entries past TTL are gone."""
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_resolve_caches_pairs_and_looks_up_linked_chat_once() -> None:
+    """Second resolve of the same post is a cache hit; linked chat is fetched once."""
+    cache = DiscussionCache()
+    resolver = AsyncMock(return_value=(-100555, 9))
+    with patch(
+        "src.services.discussion_cache.fetch_linked_chat_id",
+        new_callable=AsyncMock,
+        return_value=(-100123, -100555),
+    ) as fetch:
+        assert await cache.resolve(None, "-100123", 42, resolver) == (-100555, 9)
+        assert await cache.resolve(None, "-100123", 42, resolver) == (-100555, 9)
+        assert await cache.resolve(None, "-100123", 43, resolver) == (-100555, 9)
+    fetch.assert_awaited_once()
+    assert resolver.await_count == 2
+    assert cache.known_channels() == ["-100123"]
+
+
+@pytest.mark.asyncio
+async def test_resolve_skips_channel_without_linked_chat() -> None:
+    """Channel without discussion group is answered without calling the resolver."""
+    cache = DiscussionCache()
+    resolver = AsyncMock()
+    with patch("src.services.discussion_cache.fetch_linked_chat_id", new_callable=AsyncMock, return_value=(-100777, None)):
+        assert await cache.resolve(None, "@news", 1, resolver) == (None, None)
+    resolver.assert_not_called()
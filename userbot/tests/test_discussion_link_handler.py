@@ -0,0 +1,53 @@
+"""Tests for the auto-forward (discussion link) handler."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from telethon.tl.types import MessageFwdHeader, PeerChannel
+
+from src.handlers import discussion_link
+from src.services.discussion_cache import DiscussionCache
+
+
+def _register(cache: DiscussionCache):
+    handlers = []
+
+    def capture_handler(*args, **kwargs):
+        def deco(f):
+            handlers.append(f)
+            return f
+
+        return deco
+
+    client = MagicMock()
+    client.on = MagicMock(side_effect=capture_handler)
+    discussion_link.register_discussion_link_handler(client, MagicMock(), cache)
+    return handlers[0]
+
+
+def _event(chat_channel_id: int, origin_channel_id: int, post_id: int, message_id: int) -> MagicMock:
+    event = MagicMock()
+    event.message.id = message_id
+    event.message.peer_id = PeerChannel(chat_channel_id)
+    event.message.fwd_from = MessageFwdHeader(
+        date=None, from_id=PeerChannel(origin_channel_id), channel_post=post_id,
+    )
+    return event
+
+
+@pytest.mark.asyncio
+async def test_auto_forward_in_linked_chat_is_recorded_and_cached() -> None:
+    """Auto-forwarded copy of a target channel post: link stored with NOTIFY and cached."""
+    cache = DiscussionCache()
+    with patch("src.services.discussion_cache.fetch_linked_chat_id", new_callable=AsyncMock,
+               return_value=(-1000000001111, -1000000002222)):
+        await cache.refresh_linked(None, "@target")
+    handler = _register(cache)
+    with patch.object(discussion_link, "insert_discussion_link", new_callable=AsyncMock, return_value=True) as insert:
+        await handler(_event(2222, 1111, 42, 7))
+        await handler(_event(2222, 3333, 43, 8))  # manual forward from another channel
+    insert.assert_awaited_once()
+    assert insert.await_args.args[1:] == (-1000000001111, 42, -1000000002222, 7)
+    resolver = AsyncMock()
+    assert await cache.resolve(None, "@target", 42, resolver) == (-1000000002222, 7)
+    resolver.assert_not_called()
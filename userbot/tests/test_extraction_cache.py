@@ -0,0 +1,79 @@
+"""Tests for the content-hash extraction cache and hashing during PDF download."""
+
+import hashlib
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from telethon.tl.types import Document, DocumentAttributeFilename, MessageMediaDocument, PeerChannel
+
+from src.services import extraction_cache as cache_module
+from src.services.extraction_cache import ExtractionCache
+from src.services.pdf_downloader import download_pdf
+from src.services.pdf_extractor import PdfExtraction
+from src.services.pdf_storage import sharded_path
+
+
+def _extractor(result: PdfExtraction) -> MagicMock:
+    extractor = MagicMock()
+    extractor.version = "pypdf-test/r1/p50/c100000"
+    extractor.extract = AsyncMock(return_value=result)
+    return extractor
+
+
+@pytest.mark.asyncio
+async def test_hit_skips_extraction_and_miss_stores_result():
+    """A cached hash is answered by the lookup alone; a miss extracts and stores the result."""
+    cached = PdfExtraction(text="cached", pages=3, total_pages=3)
+    extractor = _extractor(PdfExtraction(text="fresh", pages=1, total_pages=1))
+    cache = ExtractionCache(pool=None, extractor=extractor)
+    with (
+        patch.object(cache_module, "get_cached_extraction", new_callable=AsyncMock, side_effect=[cached, None]) as get,
+        patch.object(cache_module, "put_cached_extraction", new_callable=AsyncMock) as put,
+        patch.object(cache_module, "evict_extraction_cache", new_callable=AsyncMock, return_value=0),
+    ):
+        assert (await cache.extract("/data/pdfs/a.pdf", "aa")).text == "cached"
+        extractor.extract.assert_not_awaited()
+        assert (await cache.extract("/data/pdfs/b.pdf", "bb")).text == "fresh"
+    assert get.await_args_list[0].args[1:] == ("aa", extractor.version)
+    put.assert_awaited_once()
+    assert put.await_args.args[1] == "bb"
+
+
+@pytest.mark.asyncio
+async def test_failed_extraction_is_not_cached_and_lookup_errors_fall_back():
+    extractor = _extractor(PdfExtraction(error="PdfReadError: broken"))
+    cache = ExtractionCache(pool=None, extractor=extractor)
+    with (
+        patch.object(cache_module, "get_cached_extraction", new_callable=AsyncMock, side_effect=[None, RuntimeError("db")]),
+        patch.object(cache_module, "put_cached_extraction", new_callable=AsyncMock) as put,
+    ):
+        assert (await cache.extract("/data/pdfs/a.pdf", "aa")).error
+        assert (await cache.extract("/data/pdfs/a.pdf", "aa")).error
+    put.assert_not_awaited()
+    assert extractor.extract.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_download_pdf_hashes_streamed_chunks(tmp_path):
+    """SHA-256 comes from the chunks written by download_media, matching the saved file."""
+    chunks = [b"%PDF-1.4\n", b"x" * 1000, b"%%EOF\n"]
+
+    async def download_media(media, file):
+        for chunk in chunks:
+            file.write(chunk)
+        return file
+
+    client = MagicMock()
+    client.download_media = download_media
+    doc = Document(
+        id=1, access_hash=0, file_reference=b"", date=None, mime_type="application/pdf", size=0,
+        dc_id=1, attributes=[DocumentAttributeFilename(file_name="r.pdf")],
+    )
+    message = MagicMock(id=7, peer_id=PeerChannel(42), media=MessageMediaDocument(document=doc))
+
+    downloaded = await download_pdf(client, message, str(tmp_path))
+
+    content = b"".join(chunks)
+    assert downloaded.path == sharded_path(str(tmp_path), "42_7.pdf")
+    assert downloaded.sha256 == hashlib.sha256(content).hexdigest()
+    assert open(downloaded.path, "rb").read() == content
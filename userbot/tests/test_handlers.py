@@ -154,3 +154,97 @@ async def test_handler_sends_webhook_for_pdf_and_text_post() -> None:
     call_kw = mock_webhook.call_args[1]
     assert call_kw["pdf_path"] == "/data/pdfs/123_3.pdf"
     assert call_kw["post_text"] == "Подпись к PDF"
+
+
+def _register_handler(new_post, extractor=None):
+    handlers = []
+
+    def capture_handler(*args, **kwargs):
+        def deco(f):
+            handlers.append(f)
+            return f
+
+        return deco
+
+    client = MagicMock()
+    client.on = MagicMock(side_effect=capture_handler)
+    config = MagicMock()
+    config.PDF_STORAGE_PATH = "/data/pdfs"
+    config.PDF_KEYWORD_SCAN_PAGES = 10
+    config.get_source_channel_fallback = MagicMock(return_value="")
+    new_post.register_new_post_handler(client, config, AsyncMock(), extractor=extractor)
+    return handlers[0]
+
+
+async def _run_captionless_pdf_post(tmp_path, probe, keywords=(), extractor=None):
+    """Captionless post with a PDF whose probe gives `probe`; returns (outcome, insert_outbox kwargs, file)."""
+    from telethon.tl.types import DocumentAttributeFilename
+
+    from src.handlers import new_post
+    from src.services.keyword_filter import KeywordMatcher
+    from src.services.pdf_downloader import PdfDownload
+
+    pdf = tmp_path / "123_5.pdf"
+    pdf.write_bytes(b"%PDF-1.4 scanned")
+    handler = _register_handler(new_post, extractor=extractor)
+    event = MagicMock()
+    event.message = MagicMock(id=5, text="", media=MagicMock())
+    event.message.peer_id = MagicMock(channel_id=123)
+    document = MagicMock(attributes=[DocumentAttributeFilename(file_name="Годовой отчёт 2025.pdf")])
+    outcomes = []
+
+    with (
+        patch.object(new_post, "get_channel_identifier", return_value="123"),
+        patch.object(new_post, "_get_monitored", new_callable=AsyncMock, return_value={"123"}),
+        patch.object(new_post, "_get_keywords", new_callable=AsyncMock, return_value=KeywordMatcher(list(keywords))),
+        patch.object(new_post, "get_pdf_document", return_value=document),
+        patch.object(new_post, "download_pdf", new_callable=AsyncMock, return_value=PdfDownload(str(pdf), "ab")),
+        patch.object(new_post, "run_pdf_probe", new_callable=AsyncMock, return_value=probe),
+        patch.object(new_post, "save_pdf_meta", new_callable=AsyncMock),
+        patch.object(new_post, "register_pdf_file", new_callable=AsyncMock),
+        patch.object(new_post, "insert_outbox", new_callable=AsyncMock, return_value=1) as insert,
+        patch.object(new_post, "wake_outbox_worker"),
+        patch.object(new_post._posts, "inc", side_effect=lambda outcome: outcomes.append(outcome)),
+    ):
+        await handler(event)
+    return outcomes[0], insert.call_args.kwargs if insert.called else None, pdf
+
+
+@pytest.mark.asyncio
+async def test_captionless_unreadable_pdf_goes_on_with_its_file_name(tmp_path) -> None:
+    """A scan without caption is not dropped: the file stays and the post text is the document name."""
+    from src.services.pdf_probe import PDF_STATUS_NO_TEXT, PdfProbe
+
+    outcome, outbox, pdf = await _run_captionless_pdf_post(tmp_path, PdfProbe(status=PDF_STATUS_NO_TEXT, pages=12))
+    assert outcome == "accepted"
+    assert pdf.exists()
+    assert outbox["pdf_path"] == str(pdf)
+    assert outbox["post_text"].startswith("Годовой отчёт 2025")
+
+
+@pytest.mark.asyncio
+async def test_unreadable_pdf_without_keyword_in_text_is_skipped(tmp_path) -> None:
+    """With keywords set, a PDF that cannot be scanned is skipped like a failed scan, not let through."""
+    from src.services.pdf_probe import PDF_STATUS_NO_TEXT, PdfProbe
+
+    extractor = MagicMock()
+    extractor.scan_keywords = AsyncMock()
+    outcome, outbox, pdf = await _run_captionless_pdf_post(
+        tmp_path, PdfProbe(status=PDF_STATUS_NO_TEXT, pages=12), keywords=["МСФО"], extractor=extractor
+    )
+    assert (outcome, outbox) == ("skipped_keyword_pdf", None)
+    assert not pdf.exists()
+    extractor.scan_keywords.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_probe_timeout_keeps_pdf_readable_path(tmp_path) -> None:
+    """A probe that timed out (unknown) does not mark the PDF unreadable: post text stays empty for extraction."""
+    from src.services.pdf_probe import PDF_STATUS_UNKNOWN, PdfProbe
+
+    outcome, outbox, pdf = await _run_captionless_pdf_post(
+        tmp_path, PdfProbe(status=PDF_STATUS_UNKNOWN, error="probe timeout after 30s")
+    )
+    assert outcome == "accepted"
+    assert pdf.exists()
+    assert (outbox["pdf_path"], outbox["post_text"]) == (str(pdf), "")
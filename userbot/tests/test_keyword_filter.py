@@ -0,0 +1,20 @@
+"""Tests for the compiled keyword matcher."""
+
+from src.services.keyword_filter import KeywordMatcher
+
+
+def test_matcher_matches_like_substring_loop():
+    matcher = KeywordMatcher([" Отчёт ", "МСФО", "", "отчёт о прибылях", "c++"])
+    assert matcher.keywords[0] == "отчёт о прибылях"
+    assert matcher.max_len == len("отчёт о прибылях")
+    assert matcher.search("Годовой ОТЧЁТ О ПРИБЫЛЯХ за 2025") == "отчёт о прибылях"
+    assert matcher.search("Данные по мсфо") == "мсфо"
+    assert matcher.search("Курс на C++ и Rust") == "c++"
+    assert matcher.search("Погода на завтра") is None
+    assert matcher.search("") is None
+
+
+def test_empty_matcher_is_no_filter():
+    matcher = KeywordMatcher(["", "  "])
+    assert not matcher
+    assert matcher.search("любой текст") is None
@@ -0,0 +1,70 @@
+"""Tests for the RPM/TPM-aware LLM scheduler against the rate-limited fake LLM."""
+
+import asyncio
+
+import pytest
+
+from src.services.llm_client import LLMClient
+from src.services.llm_scheduler import PRIORITY_BACKFILL, PRIORITY_LIVE, PRIORITY_REPROCESS, LLMScheduler
+from tools.fake_llm import FakeLLM, start_fake_llm
+
+
+@pytest.mark.asyncio
+async def test_waiting_requests_run_by_priority():
+    """With the only slot taken, queued live requests go before earlier backfill and reprocess ones."""
+    scheduler = LLMScheduler(max_concurrency=1)
+    await scheduler.acquire(10)
+    order: list[str] = []
+
+    async def request(name: str, priority: int) -> None:
+        await scheduler.acquire(10, priority)
+        order.append(name)
+        await scheduler.release(10, 10)
+
+    queued = [
+        asyncio.create_task(request("reprocess", PRIORITY_REPROCESS)),
+        asyncio.create_task(request("backfill", PRIORITY_BACKFILL)),
+        asyncio.create_task(request("live", PRIORITY_LIVE)),
+    ]
+    await asyncio.sleep(0.01)
+    assert order == [] and scheduler.queued == 3
+    await scheduler.release(10, 10)
+    await asyncio.gather(*queued)
+    assert order == ["live", "backfill", "reprocess"]
+    assert scheduler.tokens_used == 40
+
+
+@pytest.mark.asyncio
+async def test_scheduler_stays_under_server_limits():
+    """A burst larger than the RPM budget is spread out by the scheduler instead of drawing 429s."""
+    fake = FakeLLM(rpm=5, tpm=100000, period=0.5)
+    runner, base_url = await start_fake_llm(fake)
+    # One request of headroom absorbs network jitter between our clock and the server's
+    scheduler = LLMScheduler(rpm=4, tpm=100000, period=0.5)
+    client = LLMClient(base_url=base_url, model="fake", scheduler=scheduler)
+    try:
+        responses = await asyncio.gather(*(client.complete(f"Текст:\nпост {i}") for i in range(12)))
+    finally:
+        await client.close()
+        await runner.cleanup()
+    assert len(fake.prompts) == 12
+    assert fake.rate_limited == 0
+    assert max(r.queue_seconds for r in responses) > 0.3
+    assert scheduler.tokens_used == sum(r.prompt_tokens + r.completion_tokens for r in responses)
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_and_retries():
+    """Without local limits the server's 429 Retry-After pauses the queue and requests are retried."""
+    fake = FakeLLM(rpm=2, period=0.4)
+    runner, base_url = await start_fake_llm(fake)
+    scheduler = LLMScheduler()
+    client = LLMClient(base_url=base_url, model="fake", scheduler=scheduler)
+    try:
+        responses = await asyncio.gather(*(client.complete(f"Текст:\nпост {i}") for i in range(4)))
+    finally:
+        await client.close()
+        await runner.cleanup()
+    assert all(r.text.startswith("Кратко:") for r in responses)
+    assert fake.rate_limited > 0
+    assert scheduler.rate_limited == fake.rate_limited
@@ -0,0 +1,88 @@
+"""Tests for the MTProto call scheduler."""
+
+import asyncio
+
+import pytest
+from telethon.errors import FloodWaitError
+
+from src.services.mtproto_scheduler import (
+    PRIORITY_BACKFILL,
+    PRIORITY_LIVE,
+    PRIORITY_RESOLVE,
+    FloodPausedError,
+    MTProtoScheduler,
+)
+
+
+@pytest.mark.asyncio
+async def test_waiting_calls_run_by_priority() -> None:
+    """With the lane full, a queued resolve runs before earlier queued live and backfill calls."""
+    scheduler = MTProtoScheduler(limits={"m": 1})
+    gate = asyncio.Event()
+    order: list[str] = []
+
+    async def blocker():
+        await gate.wait()
+
+    async def record(name):
+        order.append(name)
+
+    first = asyncio.create_task(scheduler.call("m", blocker))
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.create_task(scheduler.call("m", lambda: record("backfill"), PRIORITY_BACKFILL)),
+        asyncio.create_task(scheduler.call("m", lambda: record("live"), PRIORITY_LIVE)),
+        asyncio.create_task(scheduler.call("m", lambda: record("resolve"), PRIORITY_RESOLVE)),
+    ]
+    await asyncio.sleep(0.01)
+    assert order == []
+    gate.set()
+    await asyncio.gather(first, *queued)
+    assert order == ["resolve", "live", "backfill"]
+
+
+@pytest.mark.asyncio
+async def test_two_free_slots_admit_both_waiters() -> None:
+    """Both slots free up at once: the waiter that woke while not the head still gets the second one."""
+    scheduler = MTProtoScheduler(limits={"m": 2})
+    gate = asyncio.Event()
+    backfill_ran = asyncio.Event()
+
+    async def blocker():
+        await gate.wait()
+
+    async def run_backfill():
+        backfill_ran.set()
+        return "backfill"
+
+    async def run_resolve():
+        # Holds its slot until the backfill call gets the other one, so its release wakes nobody
+        await backfill_ran.wait()
+        return "resolve"
+
+    running = [asyncio.create_task(scheduler.call("m", blocker)) for _ in range(2)]
+    await asyncio.sleep(0)
+    # The backfill call waits first, so it wakes first and finds the resolve call at the head
+    backfill = asyncio.create_task(scheduler.call("m", run_backfill, PRIORITY_BACKFILL))
+    await asyncio.sleep(0)
+    resolve = asyncio.create_task(scheduler.call("m", run_resolve, PRIORITY_RESOLVE))
+    await asyncio.sleep(0)
+    gate.set()
+    assert await asyncio.wait_for(asyncio.gather(resolve, backfill), timeout=1) == ["resolve", "backfill"]
+    await asyncio.gather(*running)
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_pauses_the_method_lane() -> None:
+    """A long FloodWait is raised and pauses the lane; other methods are not affected."""
+    scheduler = MTProtoScheduler()
+
+    async def flood():
+        raise FloodWaitError(None, capture=120)
+
+    with pytest.raises(FloodWaitError):
+        await scheduler.call("download_media", flood, max_wait=30)
+    assert scheduler.flood_wait_remaining("download_media") > 100
+    with pytest.raises(FloodPausedError):
+        await scheduler.call("download_media", lambda: asyncio.sleep(0), max_wait=30)
+    assert await scheduler.call("get_input_entity", lambda: asyncio.sleep(0, result="ok")) == "ok"
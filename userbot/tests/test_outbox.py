@@ -0,0 +1,157 @@
+"""Tests for outbox queries."""
+
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import asyncpg
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from src.database.outbox import (
+    complete_outbox,
+    fair_outbox_order,
+    get_pending_outbox_batch,
+    insert_outbox,
+    mark_outbox_accepted,
+    note_outbox_rows,
+)
+from src.database.pdf_archive import get_archivable
+
+# Queries whose behavior depends on concurrent updates run against a real Postgres when one is given
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+INIT_DB_DIR = Path(__file__).resolve().parents[2] / "init_db"
+
+
+@pytest_asyncio.fixture
+async def outbox_db():
+    """Pool on a throwaway schema with every init_db script applied; skipped without TEST_DATABASE_URL."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    conn = await asyncpg.connect(TEST_DATABASE_URL)
+    await conn.execute(f"CREATE SCHEMA {schema}")
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=2, server_settings={"search_path": schema})
+    try:
+        async with pool.acquire() as c:
+            for script in sorted(INIT_DB_DIR.glob("*.sql")):
+                await c.execute(script.read_text())
+        yield pool
+    finally:
+        await pool.close()
+        await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+        await conn.close()
+
+
+async def _outbox_row(pool: asyncpg.Pool, outbox_id: int) -> dict:
+    row = await pool.fetchrow(
+        "SELECT status, attempts, execution_id, last_error FROM userbot_outbox WHERE id = $1", outbox_id
+    )
+    return dict(row)
+
+
+def _candidates(source: str, count: int, weight: int = 1, priority: bool = False, start: int = 0) -> list[dict]:
+    """Queue of one source as the claim query returns it: ids encode source and position, minutes the age."""
+    return [
+        {
+            "id": f"{source}{n}",
+            "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=start + n),
+            "rn": n,
+            "weight": weight,
+            "priority": priority,
+        }
+        for n in range(1, count + 1)
+    ]
+
+
+def test_fair_order_interleaves_sources_by_weight() -> None:
+    """A flooding source does not starve the others: each round serves `weight` posts per source."""
+    flood = _candidates("a", 10)
+    quiet = _candidates("b", 2, start=100)
+    heavy = _candidates("c", 4, weight=2, start=200)
+    assert fair_outbox_order(flood + quiet + heavy, limit=8) == ["a1", "b1", "c1", "c2", "a2", "b2", "c3", "c4"]
+
+
+def test_fair_order_priority_first_and_newest_first() -> None:
+    """Priority sources go before every round; newest_first reverses the order within a round."""
+    normal = _candidates("a", 2)
+    urgent = _candidates("u", 2, priority=True, start=50)
+    assert fair_outbox_order(normal + urgent, limit=3) == ["u1", "u2", "a1"]
+    # With newest_first the claim query numbers each queue from its newest row
+    newest = [dict(c, rn=3 - c["rn"]) for c in _candidates("a", 2)] + [
+        dict(c, rn=3 - c["rn"]) for c in _candidates("b", 2, start=10)
+    ]
+    assert fair_outbox_order(newest, limit=4, newest_first=True) == ["b2", "a2", "b1", "a1"]
+
+
+@pytest.mark.asyncio
+async def test_pending_batch_falls_back_to_fifo_before_migration() -> None:
+    """Before migrations 012/013 the normal lane is plain pending rows oldest first and there is no digest lane."""
+    pool = MagicMock()
+    pool.fetch = AsyncMock(
+        side_effect=[asyncpg.UndefinedColumnError("column sc.weight does not exist"), [{"id": 2}]],
+    )
+    assert await get_pending_outbox_batch(pool, limit=5) == [{"id": 2}]
+    pool.fetch = AsyncMock(side_effect=asyncpg.UndefinedColumnError("column lane does not exist"))
+    assert await get_pending_outbox_batch(pool, lane="digest") == []
+
+
+@pytest.mark.asyncio
+async def test_pending_batch_reads_per_source_queues(outbox_db) -> None:
+    """End to end on Postgres: fair order across sources, due rows of the lane only."""
+    for n in range(1, 6):
+        await insert_outbox(outbox_db, channel_id="-1001", message_id=n, source_channel="flood")
+    await insert_outbox(outbox_db, channel_id="-1002", message_id=1, source_channel="quiet")
+    await outbox_db.execute(
+        "UPDATE userbot_outbox SET next_retry_at = NOW() + interval '1 hour' WHERE source_channel = 'flood' AND message_id = 1"
+    )
+    await outbox_db.execute("INSERT INTO source_channels (channel_identifier, weight) VALUES ('flood', 2)")
+    batch = await get_pending_outbox_batch(outbox_db, limit=4)
+    assert [(r["source_channel"], r["message_id"]) for r in batch] == [
+        ("flood", 2),
+        ("flood", 3),
+        ("quiet", 1),
+        ("flood", 4),
+    ]
+    assert await get_pending_outbox_batch(outbox_db, lane="digest") == []
+
+
+@pytest.mark.asyncio
+async def test_failure_callback_before_ack_is_not_undone_by_late_ack(outbox_db) -> None:
+    """n8n reports the failure before the worker records the ack: the row stays pending for a retry."""
+    outbox_id = await insert_outbox(outbox_db, channel_id="-1001", message_id=1)
+    assert await complete_outbox(outbox_db, outbox_id, "exec-1", ok=False, error="LLM down")
+    await mark_outbox_accepted(outbox_db, outbox_id, "exec-1")
+    row = await _outbox_row(outbox_db, outbox_id)
+    assert (row["status"], row["attempts"], row["execution_id"]) == ("pending", 1, "exec-1")
+    # A repeated callback of the failed execution is not counted twice
+    assert not await complete_outbox(outbox_db, outbox_id, "exec-1", ok=False, error="LLM down")
+
+    # The retry is accepted and completed as usual
+    await mark_outbox_accepted(outbox_db, outbox_id, "exec-2")
+    assert (await _outbox_row(outbox_db, outbox_id))["status"] == "accepted"
+    assert await complete_outbox(outbox_db, outbox_id, "exec-2", ok=True)
+    assert (await _outbox_row(outbox_db, outbox_id))["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_drain_note_survives_completion(outbox_db) -> None:
+    """The newest-first note written at claim time is still there after n8n reports success."""
+    outbox_id = await insert_outbox(outbox_db, channel_id="-1001", message_id=2)
+    await note_outbox_rows(outbox_db, [outbox_id], "newest-first: backlog 340 > 100")
+    await mark_outbox_accepted(outbox_db, outbox_id, "exec-1")
+    assert await complete_outbox(outbox_db, outbox_id, "exec-1", ok=True)
+    row = await _outbox_row(outbox_db, outbox_id)
+    assert (row["status"], row["last_error"]) == ("completed", "newest-first: backlog 340 > 100")
+
+
+@pytest.mark.asyncio
+async def test_pdf_of_accepted_row_is_not_archivable(outbox_db) -> None:
+    """n8n still reads the PDF of an accepted row; only completed rows release it to the archive."""
+    for n, status in enumerate(("pending", "accepted", "completed"), start=1):
+        outbox_id = await insert_outbox(outbox_db, channel_id="-1001", message_id=n, pdf_path=f"/data/pdfs/{status}.pdf")
+        await outbox_db.execute("UPDATE userbot_outbox SET status = $2 WHERE id = $1", outbox_id, status)
+    paths = [f"/data/pdfs/{status}.pdf" for status in ("pending", "accepted", "completed")]
+    assert await get_archivable(outbox_db, paths) == ["/data/pdfs/completed.pdf"]
@@ -0,0 +1,53 @@
+"""Tests for the outbox retention compactor."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services import outbox_compactor
+from src.services.outbox_compactor import compact_outbox_once, run_outbox_compactor
+
+
+@pytest.mark.asyncio
+async def test_compact_runs_batches_until_short_and_vacuums() -> None:
+    """Full batches are followed by another one; a large run ends with VACUUM and a size report."""
+    batch = AsyncMock(side_effect=[(500, 50_000), (500, 50_000), (20, 2_000)])
+    vacuum = AsyncMock()
+    with (
+        patch.object(outbox_compactor, "compact_outbox_batch", batch),
+        patch.object(outbox_compactor, "get_outbox_table_bytes", AsyncMock(side_effect=[900_000, 400_000])),
+        patch.object(outbox_compactor, "vacuum_outbox", vacuum),
+        patch.object(outbox_compactor, "OUTBOX_COMPACT_BATCH_PAUSE_SEC", 0),
+    ):
+        report = await compact_outbox_once(AsyncMock(), retention_days=7, batch_size=500, archive=True)
+    assert batch.await_count == 3
+    batch.assert_awaited_with(batch.await_args.args[0], 7, 500, True)
+    vacuum.assert_awaited_once()
+    assert report == {
+        "rows": 1020,
+        "row_bytes": 102_000,
+        "table_bytes_before": 900_000,
+        "table_bytes_after": 400_000,
+    }
+
+
+@pytest.mark.asyncio
+async def test_compact_small_run_skips_vacuum() -> None:
+    """Few rows removed: no VACUUM."""
+    vacuum = AsyncMock()
+    with (
+        patch.object(outbox_compactor, "compact_outbox_batch", AsyncMock(return_value=(3, 300))),
+        patch.object(outbox_compactor, "get_outbox_table_bytes", AsyncMock(return_value=8192)),
+        patch.object(outbox_compactor, "vacuum_outbox", vacuum),
+    ):
+        report = await compact_outbox_once(AsyncMock(), retention_days=7)
+    assert report["rows"] == 3
+    vacuum.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_compactor_disabled_with_zero_retention() -> None:
+    """retention_days=0 keeps everything: the loop returns without touching the DB."""
+    batch = AsyncMock()
+    with patch.object(outbox_compactor, "compact_outbox_batch", batch):
+        await run_outbox_compactor(AsyncMock(), retention_days=0)
+    batch.assert_not_awaited()
@@ -0,0 +1,28 @@
+"""Tests for the outbox depth sampler."""
+
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+
+from src.services.outbox_depth import sample_outbox_depth
+from src.utils import health, metrics
+
+
+@pytest.mark.asyncio
+async def test_sample_sets_gauges_for_all_statuses() -> None:
+    """Missing statuses are exported as 0; oldest pending age and sample time are recorded."""
+    health.reset()
+    pool = MagicMock()
+    pool.fetch = AsyncMock(
+        return_value=[
+            {"status": "pending", "n": 3, "oldest": 125.0},
+            {"status": "sent", "n": 10, "oldest": None},
+        ]
+    )
+    counts = await sample_outbox_depth(pool)
+    assert counts == {"pending": 3, "sent": 10}
+    rows = metrics.gauge("userbot_outbox_rows", "", ("status",))
+    assert rows.get(status="pending") == 3
+    assert rows.get(status="failed") == 0
+    assert metrics.gauge("userbot_outbox_oldest_pending_age_seconds", "").get() == 125.0
+    assert health.outbox_sample_age() is not None
+    health.reset()
@@ -0,0 +1,40 @@
+"""Tests for the staleness-aware outbox drain policy."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.outbox_drain import DrainPolicy, build_drain_policy
+
+
+@pytest.mark.asyncio
+async def test_sweep_uses_policy_and_interval() -> None:
+    """digest policy demotes stale rows; a second sweep within the interval is skipped."""
+    clock = iter([100.0, 110.0, 200.0]).__next__
+    policy = DrainPolicy(max_age_minutes=60, stale_policy="digest", clock=clock)
+    with (
+        patch("src.services.outbox_drain.demote_stale_outbox", new_callable=AsyncMock, return_value=[1, 2]) as demote,
+        patch("src.services.outbox_drain.expire_stale_outbox", new_callable=AsyncMock) as expire,
+    ):
+        assert await policy.sweep_stale(None) == [1, 2]
+        assert await policy.sweep_stale(None) == []
+        await policy.sweep_stale(None)
+    assert demote.await_count == 2
+    demote.assert_awaited_with(None, 60)
+    expire.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_claim_order_switches_to_newest_first_above_threshold() -> None:
+    """Backlog above the threshold gives newest-first order with a note for last_error."""
+    policy = DrainPolicy(newest_first_backlog=100)
+    with patch("src.services.outbox_drain.count_pending_outbox", new_callable=AsyncMock, side_effect=[340, 20]):
+        assert await policy.claim_order(None) == (True, "newest-first: backlog 340 > 100")
+        assert await policy.claim_order(None) == (False, None)
+
+
+def test_build_drain_policy_rejects_unknown_policy() -> None:
+    """Only expire and digest are accepted; 0 values disable the policy."""
+    assert not build_drain_policy().enabled
+    assert build_drain_policy(30, "Digest").uses_digest_lane
+    with pytest.raises(ValueError):
+        build_drain_policy(30, "drop")
@@ -0,0 +1,55 @@
+"""Tests for outbox delivery while the n8n circuit breaker trips."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services import outbox_worker
+from src.services.webhook_sender import N8N_ENDPOINT
+from src.utils.resilience import get_endpoint
+
+
+def _rows(count: int) -> list[dict]:
+    return [{"id": i, "message_id": i, "channel_id": "-1001", "attempts": 0} for i in range(1, count + 1)]
+
+
+@pytest.mark.asyncio
+async def test_circuit_opening_mid_batch_leaves_the_rest_pending() -> None:
+    """Row 2 trips the breaker: rows 3..5 get no request and keep their attempts."""
+    n8n = get_endpoint(N8N_ENDPOINT)
+    calls = []
+
+    async def send(url, **fields):
+        calls.append(fields["message_id"])
+        if fields["message_id"] == 1:
+            return True
+        for _ in range(n8n.breaker.failure_threshold):
+            n8n.breaker.record_failure()
+        return False
+
+    with (
+        patch.object(outbox_worker, "send_to_n8n_webhook", side_effect=send),
+        patch.object(outbox_worker, "mark_outbox_sent", new_callable=AsyncMock) as sent,
+        patch.object(outbox_worker, "mark_outbox_failed", new_callable=AsyncMock) as failed,
+    ):
+        delivered = await outbox_worker._deliver_ready(None, n8n, _rows(5), "http://n8n/webhook")
+    assert (delivered, calls) == (2, [1, 2])
+    sent.assert_awaited_once_with(None, 1)
+    assert [c.args[1] for c in failed.await_args_list] == [2]
+
+
+@pytest.mark.asyncio
+async def test_ack_and_bulk_paths_stop_while_circuit_open() -> None:
+    """Two-phase and bulk delivery make no request and mark nothing while the circuit is open."""
+    n8n = get_endpoint(N8N_ENDPOINT)
+    for _ in range(n8n.breaker.failure_threshold):
+        n8n.breaker.record_failure()
+    with (
+        patch.object(outbox_worker, "send_to_n8n_webhook_ack", new_callable=AsyncMock) as ack,
+        patch.object(outbox_worker, "send_bulk_to_n8n_webhook", new_callable=AsyncMock) as bulk,
+        patch.object(outbox_worker, "mark_outbox_failed", new_callable=AsyncMock) as failed,
+    ):
+        assert await outbox_worker._deliver_ready(None, n8n, _rows(3), "http://n8n/webhook", callback_url="http://cb") == 0
+        assert await outbox_worker._deliver_ready(None, n8n, _rows(3), "", bulk_url="http://n8n/bulk") == 0
+    ack.assert_not_called()
+    bulk.assert_not_called()
+    failed.assert_not_called()
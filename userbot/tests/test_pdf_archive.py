@@ -0,0 +1,85 @@
+"""Tests for the cold PDF archive: segment writes, mmap reads, archive passes and restores."""
+
+import os
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.services import pdf_archive as archive_module
+from src.services.pdf_archive import PdfArchive, SegmentWriter, read_archived
+from src.web.app import create_app
+
+
+def test_segment_entries_read_back_and_rotate(tmp_path):
+    """Each entry is readable from its offset; unchanged files are not written twice; segments rotate."""
+    pdfs = tmp_path / "pdfs"
+    pdfs.mkdir()
+    text_like = pdfs / "1_1.pdf"
+    text_like.write_bytes(b"%PDF-1.4 " + b"repeated stream " * 500)
+    random_like = pdfs / "1_2.pdf"
+    random_like.write_bytes(os.urandom(3000))
+    writer = SegmentWriter(str(tmp_path / "archive"), max_bytes=2048)
+
+    entries, done = writer.append_files([str(random_like), str(pdfs / "gone.pdf"), str(text_like)], {})
+    assert done == [str(random_like), str(text_like)]
+    by_path = {entry["path"]: entry for entry in entries}
+    assert by_path[str(text_like)]["codec"] == "zlib"
+    assert by_path[str(random_like)]["codec"] == "none"
+    assert by_path[str(text_like)]["segment"] != by_path[str(random_like)]["segment"]
+    for path, entry in by_path.items():
+        assert read_archived(str(tmp_path / "archive"), entry) == open(path, "rb").read()
+
+    again, done = writer.append_files([str(text_like)], {str(text_like): by_path[str(text_like)]["sha256"]})
+    assert (again, done) == ([], [str(text_like)])
+
+
+@pytest.mark.asyncio
+async def test_archive_pass_and_restore(tmp_path, monkeypatch):
+    """Cold unreferenced files leave the hot volume; restore puts the same bytes back and re-indexes them."""
+    base = tmp_path / "pdfs" / "ab" / "cd"
+    base.mkdir(parents=True)
+    cold, busy, fresh = base / "1_1.pdf", base / "1_2.pdf", base / "1_3.pdf"
+    for path in (cold, busy, fresh):
+        path.write_bytes(b"%PDF-1.4 body of " + path.name.encode() * 100)
+    (base / "1_1.opt.pdf").write_bytes(b"%PDF-1.4 small")
+    old = time.time() - 30 * 86400
+    for path in (cold, busy):
+        os.utime(path, (old, old))
+    original = cold.read_bytes()
+
+    index: dict = {}
+
+    async def save(pool, entries):
+        index.update({entry["path"]: entry for entry in entries})
+
+    async def entries(pool, paths):
+        return {path: index[path] for path in paths if path in index}
+
+    register = AsyncMock()
+    monkeypatch.setattr(archive_module, "get_archivable", AsyncMock(side_effect=lambda pool, paths: [p for p in paths if p != str(busy)]))
+    monkeypatch.setattr(archive_module, "get_archive_entries", entries)
+    monkeypatch.setattr(archive_module, "save_archive_entries", save)
+    monkeypatch.setattr(archive_module, "forget_pdf_files", AsyncMock())
+    monkeypatch.setattr(archive_module, "register_pdf_file", register)
+
+    archive = PdfArchive(MagicMock(), str(tmp_path / "pdfs"), str(tmp_path / "archive"), after_days=7)
+    report = await archive.archive_once()
+    assert (report.scanned, report.archived) == (2, 1)
+    assert sorted(os.listdir(base)) == ["1_2.pdf", "1_3.pdf"]
+    assert list(index) == [str(cold)]
+
+    assert await archive.restore(str(cold)) == "restored"
+    assert cold.read_bytes() == original
+    assert register.await_args.args[1:3] == (str(cold), len(original))
+    assert await archive.restore(str(cold)) == "hot"
+    assert await archive.restore(str(base / "9_9.pdf")) == "not_archived"
+
+    app = create_app(None, api_token="secret", pdf_archive=archive)
+    async with TestClient(TestServer(app)) as client:
+        headers = {"Authorization": "Bearer secret"}
+        resp = await client.post("/pdf/restore", json={"pdf_path": str(cold)}, headers=headers)
+        assert (resp.status, (await resp.json())["result"]) == (200, "hot")
+        resp = await client.post("/pdf/restore", json={"pdf_path": str(base / "9_9.pdf")}, headers=headers)
+        assert resp.status == 404
@@ -0,0 +1,134 @@
+"""Tests for PDF text extraction (caps, errors, process pool) and keyword scans."""
+
+import pytest
+
+from src.services.keyword_filter import KeywordMatcher
+from src.services.pdf_extractor import PdfExtractionPool, extract_pdf_text, scan_pdf_keywords
+from src.services.webhook_sender import build_webhook_payload
+
+
+def _write_pdf(path, pages: list[str]) -> str:
+    """Minimal valid PDF with one line of Helvetica text per page."""
+    count = len(pages)
+    font_num = 3 + 2 * count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(count)) + b"] /Count %d >>" % count,
+    ]
+    for i, text in enumerate(pages):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode() + b") Tj ET"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (4 + 2 * i, font_num)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+    return str(path)
+
+
+def test_extract_pdf_text_page_and_char_caps(tmp_path):
+    """Pages past max_pages are not read; text is cut at max_chars; both mark the result truncated."""
+    pdf = _write_pdf(tmp_path / "a.pdf", ["First page", "Second page", "Third page"])
+
+    full = extract_pdf_text(pdf, max_pages=10, max_chars=1000)
+    assert full.error is None
+    assert (full.pages, full.total_pages, full.truncated) == (3, 3, False)
+    assert full.text == "First page\fSecond page\fThird page"
+
+    by_pages = extract_pdf_text(pdf, max_pages=2, max_chars=1000)
+    assert (by_pages.pages, by_pages.truncated) == (2, True)
+    assert "Third" not in by_pages.text
+
+    by_chars = extract_pdf_text(pdf, max_pages=10, max_chars=5)
+    assert by_chars.pages == 1
+    assert by_chars.text == "First"
+    assert by_chars.truncated is True
+
+
+def test_extract_pdf_text_reports_errors(tmp_path):
+    """Missing, empty and non-PDF files give an error result instead of raising."""
+    (tmp_path / "empty.pdf").write_bytes(b"")
+    (tmp_path / "junk.pdf").write_bytes(b"not a pdf at all")
+    for name in ("missing.pdf", "empty.pdf", "junk.pdf"):
+        result = extract_pdf_text(str(tmp_path / name), max_pages=10, max_chars=1000)
+        assert result.error
+        assert result.text == ""
+        assert result.outcome == "failed"
+
+
+@pytest.mark.asyncio
+async def test_pool_extracts_in_worker_process(tmp_path):
+    """Extraction runs in the process pool and its text goes into the webhook payload."""
+    pdf = _write_pdf(tmp_path / "b.pdf", ["Report body"])
+    pool = PdfExtractionPool(workers=1, max_pages=5, max_chars=1000)
+    try:
+        result = await pool.extract(pdf)
+    finally:
+        pool.shutdown()
+    assert result.error is None
+    assert result.text == "Report body"
+
+    payload = build_webhook_payload(
+        post_text="",
+        pdf_path=pdf,
+        message_id=1,
+        channel_id="1",
+        source_channel="1",
+        extracted_text=result.text,
+    )
+    assert payload["extracted_text"] == "Report body"
+    assert "extracted_text" not in build_webhook_payload(
+        post_text="", pdf_path="", message_id=1, channel_id="1", source_channel="1"
+    )
+
+
+def test_scan_pdf_keywords_stops_at_first_match(tmp_path):
+    """The scan reads pages only until a keyword is found, within the page budget, across page breaks."""
+    pdf = _write_pdf(tmp_path / "c.pdf", ["Cover", "Annual", "report IFRS", "Dividends", "Appendix"])
+    matcher = KeywordMatcher(["IFRS", "dividends", "annual report"])
+
+    found = scan_pdf_keywords(pdf, matcher.pattern, matcher.max_len, max_pages=10)
+    assert (found.keyword, found.pages, found.total_pages) == ("annual report", 3, 5)
+    assert found.outcome == "match"
+
+    budget = scan_pdf_keywords(pdf, KeywordMatcher(["appendix"]).pattern, 8, max_pages=3)
+    assert (budget.keyword, budget.pages, budget.outcome) == (None, 3, "no_match")
+
+    missing = scan_pdf_keywords(str(tmp_path / "missing.pdf"), matcher.pattern, 8, max_pages=3)
+    assert missing.outcome == "failed"
+
+
+def test_scan_pdf_keywords_finds_word_split_across_pages(tmp_path):
+    """A keyword cut mid-word by the page break (with or without a hyphen) is still found."""
+    matcher = KeywordMatcher(["dividends", "prospectus"])
+    split = _write_pdf(tmp_path / "split.pdf", ["Board proposes divi", "dends of 5 per share"])
+    found = scan_pdf_keywords(split, matcher.pattern, matcher.max_len, max_pages=10)
+    assert (found.keyword, found.pages) == ("dividends", 2)
+
+    hyphen = _write_pdf(tmp_path / "hyphen.pdf", ["Bond prospec-", "tus attached"])
+    assert scan_pdf_keywords(hyphen, matcher.pattern, matcher.max_len, max_pages=10).keyword == "prospectus"
+
+    apart = _write_pdf(tmp_path / "apart.pdf", ["Interim divi", "sion results"])
+    assert scan_pdf_keywords(apart, matcher.pattern, matcher.max_len, max_pages=10).keyword is None
+
+
+@pytest.mark.asyncio
+async def test_pool_scans_keywords_in_worker_process(tmp_path):
+    pdf = _write_pdf(tmp_path / "d.pdf", ["Intro", "Bond issue terms"])
+    matcher = KeywordMatcher(["bond issue"])
+    pool = PdfExtractionPool(workers=1)
+    try:
+        result = await pool.scan_keywords(pdf, matcher.pattern, matcher.max_len, 5)
+    finally:
+        pool.shutdown()
+    assert (result.keyword, result.pages) == ("bond issue", 2)
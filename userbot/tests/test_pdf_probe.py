@@ -0,0 +1,106 @@
+"""Tests for the PDF probe at download time and its routing in the payload and native pipeline."""
+
+import asyncio
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src.services import pdf_probe as probe_module
+from src.services.pdf_probe import (
+    PDF_STATUS_CORRUPT,
+    PDF_STATUS_ENCRYPTED,
+    PDF_STATUS_NO_TEXT,
+    PDF_STATUS_OK,
+    PDF_STATUS_UNKNOWN,
+    PdfProbe,
+    PdfProbePool,
+    probe_pdf,
+    run_pdf_probe,
+    sample_pages,
+)
+from src.services.pipeline import NativePipeline, PostJob
+from src.services.webhook_sender import build_webhook_payload
+from tests.test_pdf_extractor import _write_pdf
+
+
+def test_probe_statuses(tmp_path):
+    """Text PDFs are ok; blank (scan-like), unparsable and password-protected ones are flagged."""
+    from pypdf import PdfReader, PdfWriter
+
+    text_pdf = _write_pdf(tmp_path / "a.pdf", ["Quarterly report", "Page two"])
+    ok = probe_pdf(text_pdf)
+    assert (ok.status, ok.pages, ok.has_text, ok.encrypted) == (PDF_STATUS_OK, 2, True, False)
+    assert ok.pdf_version == "1.4" and ok.size_bytes > 0 and ok.readable
+
+    assert probe_pdf(_write_pdf(tmp_path / "b.pdf", ["", ""])).status == PDF_STATUS_NO_TEXT
+    # Image-only cover pages: text further in is found by the sampled pages
+    covers = probe_pdf(_write_pdf(tmp_path / "covers.pdf", ["", "", "", "", "", "Annual report body"]))
+    assert covers.status == PDF_STATUS_OK
+    assert sample_pages(2) == [0, 1]
+    assert sample_pages(100)[:3] == [0, 1, 2] and sample_pages(100)[-1] == 99 and len(sample_pages(100)) == 9
+
+    (tmp_path / "junk.pdf").write_bytes(b"%PDF-1.4 truncated")
+    corrupt = probe_pdf(str(tmp_path / "junk.pdf"))
+    assert corrupt.status == PDF_STATUS_CORRUPT and corrupt.error and not corrupt.readable
+
+    writer = PdfWriter(clone_from=PdfReader(text_pdf))
+    writer.encrypt("secret", algorithm="RC4-128")
+    with open(tmp_path / "locked.pdf", "wb") as f:
+        writer.write(f)
+    locked = probe_pdf(str(tmp_path / "locked.pdf"))
+    assert (locked.status, locked.encrypted) == (PDF_STATUS_ENCRYPTED, True)
+
+
+@pytest.mark.asyncio
+async def test_probe_goes_into_payload(tmp_path):
+    pdf = _write_pdf(tmp_path / "c.pdf", ["Bond prospectus"])
+    probe = await run_pdf_probe(pdf)
+    payload = build_webhook_payload(
+        post_text="", pdf_path=pdf, message_id=1, channel_id="1", source_channel="1", pdf_meta=probe.as_payload()
+    )
+    assert payload["pdf_meta"]["status"] == PDF_STATUS_OK and payload["pdf_meta"]["pages"] == 1
+
+
+def _hang(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.mark.asyncio
+async def test_probe_pool_discards_hung_workers_and_recovers():
+    """A job past the timeout, queue wait included, kills its worker; the next job gets a fresh pool."""
+    pool = PdfProbePool(workers=1)
+    try:
+        hung = asyncio.ensure_future(pool.run(_hang, 60, timeout=3))
+        await asyncio.sleep(0.1)
+        # Queued behind the hung job: its wait counts too
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(_hang, 0, timeout=0.5)
+        # ... and takes the hung job down with the pool
+        with pytest.raises(BrokenProcessPool):
+            await hung
+        assert pool._executor is None
+        assert await pool.run(_hang, 0, timeout=30) == 0
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_probe_timeout_is_unknown(tmp_path, monkeypatch):
+    """A probe that overruns is unknown, not corrupt."""
+    monkeypatch.setattr(probe_module, "PDF_PROBE_TIMEOUT_SEC", 0)
+    try:
+        slow = await run_pdf_probe(_write_pdf(tmp_path / "slow.pdf", ["Report"]))
+    finally:
+        probe_module.shutdown_pdf_probe_pool()
+    assert slow.status == PDF_STATUS_UNKNOWN and slow.readable
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_extraction_of_unreadable_pdf():
+    """A scanned PDF is not sent to the extractor; the post text is summarized alone."""
+    pipeline = NativePipeline(None, None, "")
+    row = {"pdf_path": "/data/pdfs/1.pdf", "post_text": "Отчёт во вложении", "pdf_meta": {"status": PDF_STATUS_NO_TEXT}}
+    await pipeline._extract(PostJob(row=row, future=None))
+    assert "extracted_text" not in row
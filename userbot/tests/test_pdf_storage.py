@@ -0,0 +1,40 @@
+"""Tests for the sharded PDF layout and the flat-to-sharded migration tool (file side)."""
+
+import os
+
+from src.services.pdf_storage import is_sharded_path, shard_dir, sharded_path
+from tools.migrate_pdf_storage import find_sharded, move_files, plan_moves
+
+
+def test_sharded_path_is_stable_two_level_hash(tmp_path):
+    base = str(tmp_path)
+    path = sharded_path(base, "1001_42.pdf")
+    first, second = os.path.relpath(os.path.dirname(path), base).split(os.sep)
+    assert (len(first), len(second)) == (2, 2)
+    assert path == os.path.join(shard_dir(base, "1001_42.pdf"), "1001_42.pdf")
+    assert path == sharded_path(base, "1001_42.pdf")
+    assert is_sharded_path(base, path)
+    assert not is_sharded_path(base, os.path.join(base, "1001_42.pdf"))
+    assert not is_sharded_path(base, os.path.join(base, first, second, "1001_43.pdf"))
+
+
+def test_migration_moves_flat_files_and_variants_into_shards(tmp_path):
+    base = str(tmp_path)
+    (tmp_path / "1_10.pdf").write_bytes(b"%PDF-1.4 a")
+    (tmp_path / "1_10.opt.pdf").write_bytes(b"%PDF-1.4 small")
+    (tmp_path / "notes.txt").write_text("not a pdf")
+
+    moves = plan_moves(base)
+    assert {os.path.basename(m.old) for m in moves} == {"1_10.pdf", "1_10.opt.pdf"}
+    assert all(m.size_bytes > 0 for m in moves)
+
+    done = move_files(moves)
+    assert len(done) == 2
+    original = sharded_path(base, "1_10.pdf")
+    assert os.path.isfile(original)
+    assert os.path.isfile(os.path.join(os.path.dirname(original), "1_10.opt.pdf"))
+    assert not (tmp_path / "1_10.pdf").exists()
+    assert (tmp_path / "notes.txt").exists()
+    assert plan_moves(base) == []
+    # Only originals in their own shard are picked up for indexing
+    assert [m.new for m in find_sharded(base)] == [original]
@@ -0,0 +1,101 @@
+"""Tests for the native processing pipeline against the fake LLM and a fake editor-bot endpoint."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiohttp import web
+
+from src.services import pipeline as pipeline_module
+from src.services.llm_client import LLMClient
+from src.services.pipeline import NativePipeline, build_native_pipeline, parse_stage_concurrency
+from src.services.summarizer import Summarizer
+from tools.fake_llm import FakeLLM, start_fake_llm
+
+
+def _row(outbox_id: int, message_id: int, text: str = "", extracted: str = "") -> dict:
+    return {
+        "id": outbox_id,
+        "channel_id": "-1001",
+        "source_channel": "-1001",
+        "message_id": message_id,
+        "pdf_path": f"/data/pdfs/{message_id}.pdf" if extracted else "",
+        "post_text": text,
+        "extracted_text": extracted,
+        "attempts": 0,
+    }
+
+
+async def _start_editor(received: list[dict]) -> tuple[web.AppRunner, str]:
+    async def incoming(request: web.Request) -> web.Response:
+        assert request.headers.get("Authorization") == "Bearer secret"
+        received.append(await request.json())
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_post("/incoming/post", incoming)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/incoming/post"
+
+
+def test_parse_stage_concurrency():
+    assert parse_stage_concurrency("summarize=8, notify=2")["summarize"] == 8
+    assert parse_stage_concurrency("")["dedupe"] == pipeline_module.PIPELINE_DEFAULT_CONCURRENCY["dedupe"]
+    with pytest.raises(ValueError):
+        parse_stage_concurrency("ocr=2")
+    with pytest.raises(ValueError):
+        build_native_pipeline("lambda", None, lambda: None, "")
+    assert build_native_pipeline("n8n", None, lambda: None, "") is None
+
+
+@pytest.mark.asyncio
+async def test_pipeline_processes_posts_end_to_end():
+    """New posts are summarized, inserted and sent to editor-bot; duplicates are ok; empty posts fail."""
+    fake = FakeLLM(latency=0.05)
+    llm_runner, base_url = await start_fake_llm(fake)
+    received: list[dict] = []
+    editor_runner, editor_url = await _start_editor(received)
+    client = LLMClient(base_url=base_url, model="fake")
+    pipeline = NativePipeline(
+        pool=None,
+        summarizer=Summarizer(client),
+        editor_webhook_url=editor_url,
+        editor_webhook_token="secret",
+        concurrency={**pipeline_module.PIPELINE_DEFAULT_CONCURRENCY, "summarize": 3},
+        queue_size=2,
+    )
+    inserted: list[dict] = []
+
+    async def _upsert(pool, **fields):
+        inserted.append(fields)
+        return {"id": 100 + len(inserted)}
+
+    rows = [_row(i, 10 + i, text=f"Пост {i}. Компания отчиталась о прибыли.") for i in range(1, 6)]
+    rows.append(_row(6, 16, text="подпись", extracted="Текст отчёта из PDF. Выручка выросла."))
+    rows.append(_row(7, 17, text="дубль"))
+    rows.append(_row(8, 18, text="   "))
+    try:
+        with (
+            patch.object(pipeline_module, "is_post_in_progress", new_callable=AsyncMock, side_effect=lambda p, s, m: m == 17),
+            patch.object(pipeline_module, "get_config_value", new_callable=AsyncMock, return_value="Промпт канала") as config,
+            patch.object(pipeline_module, "upsert_processing_post", side_effect=_upsert),
+        ):
+            results = await pipeline.process(rows)
+    finally:
+        await pipeline.stop()
+        await client.close()
+        await llm_runner.cleanup()
+        await editor_runner.cleanup()
+
+    assert all(results[i] == (True, "") for i in range(1, 8))
+    assert results[8][0] is False and results[8][1].startswith("summarize:")
+    assert len(inserted) == len(received) == 6
+    assert fake.max_in_flight == 3
+    assert config.await_count == 1
+    pdf_post = next(p for p in received if p["source_message_id"] == 16)
+    assert pdf_post["pdf_path"] == "/data/pdfs/16.pdf"
+    assert pdf_post["summary"].startswith("Кратко: Текст отчёта")
+    assert next(f for f in inserted if f["source_message_id"] == 16)["extracted_text"].startswith("Текст отчёта")
+    assert all(p.startswith("Промпт канала") for p in fake.prompts)
@@ -0,0 +1,76 @@
+"""Tests for outbox token-bucket pacing."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.rate_limiter import (
+    OutboxPacer,
+    TokenBucket,
+    build_outbox_pacer,
+    parse_rate_windows,
+)
+
+
+def test_token_bucket_burst_then_wait() -> None:
+    """Bucket allows `burst` takes at once, then reports time until the next token."""
+    bucket = TokenBucket(rate_per_sec=0.5, burst=2, updated_at=100.0)
+    assert bucket.try_take(100.0) == 0.0
+    assert bucket.try_take(100.0) == 0.0
+    assert bucket.try_take(100.0) == pytest.approx(2.0)
+    assert bucket.try_take(102.0) == 0.0
+
+
+def test_parse_rate_windows_wraps_midnight() -> None:
+    """Window 23:00-08:00 contains 02:00 and not 12:00; burst is optional."""
+    windows = parse_rate_windows("08:00-23:00=10/5; 23:00-08:00=0")
+    assert windows[0].rate_per_minute == 10 and windows[0].burst == 5
+    assert windows[1].contains(2 * 60)
+    assert not windows[1].contains(12 * 60)
+    with pytest.raises(ValueError):
+        parse_rate_windows("8-23=1")
+
+
+@pytest.mark.asyncio
+async def test_pacer_restores_persisted_tokens() -> None:
+    """Tokens loaded from DB are used instead of a fresh full bucket (restart keeps pacing)."""
+    now = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    persisted = {"outbox:global": (0.0, now - timedelta(seconds=10))}
+    with (
+        patch("src.services.rate_limiter.load_bucket_states", new_callable=AsyncMock, return_value=persisted),
+        patch("src.services.rate_limiter.save_bucket_state", new_callable=AsyncMock) as save,
+    ):
+        pacer = OutboxPacer(AsyncMock(), rate_per_minute=1, burst=3)
+        wait = await pacer.acquire("123", now=now)
+        assert wait == pytest.approx(50.0)
+        save.assert_not_called()
+        assert await pacer.acquire("123", now=now + timedelta(seconds=50)) == 0.0
+        save.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_pacer_per_channel_buckets_are_independent() -> None:
+    """With per_channel, a throttled channel does not block another one."""
+    now = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    pacer = OutboxPacer(None, rate_per_minute=1, burst=1, per_channel=True)
+    assert await pacer.acquire("a", now=now) == 0.0
+    assert await pacer.acquire("a", now=now) > 0
+    assert await pacer.acquire("b", now=now) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_pacer_window_with_zero_rate_pauses_until_window_end() -> None:
+    """Rate 0 in the active window pauses delivery until the window ends."""
+    pacer = OutboxPacer(None, rate_per_minute=5, windows=parse_rate_windows("23:00-08:00=0"))
+    wait = await pacer.acquire("a", now=datetime(2026, 1, 1, 7, 30, tzinfo=timezone.utc))
+    assert wait == pytest.approx(30 * 60)
+
+
+def test_build_outbox_pacer_maps_legacy_buffer_minutes() -> None:
+    """OUTBOX_BUFFER_MINUTES=5 becomes one post per 5 minutes with burst 1."""
+    pacer = build_outbox_pacer(None, buffer_minutes=5)
+    assert pacer.enabled
+    assert pacer.rate_per_minute == pytest.approx(0.2)
+    assert pacer.burst == 1
+    assert not build_outbox_pacer(None).enabled
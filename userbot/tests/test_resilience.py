@@ -0,0 +1,134 @@
+"""Tests for circuit breaker, full-jitter backoff and retry budget."""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    full_jitter_backoff,
+    get_endpoint,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_breaker_opens_then_half_open_probe_closes() -> None:
+    """Consecutive failures open the circuit; after reset_timeout one probe goes through."""
+    clock = _Clock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(10)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    clock.now = 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_failure_reopens() -> None:
+    """A failed probe opens the circuit again for a full reset_timeout."""
+    clock = _Clock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=5, clock=clock)
+    breaker.record_failure()
+    clock.now = 5
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.retry_after() == pytest.approx(5)
+
+
+def test_breaker_frees_probe_slot_without_outcome() -> None:
+    """A probe whose caller never reports back does not keep the circuit half-open forever."""
+    clock = _Clock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=5, clock=clock)
+    breaker.record_failure()
+    clock.now = 5
+    assert breaker.allow()
+    clock.now = 9
+    assert not breaker.allow()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_full_jitter_backoff_bounds() -> None:
+    """Delay is uniform between 0 and the capped exponential."""
+    assert full_jitter_backoff(3, base=1, cap=100, rand=lambda: 0.5) == pytest.approx(4)
+    assert full_jitter_backoff(10, base=1, cap=30, rand=lambda: 0.999) < 30
+    assert full_jitter_backoff(2, base=1, cap=30, rand=lambda: 0.0) == 0
+
+
+def test_retry_budget_caps_retries_to_ratio_of_traffic() -> None:
+    """With 10 requests and ratio 0.2, min 1: at most 3 retries in the window."""
+    clock = _Clock()
+    budget = RetryBudget("test", ratio=0.2, min_retries=1, window_sec=60, clock=clock)
+    for _ in range(10):
+        budget.record_request()
+    assert [budget.try_retry() for _ in range(4)] == [True, True, True, False]
+    clock.now = 61
+    assert budget.try_retry()
+
+
+@pytest.mark.asyncio
+async def test_webhook_not_called_while_circuit_open() -> None:
+    """Open n8n circuit: sender fails fast without an HTTP request."""
+    from src.services.webhook_sender import N8N_ENDPOINT, send_to_n8n_webhook
+
+    breaker = get_endpoint(N8N_ENDPOINT).breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    with patch("aiohttp.ClientSession") as session_cls, patch("asyncio.sleep", new_callable=AsyncMock):
+        ok = await send_to_n8n_webhook(
+            "http://test/webhook",
+            post_text="",
+            pdf_path="",
+            message_id=1,
+            channel_id="1",
+            source_channel="1",
+        )
+    assert ok is False
+    session_cls.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_ack_webhook_records_unexpected_error_of_half_open_probe() -> None:
+    """A non-aiohttp error during the half-open probe reopens the circuit instead of leaking the slot."""
+    from src.services.webhook_sender import N8N_ENDPOINT, send_to_n8n_webhook_ack
+
+    clock = _Clock()
+    endpoint = get_endpoint(N8N_ENDPOINT)
+    endpoint.breaker = CircuitBreaker(N8N_ENDPOINT, failure_threshold=1, reset_timeout=5, clock=clock)
+    endpoint.breaker.record_failure()
+    clock.now = 5
+    with patch("aiohttp.ClientSession", side_effect=RuntimeError("event loop is closing")) as session_cls, patch(
+        "asyncio.sleep", new_callable=AsyncMock
+    ):
+        accepted, _, error = await send_to_n8n_webhook_ack(
+            "http://test/webhook",
+            outbox_id=1,
+            callback_url="http://userbot/outbox/complete",
+            post_text="",
+            pdf_path="",
+            message_id=1,
+            channel_id="1",
+            source_channel="1",
+        )
+    assert not accepted and error.startswith("circuit open")
+    session_cls.assert_called_once()  # the retry is refused by the reopened circuit
+    assert endpoint.breaker.state == "open"
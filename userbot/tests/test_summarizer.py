@@ -0,0 +1,118 @@
+"""Tests for chunking and map-reduce summarization against the local fake LLM server."""
+
+import pytest
+
+from src.services.llm_client import LLMClient, LLMError, LLMResponse, estimate_tokens
+from src.services.summarizer import MAP_PROMPT, MemorySummaryCache, Summarizer, chunk_text
+from tools.fake_llm import FakeLLM, start_fake_llm
+
+
+def _long_text(paragraphs: int) -> str:
+    return "\n\n".join(f"Раздел {i}. " + "Выручка выросла на десять процентов. " * 20 for i in range(paragraphs))
+
+
+def test_chunk_text_respects_token_budget():
+    text = _long_text(6) + "\n\n" + "Очень длинное предложение без точки " * 200
+    chunks = chunk_text(text, max_tokens=300)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c) <= 300 for c in chunks)
+    assert "".join(c.replace("\n", "").replace(" ", "") for c in chunks) == text.replace("\n", "").replace(" ", "")
+
+
+@pytest.mark.asyncio
+async def test_map_reduce_concurrency_and_stats():
+    fake = FakeLLM(latency=0.05)
+    runner, base_url = await start_fake_llm(fake)
+    client = LLMClient(base_url=base_url, model="fake")
+    try:
+        summarizer = Summarizer(client, chunk_tokens=300, map_concurrency=2)
+        result = await summarizer.summarize(_long_text(8), "Промпт канала")
+    finally:
+        await client.close()
+        await runner.cleanup()
+    stats = result.stats
+    assert stats.chunks > 2
+    assert stats.llm_calls == stats.chunks + 1
+    assert fake.max_in_flight == 2
+    assert fake.prompts[-1].startswith("Промпт канала")
+    assert sum(p.startswith(MAP_PROMPT) for p in fake.prompts) == stats.chunks
+    assert result.text.startswith("Кратко:")
+    assert stats.prompt_tokens > 0 and stats.completion_tokens > 0
+    assert set(stats.stage_seconds) == {"map", "reduce"}
+
+
+@pytest.mark.asyncio
+async def test_failed_reduce_keeps_partial_results():
+    """After a failed reduce, a retry with the same cache only repeats the reduce call."""
+    fail_reduce = [True]
+    fake = FakeLLM(fail=lambda prompt: 500 if fail_reduce[0] and prompt.startswith("Промпт") else None)
+    runner, base_url = await start_fake_llm(fake)
+    client = LLMClient(base_url=base_url, model="fake")
+    summarizer = Summarizer(client, cache=MemorySummaryCache(), chunk_tokens=300)
+    text = _long_text(6)
+    try:
+        with pytest.raises(LLMError) as exc_info:
+            await summarizer.summarize(text, "Промпт канала")
+        assert exc_info.value.status == 500
+        first_round = len(fake.prompts)
+        fail_reduce[0] = False
+        result = await summarizer.summarize(text, "Промпт канала")
+    finally:
+        await client.close()
+        await runner.cleanup()
+    assert len(fake.prompts) == first_round + 1
+    assert result.stats.llm_calls == 1
+    assert result.stats.cached_calls == result.stats.chunks
+
+
+class _CountingCache(MemorySummaryCache):
+    """Records which lookups would count in summary_cache_stats."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.counted: list[bool] = []
+
+    async def get(self, prompt, model, text, count=True):
+        self.counted.append(count)
+        return await super().get(prompt, model, text, count)
+
+
+class _EchoClient:
+    """Completion client whose 'summary' is as long as its input, so map rounds never shrink the text."""
+
+    model = "echo"
+
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    async def complete(self, prompt, max_tokens=None, stage="single", priority=0, model=None):
+        self.prompts.append(prompt)
+        return LLMResponse(text=prompt.split("Текст:\n", 1)[-1])
+
+
+@pytest.mark.asyncio
+async def test_only_whole_text_lookups_count_in_cache_stats():
+    """Chunk and reduce lookups stay out of the hit rate; a repeat of the document is one counted hit."""
+    cache = _CountingCache()
+    client = _EchoClient()
+    summarizer = Summarizer(client, cache=cache, chunk_tokens=300)
+    text = _long_text(6)
+    await summarizer.summarize(text, "Промпт канала")
+    assert cache.counted[0] is True and cache.counted.count(True) == 1
+    calls = len(client.prompts)
+    cache.counted.clear()
+    again = await summarizer.summarize(text, "Промпт канала")
+    assert cache.counted == [True]
+    assert len(client.prompts) == calls and again.stats.cached_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_reduce_input_is_capped_after_max_rounds():
+    """Partials that never shrink are cut so the reduce prompt still fits one chunk and covers every part."""
+    client = _EchoClient()
+    summarizer = Summarizer(client, chunk_tokens=300)
+    await summarizer.summarize(_long_text(12), "Промпт канала")
+    reduce_input = client.prompts[-1].split("Текст:\n", 1)[-1]
+    assert client.prompts[-1].startswith("Промпт канала")
+    assert estimate_tokens(reduce_input) <= 300
+    assert "Часть 1:" in reduce_input and reduce_input.count("Часть ") > 1
@@ -0,0 +1,99 @@
+"""Tests for the summarization policy: passthrough, PDF page trimming and per-rule models."""
+
+import json
+
+import pytest
+
+from src.services.pdf_extractor import PDF_PAGE_BREAK
+from src.services.summary_policy import (
+    ACTION_PASSTHROUGH,
+    ACTION_SUMMARIZE,
+    SummaryPolicy,
+    is_toc_page,
+    normalize_post_text,
+    parse_policy_rules,
+)
+
+RULES = """[
+  {"name": "short", "has_pdf": false, "max_chars": 400, "action": "passthrough"},
+  {"name": "long_pdf", "min_pages": 10, "first_pages": 2},
+  {"name": "cheap", "sources": ["@digest"], "model": "gpt-4.1-nano"}
+]"""
+
+
+def _row(text: str = "", pages: list[str] | None = None, source: str = "@news") -> dict:
+    return {
+        "source_channel": source,
+        "post_text": text,
+        "pdf_path": "/data/pdfs/1.pdf" if pages is not None else "",
+        "extracted_text": PDF_PAGE_BREAK.join(pages) if pages else "",
+        "total_pages": len(pages or []),
+    }
+
+
+def test_short_post_passes_through_normalized():
+    row = _row("Курс  ЦБ\u200b на завтра\n\n\n\n92,5 ₽ ")
+    decision = SummaryPolicy(parse_policy_rules(RULES)).apply(row)
+    assert decision.action == ACTION_PASSTHROUGH and decision.rule == "short"
+    assert row["summary"] == "Курс ЦБ на завтра\n\n92,5 ₽"
+    assert row["summary_policy"] == {"rule": "short", "action": "passthrough", "chars": len(row["post_text"]), "pages": 0}
+
+
+def test_long_pdf_keeps_first_pages_and_contents():
+    toc = "Содержание\nВведение ........ 3\nИтоги ........ 40"
+    pages = [f"Страница {i}" for i in range(1, 13)]
+    pages[5] = toc
+    row = _row("Годовой отчёт", pages)
+    decision = SummaryPolicy(parse_policy_rules(RULES)).apply(row)
+    assert decision.action == ACTION_SUMMARIZE and decision.rule == "long_pdf"
+    assert decision.pages_kept == 3 and decision.toc_pages == [6]
+    assert row["extracted_text"] == "Страница 1\n\nСтраница 2\n\n" + toc
+    assert PDF_PAGE_BREAK not in row["extracted_text"]
+    assert "summary" not in row
+
+
+def test_source_rule_sets_model_and_default_strips_page_breaks():
+    policy = SummaryPolicy(parse_policy_rules(RULES))
+    text = "Длинный дайджест. " * 40
+    digest = _row(text, source="@digest")
+    assert policy.apply(digest).model == "gpt-4.1-nano"
+    row = _row(text, ["Первая", "", "Третья"])
+    decision = policy.apply(row)
+    assert decision.rule == "default" and decision.model is None
+    assert row["extracted_text"] == "Первая\n\nТретья"
+    # Without rules every post is summarized as before
+    assert SummaryPolicy().apply(_row("Коротко")).action == ACTION_SUMMARIZE
+
+
+def test_toc_detection_and_normalization():
+    assert is_toc_page("Глава 1 ....... 5\n" * 5)
+    assert not is_toc_page("Выручка выросла на 12%. Итого 5")
+    assert normalize_post_text("\ufeffa\t b\r\nc") == "a b\nc"
+
+
+@pytest.mark.parametrize(
+    "spec",
+    ['{"name": "x"}', "[1]", '[{"action": "drop"}]', '[{"max_len": 10}]', "[{"],
+)
+def test_parse_policy_rules_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        parse_policy_rules(spec)
+    assert parse_policy_rules("") == []
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        {"max_chars": "400"},
+        {"min_pages": 1.5},
+        {"first_pages": -1},
+        {"min_chars": True},
+        {"has_pdf": "false"},
+        {"sources": {"@news": 1}},
+        {"model": 4},
+    ],
+)
+def test_parse_policy_rules_rejects_malformed_values(rule):
+    """Wrong value types fail at startup instead of raising TypeError in every outbox batch."""
+    with pytest.raises(ValueError, match="rule 2"):
+        parse_policy_rules(json.dumps([{"name": "ok", "max_chars": 400}, rule]))
@@ -88,3 +88,119 @@ async def test_discussion_resolve_success_returns_ok_and_ids() -> None:
             assert data.get("ok") is True
             assert data.get("discussion_chat_id") == -1009876543210
             assert data.get("discussion_message_id") == 111
+
+
+@pytest.mark.asyncio
+async def test_metrics_returns_prometheus_text() -> None:
+    """GET /metrics returns registered metrics in Prometheus text format without auth."""
+    from src.utils import metrics
+
+    metrics.counter("userbot_test_requests_total", "Test counter").inc()
+    app = create_app(None, api_token="secret")
+    async with TestClient(TestServer(app)) as client:
+        resp = await client.get("/metrics")
+        assert resp.status == 200
+        text = await resp.text()
+        assert "# TYPE userbot_test_requests_total counter" in text
+        assert "userbot_test_requests_total 1" in text
+
+
+@pytest.mark.asyncio
+async def test_outbox_complete_applies_callback() -> None:
+    """POST /outbox/complete passes outcome of the n8n execution to the outbox."""
+    app = create_app(None, api_token="secret", pool=MagicMock())
+    with patch(
+        "src.web.app.apply_outbox_completion",
+        new_callable=AsyncMock,
+        return_value=True,
+    ) as apply:
+        async with TestClient(TestServer(app)) as client:
+            resp = await client.post(
+                "/outbox/complete",
+                json={"outbox_id": 7, "execution_id": "123", "status": "failed", "error": "openai"},
+                headers={"Authorization": "Bearer secret"},
+            )
+            assert resp.status == 200
+            assert await resp.json() == {"ok": True, "updated": True}
+    apply.assert_awaited_once_with(app["pool"], 7, "123", ok=False, error="openai")
+
+
+@pytest.mark.asyncio
+async def test_outbox_complete_rejects_bad_status_and_token() -> None:
+    """Unknown status gives 400; wrong token gives 403."""
+    app = create_app(None, api_token="secret", pool=MagicMock())
+    async with TestClient(TestServer(app)) as client:
+        resp = await client.post(
+            "/outbox/complete",
+            json={"outbox_id": 7, "execution_id": "123", "status": "done"},
+            headers={"Authorization": "Bearer secret"},
+        )
+        assert resp.status == 400
+        resp = await client.post(
+            "/outbox/complete",
+            json={"outbox_id": 7, "execution_id": "123", "status": "completed"},
+            headers={"Authorization": "Bearer wrong"},
+        )
+        assert resp.status == 403
+
+
+@pytest.mark.asyncio
+async def test_discussion_resolve_batch_returns_results_in_order() -> None:
+    """POST /discussion/resolve_batch resolves every pair and reports per-item results."""
+    app = create_app(MagicMock(), api_token="secret")
+
+    async def fake_resolve(client, channel_id, message_id):
+        return (-100999, message_id + 1000) if channel_id == "-100111" else (None, None)
+
+    with (
+        patch("src.web.app.resolve_discussion_message", side_effect=fake_resolve),
+        patch("src.services.discussion_cache.fetch_linked_chat_id", new_callable=AsyncMock, return_value=(-100111, -100999)),
+    ):
+        async with TestClient(TestServer(app)) as client:
+            resp = await client.post(
+                "/discussion/resolve_batch",
+                json={"items": [{"channel_id": "-100111", "message_id": 5}, {"channel_id": "-100222", "message_id": 6}]},
+                headers={"Authorization": "Bearer secret"},
+            )
+            assert resp.status == 200
+            data = await resp.json()
+            assert data["ok"] is True
+            first, second = data["results"]
+            assert first == {
+                "channel_id": "-100111",
+                "message_id": 5,
+                "ok": True,
+                "discussion_chat_id": -100999,
+                "discussion_message_id": 1005,
+            }
+            assert second["ok"] is False and second["channel_id"] == "-100222"
+
+            resp = await client.post(
+                "/discussion/resolve_batch",
+                json={"items": [{"channel_id": "-100111"}]},
+                headers={"Authorization": "Bearer secret"},
+            )
+            assert resp.status == 400
+
+
+@pytest.mark.asyncio
+async def test_readyz_reflects_telegram_and_outbox_sample() -> None:
+    """/healthz is always 200; /readyz is 503 until connected and a fresh outbox sample exists."""
+    from src.utils import health
+
+    health.reset()
+    tg = MagicMock()
+    tg.is_connected = MagicMock(return_value=True)
+    app = create_app(tg, api_token="secret")
+    async with TestClient(TestServer(app)) as client:
+        assert (await client.get("/healthz")).status == 200
+        resp = await client.get("/readyz")
+        assert resp.status == 503
+        assert (await resp.json())["checks"] == {"telegram_connected": True, "database": False}
+        health.mark_outbox_sampled()
+        assert (await client.get("/readyz")).status == 200
+        tg.is_connected.return_value = False
+        assert (await client.get("/readyz")).status == 503
+        text = await (await client.get("/metrics")).text()
+        assert "userbot_telegram_connected 0" in text
+    health.reset()
@@ -53,3 +53,98 @@ async def test_send_to_n8n_webhook_failure() -> None:
             source_channel="src",
         )
         assert result is False
+
+
+def _mock_session(session_cls, status: int, body: str) -> MagicMock:
+    """Wire patched aiohttp.ClientSession to return one response with given status/body."""
+    resp = AsyncMock()
+    resp.status = status
+    resp.text = AsyncMock(return_value=body)
+    resp.__aenter__ = AsyncMock(return_value=resp)
+    resp.__aexit__ = AsyncMock(return_value=None)
+    session = AsyncMock()
+    session.post = MagicMock(return_value=resp)
+    session_cls.return_value.__aenter__ = AsyncMock(return_value=session)
+    session_cls.return_value.__aexit__ = AsyncMock(return_value=None)
+    return session
+
+
+def _outbox_rows() -> list[dict]:
+    return [
+        {"id": 10, "post_text": "a", "pdf_path": "", "message_id": 1, "channel_id": "123", "source_channel": "123"},
+        {"id": 11, "post_text": "b", "pdf_path": "/data/pdfs/123_2.pdf", "message_id": 2, "channel_id": "123", "source_channel": "123"},
+        {"id": 12, "post_text": "c", "pdf_path": "", "message_id": 3, "channel_id": "123", "source_channel": "123"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_send_bulk_maps_partial_failures_to_outbox_ids() -> None:
+    """Per-item results are mapped by outbox_id; items missing from response are failures."""
+    from src.services.webhook_sender import send_bulk_to_n8n_webhook
+
+    body = '{"ok": true, "results": [{"outbox_id": 11, "ok": false, "error": "openai"}, {"outbox_id": 10, "ok": true}]}'
+    with patch("aiohttp.ClientSession") as session_cls:
+        session = _mock_session(session_cls, 200, body)
+        results = await send_bulk_to_n8n_webhook("http://test/webhook/bulk", _outbox_rows())
+    sent = session.post.call_args[1]["json"]["posts"]
+    assert [p["outbox_id"] for p in sent] == [10, 11, 12]
+    assert results[10] == (True, "")
+    assert results[11] == (False, "openai")
+    assert results[12][0] is False
+
+
+@pytest.mark.asyncio
+async def test_send_bulk_4xx_fails_all_items_without_retry() -> None:
+    """On 4xx the whole batch fails once (no retries) with the same error for every row."""
+    from src.services.webhook_sender import send_bulk_to_n8n_webhook
+
+    with patch("aiohttp.ClientSession") as session_cls:
+        session = _mock_session(session_cls, 404, "not found")
+        results = await send_bulk_to_n8n_webhook("http://test/webhook/bulk", _outbox_rows())
+    assert session.post.call_count == 1
+    assert all(ok is False for ok, _ in results.values())
+    assert set(results) == {10, 11, 12}
+
+
+@pytest.mark.asyncio
+async def test_send_ack_returns_execution_id_and_sends_callback_url() -> None:
+    """Two-phase mode: payload carries outbox_id and callback_url; ack yields n8n execution id."""
+    from src.services.webhook_sender import send_to_n8n_webhook_ack
+
+    with patch("aiohttp.ClientSession") as session_cls:
+        session = _mock_session(session_cls, 202, '{"ok": true, "accepted": true, "execution_id": "4711"}')
+        accepted, execution_id, error = await send_to_n8n_webhook_ack(
+            "http://test/webhook",
+            outbox_id=10,
+            callback_url="http://userbot:8081/outbox/complete",
+            post_text="hello",
+            pdf_path="",
+            message_id=1,
+            channel_id="123",
+            source_channel="123",
+        )
+    assert (accepted, execution_id, error) == (True, "4711", "")
+    payload = session.post.call_args.kwargs["json"]
+    assert payload["outbox_id"] == 10
+    assert payload["callback_url"] == "http://userbot:8081/outbox/complete"
+
+
+@pytest.mark.asyncio
+async def test_send_ack_without_execution_id_is_not_accepted() -> None:
+    """A 2xx from a workflow that does not ack (no execution_id) leaves the row for retry."""
+    from src.services.webhook_sender import send_to_n8n_webhook_ack
+
+    with patch("aiohttp.ClientSession") as session_cls:
+        _mock_session(session_cls, 200, "")
+        accepted, execution_id, error = await send_to_n8n_webhook_ack(
+            "http://test/webhook",
+            outbox_id=10,
+            callback_url="http://userbot:8081/outbox/complete",
+            post_text="hello",
+            pdf_path="",
+            message_id=1,
+            channel_id="123",
+            source_channel="123",
+        )
+    assert accepted is False and execution_id == ""
+    assert "execution_id" in error
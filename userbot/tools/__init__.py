@@ -0,0 +1 @@
+"""Developer tools: local stand-ins and benchmarks (not part of the container image)."""
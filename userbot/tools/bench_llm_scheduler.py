@@ -0,0 +1,120 @@
+"""
+Offline benchmark: a burst of backfill and live summaries against the rate-limited fake LLM,
+once with ad hoc retries (what concurrent n8n nodes do) and once through LLMScheduler.
+
+Limits are per `--period` seconds instead of a minute so a run takes seconds.
+Run: python -m tools.bench_llm_scheduler --requests 80 --rpm 30 --tpm 12000 --period 2
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from src.services.llm_client import LLMClient, LLMError
+from src.services.llm_scheduler import PRIORITY_BACKFILL, PRIORITY_LIVE, LLMScheduler, priority_name
+from tools.fake_llm import FakeLLM, start_fake_llm
+
+# Ad hoc mode: retries per request and the wait when the server sends no Retry-After
+ADHOC_MAX_RETRIES = 20
+ADHOC_RETRY_SEC = 1.0
+
+
+@dataclass
+class RunResult:
+    mode: str
+    seconds: float = 0.0
+    rate_limited: int = 0
+    failed: int = 0
+    tokens: int = 0
+    done_after: dict[str, list[float]] = field(default_factory=dict)
+    queue_seconds: list[float] = field(default_factory=list)
+
+
+def _prompt(i: int, size: int) -> str:
+    return "Промпт канала\n\nТекст:\n" + f"Пост {i}. " + "Выручка выросла, прибыль снизилась. " * size
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+async def _run(mode: str, args: argparse.Namespace) -> RunResult:
+    fake = FakeLLM(latency=args.latency, rpm=args.rpm, tpm=args.tpm, period=args.period)
+    runner, base_url = await start_fake_llm(fake)
+    scheduler = None
+    if mode == "scheduled":
+        scheduler = LLMScheduler(rpm=args.rpm, tpm=args.tpm, max_concurrency=args.concurrency, period=args.period)
+    client = LLMClient(base_url=base_url, model="fake", scheduler=scheduler)
+    result = RunResult(mode=mode)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    started = time.perf_counter()
+
+    async def one(i: int, priority: int) -> None:
+        prompt = _prompt(i, args.size)
+        try:
+            if scheduler is not None:
+                response = await client.complete(prompt, max_tokens=64, priority=priority)
+                result.queue_seconds.append(response.queue_seconds)
+            else:
+                async with semaphore:
+                    for attempt in range(ADHOC_MAX_RETRIES + 1):
+                        try:
+                            response = await client.complete(prompt, max_tokens=64)
+                            break
+                        except LLMError as e:
+                            if e.status != 429 or attempt == ADHOC_MAX_RETRIES:
+                                raise
+                            await asyncio.sleep(e.retry_after or ADHOC_RETRY_SEC)
+            result.tokens += response.prompt_tokens + response.completion_tokens
+            result.done_after.setdefault(priority_name(priority), []).append(time.perf_counter() - started)
+        except LLMError:
+            result.failed += 1
+
+    backfill = args.requests // 2
+    try:
+        # Backfill is queued first; live posts arrive right after and should still finish first
+        await asyncio.gather(
+            *(one(i, PRIORITY_BACKFILL) for i in range(backfill)),
+            *(one(i, PRIORITY_LIVE) for i in range(backfill, args.requests)),
+        )
+    finally:
+        await client.close()
+        await runner.cleanup()
+    result.seconds = time.perf_counter() - started
+    result.rate_limited = fake.rate_limited
+    return result
+
+
+def _print(result: RunResult) -> None:
+    print(f"{result.mode}: {result.seconds:.2f}s, 429 responses {result.rate_limited}, failed {result.failed}, tokens {result.tokens}")
+    for name, values in sorted(result.done_after.items()):
+        print(f"  {name:<9} done p50 {_pct(values, 50):6.2f}s  p95 {_pct(values, 95):6.2f}s  n={len(values)}")
+    if result.queue_seconds:
+        print(f"  queue wait p50 {_pct(result.queue_seconds, 50):.2f}s  p95 {_pct(result.queue_seconds, 95):.2f}s")
+
+
+async def _main(args: argparse.Namespace) -> None:
+    for mode in ("adhoc", "scheduled"):
+        _print(await _run(mode, args))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark LLMScheduler against ad hoc 429 retries")
+    parser.add_argument("--requests", type=int, default=80)
+    parser.add_argument("--rpm", type=int, default=30, help="requests per period")
+    parser.add_argument("--tpm", type=int, default=12000, help="tokens per period")
+    parser.add_argument("--period", type=float, default=2.0, help="seconds the limits refer to")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--size", type=int, default=20, help="sentences per prompt")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Local stand-in for an OpenAI-compatible /v1/chat/completions endpoint (tests and offline runs).
+
+The "summary" is the first words of the text after "Текст:"; usage is estimated like the
+client does. With rpm/tpm it enforces limits like the real API (token buckets that refill over
+`period` seconds; a request costs its prompt tokens plus max_tokens) and answers 429 with
+Retry-After. Run: python -m tools.fake_llm --port 8099 --latency 0.2 --rpm 60 --tpm 20000
+"""
+
+import argparse
+import asyncio
+import math
+import time
+from typing import Callable, Optional
+
+from aiohttp import web
+
+from src.services.rate_limiter import TokenBucket
+
+SUMMARY_WORDS = 12
+
+
+class FakeLLM:
+    """aiohttp app with request log and peak concurrency; fail(prompt) -> HTTP status to fail a request."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        fail: Optional[Callable[[str], Optional[int]]] = None,
+        rpm: int = 0,
+        tpm: int = 0,
+        period: float = 60.0,
+    ) -> None:
+        self.latency = latency
+        self.fail = fail
+        self.rpm = TokenBucket(rpm / period, rpm) if rpm > 0 else None
+        self.tpm = TokenBucket(tpm / period, tpm) if tpm > 0 else None
+        self.prompts: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rate_limited = 0
+
+    def _rate_limit_wait(self, tokens: int) -> float:
+        """Charge the request against the buckets; seconds to wait if one of them is short."""
+        now = time.monotonic()
+        wait = 0.0
+        if self.rpm is not None:
+            wait = max(wait, self.rpm.time_until(now))
+        if self.tpm is not None:
+            wait = max(wait, self.tpm.time_until(now, tokens))
+        if wait == 0.0:
+            if self.rpm is not None:
+                self.rpm.try_take(now)
+            if self.tpm is not None:
+                self.tpm.try_take(now, tokens)
+        return wait
+
+    @staticmethod
+    def summarize(prompt: str) -> str:
+        text = prompt.split("Текст:", 1)[-1]
+        return "Кратко: " + " ".join(text.split()[:SUMMARY_WORDS])
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        prompt = "\n".join(m.get("content") or "" for m in body.get("messages") or [])
+        wait = self._rate_limit_wait(math.ceil(len(prompt) / 4) + int(body.get("max_tokens") or 0))
+        if wait > 0:
+            self.rate_limited += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status=429,
+                headers={"Retry-After": f"{wait:.3f}"},
+            )
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            status = self.fail(prompt) if self.fail else None
+            if status:
+                return web.json_response({"error": {"message": "fake failure"}}, status=status)
+            content = self.summarize(prompt)
+            return web.json_response(
+                {
+                    "id": f"fake-{len(self.prompts)}",
+                    "object": "chat.completion",
+                    "model": body.get("model") or "fake",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {
+                        "prompt_tokens": math.ceil(len(prompt) / 4),
+                        "completion_tokens": math.ceil(len(content) / 4),
+                        "total_tokens": math.ceil(len(prompt) / 4) + math.ceil(len(content) / 4),
+                    },
+                }
+            )
+        finally:
+            self.in_flight -= 1
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self.handle)
+        return app
+
+
+async def start_fake_llm(fake: FakeLLM, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, str]:
+    """Start the server; returns (runner, base_url such as http://127.0.0.1:PORT/v1). Stop with runner.cleanup()."""
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}/v1"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute, 0 = unlimited")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute, 0 = unlimited")
+    args = parser.parse_args()
+    fake = FakeLLM(latency=args.latency, rpm=args.rpm, tpm=args.tpm)
+    web.run_app(fake.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
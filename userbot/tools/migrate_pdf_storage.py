@@ -0,0 +1,192 @@
+"""
+One-off move of the PDF volume from the flat layout (/data/pdfs/<chat>_<msg>.pdf) to the sharded
+one (/data/pdfs/ab/cd/<chat>_<msg>.pdf, see src/services/pdf_storage.py), with pdf_path updated in
+every table that stores it and each file registered in pdf_files (migration 020). Optimized
+variants (<name>.opt.pdf, editor-bot) move along with their original. Files that are already
+sharded but missing from pdf_files are indexed too, so the tool can be rerun at any time.
+
+Files of a batch are moved first and their rows updated in one transaction; if the transaction
+fails, the files of that batch are moved back.
+Run (in the userbot container): python -m tools.migrate_pdf_storage [--dry-run] [--storage /data/pdfs]
+"""
+
+import argparse
+import asyncio
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import asyncpg
+
+from src.services.pdf_storage import PDF_SHARD_LEVELS, is_sharded_path, sharded_path
+
+OPTIMIZED_SUFFIX = ".opt.pdf"
+BATCH_SIZE = 500
+# Tables with a pdf_path column; the ones not created yet (migrations not applied) are skipped
+PDF_PATH_TABLES = ("userbot_outbox", "userbot_outbox_archive", "posts", "pdf_extractions", "pdf_meta")
+
+
+@dataclass
+class PdfMove:
+    old: str
+    new: str
+    size_bytes: int
+    created_at: datetime
+
+
+def _stat(path: str) -> tuple[int, datetime]:
+    st = os.stat(path)
+    return st.st_size, datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+
+
+def plan_moves(base: str) -> list[PdfMove]:
+    """Flat PDFs in base and where they go; optimized variants go to their original's directory."""
+    moves = []
+    with os.scandir(base) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.lower().endswith(".pdf"):
+                continue
+            name = entry.name
+            if name.endswith(OPTIMIZED_SUFFIX):
+                original = name[: -len(OPTIMIZED_SUFFIX)] + ".pdf"
+                new = os.path.join(os.path.dirname(sharded_path(base, original)), name)
+            else:
+                new = sharded_path(base, name)
+            size, created = _stat(entry.path)
+            moves.append(PdfMove(entry.path, new, size, created))
+    return sorted(moves, key=lambda m: m.old)
+
+
+def find_sharded(base: str) -> list[PdfMove]:
+    """Originals already in the sharded layout (old == new); variants are not indexed."""
+    found = []
+    for root, dirs, files in os.walk(base):
+        depth = os.path.relpath(root, base).count(os.sep) + 1 if root != base else 0
+        if depth >= PDF_SHARD_LEVELS:
+            dirs[:] = []
+        if depth != PDF_SHARD_LEVELS:
+            continue
+        for name in files:
+            path = os.path.join(root, name)
+            if name.lower().endswith(".pdf") and not name.endswith(OPTIMIZED_SUFFIX) and is_sharded_path(base, path):
+                size, created = _stat(path)
+                found.append(PdfMove(path, path, size, created))
+    return sorted(found, key=lambda m: m.old)
+
+
+def move_files(moves: list[PdfMove]) -> list[PdfMove]:
+    """Rename each file to its new path; returns the moves done (targets that exist are skipped)."""
+    done = []
+    for move in moves:
+        if os.path.exists(move.new):
+            print(f"skip {move.old}: {move.new} already exists")
+            continue
+        os.makedirs(os.path.dirname(move.new), exist_ok=True)
+        os.rename(move.old, move.new)
+        done.append(move)
+    return done
+
+
+def undo_moves(moves: list[PdfMove]) -> None:
+    for move in moves:
+        try:
+            os.rename(move.new, move.old)
+        except OSError as e:
+            print(f"could not move {move.new} back to {move.old}: {e}")
+
+
+async def _existing_tables(conn: asyncpg.Connection) -> list[str]:
+    rows = await conn.fetch(
+        "SELECT t FROM unnest($1::text[]) AS t WHERE to_regclass(t) IS NOT NULL",
+        list(PDF_PATH_TABLES),
+    )
+    return [row["t"] for row in rows]
+
+
+async def _apply_batch(conn: asyncpg.Connection, tables: list[str], moves: list[PdfMove]) -> None:
+    """Repoint pdf_path of moved files and index them with the outbox rows and posts that reference them."""
+    olds = [m.old for m in moves]
+    news = [m.new for m in moves]
+    async with conn.transaction():
+        for table in tables:
+            await conn.execute(
+                f"""
+                UPDATE {table} AS t SET pdf_path = m.new
+                FROM unnest($1::text[], $2::text[]) AS m(old, new)
+                WHERE t.pdf_path = m.old AND m.old <> m.new
+                """,
+                olds,
+                news,
+            )
+        # Variants are not indexed: they are derived from their original and live next to it
+        originals = [m for m in moves if not m.new.endswith(OPTIMIZED_SUFFIX)]
+        ref_sources = []
+        if "userbot_outbox" in tables:
+            ref_sources.append("SELECT o.pdf_path AS path, 'outbox:' || o.id AS ref FROM userbot_outbox o JOIN m ON o.pdf_path = m.path")
+        if "posts" in tables:
+            ref_sources.append("SELECT p.pdf_path AS path, 'post:' || p.id AS ref FROM posts p JOIN m ON p.pdf_path = m.path")
+        refs = " UNION ".join(ref_sources) or "SELECT NULL::text AS path, NULL::text AS ref WHERE false"
+        await conn.execute(
+            f"""
+            WITH m AS (
+                SELECT * FROM unnest($1::text[], $2::bigint[], $3::timestamptz[]) AS m(path, size_bytes, created_at)
+            ),
+            refs AS ({refs})
+            INSERT INTO pdf_files (path, size_bytes, created_at, last_access_at, referenced_by)
+            SELECT m.path, m.size_bytes, m.created_at, m.created_at,
+                   ARRAY(SELECT refs.ref FROM refs WHERE refs.path = m.path)
+            FROM m
+            ON CONFLICT (path) DO NOTHING
+            """,
+            [m.new for m in originals],
+            [m.size_bytes for m in originals],
+            [m.created_at for m in originals],
+        )
+
+
+async def migrate(database_url: str, base: str, dry_run: bool) -> None:
+    moves = plan_moves(base)
+    sharded = find_sharded(base)
+    print(f"{len(moves)} flat file(s) to move, {len(sharded)} sharded file(s) to index in {base}")
+    if dry_run:
+        for move in moves[:20]:
+            print(f"{move.old} -> {move.new}")
+        return
+    conn = await asyncpg.connect(database_url)
+    try:
+        if not await conn.fetchval("SELECT to_regclass('pdf_files') IS NOT NULL"):
+            raise SystemExit("pdf_files is missing: apply init_db/migrate_020_pdf_files.sql first")
+        tables = await _existing_tables(conn)
+        moved = 0
+        for start in range(0, len(moves), BATCH_SIZE):
+            done = move_files(moves[start : start + BATCH_SIZE])
+            try:
+                await _apply_batch(conn, tables, done)
+            except Exception:
+                undo_moves(done)
+                raise
+            moved += len(done)
+            print(f"moved {moved}/{len(moves)}")
+        indexed = await conn.fetch("SELECT path FROM pdf_files WHERE path = ANY($1::text[])", [m.new for m in sharded])
+        known = {row["path"] for row in indexed}
+        missing = [m for m in sharded if m.new not in known]
+        for start in range(0, len(missing), BATCH_SIZE):
+            await _apply_batch(conn, tables, missing[start : start + BATCH_SIZE])
+        print(f"indexed {len(missing)} sharded file(s) missing from pdf_files")
+    finally:
+        await conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--storage", default=os.environ.get("PDF_STORAGE_PATH", "/data/pdfs"))
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", ""))
+    parser.add_argument("--dry-run", action="store_true", help="only print what would be moved")
+    args = parser.parse_args()
+    if not args.dry_run and not args.database_url:
+        parser.error("DATABASE_URL or --database-url is required")
+    asyncio.run(migrate(args.database_url, args.storage, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()